@@ -0,0 +1,127 @@
+"""
+取图方式基准：主动取图（POLLING，循环 MV_CC_GetImageBuffer）与回调取流（CALLBACK，SDK 回调写入 FrameRing）
+使用模拟相机后端，不需要相机及 MVS SDK；两种方式依次在同一台模拟相机上运行
+    连续采集    帧率、SDK 接收到开始处理的延迟（遥测 SdkMs）、进程 CPU 占用、停止取流耗时
+    空闲        触发模式且无触发：进程 CPU 占用、取图超时次数、停止取流耗时（主动取图最长等待一个超时）
+
+用法（在项目根目录执行）:
+    python -m Benchmark.acquisition_benchmark --seconds 5
+    python -m Benchmark.acquisition_benchmark --frame-rate 10 --process-ms 20 --output acquisition.json
+"""
+import sys
+import json
+import argparse
+from time import perf_counter, process_time, sleep
+import numpy as np
+
+# 在导入相机模块前选择模拟相机后端
+import User.config_static
+User.config_static.CF_CAMERA_BACKEND = "SIMULATED"
+
+from CameraCore.my_camera_t import MyCamera, ACQUISITION_POLLING, ACQUISITION_CALLBACK
+from CameraCore.camera_telemetry import CameraTelemetry
+from MvImport.MvErrorDefine_const import MV_OK
+
+
+def stop_grabbing(camera: MyCamera) -> float:
+    """
+    停止取流，等待取流循环退出
+    :param camera:
+    :return:    耗时 ms
+    """
+    start = perf_counter()
+    camera.release_grab()
+    while camera.get_grab_flag():
+        sleep(0.001)
+    return (perf_counter() - start) * 1000
+
+
+def run_mode(camera_identity, acquisition: str, seconds: float, frame_rate: float, process_ms: float, idle: bool) -> dict:
+    """
+    一种取图方式的一个场景
+    :param camera_identity:
+    :param acquisition:     ACQUISITION_POLLING/ACQUISITION_CALLBACK
+    :param seconds:         运行时间
+    :param frame_rate:      连续采集帧率，0 为相机最大帧率
+    :param process_ms:      帧处理回调的模拟耗时
+    :param idle:            True 为触发模式且不触发
+    :return:
+    """
+    def frame_process(frame_data: np.ndarray, parameters: dict, *args, **kwargs) -> np.ndarray:
+        if process_ms > 0:
+            sleep(process_ms / 1000)
+        return frame_data
+
+    # 遥测按序列号累计，每个场景重新开始
+    CameraTelemetry._instances.pop(camera_identity.serial_number, None)
+
+    camera = MyCamera(camera_identity=camera_identity, name=camera_identity.uid, acquisition=acquisition,
+                      frame_process_callback=frame_process)
+    ret = camera.open_camera()
+    if ret != MV_OK:
+        return {"Acquisition": acquisition, "Error": "打开相机失败[%#X]" % (ret,)}
+
+    if idle:
+        camera.set_TriggerMode(1)
+        camera.set_TriggerSource(7)
+    elif frame_rate > 0:
+        camera.set_AcquisitionFrameRateEnable(True)
+        camera.set_AcquisitionFrameRate(float(frame_rate))
+
+    camera.grab_in_runtime()
+    while not camera.get_grab_flag():
+        sleep(0.001)
+
+    cpu_start, wall_start = process_time(), perf_counter()
+    sleep(seconds)
+    cpu, wall = process_time() - cpu_start, perf_counter() - wall_start
+
+    stop_ms = stop_grabbing(camera)
+    camera.close_camera()
+
+    telemetry = camera.telemetry.get_summary()
+    return {
+        "Acquisition": acquisition,
+        "Scenario": "IDLE" if idle else "STREAM",
+        "Frames": telemetry["Frames"],
+        "Fps": telemetry["Fps"],
+        "LostFrames": telemetry["LostFrames"],
+        "Timeouts": telemetry["Timeouts"],
+        "SdkMsP50": telemetry["SdkMsP50"],
+        "SdkMsP95": telemetry["SdkMsP95"],
+        "CpuPercent": round(cpu / wall * 100, 2),
+        "StopMs": round(stop_ms, 3),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="polling vs callback acquisition benchmark")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每个场景的运行时间（秒）")
+    parser.add_argument("--frame-rate", type=float, default=0.0, help="连续采集帧率，0 为 CF_SIMULATED_CAMERAS 中的最大帧率")
+    parser.add_argument("--process-ms", type=float, default=5.0, help="帧处理回调的模拟耗时（毫秒）")
+    parser.add_argument("--output", default="", help="结果保存为json文件")
+    args = parser.parse_args()
+
+    MyCamera.enum_cameras()
+    cameras_identity = list(MyCamera.get_enum_cameras_identity())
+    if not cameras_identity:
+        print("没有模拟相机，检查 CF_SIMULATED_CAMERAS")
+        return 1
+
+    results = list()
+    for idle in (False, True):
+        for acquisition in (ACQUISITION_POLLING, ACQUISITION_CALLBACK):
+            results.append(run_mode(cameras_identity[0], acquisition=acquisition, seconds=args.seconds,
+                                    frame_rate=args.frame_rate, process_ms=args.process_ms, idle=idle))
+
+    for result in results:
+        print("  ".join("%s[%s]" % (k, v) for k, v in result.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+    return 1 if any("Error" in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+导入耗时基准
+在独立的子进程中执行 python -X importtime -c "import <module>"，统计各入口模块的总导入时间及最耗时的依赖
+
+用法（在项目根目录执行）:
+    python -m Benchmark.import_time
+    python -m Benchmark.import_time Utils.frame_operator main_grab --top 15 --output import_time.json
+"""
+import sys
+import json
+import argparse
+from subprocess import run, PIPE
+from os import path as os_path
+
+# 项目根目录
+ROOT_DIR = os_path.dirname(os_path.dirname(os_path.abspath(__file__)))
+
+# 默认统计的模块，依次为 检测核心、相机进程、示教进程、主进程
+DEFAULT_MODULES = ["Utils.frame_operator", "main_grab", "main_teach", "main_root"]
+
+
+def measure_import_time(module: str, python: str = sys.executable) -> dict:
+    """
+    测量模块导入时间
+    :param module:  模块名
+    :param python:  python解释器
+    :return:        {"Module", "Success", "Total", "Imports": [(name, self_us, cumulative_us), ...], "Error"}
+    """
+    completed = run([python, "-X", "importtime", "-c", "import %s" % module],
+                    cwd=ROOT_DIR, stdout=PIPE, stderr=PIPE, universal_newlines=True)
+
+    imports = list()
+    errors = list()
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            self_us = int(fields[0])
+            cumulative_us = int(fields[1])
+        except ValueError:
+            continue    # 标题行
+        # 缩进表示导入层级
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), self_us, cumulative_us, level))
+
+    # 目标模块的累计时间即总导入时间（不含解释器启动时的 site 等）
+    total = sum(item[2] for item in imports if item[3] == 0 and item[0] == module)
+
+    return {"Module": module,
+            "Success": completed.returncode == 0,
+            "Total": total,
+            "Imports": imports,
+            "Error": "\n".join(errors[-5:])}
+
+
+def top_imports(imports: list, top: int) -> list:
+    """
+    按累计时间排序的直接依赖（只统计第一层，避免子包重复计算）
+    :param imports:
+    :param top:
+    :return:
+    """
+    first_level = [item for item in imports if item[3] == 1]
+    first_level.sort(key=lambda item: item[2], reverse=True)
+    return first_level[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import time benchmark")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="要测量的模块")
+    parser.add_argument("--top", type=int, default=10, help="显示最耗时的依赖数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最小值")
+    parser.add_argument("--output", default="", help="结果保存为json文件")
+    args = parser.parse_args()
+
+    results = list()
+    for module in args.modules:
+        best = None
+        for _ in range(max(args.repeat, 1)):
+            res = measure_import_time(module)
+            if best is None or (res["Success"] and res["Total"] < best["Total"]):
+                best = res
+
+        results.append(best)
+
+        if not best["Success"]:
+            print("%-24s import failed: %s" % (module, best["Error"].splitlines()[-1] if best["Error"] else ""))
+            continue
+
+        print("%-24s %10.1f ms" % (module, best["Total"] / 1000))
+        for name, self_us, cumulative_us, _ in top_imports(best["Imports"], args.top):
+            print("    %-40s %10.1f ms" % (name, cumulative_us / 1000))
+
+    if args.output:
+        summary = [{"Module": res["Module"], "Success": res["Success"], "TotalMs": res["Total"] / 1000,
+                    "Top": [{"Name": name, "CumulativeMs": cumulative_us / 1000}
+                            for name, _, cumulative_us, _ in top_imports(res["Imports"], args.top)]}
+                   for res in results]
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(summary, file, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
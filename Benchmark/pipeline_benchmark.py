@@ -0,0 +1,210 @@
+"""
+检测流程基准
+使用 FrameSynthesizer 合成不同 分辨率/网格/噪声/条纹/透视 的图片，分别统计 FrameOperator 各阶段及完整检测的耗时，结果保存为json，
+并可与之前保存的结果比较
+
+用法（在项目根目录执行）:
+    python -m Benchmark.pipeline_benchmark --output bench.json
+    python -m Benchmark.pipeline_benchmark --resolutions 2448x2048 --grids 20x16 --methods 1 --repeat 20
+    python -m Benchmark.pipeline_benchmark --baseline bench_old.json --tolerance 0.15
+"""
+import sys
+import json
+import platform
+import argparse
+from time import perf_counter
+from itertools import product
+from os import cpu_count
+import numpy as np
+import cv2
+
+from Utils.frame_operator import FrameOperator
+from Utils.frame_kernels import FrameKernels
+from Utils.frame_synthesizer import FrameSynthesizer
+
+STAGES = ["Perspective", "Binarization", "StripeDenoise", "Morphology", "Contours", "Match", "EndToEnd"]
+
+
+def parse_sizes(text: str) -> list:
+    """
+    "1280x1024,2448x2048" -> [(1280, 1024), (2448, 2048)]
+    """
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+
+def parse_numbers(text: str, number_type=float) -> list:
+    return [number_type(item) for item in text.split(",") if item]
+
+
+def time_stages(frame: np.ndarray, message: dict) -> dict:
+    """
+    依次执行各阶段并计时
+    :param frame:
+    :param message:
+    :return:    {阶段: 秒}
+    """
+    p = message
+    vertexes = [[p["P1X"], p["P1Y"]], [p["P2X"], p["P2Y"]], [p["P3X"], p["P3Y"]], [p["P4X"], p["P4Y"]]]
+    timing = dict()
+
+    start = perf_counter()
+    perspective = FrameOperator.perspective_transform(frame, vertexes)
+    timing["Perspective"] = perf_counter() - start
+
+    start = perf_counter()
+    binarization, _ = FrameOperator.binarization_transform(
+        perspective, p["ScaleAlpha"], p["ScaleBeta"], p["GammaConstant"], p["GammaPower"], p["LogConstant"],
+        p["Thresh"], p["SauvolaThreshWindowSize"], p["SauvolaThreshK"],
+        p["ScaleEnable"], p["GammaEnable"], p["LogEnable"], p["AutoThresh"], p["ThreadMethod"])
+    timing["Binarization"] = perf_counter() - start
+
+    start = perf_counter()
+    denoise = binarization
+    if p["StripeEnable"]:
+        denoise = FrameOperator.stripe_denoise(denoise, p["EliminatedSpan"], p["ReservedInterval"])
+    timing["StripeDenoise"] = perf_counter() - start
+
+    start = perf_counter()
+    denoise = FrameOperator.denoise_transform(denoise, p["EliminatedSpan"], p["ReservedInterval"],
+                                              p["ErodeShape"], p["ErodeKsize"], p["ErodeIterations"],
+                                              p["DilateShape"], p["DilateKsize"], p["DilateIterations"],
+                                              False, p["ErodeEnable"], p["DilateEnable"])
+    timing["Morphology"] = perf_counter() - start
+
+    start = perf_counter()
+    contours_collection = FrameOperator.find_matched_contours(denoise, p["MinArea"], p["MaxArea"], p["MaxRoundness"], p["MaxDistance"],
+                                                              p["XNumber"], p["XMini"], p["XMaxi"], p["YNumber"], p["YMini"], p["YMaxi"])
+    timing["Contours"] = perf_counter() - start
+
+    start = perf_counter()
+    pins_map = FrameOperator.convert_contours_collection_to_array(contours_collection, p["XNumber"], p["YNumber"])
+    FrameOperator.match_pins_map(pins_map, p["PinsMap"])
+    timing["Match"] = perf_counter() - start
+
+    return timing
+
+
+def run_case(case: dict, repeat: int, seed: int) -> dict:
+    """
+    执行一个用例
+    :param case:
+    :param repeat:
+    :param seed:
+    :return:
+    """
+    width, height = case["Resolution"]
+    x_number, y_number = case["Grid"]
+    synthetic = FrameSynthesizer.synthesize(width=width, height=height, x_number=x_number, y_number=y_number,
+                                            noise=case["Noise"], stripes=case["Stripes"], perspective=case["Warp"],
+                                            thread_method=case["ThreadMethod"], seed=seed)
+    frame = synthetic["Frame"]
+    message = dict(synthetic["Parameters"], PinsMap=synthetic["PinsMap"])
+
+    samples = {stage: list() for stage in STAGES}
+    detection_res = None
+    for _ in range(repeat):
+        for stage, elapsed in time_stages(frame, message).items():
+            samples[stage].append(elapsed)
+        start = perf_counter()
+        # 完整检测，含结果绘制
+        detection_res, _, _, _ = FrameOperator.detect_frame(frame, message)
+        samples["EndToEnd"].append(perf_counter() - start)
+
+    result = {"Resolution": "%dx%d" % (width, height), "Grid": "%dx%d" % (x_number, y_number),
+              "Noise": case["Noise"], "Stripes": case["Stripes"], "Warp": case["Warp"],
+              "ThreadMethod": case["ThreadMethod"], "Detection": bool(detection_res)}
+    # 合成图片与基准一致，检测结果为 False 说明参数与图片不匹配，耗时没有参考意义
+    for stage in STAGES:
+        values = np.array(samples[stage]) * 1000
+        result[stage] = {"MedianMs": round(float(np.median(values)), 3), "MinMs": round(float(values.min()), 3)}
+    return result
+
+
+def case_name(result: dict) -> str:
+    return "%s|%s|n%s|s%s|w%s|m%s" % (result["Resolution"], result["Grid"], result["Noise"], result["Stripes"],
+                                     result["Warp"], result["ThreadMethod"])
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    与基准结果比较，返回变慢超过容差的阶段
+    :param results:
+    :param baseline:
+    :param tolerance:   允许的相对变慢比例
+    :return:    [(用例, 阶段, 基准ms, 当前ms), ...]
+    """
+    old = {case_name(item): item for item in baseline}
+    regressions = list()
+    for item in results:
+        reference = old.get(case_name(item))
+        if reference is None:
+            continue
+        for stage in STAGES:
+            before = reference[stage]["MedianMs"]
+            after = item[stage]["MedianMs"]
+            # 极短的阶段受计时误差影响大，忽略 0.5ms 以内的差异
+            if after > before * (1 + tolerance) and after - before > 0.5:
+                regressions.append((case_name(item), stage, before, after))
+    return regressions
+
+
+def environment() -> dict:
+    import numba
+    return {"Python": platform.python_version(), "Platform": platform.platform(), "Processor": platform.processor(),
+            "CpuCount": cpu_count(), "Numpy": np.__version__, "Opencv": cv2.__version__, "Numba": numba.__version__}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="detection pipeline benchmark")
+    parser.add_argument("--resolutions", default="1280x1024,2448x2048", help="分辨率列表")
+    parser.add_argument("--grids", default="12x8,24x16", help="网格 列x行 列表")
+    parser.add_argument("--noise", default="4", help="噪声标准差列表")
+    parser.add_argument("--stripes", default="0,6", help="条纹数量列表")
+    parser.add_argument("--perspective", default="0.05", help="透视畸变程度列表")
+    parser.add_argument("--methods", default="0,1", help="二值化方法 ThreadMethod 列表")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数，取中位数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", default="", help="结果保存为json文件")
+    parser.add_argument("--baseline", default="", help="用于比较的历史结果json文件")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的相对变慢比例")
+    args = parser.parse_args()
+
+    # 预热，避免首个用例计入编译时间
+    warm_up_time = FrameKernels.warm_up()
+
+    cases = [{"Resolution": resolution, "Grid": grid, "Noise": noise, "Stripes": stripes, "Warp": perspective, "ThreadMethod": method}
+             for resolution, grid, noise, stripes, perspective, method in product(
+                parse_sizes(args.resolutions), parse_sizes(args.grids), parse_numbers(args.noise),
+                parse_numbers(args.stripes, int), parse_numbers(args.perspective), parse_numbers(args.methods, int))]
+
+    results = list()
+    print("%-44s %s" % ("case", " ".join("%13s" % stage for stage in STAGES)))
+    for case in cases:
+        result = run_case(case, repeat=max(args.repeat, 1), seed=args.seed)
+        results.append(result)
+        print("%-44s %s%s" % (case_name(result), " ".join("%13.3f" % result[stage]["MedianMs"] for stage in STAGES),
+                              "" if result["Detection"] else "  [检测结果错误]"))
+
+    # 合成图片的检测结果应全部正确，否则计时的不是正常的检测流程
+    failures = [case_name(result) for result in results if not result["Detection"]]
+    for name in failures:
+        print("[错误] %s 检测结果与基准不一致" % (name,))
+
+    report = {"Environment": environment(), "WarmUpS": round(warm_up_time, 3), "Repeat": args.repeat, "Seed": args.seed, "Results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["Results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, stage, before, after in regressions:
+            print("[变慢] %s %s %.3fms -> %.3fms" % (name, stage, before, after))
+        if regressions:
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+模拟相机 取流->检测 基准
+使用模拟相机后端（CameraCore.simulated_camera），不需要相机及 MVS SDK，可在 linux/CI 中运行
+每台合成帧源的模拟相机由 MyCamera 取流，在帧处理回调中按合成的检测参数及基准检测，统计帧率、检测耗时及检测结果
+
+用法（在项目根目录执行）:
+    python -m Benchmark.simulated_camera_benchmark --seconds 10
+    python -m Benchmark.simulated_camera_benchmark --trigger 5 --seconds 10
+    python -m Benchmark.simulated_camera_benchmark --frame-rate 30 --output sim.json
+    python -m Benchmark.simulated_camera_benchmark --runtime POOL --seconds 10
+"""
+import sys
+import json
+import argparse
+import threading
+from time import perf_counter, sleep
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+# 在导入相机模块前选择模拟相机后端
+import User.config_static
+User.config_static.CF_CAMERA_BACKEND = "SIMULATED"
+
+from CameraCore.my_camera_t import MyCamera
+from CameraCore.camera_runtime import ThreadRuntime, PoolRuntime
+from CameraCore.simulated_camera import SimulatedMvCamera
+from MvImport.MvErrorDefine_const import MV_OK
+from Utils.frame_operator import FrameOperator
+from Utils.frame_kernels import FrameKernels
+
+
+class DetectionCounter:
+    """
+    帧处理回调，检测并统计
+    """
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.lock = threading.Lock()
+        self.latencies = list()
+        self.right = 0
+        self.wrong = 0
+
+    def __call__(self, frame_data: np.ndarray, parameters: dict, *args, **kwargs) -> np.ndarray:
+        start = perf_counter()
+        # 彩色相机（RGB8Packed/BayerRG8）的帧转为灰度图
+        if frame_data.ndim == 3:
+            frame_data = cv2.cvtColor(frame_data, cv2.COLOR_BGR2GRAY)
+        detection_res, _, _, draw = FrameOperator.detect_frame(frame_data, self.message)
+        elapsed = (perf_counter() - start) * 1000
+        with self.lock:
+            self.latencies.append(elapsed)
+            if detection_res:
+                self.right += 1
+            else:
+                self.wrong += 1
+        return draw
+
+
+def run_camera(camera_identity, runtime, seconds: float, frame_rate: float, trigger: float) -> dict:
+    """
+    一台模拟相机取流并检测
+    :param camera_identity:
+    :param runtime:     取流的执行方式
+    :param seconds:     取流时间
+    :param frame_rate:  连续采集帧率，0 为相机最大帧率
+    :param trigger:     软触发频率，0 为连续采集
+    :return:
+    """
+    references = SimulatedMvCamera.get_synthetic_references(camera_identity.serial_number)
+    if not references:
+        return {"SerialNumber": camera_identity.serial_number, "Error": "不是合成帧源"}
+    counter = DetectionCounter(message=dict(references[0]["Parameters"], PinsMap=references[0]["PinsMap"]))
+
+    camera = MyCamera(camera_identity=camera_identity, name=camera_identity.uid, frame_process_callback=counter, runtime=runtime)
+    ret = camera.open_camera()
+    if ret != MV_OK:
+        return {"SerialNumber": camera_identity.serial_number, "Error": "打开相机失败[%#X]" % (ret,)}
+
+    if frame_rate > 0:
+        camera.set_AcquisitionFrameRateEnable(True)
+        camera.set_AcquisitionFrameRate(float(frame_rate))
+    if trigger > 0:
+        camera.set_TriggerMode(1)
+        camera.set_TriggerSource(7)
+
+    camera.grab_in_runtime()
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        if trigger > 0:
+            camera.set_TriggerSoftware()
+            sleep(1 / trigger)
+        else:
+            sleep(0.1)
+    camera.close_camera()
+    elapsed = perf_counter() - start
+
+    latencies = sorted(counter.latencies)
+    frames = len(latencies)
+    statistics = camera.get_statistics()
+    telemetry = camera.telemetry.get_summary()
+    return {
+        "SerialNumber": camera_identity.serial_number,
+        "Runtime": type(runtime).__name__,
+        "Frames": frames,
+        "Fps": round(frames / elapsed, 2),
+        "LostFrames": statistics["LostFrames"],
+        "Right": counter.right,
+        "Wrong": counter.wrong,
+        "DetectP50Ms": round(latencies[frames // 2], 3) if frames else float("nan"),
+        "DetectMaxMs": round(latencies[-1], 3) if frames else float("nan"),
+        "Timeouts": telemetry["Timeouts"],
+        "SdkMsP95": telemetry["SdkMsP95"],
+        "ProcessMsP95": telemetry["ProcessMsP95"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="simulated camera grab and detect benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="每台相机取流时间（秒）")
+    parser.add_argument("--frame-rate", type=float, default=0.0, help="连续采集帧率，0 为 CF_SIMULATED_CAMERAS 中的最大帧率")
+    parser.add_argument("--runtime", default="THREAD", choices=["THREAD", "POOL"], help="取流的执行方式")
+    parser.add_argument("--trigger", type=float, default=0.0, help="软触发频率（次/秒），0 为连续采集")
+    parser.add_argument("--output", default="", help="结果保存为json文件")
+    args = parser.parse_args()
+
+    # 预热检测内核，第一帧不计入编译时间
+    FrameKernels.warm_up()
+
+    MyCamera.enum_cameras()
+    cameras_identity = list(MyCamera.get_enum_cameras_identity())
+    if not cameras_identity:
+        print("没有模拟相机，检查 CF_SIMULATED_CAMERAS")
+        return 1
+
+    # 各相机同时取流，POOL 时在共用的线程池中取流
+    pool = ThreadPoolExecutor(max_workers=len(cameras_identity)) if args.runtime == "POOL" else None
+    results = [None] * len(cameras_identity)
+
+    def run(index: int):
+        runtime = PoolRuntime(executor=pool) if pool is not None else ThreadRuntime()
+        results[index] = run_camera(cameras_identity[index], runtime=runtime,
+                                    seconds=args.seconds, frame_rate=args.frame_rate, trigger=args.trigger)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(cameras_identity))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if pool is not None:
+        pool.shutdown()
+
+    for result in results:
+        print("  ".join("%s[%s]" % (k, v) for k, v in result.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=4)
+    return 1 if any("Error" in result for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
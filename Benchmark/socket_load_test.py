@@ -0,0 +1,233 @@
+"""
+socket 服务器负载测试
+建立大量空闲连接，同时由少量活跃客户端循环发送命令，统计服务器线程数、内存及命令往返时延
+本进程启动的 asyncio 服务器默认不限流，--limit 时按 CF_SOCKET_RATE_LIMIT 限流；时延及吞吐量只统计得到应答的命令，被限流的命令单独计数
+
+用法（在项目根目录执行）:
+    python -m Benchmark.socket_load_test --dummy --idle 500 --active 4 --requests 50
+    python -m Benchmark.socket_load_test --dummy --delay 0.05 --active 4 --requests 48 --pipeline 8
+    python -m Benchmark.socket_load_test --dummy --limit --active 4 --requests 50
+    python -m Benchmark.socket_load_test --server THREAD --idle 200 --active 0
+    python -m Benchmark.socket_load_test --host 192.168.1.10 --port 8888 --idle 300 --command "enum line"
+"""
+import sys
+import json
+import socket
+import argparse
+import threading
+from time import perf_counter, sleep
+
+from Utils.socket_operator import SocketOperator
+from Utils.async_socket_server import AsyncSocketServer, TokenBucket
+from Utils.socket_protocol import (COMMAND_PREFIX, COMMAND_LINES, RESPONSE_PREFIX, RESPONSE_RATE_LIMITED, REQUEST_ID_PREFIX,
+                                   FRAME_DELIMITER, create_message, get_request_id, frame_response)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class DummyExecutor:
+    """
+    不访问数据库及相机的命令执行对象，只测量服务器本身的开销
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def execute(self, data: str, reply) -> bool:
+        if self.delay > 0:
+            sleep(self.delay)
+        reply(frame_response(create_message(RESPONSE_PREFIX, "ok"), request_id=get_request_id(data)))
+        return True
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_rss_mb() -> float:
+    if psutil is None:
+        return float("nan")
+    return psutil.Process().memory_info().rss / 1024 ** 2
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def start_server(kind: str, port: int, executor_factory=None, limit: bool = False):
+    """
+    在当前进程启动服务器
+    :param kind:                ASYNC / THREAD
+    :param port:
+    :param executor_factory:    asyncio 版服务器的命令执行对象，None 为 CommandExecutor
+    :param limit:               asyncio 版服务器按 CF_SOCKET_RATE_LIMIT 限流，False 时不限流，只测量服务器本身
+    :return:
+    """
+    if kind == "ASYNC":
+        kwargs = dict() if limit else {"bucket_factory": lambda: TokenBucket(rate=0)}
+        if executor_factory is not None:
+            kwargs["executor_factory"] = executor_factory
+        server = AsyncSocketServer(**kwargs)
+    else:
+        # 每个客户端一个 MyCorrespondent 线程
+        server = SocketOperator()
+
+    created = threading.Event()
+    t = threading.Thread(target=server.start_listen, daemon=True,
+                         kwargs={"ip": "127.0.0.1", "port": port,
+                                 "server_created_successful_callback": created.set,
+                                 "server_created_failed_callback": lambda error: print("[监听失败] %s" % error)})
+    t.start()
+    created.wait(30)
+    return server
+
+
+def open_idle_clients(host: str, port: int, count: int) -> list:
+    clients = list()
+    for _ in range(count):
+        try:
+            clients.append(socket.create_connection((host, port), timeout=10))
+        except OSError as err:
+            print("[连接失败] 已建立[%d]个连接 %s" % (len(clients), err))
+            break
+    return clients
+
+
+def run_active_client(host: str, port: int, command: str, requests: int, latencies: list, limited: list, errors: list):
+    try:
+        with socket.create_connection((host, port), timeout=30) as conn:
+            for _ in range(requests):
+                start = perf_counter()
+                conn.send(command.encode("utf-8"))
+                response = conn.recv(1024).decode("utf-8")
+                if not response:
+                    errors.append("closed")
+                    return
+                # 被限流的命令不计入时延
+                if RESPONSE_RATE_LIMITED in response:
+                    limited.append(response)
+                else:
+                    latencies.append((perf_counter() - start) * 1000)
+    except OSError as err:
+        errors.append(str(err))
+
+
+def run_pipelined_client(host: str, port: int, command: str, requests: int, pipeline: int, latencies: list, limited: list, errors: list):
+    """
+    每次连续发送 pipeline 条带 id 的命令，再按 id 接收全部响应
+    """
+    data = json.loads(command)
+    try:
+        with socket.create_connection((host, port), timeout=30) as conn, conn.makefile("r", encoding="utf-8") as file:
+            for first in range(0, requests, pipeline):
+                sent = dict()
+                for request_id in range(first, min(first + pipeline, requests)):
+                    data[REQUEST_ID_PREFIX] = request_id
+                    sent[request_id] = perf_counter()
+                    conn.send((json.dumps(data) + FRAME_DELIMITER).encode("utf-8"))
+                while sent:
+                    line = file.readline()
+                    if not line:
+                        errors.append("closed")
+                        return
+                    response = json.loads(line)
+                    start = sent.pop(response[REQUEST_ID_PREFIX])
+                    if response[RESPONSE_PREFIX] == RESPONSE_RATE_LIMITED:
+                        limited.append(response)
+                    else:
+                        latencies.append((perf_counter() - start) * 1000)
+    except (OSError, ValueError, KeyError) as err:
+        errors.append(str(err))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="socket server load test")
+    parser.add_argument("--host", default="", help="外部服务器地址，为空时在本进程启动服务器")
+    parser.add_argument("--port", type=int, default=0, help="外部服务器端口")
+    parser.add_argument("--server", default="ASYNC", choices=["ASYNC", "THREAD"], help="本进程启动的服务器类型")
+    parser.add_argument("--dummy", action="store_true", help="本进程 asyncio 服务器使用不访问数据库及相机的命令执行对象")
+    parser.add_argument("--delay", type=float, default=0.0, help="dummy 命令的执行时间（秒）")
+    parser.add_argument("--limit", action="store_true", help="本进程 asyncio 服务器按 CF_SOCKET_RATE_LIMIT 限流，默认不限流")
+    parser.add_argument("--idle", type=int, default=500, help="空闲连接数")
+    parser.add_argument("--active", type=int, default=4, help="活跃客户端数")
+    parser.add_argument("--requests", type=int, default=50, help="每个活跃客户端发送的命令数")
+    parser.add_argument("--command", default=COMMAND_LINES, help="活跃客户端发送的命令")
+    parser.add_argument("--pipeline", type=int, default=0, help="每个活跃客户端连续发送的带 id 命令数，0 为逐条发送并等待响应")
+    parser.add_argument("--output", default="", help="结果保存为json文件")
+    args = parser.parse_args()
+
+    server = None
+    if args.host:
+        host, port = args.host, args.port
+    else:
+        host, port = "127.0.0.1", get_free_port()
+        executor_factory = (lambda: DummyExecutor(delay=args.delay)) if args.dummy else None
+        server = start_server(kind=args.server, port=port, executor_factory=executor_factory, limit=args.limit)
+
+    threads_before = threading.active_count()
+    rss_before = get_rss_mb()
+
+    start = perf_counter()
+    idle_clients = open_idle_clients(host, port, args.idle)
+    connect_time = perf_counter() - start
+    sleep(1)
+
+    threads_idle = threading.active_count()
+    rss_idle = get_rss_mb()
+
+    latencies, limited, errors = list(), list(), list()
+    command = create_message(COMMAND_PREFIX, args.command)
+    if args.pipeline > 0:
+        active = [threading.Thread(target=run_pipelined_client, args=(host, port, command, args.requests, args.pipeline, latencies, limited, errors))
+                  for _ in range(args.active)]
+    else:
+        active = [threading.Thread(target=run_active_client, args=(host, port, command, args.requests, latencies, limited, errors))
+                  for _ in range(args.active)]
+    start = perf_counter()
+    for t in active:
+        t.start()
+    for t in active:
+        t.join()
+    active_time = perf_counter() - start
+
+    report = {
+        "Server": "%s:%d" % (host, port) if args.host else args.server,
+        "IdleConnections": len(idle_clients),
+        "ConnectS": round(connect_time, 3),
+        # 只有本进程启动的服务器才能统计线程数及内存
+        "ThreadsBefore": threads_before,
+        "ThreadsIdle": threads_idle,
+        "RssBeforeMB": round(rss_before, 1),
+        "RssIdleMB": round(rss_idle, 1),
+        "Requests": len(latencies),
+        "RateLimited": len(limited),
+        "Errors": len(errors),
+        "Throughput": round(len(latencies) / active_time, 1) if active_time else 0.0,
+        "LatencyP50Ms": round(percentile(latencies, 0.5), 3),
+        "LatencyP95Ms": round(percentile(latencies, 0.95), 3),
+        "LatencyMaxMs": round(max(latencies), 3) if latencies else float("nan"),
+    }
+    for key, value in report.items():
+        print("%-16s %s" % (key, value))
+
+    for conn in idle_clients:
+        conn.close()
+    if server is not None:
+        server.stop_listen()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=4)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,22 @@
 from typing import Dict, Union
+from threading import Lock
 from ctypes import memset, cast, POINTER, CFUNCTYPE, create_string_buffer, c_ubyte, c_void_p, byref, sizeof, c_bool
+try:
+    # windows 下 SDK 回调为 __stdcall
+    from ctypes import WINFUNCTYPE as IMAGE_CALLBACK_FUNCTYPE
+except ImportError:
+    IMAGE_CALLBACK_FUNCTYPE = CFUNCTYPE
 
 from MvImport.CameraParams_const import MV_GIGE_DEVICE, MV_ACCESS_Exclusive
-from MvImport.MvCameraControl_class import MvCamera
+from User.config_static import CF_CAMERA_BACKEND
+if CF_CAMERA_BACKEND == "SIMULATED":
+    from CameraCore.simulated_camera import SimulatedMvCamera as MvCamera
+else:
+    from MvImport.MvCameraControl_class import MvCamera
 from MvImport.CameraParams_header import (MV_CC_DEVICE_INFO_LIST, MV_CC_DEVICE_INFO, MV_FRAME_OUT_INFO_EX,
                                           MVCC_INTVALUE_EX, MVCC_FLOATVALUE, MVCC_ENUMVALUE, MVCC_STRINGVALUE,
-                                          MV_TRANSMISSION_TYPE, MV_GIGE_TRANSTYPE_MULTICAST)
+                                          MV_TRANSMISSION_TYPE, MV_GIGE_TRANSTYPE_MULTICAST, MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV,
+                                          MV_NETTRANS_INFO)
 from MvImport.MvErrorDefine_const import MV_OK
 
 from CameraCore.camera_err_header import *
@@ -65,8 +76,14 @@ from CameraCore.camera_err_header import *
 
 class CameraOperator(MvCamera):
 
+    # SDK 枚举时会释放并重新申请设备列表内存，同一进程内依次枚举
+    enum_lock = Lock()
+
     def __init__(self):
         super().__init__()
+        # 注册到 SDK 的回调函数对象，SDK 保存的是函数指针，被回收后回调会访问无效内存，在句柄销毁前保持引用
+        self.c_image_callback = None
+        self.c_image_callback_user = None
 
     @staticmethod
     def enum_devices(device_type: int = MV_GIGE_DEVICE, enum_err_callback=None, enum_none_callback=None, enum_successful_callback=None) -> int:
@@ -132,23 +149,25 @@ class CameraOperator(MvCamera):
             返回：成功，返回MV_OK；失败，返回错误码
             备注：设备列表的内存是在SDK内部分配的，多线程调用该接口时会进行设备列表内存的释放和申请，建议尽量避免多线程枚举操作。
         '''
-        ret = CameraOperator.MV_CC_EnumDevices(device_type, device_info_list)
+        # 设备列表在读取完成前不能被其他线程的枚举释放
+        with CameraOperator.enum_lock:
+            ret = CameraOperator.MV_CC_EnumDevices(device_type, device_info_list)
+            if ret == MV_OK and device_info_list.nDeviceNum > 0:
+                # 找到相机
+                if enum_successful_callback is not None:
+                    enum_successful_callback(device_info_list=device_info_list, device_num=device_info_list.nDeviceNum)
+
         if ret != MV_OK:
             # 枚举设备失败
             err_str: str = CameraOperator.err_code_map(err_code=ret)
             if enum_err_callback is not None:
                 enum_err_callback(err_code=ret, err_str=err_str)
-        else:
-            if device_info_list.nDeviceNum == 0:  # nDeviceNum -> 在线设备数量
-                # 没有找到相机
-                ret = CAMERA_ENUM_NONE
-                err_str: str = CameraOperator.err_code_map(err_code=ret)
-                if enum_none_callback is not None:
-                    enum_none_callback(err_code=ret, err_str=err_str)
-            else:
-                # 找到相机
-                if enum_successful_callback is not None:
-                    enum_successful_callback(device_info_list=device_info_list, device_num=device_info_list.nDeviceNum)
+        elif device_info_list.nDeviceNum == 0:  # nDeviceNum -> 在线设备数量
+            # 没有找到相机
+            ret = CAMERA_ENUM_NONE
+            err_str: str = CameraOperator.err_code_map(err_code=ret)
+            if enum_none_callback is not None:
+                enum_none_callback(err_code=ret, err_str=err_str)
         return ret
 
     @staticmethod
@@ -159,8 +178,8 @@ class CameraOperator(MvCamera):
         :param device_index:                        设备列表结构体中序号，从0开始，
         :return:
         """
-        # 开辟空间
-        st_device_info: MV_CC_DEVICE_INFO = cast(device_info_list.pDeviceInfo[device_index], POINTER(MV_CC_DEVICE_INFO)).contents
+        # 复制一份，设备列表内存在下次枚举时由 SDK 释放
+        st_device_info: MV_CC_DEVICE_INFO = MV_CC_DEVICE_INFO.from_buffer_copy(cast(device_info_list.pDeviceInfo[device_index], POINTER(MV_CC_DEVICE_INFO)).contents)
         return st_device_info
 
     @staticmethod
@@ -296,6 +315,9 @@ class CameraOperator(MvCamera):
         返回                      ->  成功，返回MV_OK；失败，返回错误码
         '''
         ret = self.MV_CC_DestroyHandle()
+        # 句柄销毁后 SDK 不再回调
+        self.c_image_callback = None
+        self.c_image_callback_user = None
         if ret != MV_OK:
             if destroy_handle_failed_callback is not None:
                 destroy_handle_failed_callback(err_code=ret, err_str=self.err_code_map(err_code=ret))
@@ -365,13 +387,14 @@ class CameraOperator(MvCamera):
                 close_device_successful_callback()
         return ret
 
-    def set_multicast_TransmissionType(self, ip: Union[str, list] = "239.192.1.1", port: int = 1042,
+    def set_multicast_TransmissionType(self, ip: Union[str, list] = "239.192.1.1", port: int = 1042, receive: bool = True,
                                        set_multicast_successful_callback=None,
                                        set_multicast_failed_callback=None) -> int:
         """
         设置组播模式
         :param ip:          字符串类型 -> "239.192.1.1"  列表类型 -> ["239", "192", "1", "1"]
         :param port:
+        :param receive:     False -> MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV，本实例只控制采集，不接收图像
         :param set_multicast_successful_callback:
         :param set_multicast_failed_callback:
         :return:
@@ -386,7 +409,7 @@ class CameraOperator(MvCamera):
         transmission_type = MV_TRANSMISSION_TYPE()
         memset(byref(transmission_type), 0, sizeof(MV_TRANSMISSION_TYPE))
 
-        transmission_type.enTransmissionType = MV_GIGE_TRANSTYPE_MULTICAST
+        transmission_type.enTransmissionType = MV_GIGE_TRANSTYPE_MULTICAST if receive else MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV
         transmission_type.nDestIp = dest_ip
         transmission_type.nDestPort = port
 
@@ -488,16 +511,19 @@ class CameraOperator(MvCamera):
         elif isinstance(user_data, str):
             str_user = create_string_buffer(user_data.encode('utf-8'))
             p_user = cast(str_user, c_void_p)
+            self.c_image_callback_user = str_user
         else:
             p_user = None
 
         # 创建一个c函数类型的对象
-        c_image_callback = CFUNCTYPE(None, p_data, p_st_frame_out_info, c_void_p)
+        c_image_callback = IMAGE_CALLBACK_FUNCTYPE(None, p_data, p_st_frame_out_info, c_void_p)
         '''第一个参数是python回调函数的返回值，如果没有就是None；第二个及其以后的就是python回调函数的参数类型'''
         # 根据c函数类型的对象生成python回调函数
         py_image_callback = c_image_callback(image_callback)
 
         ret = self.MV_CC_RegisterImageCallBackEx(py_image_callback, p_user)
+        if ret == MV_OK:
+            self.c_image_callback = py_image_callback
         if ret != MV_OK:
             if register_image_failed_callback is not None:
                 # 销毁句柄
@@ -765,6 +791,41 @@ class CameraOperator(MvCamera):
                 get_value_failed_callback(err_code=ret, err_str=self.err_code_map(err_code=ret))
             return ret
 
+    def is_device_connected(self) -> bool:
+        """
+        设备是否在线（掉线后需要关闭并重新打开）
+        :return:
+        """
+        return bool(self.MV_CC_IsDeviceConnected())
+
+    def get_net_trans_info(self) -> dict:
+        """
+        获取网络传输统计（只对GigE相机有效），统计开始取流到当前
+        :return:    {"ret", "ReceiveDataSize", "ThrowFrameCount", "NetRecvFrameCount", "RequestResendPacketCount", "ResendPacketCount"}
+        """
+        st_net_trans_info = MV_NETTRANS_INFO()
+        memset(byref(st_net_trans_info), 0, sizeof(MV_NETTRANS_INFO))
+        ret = self.MV_GIGE_GetNetTransInfo(st_net_trans_info)
+        if ret != MV_OK:
+            return {"ret": ret}
+        return {"ret": ret,
+                "ReceiveDataSize": st_net_trans_info.nReceiveDataSize,
+                "ThrowFrameCount": st_net_trans_info.nThrowFrameCount,
+                "NetRecvFrameCount": st_net_trans_info.nNetRecvFrameCount,
+                "RequestResendPacketCount": st_net_trans_info.nRequestResendPacketCount,
+                "ResendPacketCount": st_net_trans_info.nResendPacketCount}
+
+    def get_GevTimestampTickFrequency(self, get_value_successful_callback=None, get_value_failed_callback=None) -> dict:
+        """
+        获取设备时间戳频率 Hz
+        :param get_value_successful_callback:
+        :param get_value_failed_callback:
+        :return:
+        """
+        return self.get_device_parameter(param_type='int', node_name="GevTimestampTickFrequency",
+                                         get_value_successful_callback=get_value_successful_callback,
+                                         get_value_failed_callback=get_value_failed_callback)
+
     def get_PayloadSize(self, get_value_successful_callback=None, get_value_failed_callback=None) -> dict:
         """
         获取数据包大小
@@ -0,0 +1,100 @@
+from abc import ABC, abstractmethod
+from threading import Thread
+from concurrent.futures import Executor, Future
+from typing import Optional
+
+from Utils.messenger import Messenger
+
+
+"""
+相机取流的执行方式，MyCamera 只有一个取流循环 MyCamera.grab()，由执行方式决定在哪里运行
+    ThreadRuntime       进程内线程（默认），界面及 socket 命令使用
+    PoolRuntime         线程池/进程池的 worker，多台相机共用有限的线程
+"""
+
+
+class CameraRuntime(ABC):
+    """
+    执行方式的接口
+    """
+
+    @abstractmethod
+    def start(self, camera) -> None:
+        """
+        开始运行 camera.grab()，不等待取流结束
+        :param camera:  MyCamera
+        :return:
+        """
+
+    @abstractmethod
+    def join(self, timeout: Optional[float] = None) -> None:
+        """
+        等待取流结束
+        :param timeout:
+        :return:
+        """
+
+    @abstractmethod
+    def is_alive(self) -> bool:
+        """
+        是否仍在取流
+        :return:
+        """
+
+
+class ThreadRuntime(CameraRuntime):
+    """
+    每次取流一个线程
+    """
+
+    def __init__(self, name: Optional[str] = None, daemon: bool = False):
+        """
+        :param name:    线程名称，None 为相机名称
+        :param daemon:
+        """
+        self.name = name
+        self.daemon = daemon
+        self.thread: Optional[Thread] = None
+
+    def start(self, camera) -> None:
+        self.thread = Thread(target=camera.grab, name=self.name or camera.name, daemon=self.daemon)
+        self.thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+
+class PoolRuntime(CameraRuntime):
+    """
+    在 executor 的 worker 中取流，取流期间占用一个 worker
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self.future: Optional[Future] = None
+
+    def start(self, camera) -> None:
+        self.future = self.executor.submit(camera.grab)
+        self.future.add_done_callback(self.grab_done)
+
+    @staticmethod
+    def grab_done(future: Future):
+        if future.cancelled():
+            return
+        err = future.exception()
+        if err is not None:
+            m = {"level": 'ERROR', "title": '错误', "text": '相机取流异常结束！',
+                 "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+            Messenger.print(message=m)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self.future is not None:
+            # 异常已在 grab_done 中输出
+            self.future.exception(timeout)
+
+    def is_alive(self) -> bool:
+        return self.future is not None and not self.future.done()
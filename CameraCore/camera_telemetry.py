@@ -0,0 +1,223 @@
+import threading
+from collections import deque
+from time import monotonic
+from typing import Optional
+import numpy as np
+
+from MvImport.CameraParams_header import MV_FRAME_OUT_INFO_EX
+from MvImport.MvErrorDefine_const import MV_OK, MV_E_NODATA
+
+from User.config_static import CF_CAMERA_TELEMETRY_SIZE, CF_CAMERA_TELEMETRY_NET_INTERVAL
+
+"""
+相机取流遥测：每帧的帧号、丢帧、时间戳及各阶段耗时记录在环形缓冲中，用于判断检测慢在哪一环
+    网络    TransferJitterMs    设备时间戳到 SDK 接收的延迟（相对本次取流中的最小值，设备时钟与主机不同步，只能得到抖动）
+            LostPackets         帧信息中的丢包数；ResendRequested/Resent 为 MV_GIGE_GetNetTransInfo 的重发统计
+    SDK     SdkMs               SDK 接收到 MV_CC_GetImageBuffer 取出的时间，即帧在 SDK 缓存节点中的排队时间
+            LostFrames          帧号不连续（缓存节点满时 SDK 丢弃、或网络丢帧）
+            Timeouts/Errors     MV_CC_GetImageBuffer 超时/失败次数
+    处理    ProcessMs           取出后 复制、转换、保存及帧处理回调 的耗时
+遥测按相机序列号保存在进程内，关闭相机后仍可查询
+"""
+
+# 环形缓冲中每帧记录的字段
+FRAME_FIELDS = ("Grab", "FrameNum", "Gap", "ReceiveTime", "DeviceTime", "SdkMs", "TransferMs", "ProcessMs", "LostPacket")
+
+
+class CameraTelemetry:
+    """
+    一台相机的取流遥测，取流线程写入，界面及 socket 线程读取
+    """
+    _instances = dict()     # {serial_number: CameraTelemetry}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, serial_number: str, uid: str = '', size: int = CF_CAMERA_TELEMETRY_SIZE):
+        """
+        :param serial_number:
+        :param uid:
+        :param size:    环形缓冲保留的帧数
+        """
+        self.serial_number = serial_number
+        self.uid = uid
+        self.lock = threading.Lock()
+        self.frames = deque(maxlen=size)
+
+        # 本次取流
+        self.grabbing = False
+        self.tick_frequency = None      # 设备时间戳频率 Hz
+        self.last_frame_num = None
+        self.min_transfer_ms = None
+        self.last_net_time = 0.0
+
+        # 累计
+        self.grabs = 0
+        self.total_frames = 0
+        self.lost_frames = 0
+        self.lost_packets = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_error = None
+        self.net_trans = dict()
+
+    @classmethod
+    def get_instance(cls, serial_number: str, uid: str = '') -> "CameraTelemetry":
+        with cls._instances_lock:
+            instance = cls._instances.get(serial_number)
+            if instance is None:
+                instance = cls._instances[serial_number] = cls(serial_number=serial_number, uid=uid)
+            elif uid:
+                instance.uid = uid
+            return instance
+
+    @classmethod
+    def get_instances(cls) -> list:
+        with cls._instances_lock:
+            return list(cls._instances.values())
+
+    def start(self, tick_frequency: Optional[int] = None):
+        """
+        开始取流，帧号及传输延迟的基准重新计算
+        :param tick_frequency:  设备时间戳频率 Hz，None 时不计算设备帧率
+        :return:
+        """
+        with self.lock:
+            self.grabbing = True
+            self.grabs += 1
+            self.tick_frequency = tick_frequency or None
+            self.last_frame_num = None
+            self.min_transfer_ms = None
+            self.last_net_time = monotonic()
+
+    def stop(self):
+        with self.lock:
+            self.grabbing = False
+
+    def record_frame(self, st_frame_out_info: MV_FRAME_OUT_INFO_EX, receive_time: float, process_seconds: float):
+        """
+        记录一帧
+        :param st_frame_out_info:   帧信息
+        :param receive_time:        MV_CC_GetImageBuffer 返回的时间 time()
+        :param process_seconds:     处理耗时 s
+        :return:
+        """
+        frame_num = st_frame_out_info.nFrameNum
+        device_ticks = (st_frame_out_info.nDevTimeStampHigh << 32) | st_frame_out_info.nDevTimeStampLow
+        host_ms = st_frame_out_info.nHostTimeStamp
+
+        with self.lock:
+            # 帧号为 32 位，回绕后仍连续；帧号变小（相机重新开始计数）不计为丢帧
+            gap = 0
+            if self.last_frame_num is not None:
+                gap = (frame_num - self.last_frame_num - 1) & 0xFFFFFFFF
+                if gap >= 0x80000000:
+                    gap = 0
+            self.last_frame_num = frame_num
+
+            device_time = device_ticks / self.tick_frequency if self.tick_frequency and device_ticks else None
+            sdk_ms = receive_time * 1000 - host_ms if host_ms else None
+            transfer_ms = None
+            if device_time is not None and host_ms:
+                offset = host_ms - device_time * 1000
+                if self.min_transfer_ms is None or offset < self.min_transfer_ms:
+                    self.min_transfer_ms = offset
+                transfer_ms = offset - self.min_transfer_ms
+
+            self.frames.append((self.grabs, frame_num, gap, receive_time, device_time, sdk_ms, transfer_ms, process_seconds * 1000,
+                                st_frame_out_info.nLostPacket))
+            self.total_frames += 1
+            self.lost_frames += gap
+            self.lost_packets += st_frame_out_info.nLostPacket
+
+    def record_failure(self, ret: int):
+        """
+        记录 MV_CC_GetImageBuffer 失败
+        :param ret: 错误码，MV_E_NODATA 为超时
+        :return:
+        """
+        with self.lock:
+            if ret == MV_E_NODATA:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+                self.last_error = ret
+
+    def need_net_trans(self) -> bool:
+        """
+        距上次查询网络传输统计超过 CF_CAMERA_TELEMETRY_NET_INTERVAL
+        :return:
+        """
+        now = monotonic()
+        with self.lock:
+            if now - self.last_net_time < CF_CAMERA_TELEMETRY_NET_INTERVAL:
+                return False
+            self.last_net_time = now
+            return True
+
+    def set_net_trans(self, net_trans: dict):
+        """
+        :param net_trans:   CameraOperator.get_net_trans_info() 的结果，统计开始取流到当前
+        :return:
+        """
+        if net_trans.get("ret") != MV_OK:
+            return
+        with self.lock:
+            self.net_trans = dict(net_trans)
+
+    def get_frames(self) -> list:
+        """
+        环形缓冲中的帧记录
+        :return:    [{FRAME_FIELDS}, ...]，从旧到新
+        """
+        with self.lock:
+            frames = list(self.frames)
+        return [dict(zip(FRAME_FIELDS, frame)) for frame in frames]
+
+    @staticmethod
+    def percentiles(values: list, prefix: str) -> dict:
+        values = [v for v in values if v is not None]
+        if not values:
+            return {prefix + "P50": None, prefix + "P95": None, prefix + "Max": None}
+        p50, p95 = np.percentile(values, [50, 95])
+        return {prefix + "P50": round(float(p50), 3), prefix + "P95": round(float(p95), 3), prefix + "Max": round(float(max(values)), 3)}
+
+    def get_summary(self) -> dict:
+        """
+        环形缓冲中的帧率及各阶段耗时，累计的丢帧、超时及重发统计
+        :return:
+        """
+        with self.lock:
+            frames = list(self.frames)
+            summary = {"SerialNumber": self.serial_number, "Uid": self.uid, "Grabbing": self.grabbing, "Grabs": self.grabs,
+                       "Frames": self.total_frames, "LostFrames": self.lost_frames, "LostPackets": self.lost_packets,
+                       "Timeouts": self.timeouts, "Errors": self.errors,
+                       "LastError": None if self.last_error is None else "%#X" % (self.last_error,),
+                       "ResendRequested": self.net_trans.get("RequestResendPacketCount"),
+                       "Resent": self.net_trans.get("ResendPacketCount"),
+                       "ThrowFrames": self.net_trans.get("ThrowFrameCount")}
+
+        summary["Window"] = len(frames)
+        # 帧率及丢帧率只按最近一次取流中的帧计算，各次取流之间的空闲不计入
+        last = [frame for frame in frames if frame[0] == frames[-1][0]] if frames else list()
+        fps = device_fps = None
+        gaps = sum(frame[2] for frame in last[1:])
+        if len(last) >= 2:
+            elapsed = last[-1][3] - last[0][3]
+            if elapsed > 0:
+                fps = (len(last) - 1) / elapsed
+            if last[0][4] is not None and last[-1][4] is not None and last[-1][4] > last[0][4]:
+                device_fps = (len(last) - 1 + gaps) / (last[-1][4] - last[0][4])
+        summary["Fps"] = None if fps is None else round(fps, 2)
+        summary["DeviceFps"] = None if device_fps is None else round(device_fps, 2)
+        summary["DropRate"] = round(gaps / (len(last) + gaps), 4) if last else None
+        summary.update(self.percentiles([frame[5] for frame in frames], "SdkMs"))
+        summary.update(self.percentiles([frame[6] for frame in frames], "TransferJitterMs"))
+        summary.update(self.percentiles([frame[7] for frame in frames], "ProcessMs"))
+        return summary
+
+    @staticmethod
+    def get_summaries(uid: Optional[str] = None) -> list:
+        """
+        :param uid:     None 为全部相机
+        :return:
+        """
+        return [telemetry.get_summary() for telemetry in CameraTelemetry.get_instances() if uid is None or telemetry.uid == uid]
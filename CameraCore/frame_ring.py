@@ -0,0 +1,123 @@
+import threading
+from collections import deque
+from ctypes import c_ubyte, memmove, sizeof, byref
+from time import time
+from typing import Optional
+
+from MvImport.CameraParams_header import MV_FRAME_OUT_INFO_EX
+
+
+class FrameSlot:
+    """
+    环形缓冲中的一帧，缓存按帧长度开辟，帧长度变大时重新开辟
+    """
+
+    def __init__(self):
+        self.frame_buf = None
+        self.st_frame_out_info = MV_FRAME_OUT_INFO_EX()
+        self.put_time = 0.0     # 复制完成的时间 time()
+
+    def copy_from(self, p_data, p_st_frame_out_info):
+        """
+        复制 SDK 的帧数据及帧信息，回调返回后 SDK 缓存不再有效
+        :param p_data:                  POINTER(c_ubyte)
+        :param p_st_frame_out_info:     POINTER(MV_FRAME_OUT_INFO_EX)
+        :return:
+        """
+        memmove(byref(self.st_frame_out_info), p_st_frame_out_info, sizeof(MV_FRAME_OUT_INFO_EX))
+        frame_len = self.st_frame_out_info.nFrameLen
+        if self.frame_buf is None or len(self.frame_buf) < frame_len:
+            self.frame_buf = (c_ubyte * frame_len)()
+        memmove(self.frame_buf, p_data, frame_len)
+        self.put_time = time()
+
+
+class FrameRing:
+    """
+    回调取流的帧环形缓冲，SDK 回调线程写入，取流线程读取
+    - 写入不等待：没有空闲缓存时覆盖最旧的未读帧（与 SDK 缓存节点满时丢弃最旧帧相同）
+    - 读取方持有的缓存不会被覆盖，直到下一次读取或 release()
+    - close() 立即唤醒等待的读取方，停止取流无需等待超时
+    """
+
+    def __init__(self, size: int = 3):
+        """
+        :param size:    缓存个数，至少 2（读取方持有 1 个）
+        """
+        self.slots = [FrameSlot() for _ in range(max(size, 2))]
+        self.free = deque(range(len(self.slots)))
+        self.ready = deque()
+        self.held = None
+        self.closed = False
+        self.condition = threading.Condition(threading.Lock())
+
+        # 统计
+        self.put_frames = 0
+        self.dropped_frames = 0
+
+    def put(self, p_data, p_st_frame_out_info) -> bool:
+        """
+        在 SDK 回调线程中复制一帧
+        :param p_data:
+        :param p_st_frame_out_info:
+        :return:    关闭后为 False
+        """
+        with self.condition:
+            if self.closed:
+                return False
+            if self.free:
+                index = self.free.popleft()
+            else:
+                # 读取方处理不过来，覆盖最旧的未读帧
+                index = self.ready.popleft()
+                self.dropped_frames += 1
+
+        # 该缓存既不在 free 也不在 ready 中，复制时不加锁
+        self.slots[index].copy_from(p_data, p_st_frame_out_info)
+
+        with self.condition:
+            self.ready.append(index)
+            self.put_frames += 1
+            self.condition.notify()
+        return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[FrameSlot]:
+        """
+        取最旧的未读帧，上一次取出的缓存归还
+        :param timeout:     None 为一直等待，直到有帧或 close()
+        :return:    None 为超时或已关闭
+        """
+        with self.condition:
+            self._release()
+            if not self.condition.wait_for(lambda: self.ready or self.closed, timeout):
+                return None
+            if not self.ready:
+                return None
+            self.held = self.ready.popleft()
+            return self.slots[self.held]
+
+    def release(self):
+        """
+        归还读取方持有的缓存
+        :return:
+        """
+        with self.condition:
+            self._release()
+
+    def _release(self):
+        if self.held is not None:
+            self.free.append(self.held)
+            self.held = None
+
+    def close(self):
+        """
+        停止写入并唤醒读取方，未读的帧丢弃
+        :return:
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def get_statistics(self) -> dict:
+        with self.condition:
+            return {"PutFrames": self.put_frames, "DroppedFrames": self.dropped_frames, "Ready": len(self.ready)}
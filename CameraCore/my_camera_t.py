@@ -3,10 +3,10 @@ import cv2
 import numpy as np
 import os
 from datetime import datetime
-from ctypes import c_ubyte, memset, byref, sizeof, create_string_buffer, cdll, CDLL
+from ctypes import c_ubyte, memset, byref, sizeof, create_string_buffer, memmove
 from threading import Thread
 from multiprocessing import Pipe
-from time import sleep
+from time import sleep, time, perf_counter
 
 from MvImport.CameraParams_const import MV_GIGE_DEVICE, MV_ACCESS_Exclusive, MV_ACCESS_Control, MV_ACCESS_Monitor
 from MvImport.CameraParams_header import (MV_CC_DEVICE_INFO_LIST, MV_CC_DEVICE_INFO, MV_FRAME_OUT_INFO_EX,
@@ -17,16 +17,26 @@ from MvImport.PixelType_header import PixelType_Gvsp_Mono8, PixelType_Gvsp_RGB8_
 
 from CameraCore.camera_operator import CameraOperator
 from CameraCore.camera_identity import CameraIdentity
+from CameraCore.camera_runtime import CameraRuntime, ThreadRuntime
+from CameraCore.sensor_roi import SensorRoi
+from CameraCore.camera_telemetry import CameraTelemetry
+from CameraCore.frame_ring import FrameRing
 from CameraCore.camera_err_header import *
 from CameraCore.communica_message_header import *
 
 from Utils.messenger import Messenger
+from User.config_static import (CF_CAMERA_ACQUISITION, CF_CAMERA_FRAME_RING_SIZE, CF_CAMERA_MULTICAST_ENABLE,
+                                CF_CAMERA_MULTICAST_GROUPS, CF_CAMERA_MULTICAST_PORT)
 
 # libc = CDLL("libc.so.6")  # linux 使用memcpy函数  ??
 
 
 VIRTUAL_CAMERA_SERIAL_NUMBER_PREFIX = "Vir"
 
+# 取图方式 POLLING：取流线程循环 MV_CC_GetImageBuffer / CALLBACK：SDK 回调线程复制到 FrameRing，取流线程等待新帧
+ACQUISITION_POLLING = "POLLING"
+ACQUISITION_CALLBACK = "CALLBACK"
+
 
 class MyCamera(CameraOperator):
     # 全局变量,列表,存放枚举到的 cameras_identity
@@ -80,6 +90,18 @@ class MyCamera(CameraOperator):
         # running_cameras 的锁
         self.running_cameras_lock = kwargs.get("running_cameras_lock")
 
+        # 取流的执行方式，默认每次取流一个线程
+        self.runtime: CameraRuntime = kwargs.get("runtime") or ThreadRuntime()
+        # 取图方式，回调取流时的帧环形缓冲（只在取流期间存在）
+        self.acquisition: str = kwargs.get("acquisition") or CF_CAMERA_ACQUISITION
+        self.frame_ring: Optional[FrameRing] = None
+
+        # 已设置的传感器 ROI，关闭相机前恢复全画幅
+        self.sensor_roi: Optional[dict] = None
+
+        # 取流遥测，同一相机的各次打开共用
+        self.telemetry: CameraTelemetry = CameraTelemetry.get_instance(serial_number=camera_identity.serial_number, uid=camera_identity.uid)
+
         # 相机状态标志
         # 打开标志
         self.open_flag: bool = False
@@ -89,6 +111,8 @@ class MyCamera(CameraOperator):
         # 相机动作
         # 保存图片
         self.to_save: bool = False
+        # 观察每一帧 frame_observer(frame_data)，在保存之后调用（如帧质量检查记录取流中的上一帧）
+        self.frame_observer = None
         # 停止取流
         self.to_stop: bool = False
 
@@ -140,6 +164,10 @@ class MyCamera(CameraOperator):
         :return:
         """
         self.to_stop = flag
+        # 回调取流时立即唤醒等待新帧的取流循环
+        frame_ring = self.frame_ring
+        if flag and frame_ring is not None:
+            frame_ring.close()
 
     def get_to_save(self) -> bool:
         """
@@ -355,14 +383,39 @@ class MyCamera(CameraOperator):
         detailed_text = ''
         Messenger.print(widget=None, level=level, title=title, text=text, informative_text=informative_text, detailed_text=detailed_text)
 
-    def open_camera(self, access_mode: int = MV_ACCESS_Exclusive, multicast_ip: Union[str, list, None] = None, multicast_port: int = 1042) -> int:
+    @staticmethod
+    def get_multicast_group(camera_identity: CameraIdentity) -> tuple:
+        """
+        相机的组播地址，CF_CAMERA_MULTICAST_GROUPS 中未配置时为 239.192.1.<相机IP末位>:CF_CAMERA_MULTICAST_PORT
+        :param camera_identity:
+        :return:    (组地址, 端口)
+        """
+        group = CF_CAMERA_MULTICAST_GROUPS.get(camera_identity.serial_number)
+        if group is not None:
+            return group[0], int(group[1])
+        return "239.192.1.%s" % (camera_identity.current_ip.split('.')[3],), CF_CAMERA_MULTICAST_PORT
+
+    @staticmethod
+    def get_receiver_access_mode() -> int:
+        """
+        显示及检测打开相机的权限：组播时为监控权限，否则独占
+        :return:
+        """
+        return MV_ACCESS_Monitor if CF_CAMERA_MULTICAST_ENABLE else MV_ACCESS_Exclusive
+
+    def open_camera(self, access_mode: Optional[int] = None, multicast_ip: Union[str, list, None] = None,
+                    multicast_port: Optional[int] = None, multicast_receive: bool = True) -> int:
         """
         打开相机
-        :param access_mode:
-        :param multicast_ip:    字符串类型 -> "239.192.1.1"  列表类型 -> ["239", "192", "1", "1"]  None -> 根据相机IP设置
-        :param multicast_port:
+        :param access_mode:         None -> self.access_mode
+        :param multicast_ip:        字符串类型 -> "239.192.1.1"  列表类型 -> ["239", "192", "1", "1"]  None -> get_multicast_group()
+        :param multicast_port:      None -> get_multicast_group()
+        :param multicast_receive:   False -> 控制权限下本实例只控制采集，不接收组播图像
         :return:
         """
+        if access_mode is None:
+            access_mode = self.access_mode
+
         if not self.get_open_flag():
             # 创建句柄
             st_device_info = self.camera_identity.st_device_info
@@ -379,8 +432,8 @@ class MyCamera(CameraOperator):
                 return ret
 
             # 优化网络最佳包大小
-            # 虚拟相机不可用
-            if VIRTUAL_CAMERA_SERIAL_NUMBER_PREFIX not in self.camera_identity.serial_number:
+            # 虚拟相机不可用；监控权限不能写节点，包大小由控制端设置
+            if VIRTUAL_CAMERA_SERIAL_NUMBER_PREFIX not in self.camera_identity.serial_number and access_mode != MV_ACCESS_Monitor:
                 ret = self.optimize_PacketSize(get_value_failed_callback=self.get_PacketSize_failed_callback,
                                                set_value_successful_callback=self.set_PacketSize_successful_callback,
                                                set_value_failed_callback=self.set_PacketSize_failed_callback)
@@ -393,9 +446,13 @@ class MyCamera(CameraOperator):
 
             # 设置组播
             if access_mode == MV_ACCESS_Control or access_mode == MV_ACCESS_Monitor:
+                group_ip, group_port = self.get_multicast_group(self.camera_identity)
                 if multicast_ip is None:
-                    multicast_ip = ["239", "192", "1", self.camera_identity.current_ip.split('.')[3]]
+                    multicast_ip = group_ip
+                if multicast_port is None:
+                    multicast_port = group_port
                 ret = self.set_multicast_TransmissionType(ip=multicast_ip, port=multicast_port,
+                                                          receive=multicast_receive or access_mode != MV_ACCESS_Control,
                                                           set_multicast_successful_callback=self.set_multicast_successful_callback,
                                                           set_multicast_failed_callback=self.set_multicast_failed_callback)
                 if ret != MV_OK:
@@ -532,10 +589,15 @@ class MyCamera(CameraOperator):
             #     return res['ret']
             # payload_size = int(res['nCurValue'])
 
+            # 回调取流，开始取流前注册回调
+            if self.acquisition == ACQUISITION_CALLBACK:
+                self.frame_ring = self.prepare_frame_ring()
+
             # 开始取流
             ret = self.start_grabbing(start_grabbing_successful_callback=self.start_grabbing_successful_callback,
                                       start_grabbing_failed_callback=self.start_grabbing_failed_callback)
             if ret != MV_OK:
+                self.frame_ring = None
                 return ret
 
             # 开始取流前的回调函数
@@ -550,24 +612,35 @@ class MyCamera(CameraOperator):
             self.set_grab_flag(True)    # 取流标志
             self.set_to_stop(False)     # 停止取流动作
 
-            # 持续取流
-            self.do_grabbing()
+            # 遥测，设备时间戳频率用于计算设备帧率及传输延迟
+            res = self.get_GevTimestampTickFrequency()
+            self.telemetry.start(tick_frequency=res["nCurValue"] if res["ret"] == MV_OK else None)
 
-            # 移除 running_cameras
-            if self.running_cameras_lock is not None and self.running_cameras_manager is not None:
-                with self.running_cameras_lock:
-                    self.running_cameras_manager.remove(self.camera_identity.serial_number)
+            try:
+                # 持续取流
+                self.do_grabbing()
+            finally:
+                # 帧处理回调异常时同样停止取流并复位标志，close_camera 不会一直等待
+                # 网络传输统计在停止取流前获取
+                self.telemetry.set_net_trans(self.get_net_trans_info())
+                self.telemetry.stop()
 
-            # 结束取流后的回调函数
-            if self.after_grab_callback is not None:
-                self.after_grab_callback()
+                # 移除 running_cameras
+                if self.running_cameras_lock is not None and self.running_cameras_manager is not None:
+                    with self.running_cameras_lock:
+                        self.running_cameras_manager.remove(self.camera_identity.serial_number)
 
-            # 停止取流
-            ret = self.stop_grabbing(stop_grabbing_successful_callback=self.stop_grabbing_successful_callback,
-                                     stop_grabbing_failed_callback=self.stop_grabbing_failed_callback)
+                # 结束取流后的回调函数
+                if self.after_grab_callback is not None:
+                    self.after_grab_callback()
 
-            self.set_grab_flag(False)   # 取流标志
-            self.set_to_stop(False)     # 停止取流动作
+                # 停止取流，之后 SDK 不再回调
+                ret = self.stop_grabbing(stop_grabbing_successful_callback=self.stop_grabbing_successful_callback,
+                                         stop_grabbing_failed_callback=self.stop_grabbing_failed_callback)
+                self.frame_ring = None
+
+                self.set_grab_flag(False)   # 取流标志
+                self.set_to_stop(False)     # 停止取流动作
 
             return ret
         else:
@@ -582,9 +655,14 @@ class MyCamera(CameraOperator):
     def do_grabbing(self, millisecond: int = 1000):
         """
         持续取流
-        :param millisecond:
+        :param millisecond:     主动取图的超时，回调取流时不使用
         :return:
         """
+        # 回调取流
+        if self.frame_ring is not None:
+            self.do_grabbing_from_ring(frame_ring=self.frame_ring)
+            return
+
         # 方法1 -> 创建图像结构体
         st_frame_out: MV_FRAME_OUT = MV_FRAME_OUT()
         memset(byref(st_frame_out), 0, sizeof(st_frame_out))
@@ -609,98 +687,141 @@ class MyCamera(CameraOperator):
             if ret != MV_OK:
                 # err_str = self.err_code_map(err_code=ret)
                 # print("[%s] -> get no data, error: [%#X, %s] " % (self.camera_identity.uid, ret, err_str))
+                self.telemetry.record_failure(ret)
                 continue
+            receive_time = time()
+            process_start = perf_counter()
 
-            # 开辟图像流缓存空间大小
-            st_frame_out_info: MV_FRAME_OUT_INFO_EX = st_frame_out.stFrameInfo
-            if frame_buf is None:
+            # 帧信息在释放缓存后不再有效，复制一份
+            st_frame_out_info: MV_FRAME_OUT_INFO_EX = MV_FRAME_OUT_INFO_EX.from_buffer_copy(st_frame_out.stFrameInfo)
+            # 开辟图像流缓存空间大小，帧长度变大（如修改 ROI/像素格式）时重新开辟
+            if frame_buf is None or len(frame_buf) < st_frame_out_info.nFrameLen:
                 frame_buf = (c_ubyte * st_frame_out_info.nFrameLen)()
 
-            # 将 p_data 复制到 frame_buf
-            # windows
-            # 方法1
-            cdll.msvcrt.memcpy(byref(frame_buf), st_frame_out.pBufAddr, st_frame_out_info.nFrameLen)
-            # # 方法2
-            # # cdll.msvcrt.memcpy(byref(frame_buf), p_data, st_frame_out_info.nFrameLen)
-            # linux。在linux中, 没有cdll.msvcrt.memcpy, 使用libc = CDLL("libc.so.6").memcpy代替
-            # # 方法1
-            # libc.memcpy(byref(frame_buf), st_frame_out.pBufAddr, st_frame_out_info.nFrameLen)
-            # # 方法2
-            # # libc.memcpy(byref(frame_buf), p_data, st_frame_out_info.nFrameLen)
-
-            width = st_frame_out_info.nWidth  # 图片宽度
-            height = st_frame_out_info.nHeight  # 图片高度
-            '''
-            frombuffer -> 将data以流的形式读入转化成nparray对象
-                          numpy.frombuffer(buffer, dtype=float, count=-1, offset=0)
-                          参数:
-                            buffer: 缓冲区，它表示暴露缓冲区接口的对象。
-                            dtype： 代表返回的数据类型数组的数据类型。默认值为0。
-                            count： 代表返回的ndarray的长度。默认值为-1。
-                            offset：偏移量，代表读取的起始位置。默认值为0。
-            '''
-            # numpy 数组长度为 [nWidth * nHeight], 数据类型为np.uint8
-            frame_data: np.ndarray = np.frombuffer(frame_buf, count=st_frame_out_info.nFrameLen, dtype=np.uint8, offset=0)
-
-            # 将一维数组转化为三维数组
-            # # 灰度图
-            # frame_data = np.reshape(frame_data, (height, width))
-            # 将一维数组转化为三维数组
-            # 灰度图
-            if st_frame_out_info.enPixelType == PixelType_Gvsp_Mono8:
-                frame_data = np.reshape(frame_data, (height, width))
-            # RGB
-            elif st_frame_out_info.enPixelType == PixelType_Gvsp_RGB8_Packed:
-                frame_data = np.reshape(frame_data, (height, width, -1))
-                frame_data = cv2.cvtColor(src=frame_data, code=cv2.COLOR_RGB2BGR)
-            elif st_frame_out_info.enPixelType == PixelType_Gvsp_BayerRG8:
-                frame_data = np.reshape(frame_data, (height, width))
-                frame_data = cv2.cvtColor(frame_data, cv2.COLOR_BAYER_RG2BGR)
-            else:
-                raise Exception("pixel type[%d] has not supported" % st_frame_out_info.enPixelType)
-            # 开始加锁
-            # MyCamera.lock.acquire()
-
-            # 改变图像大小
-            if self.resize_ratio is not None and self.resize_ratio != 1.0:
-                frame_data = cv2.resize(frame_data, None, None, fx=self.resize_ratio, fy=self.resize_ratio, interpolation=cv2.INTER_AREA)
-
-            # 旋转图片
-            if self.rotate_flag == 1:
-                frame_data = cv2.rotate(frame_data, cv2.ROTATE_90_CLOCKWISE)
-            elif self.rotate_flag == 2:
-                frame_data = cv2.rotate(frame_data, cv2.ROTATE_180)
-            elif self.rotate_flag == 3:
-                frame_data = cv2.rotate(frame_data, cv2.ROTATE_90_COUNTERCLOCKWISE)
-
-            # 保存图片
-            if self.get_to_save():
-                parameters = {"SerialNumber": self.camera_identity.serial_number, "Uid": self.camera_identity.uid}
-                self.save_process_callback(frame_data=frame_data, parameters=parameters)
-                self.set_to_save(False)
-
-            # 处理帧数据
-            if self.frame_process_callback is not None:
-                # parameters = {"st_frame_out_info": st_frame_out_info}
-                parameters = dict()
-                frame_data = self.frame_process_callback(frame_data=frame_data, parameters=parameters)
-
-            # 通过pipe管道向GUI进程传输图像画面
-            if self.imgbuf_child_conn is not None:
-                self.imgbuf_child_conn.send({"SerialNumber": self.camera_identity.serial_number, "FrameData": frame_data})
-
-            # 释放锁
-            # MyCamera.lock.release()
-
-            # 方法1 -> 释放缓存
+            # 将 pBufAddr 复制到 frame_buf，ctypes.memmove 不依赖 msvcrt，windows 及 linux 通用
+            memmove(frame_buf, st_frame_out.pBufAddr, st_frame_out_info.nFrameLen)
+            # 复制后立即释放 SDK 缓存，处理帧期间 SDK 可继续使用该缓存
             self.MV_CC_FreeImageBuffer(st_frame_out)
 
+            self.process_frame(frame_buf=frame_buf, st_frame_out_info=st_frame_out_info,
+                               receive_time=receive_time, process_start=process_start)
+
         # 关闭相机后处理变量
         if frame_buf is not None:
             del frame_buf
         # 方法2
         # del p_data
 
+    def do_grabbing_from_ring(self, frame_ring: FrameRing):
+        """
+        回调取流：等待 SDK 回调写入的新帧，没有帧时不占用 CPU，停止取流时立即返回
+        :param frame_ring:
+        :return:
+        """
+        while not self.get_to_stop():
+            slot = frame_ring.get()
+            # 已关闭（停止取流）
+            if slot is None:
+                break
+            self.process_frame(frame_buf=slot.frame_buf, st_frame_out_info=slot.st_frame_out_info,
+                               receive_time=time(), process_start=perf_counter())
+        frame_ring.release()
+
+    def process_frame(self, frame_buf, st_frame_out_info: MV_FRAME_OUT_INFO_EX, receive_time: float, process_start: float):
+        """
+        处理一帧：转换、缩放、旋转、保存、帧处理回调、传输画面，记录遥测
+        :param frame_buf:           图像缓存，处理期间不会被覆盖
+        :param st_frame_out_info:   帧信息
+        :param receive_time:        取得该帧的时间 time()
+        :param process_start:       开始处理的时间 perf_counter()
+        :return:
+        """
+        frame_data = self.convert_frame(frame_buf=frame_buf, st_frame_out_info=st_frame_out_info)
+
+        # 开始加锁
+        # MyCamera.lock.acquire()
+
+        # 改变图像大小
+        if self.resize_ratio is not None and self.resize_ratio != 1.0:
+            frame_data = cv2.resize(frame_data, None, None, fx=self.resize_ratio, fy=self.resize_ratio, interpolation=cv2.INTER_AREA)
+
+        # 旋转图片
+        if self.rotate_flag == 1:
+            frame_data = cv2.rotate(frame_data, cv2.ROTATE_90_CLOCKWISE)
+        elif self.rotate_flag == 2:
+            frame_data = cv2.rotate(frame_data, cv2.ROTATE_180)
+        elif self.rotate_flag == 3:
+            frame_data = cv2.rotate(frame_data, cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+        # 保存图片
+        if self.get_to_save():
+            parameters = {"SerialNumber": self.camera_identity.serial_number, "Uid": self.camera_identity.uid}
+            # 先复位，回调中可以再次置位保存下一帧（如帧质量不合格时重取）
+            self.set_to_save(False)
+            # frame_buf 会被下一帧覆盖，保存的帧不能引用它
+            self.save_process_callback(frame_data=frame_data.copy(), parameters=parameters)
+
+        # 观察帧数据，下一帧保存时比较的是这一帧
+        frame_observer = self.frame_observer
+        if frame_observer is not None:
+            frame_observer(frame_data)
+
+        # 处理帧数据
+        if self.frame_process_callback is not None:
+            # parameters = {"st_frame_out_info": st_frame_out_info}
+            parameters = dict()
+            frame_data = self.frame_process_callback(frame_data=frame_data, parameters=parameters)
+
+        # 通过pipe管道向GUI进程传输图像画面
+        if self.imgbuf_child_conn is not None:
+            self.imgbuf_child_conn.send({"SerialNumber": self.camera_identity.serial_number, "FrameData": frame_data})
+
+        # 释放锁
+        # MyCamera.lock.release()
+
+        # 遥测
+        self.telemetry.record_frame(st_frame_out_info=st_frame_out_info, receive_time=receive_time,
+                                    process_seconds=perf_counter() - process_start)
+        if self.telemetry.need_net_trans():
+            self.telemetry.set_net_trans(self.get_net_trans_info())
+
+    @staticmethod
+    def convert_frame(frame_buf, st_frame_out_info: MV_FRAME_OUT_INFO_EX) -> np.ndarray:
+        """
+        图像缓存转为 numpy 数组，灰度图或 BGR 图
+        :param frame_buf:           图像缓存
+        :param st_frame_out_info:   帧信息
+        :return:
+        """
+        width = st_frame_out_info.nWidth  # 图片宽度
+        height = st_frame_out_info.nHeight  # 图片高度
+        '''
+        frombuffer -> 将data以流的形式读入转化成nparray对象
+                      numpy.frombuffer(buffer, dtype=float, count=-1, offset=0)
+                      参数:
+                        buffer: 缓冲区，它表示暴露缓冲区接口的对象。
+                        dtype： 代表返回的数据类型数组的数据类型。默认值为0。
+                        count： 代表返回的ndarray的长度。默认值为-1。
+                        offset：偏移量，代表读取的起始位置。默认值为0。
+        '''
+        # numpy 数组长度为 [nWidth * nHeight], 数据类型为np.uint8
+        frame_data: np.ndarray = np.frombuffer(frame_buf, count=st_frame_out_info.nFrameLen, dtype=np.uint8, offset=0)
+
+        # 将一维数组转化为二维/三维数组
+        # 灰度图
+        if st_frame_out_info.enPixelType == PixelType_Gvsp_Mono8:
+            frame_data = np.reshape(frame_data, (height, width))
+        # RGB
+        elif st_frame_out_info.enPixelType == PixelType_Gvsp_RGB8_Packed:
+            frame_data = np.reshape(frame_data, (height, width, -1))
+            frame_data = cv2.cvtColor(src=frame_data, code=cv2.COLOR_RGB2BGR)
+        elif st_frame_out_info.enPixelType == PixelType_Gvsp_BayerRG8:
+            frame_data = np.reshape(frame_data, (height, width))
+            frame_data = cv2.cvtColor(frame_data, cv2.COLOR_BAYER_RG2BGR)
+        else:
+            raise Exception("pixel type[%d] has not supported" % st_frame_out_info.enPixelType)
+        return frame_data
+
     def release_grab(self) -> int:
         """
         释放持续取流
@@ -766,27 +887,32 @@ class MyCamera(CameraOperator):
         detailed_text = ''
         Messenger.print(widget=None, level=level, title=title, text=text, informative_text=informative_text, detailed_text=detailed_text)
 
-    def open_and_grab_in_thread(self) -> int:
+    def open_and_grab_in_runtime(self) -> int:
         """
-        打开相机，在多线程中取流
+        打开相机，按执行方式取流
         :return:
         """
         # 打开相机
         ret = self.open_camera(access_mode=self.access_mode)
         if ret == MV_OK:
             # 取流
-            self.grab_in_thread()
+            self.grab_in_runtime()
         return ret
 
-    def grab_in_thread(self):
+    def is_continuous(self) -> bool:
+        """
+        是否为连续采集（触发模式关闭），读取失败时按触发模式处理
+        :return:
+        """
+        res = self.get_TriggerMode()
+        return res["ret"] == MV_OK and res["nCurValue"] == 0
+
+    def grab_in_runtime(self):
         """
-        在多线程中取流
+        按执行方式取流，不等待取流结束
         :return:
         """
-        t0 = Thread(target=self.grab, name=self.name)
-        # t0.setDaemon(True)
-        # t0.setDaemon(False)
-        t0.start()
+        self.runtime.start(self)
 
     def grab_or_not(self, flag: bool):
         """
@@ -795,7 +921,7 @@ class MyCamera(CameraOperator):
         :return:
         """
         if flag:
-            self.grab_in_thread()
+            self.grab_in_runtime()
         else:
             self.release_grab()
 
@@ -812,6 +938,10 @@ class MyCamera(CameraOperator):
                 while self.get_grab_flag():
                     sleep(0.1)
 
+            # ROI 保存在相机中，恢复全画幅，示教界面等不受影响
+            if self.sensor_roi is not None:
+                self.reset_sensor_roi()
+
             # 关闭设备
             self.close_device(close_device_failed_callback=self.close_device_failed_callback,
                               close_device_successful_callback=self.close_device_successful_callback)
@@ -881,6 +1011,55 @@ class MyCamera(CameraOperator):
         detailed_text = ''
         Messenger.print(widget=None, level=level, title=title, text=text, informative_text=informative_text, detailed_text=detailed_text)
 
+    def apply_sensor_roi(self, vertexes: list, margin: int) -> Optional[list]:
+        """
+        按检测区域四边形的外接矩形设置相机 ROI，需在打开相机后、取流前调用
+        :param vertexes:    全画幅帧中的顶点 [[x, y], ...]
+        :param margin:      外扩像素（传感器坐标）
+        :return:            ROI 帧中的顶点，失败时为 None 并恢复全画幅
+        """
+        width_max = self.get_WidthMax()
+        height_max = self.get_HeightMax()
+        width = self.get_Width()
+        height = self.get_Height()
+        offset_x = self.get_OffsetX()
+        offset_y = self.get_OffsetY()
+        if any(res["ret"] != MV_OK for res in (width_max, height_max, width, height, offset_x, offset_y)):
+            return None
+
+        roi = SensorRoi.calculate(vertexes=vertexes, width_max=width_max["nCurValue"], height_max=height_max["nCurValue"], margin=margin,
+                                  rotate_flag=self.rotate_flag, resize_ratio=self.resize_ratio,
+                                  width_inc=max(width["nInc"], 1), height_inc=max(height["nInc"], 1),
+                                  offset_x_inc=max(offset_x["nInc"], 1), offset_y_inc=max(offset_y["nInc"], 1),
+                                  width_min=width["nMin"], height_min=height["nMin"])
+
+        # 先清零偏移再设置宽高，偏移加宽高不能超出传感器
+        self.sensor_roi = roi
+        for ret in (self.set_OffsetX(0), self.set_OffsetY(0), self.set_Width(roi["Width"]), self.set_Height(roi["Height"]),
+                    self.set_OffsetX(roi["OffsetX"]), self.set_OffsetY(roi["OffsetY"])):
+            if ret != MV_OK:
+                m = {"level": 'WARNING', "title": '警告', "text": '相机设置ROI错误！',
+                     "informative_text": '错误事项[%s]，错误代码[%#X]' % (self.err_code_map(err_code=ret), ret), "detailed_text": '使用全画幅'}
+                Messenger.print(message=m)
+                self.reset_sensor_roi()
+                return None
+        return roi["Vertexes"]
+
+    def reset_sensor_roi(self) -> int:
+        """
+        恢复全画幅，需在取流前或停止取流后调用
+        :return:
+        """
+        self.sensor_roi = None
+        width_max = self.get_WidthMax()
+        height_max = self.get_HeightMax()
+        if width_max["ret"] != MV_OK or height_max["ret"] != MV_OK:
+            return width_max["ret"] if width_max["ret"] != MV_OK else height_max["ret"]
+        for ret in (self.set_OffsetX(0), self.set_OffsetY(0), self.set_Width(width_max["nCurValue"]), self.set_Height(height_max["nCurValue"])):
+            if ret != MV_OK:
+                return ret
+        return MV_OK
+
     def save_picture(self, saved_folder: str, *args, **kwargs) -> bool:
         """
         保存图片
@@ -989,27 +1168,40 @@ class MyCamera(CameraOperator):
             save_picture_failed_callback(err_str="缺少图片数据")
         return False
 
-    @staticmethod
-    def image_callback(p_data, p_st_frame_out_info, p_user):
+    def prepare_frame_ring(self) -> Optional[FrameRing]:
+        """
+        回调取流：注册回调（每个句柄一次），创建本次取流的帧环形缓冲
+        :return:    注册失败时为 None，使用主动取图
         """
-        相机的回调函数，相机获得每一帧后会执行这个函数，
+        if self.c_image_callback is None:
+            ret = self.register_image_callback(image_callback=self.image_callback, user_data=None)
+            if ret != MV_OK:
+                m = {"level": 'WARNING', "title": '警告', "text": '相机注册取图回调错误，使用主动取图！',
+                     "informative_text": '错误事项[%s]，错误代码[%#X]' % (self.err_code_map(err_code=ret), ret), "detailed_text": ''}
+                Messenger.print(message=m)
+                return None
+        return FrameRing(size=CF_CAMERA_FRAME_RING_SIZE)
+
+    def image_callback(self, p_data, p_st_frame_out_info, p_user):
+        """
+        相机的回调函数，相机获得每一帧后在 SDK 线程中执行，
         在 register_image_callback 函数中会使用这个回调函数
+        只复制到 frame_ring 并唤醒取流循环，帧的处理在取流循环中进行，不阻塞 SDK 线程
         :param p_data:          相机帧数据指针     POINTER(c_ubyte)
         :param p_st_frame_out_info:    帧信息结构体      POINTER(MV_FRAME_OUT_INFO_EX)
-        :param p_user:          用户自定义信息     int 或 None，在这里传入的是相机uid
+        :param p_user:          用户自定义信息     未使用
         :return:
         """
-        # # 读取指针
-        # # 帧信息 MV_FRAME_OUT_INFO_EX结构体 指针
-        # st_frame_out_info = cast(p_st_frame_out_info, POINTER(MV_FRAME_OUT_INFO_EX)).contents
-        # # 帧数据指针，保存年每一帧的画面numpy数组，长度为st_frame_info.nFrameLen，类型为c_ubyte
-        # data = cast(p_data, POINTER(c_ubyte * st_frame_out_info.nFrameLen)).contents
-        # # 用户自定义信息
-        # # str
-        # user_data = str(cast(p_user, c_char_p).value, encoding="utf-8")
-        # # int
-        # # user_data = p_user
-        pass
+        frame_ring = self.frame_ring
+        if frame_ring is None or not p_data or not p_st_frame_out_info:
+            return
+        # 异常不能抛出到 SDK 线程
+        try:
+            frame_ring.put(p_data, p_st_frame_out_info)
+        except Exception as err:
+            m = {"level": 'ERROR', "title": '错误', "text": '相机取图回调错误！',
+                 "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+            Messenger.print(message=m)
 
     def set_parameters(self, commands: dict):
         """
@@ -1086,7 +1278,7 @@ class MyCamera(CameraOperator):
             self.close_camera()
         # 开始取流
         elif command == CAMERA_START_GRABBING:
-            self.grab_in_thread()
+            self.grab_in_runtime()
         # 停止取流
         elif command == CAMERA_STOP_GRABBING:
             self.release_grab()
@@ -1310,7 +1502,7 @@ if __name__ == "__main__":
                       )
 
     # 打开相机
-    my_cam.open_camera()
+    my_cam.open_camera(access_mode=acce_mode)
 
     # 默认值
     my_cam.set_TriggerMode(TriggerMode=0)
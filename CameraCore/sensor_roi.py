@@ -0,0 +1,105 @@
+import math
+from typing import Optional
+
+
+VERTEX_KEYS = (("P1X", "P1Y"), ("P2X", "P2Y"), ("P3X", "P3Y"), ("P4X", "P4Y"))
+
+
+class SensorRoi:
+    """
+    相机传感器 ROI：按示教的检测区域四边形 P1~P4 只采集其外接矩形
+    示教的顶点为全画幅帧中的坐标，帧在取流循环中经过 缩放(resize_ratio) 及 旋转(rotate_flag)，计算 ROI 前先换算为传感器坐标
+    """
+
+    @staticmethod
+    def get_vertexes(message: dict) -> list:
+        return [[message[x], message[y]] for x, y in VERTEX_KEYS]
+
+    @staticmethod
+    def set_vertexes(message: dict, vertexes: list) -> dict:
+        """
+        :return:    新的字典，顶点替换为 vertexes
+        """
+        message = dict(message)
+        for (x, y), vertex in zip(VERTEX_KEYS, vertexes):
+            message[x], message[y] = int(vertex[0]), int(vertex[1])
+        return message
+
+    @staticmethod
+    def frame_to_sensor(point: tuple, sensor_width: int, sensor_height: int, rotate_flag: Optional[int], resize_ratio: Optional[float]) -> tuple:
+        """
+        帧坐标 -> 传感器坐标
+        :param point:           (x, y)
+        :param sensor_width:    采集区域宽度
+        :param sensor_height:   采集区域高度
+        :param rotate_flag:     0 -> 不旋转, 1 -> 顺时针90度, 2 -> 顺时针180度, 3 -> 逆时针90度
+        :param resize_ratio:
+        :return:
+        """
+        ratio = resize_ratio or 1.0
+        x, y = point[0] / ratio, point[1] / ratio
+        if rotate_flag == 1:
+            return y, sensor_height - 1 - x
+        elif rotate_flag == 2:
+            return sensor_width - 1 - x, sensor_height - 1 - y
+        elif rotate_flag == 3:
+            return sensor_width - 1 - y, x
+        return x, y
+
+    @staticmethod
+    def sensor_to_frame(point: tuple, sensor_width: int, sensor_height: int, rotate_flag: Optional[int], resize_ratio: Optional[float]) -> tuple:
+        """
+        传感器坐标 -> 帧坐标，frame_to_sensor 的逆变换
+        """
+        x, y = point
+        if rotate_flag == 1:
+            x, y = sensor_height - 1 - y, x
+        elif rotate_flag == 2:
+            x, y = sensor_width - 1 - x, sensor_height - 1 - y
+        elif rotate_flag == 3:
+            x, y = y, sensor_width - 1 - x
+        ratio = resize_ratio or 1.0
+        return x * ratio, y * ratio
+
+    @staticmethod
+    def calculate(vertexes: list, width_max: int, height_max: int, margin: int,
+                  rotate_flag: Optional[int] = None, resize_ratio: Optional[float] = None,
+                  width_inc: int = 1, height_inc: int = 1, offset_x_inc: int = 1, offset_y_inc: int = 1,
+                  width_min: int = 1, height_min: int = 1) -> dict:
+        """
+        计算 ROI 及 ROI 帧中的顶点
+        :param vertexes:        全画幅帧中的顶点 [[x, y], ...]
+        :param width_max:       传感器宽度
+        :param height_max:      传感器高度
+        :param margin:          外扩像素（传感器坐标）
+        :param rotate_flag:
+        :param resize_ratio:
+        :param width_inc:       各节点的步进，ROI 按步进对齐
+        :param height_inc:
+        :param offset_x_inc:
+        :param offset_y_inc:
+        :param width_min:
+        :param height_min:
+        :return:    {"OffsetX", "OffsetY", "Width", "Height", "Vertexes", "AreaRatio"}
+        """
+        points = [SensorRoi.frame_to_sensor(vertex, width_max, height_max, rotate_flag, resize_ratio) for vertex in vertexes]
+        x_min = max(min(p[0] for p in points) - margin, 0)
+        y_min = max(min(p[1] for p in points) - margin, 0)
+        x_max = min(max(p[0] for p in points) + margin, width_max - 1)
+        y_max = min(max(p[1] for p in points) + margin, height_max - 1)
+
+        # 偏移向下对齐，宽高向上对齐，不超出传感器
+        offset_x = int(x_min) // offset_x_inc * offset_x_inc
+        offset_y = int(y_min) // offset_y_inc * offset_y_inc
+        width = max(int(math.ceil((x_max + 1 - offset_x) / width_inc)) * width_inc, width_min)
+        height = max(int(math.ceil((y_max + 1 - offset_y) / height_inc)) * height_inc, height_min)
+        width = min(width, (width_max - offset_x) // width_inc * width_inc)
+        height = min(height, (height_max - offset_y) // height_inc * height_inc)
+
+        roi_vertexes = list()
+        for x, y in points:
+            x, y = SensorRoi.sensor_to_frame((x - offset_x, y - offset_y), width, height, rotate_flag, resize_ratio)
+            roi_vertexes.append([int(round(x)), int(round(y))])
+
+        return {"OffsetX": offset_x, "OffsetY": offset_y, "Width": width, "Height": height, "Vertexes": roi_vertexes,
+                "AreaRatio": width * height / (width_max * height_max)}
@@ -0,0 +1,749 @@
+import threading
+from os import path as os_path, listdir
+from collections import deque
+from time import monotonic, time
+from zlib import crc32
+from ctypes import (POINTER, c_ubyte, cast, pointer, memmove, memset, byref, sizeof, addressof)
+from typing import Optional
+import numpy as np
+import cv2
+
+from MvImport.CameraParams_const import (MV_GIGE_DEVICE, MV_ACCESS_Exclusive, MV_ACCESS_Monitor)
+from MvImport.CameraParams_header import (MV_CC_DEVICE_INFO, MV_FRAME_OUT_INFO_EX, MV_NETTRANS_INFO, MV_GIGE_TRANSTYPE_MULTICAST,
+                                          MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV)
+from MvImport.PixelType_header import PixelType_Gvsp_Mono8, PixelType_Gvsp_RGB8_Packed, PixelType_Gvsp_BayerRG8
+from MvImport.MvErrorDefine_const import (MV_OK, MV_E_HANDLE, MV_E_SUPPORT, MV_E_CALLORDER, MV_E_PARAMETER, MV_E_NODATA,
+                                          MV_E_GC_ACCESS, MV_E_ACCESS_DENIED)
+
+from User.config_static import CF_SIMULATED_CAMERAS
+
+"""
+模拟相机：实现 CameraOperator 使用的 MvCamera 接口（MV_CC_*），不需要相机及 MVS SDK
+CF_CAMERA_BACKEND = "SIMULATED" 时 CameraOperator 继承本模块的 SimulatedMvCamera，MyCamera 的 打开/取流/触发/参数设置 流程不变
+
+帧源（CF_SIMULATED_CAMERAS 中的 Source）：
+    图片文件夹      按文件名顺序循环回放
+    视频文件        循环回放
+    "SYNTHETIC"     FrameSynthesizer 合成的顶棒网格，几何固定，每 4 帧中有 1 帧翻转一个位置（错误零件）
+参数节点：Width/Height/OffsetX/OffsetY（ROI，取流时不可修改）、PixelFormat、AcquisitionFrameRate(Enable)、ExposureTime、
+          TriggerMode/TriggerSource/TriggerDelay/TriggerSoftware 等，其他节点可读写但不影响图像
+"""
+
+SIMULATED_SDK_VERSION = 0x03020000
+SIMULATED_MODEL_NAME = "Simulated"
+SIMULATED_TICK_FREQUENCY = 100000000     # 设备时间戳频率 Hz
+SYNTHETIC_SOURCE = "SYNTHETIC"
+SYNTHETIC_VARIANTS = 8
+IMAGE_EXTENSIONS = (".bmp", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+
+PIXEL_FORMATS = {"Mono8": PixelType_Gvsp_Mono8, "RGB8Packed": PixelType_Gvsp_RGB8_Packed, "BayerRG8": PixelType_Gvsp_BayerRG8}
+BYTES_PER_PIXEL = {PixelType_Gvsp_Mono8: 1, PixelType_Gvsp_RGB8_Packed: 3, PixelType_Gvsp_BayerRG8: 1}
+
+TRIGGER_MODE_OFF = 0
+TRIGGER_MODE_ON = 1
+TRIGGER_SOURCE_SOFTWARE = 7
+
+# 不能在取流时修改的节点
+LOCKED_WHEN_GRABBING = ("Width", "Height", "PixelFormat")
+# 整型节点的步进，其他为 1
+INT_INCREMENTS = {"Width": 8, "Height": 2, "OffsetX": 8, "OffsetY": 2}
+
+
+class FrameSource:
+    """
+    模拟相机的帧源，输出 BGR 或灰度图，尺寸为相机最大分辨率
+    """
+
+    def __init__(self, source: str, width: int, height: int, seed: int = 0):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.seed = seed
+
+        self.index = 0
+        self.frames = None          # 图片文件夹/合成：全部帧
+        self.capture = None         # 视频
+        self.references = list()    # 合成：[{"Parameters", "PinsMap"}]，用于写入数据库
+
+    def load(self):
+        if self.source.upper() == SYNTHETIC_SOURCE:
+            self.frames = self.synthesize()
+        elif os_path.isdir(self.source):
+            files = sorted(f for f in listdir(self.source) if f.lower().endswith(IMAGE_EXTENSIONS))
+            # 按文件读取，cv2.imread 不支持中文路径
+            self.frames = [cv2.imdecode(np.fromfile(os_path.join(self.source, f), dtype=np.uint8), cv2.IMREAD_UNCHANGED) for f in files]
+            self.frames = [self.fit(frame) for frame in self.frames if frame is not None]
+            if not self.frames:
+                raise ValueError("文件夹[%s]中没有图片" % (self.source,))
+        else:
+            self.capture = cv2.VideoCapture(self.source)
+            if not self.capture.isOpened():
+                raise ValueError("无法打开视频[%s]" % (self.source,))
+
+    def synthesize(self) -> list:
+        from Utils.frame_synthesizer import FrameSynthesizer
+        from User.config_static import CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL
+
+        # 指定 pins_map 时随机数序列不同，基准帧也按指定 pins_map 合成，保证各帧几何相同
+        pins_map = FrameSynthesizer.synthesize(width=self.width, height=self.height, seed=self.seed)["PinsMap"]
+        reference = FrameSynthesizer.synthesize(width=self.width, height=self.height, seed=self.seed, pins_map=pins_map)
+        self.references = [{"Parameters": reference["Parameters"], "PinsMap": reference["PinsMap"]}]
+
+        rng = np.random.RandomState(self.seed)
+        frames = list()
+        for variant in range(SYNTHETIC_VARIANTS):
+            if variant % 4 != 3:
+                frames.append(reference["Frame"])
+                continue
+            # 翻转一个位置
+            pins_map = reference["PinsMap"].copy()
+            y, x = rng.randint(pins_map.shape[0]), rng.randint(pins_map.shape[1])
+            is_null = np.all(pins_map[y, x] == CF_COLOR_PINSMAP_NULL)
+            pins_map[y, x] = CF_COLOR_PINSMAP_PIN if is_null else CF_COLOR_PINSMAP_NULL
+            frames.append(FrameSynthesizer.synthesize(width=self.width, height=self.height, seed=self.seed, pins_map=pins_map)["Frame"])
+        return frames
+
+    def fit(self, frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+        return frame
+
+    def next_frame(self) -> np.ndarray:
+        if self.frames is None and self.capture is None:
+            self.load()
+
+        if self.frames is not None:
+            frame = self.frames[self.index % len(self.frames)]
+            self.index += 1
+            return frame
+
+        ret, frame = self.capture.read()
+        if not ret:
+            # 循环回放
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+            if not ret:
+                raise ValueError("无法读取视频[%s]" % (self.source,))
+        self.index += 1
+        return self.fit(frame)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class SimulatedDevice:
+    """
+    一台模拟相机：设备信息、参数节点、访问权限，同一进程内的各句柄共享
+    """
+
+    def __init__(self, index: int, config: dict):
+        self.index = index
+        self.serial_number = str(config["SerialNumber"])
+        self.uid = str(config.get("Uid", self.serial_number))
+        self.source = config.get("Source", SYNTHETIC_SOURCE)
+        self.ip = config.get("Ip", "192.168.100.%d" % (index + 10,))
+
+        width = int(config.get("Width", 1280))
+        height = int(config.get("Height", 1024))
+        frame_rate = float(config.get("FrameRate", 10.0))
+        pixel_format = PIXEL_FORMATS.get(config.get("PixelFormat", "Mono8"), PixelType_Gvsp_Mono8)
+
+        self.lock = threading.Lock()
+        self.access_modes = list()      # 已打开的访问权限
+        self.receivers = list()         # 以监控权限组播取流的句柄，由控制权限的句柄转发帧
+
+        # 节点：{名称: [类型, 当前值, 最小值, 最大值]}，枚举的最小值为可选值
+        self.nodes = {
+            "WidthMax": ["int", width, width, width],
+            "HeightMax": ["int", height, height, height],
+            "Width": ["int", width, 8, width],
+            "Height": ["int", height, 8, height],
+            "OffsetX": ["int", 0, 0, width - 8],
+            "OffsetY": ["int", 0, 0, height - 8],
+            "PayloadSize": ["int", 0, 0, 1 << 31],
+            "GevSCPSPacketSize": ["int", 1500, 220, 9156],
+            "GevTimestampTickFrequency": ["int", SIMULATED_TICK_FREQUENCY, SIMULATED_TICK_FREQUENCY, SIMULATED_TICK_FREQUENCY],
+            "Brightness": ["int", 100, 0, 255],
+            "Sharpness": ["int", 0, 0, 100],
+            "PixelFormat": ["enum", pixel_format, sorted(PIXEL_FORMATS.values()), None],
+            "TriggerMode": ["enum", TRIGGER_MODE_OFF, [TRIGGER_MODE_OFF, TRIGGER_MODE_ON], None],
+            "TriggerSource": ["enum", TRIGGER_SOURCE_SOFTWARE, [0, 1, 2, 3, 4, TRIGGER_SOURCE_SOFTWARE], None],
+            "TriggerActivation": ["enum", 0, [0, 1], None],
+            "ExposureAuto": ["enum", 0, [0, 1, 2], None],
+            "GainAuto": ["enum", 0, [0, 1, 2], None],
+            "GammaSelector": ["enum", 1, [1, 2], None],
+            "AcquisitionFrameRate": ["float", frame_rate, 0.1, frame_rate],
+            "ResultingFrameRate": ["float", frame_rate, 0.0, frame_rate],
+            "ExposureTime": ["float", 5000.0, 15.0, 10000000.0],
+            "TriggerDelay": ["float", 0.0, 0.0, 16000000.0],
+            "Gain": ["float", 0.0, 0.0, 17.0],
+            "Gamma": ["float", 1.0, 0.0, 4.0],
+            "AcquisitionFrameRateEnable": ["bool", False, None, None],
+            "SharpnessEnable": ["bool", False, None, None],
+            "GammaEnable": ["bool", False, None, None],
+            "DeviceUserID": ["string", self.uid, None, 16],
+            "DeviceSerialNumber": ["string", self.serial_number, None, 16],
+            "DeviceModelName": ["string", SIMULATED_MODEL_NAME, None, 32],
+        }
+
+    def get_value(self, node_name: str):
+        with self.lock:
+            return self.nodes[node_name][1]
+
+    def get_payload_size(self) -> int:
+        with self.lock:
+            return self.nodes["Width"][1] * self.nodes["Height"][1] * BYTES_PER_PIXEL[self.nodes["PixelFormat"][1]]
+
+    def create_device_info(self) -> MV_CC_DEVICE_INFO:
+        st_device_info = MV_CC_DEVICE_INFO()
+        memset(byref(st_device_info), 0, sizeof(st_device_info))
+        st_device_info.nTLayerType = MV_GIGE_DEVICE
+        gige_info = st_device_info.SpecialInfo.stGigEInfo
+        a, b, c, d = (int(v) for v in self.ip.split("."))
+        gige_info.nCurrentIp = (a << 24) | (b << 16) | (c << 8) | d
+        for field, text in (("chUserDefinedName", self.uid), ("chSerialNumber", self.serial_number),
+                            ("chModelName", SIMULATED_MODEL_NAME), ("chManufacturerName", SIMULATED_MODEL_NAME)):
+            data = text.encode("utf-8")[:len(getattr(gige_info, field)) - 1]
+            memmove(getattr(gige_info, field), data, len(data))
+        return st_device_info
+
+    def open(self, access_mode: int) -> int:
+        with self.lock:
+            # 独占及控制权限只能有一个
+            if access_mode != MV_ACCESS_Monitor and any(mode != MV_ACCESS_Monitor for mode in self.access_modes):
+                return MV_E_ACCESS_DENIED
+            if access_mode == MV_ACCESS_Exclusive and self.access_modes:
+                return MV_E_ACCESS_DENIED
+            if MV_ACCESS_Exclusive in self.access_modes:
+                return MV_E_ACCESS_DENIED
+            self.access_modes.append(access_mode)
+            return MV_OK
+
+    def close(self, access_mode: int):
+        with self.lock:
+            if access_mode in self.access_modes:
+                self.access_modes.remove(access_mode)
+
+    def add_receiver(self, receiver):
+        with self.lock:
+            self.receivers.append(receiver)
+
+    def remove_receiver(self, receiver):
+        with self.lock:
+            if receiver in self.receivers:
+                self.receivers.remove(receiver)
+
+    def get_receivers(self, group: tuple) -> list:
+        """
+        :param group:   控制句柄的组播地址 (组地址, 端口)
+        :return:    同一组播地址的监控句柄
+        """
+        with self.lock:
+            return [receiver for receiver in self.receivers if receiver._multicast_group() == group]
+
+    def is_accessible(self, access_mode: int) -> bool:
+        with self.lock:
+            if MV_ACCESS_Exclusive in self.access_modes:
+                return False
+            return access_mode == MV_ACCESS_Monitor or not self.access_modes
+
+
+class SimulatedDevices:
+    """
+    进程内的模拟相机，按 CF_SIMULATED_CAMERAS 创建
+    """
+    _devices = None
+    _device_infos = list()      # 枚举结果，与 SDK 相同在下次枚举前保持有效
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_devices(cls) -> list:
+        with cls._lock:
+            if cls._devices is None:
+                cls._devices = [SimulatedDevice(index, config) for index, config in enumerate(CF_SIMULATED_CAMERAS)]
+            return cls._devices
+
+    @classmethod
+    def find(cls, serial_number: str) -> Optional[SimulatedDevice]:
+        for device in cls.get_devices():
+            if device.serial_number == serial_number:
+                return device
+        return None
+
+    @staticmethod
+    def decode_serial_number(st_device_info: MV_CC_DEVICE_INFO) -> str:
+        data = bytes(st_device_info.SpecialInfo.stGigEInfo.chSerialNumber)
+        return data.split(b"\x00")[0].decode("utf-8", errors="replace")
+
+
+class SimulatedMvCamera:
+    """
+    模拟相机句柄，接口与 MvImport.MvCameraControl_class.MvCamera 相同
+    """
+
+    def __init__(self):
+        self._device = None             # SimulatedDevice
+        self._access_mode = None
+        self._source = None
+
+        self._grab_thread = None
+        self._grabbing = False
+        self._stop_event = threading.Event()
+        self._trigger_event = threading.Event()
+        self._frames = deque(maxlen=1)
+        self._frames_condition = threading.Condition(threading.Lock())
+        self._outstanding = dict()      # GetImageBuffer 取出、尚未 FreeImageBuffer 的缓存
+
+        self._image_callback = None
+        self._image_callback_user = None
+        self._transmission_type = None
+
+        # 统计
+        self.frame_number = 0
+        self.lost_frames = 0
+        self.triggers = 0
+        self.receive_data_size = 0
+
+    # 设备
+    @staticmethod
+    def MV_CC_GetSDKVersion():
+        return SIMULATED_SDK_VERSION
+
+    @staticmethod
+    def MV_CC_EnumDevices(nTLayerType, stDevList):
+        stDevList.nDeviceNum = 0
+        if not nTLayerType & MV_GIGE_DEVICE:
+            return MV_OK
+        SimulatedDevices._device_infos = [device.create_device_info() for device in SimulatedDevices.get_devices()]
+        for index, st_device_info in enumerate(SimulatedDevices._device_infos):
+            stDevList.pDeviceInfo[index] = pointer(st_device_info)
+        stDevList.nDeviceNum = len(SimulatedDevices._device_infos)
+        return MV_OK
+
+    @staticmethod
+    def MV_CC_IsDeviceAccessible(stDevInfo, nAccessMode):
+        device = SimulatedDevices.find(SimulatedDevices.decode_serial_number(stDevInfo))
+        return device is not None and device.is_accessible(nAccessMode)
+
+    def MV_CC_CreateHandle(self, stDevInfo):
+        self._device = SimulatedDevices.find(SimulatedDevices.decode_serial_number(stDevInfo))
+        return MV_OK if self._device is not None else MV_E_HANDLE
+
+    def MV_CC_CreateHandleWithoutLog(self, stDevInfo):
+        return self.MV_CC_CreateHandle(stDevInfo)
+
+    def MV_CC_DestroyHandle(self):
+        if self._access_mode is not None:
+            self.MV_CC_CloseDevice()
+        self._device = None
+        self._image_callback = None
+        self._image_callback_user = None
+        return MV_OK
+
+    def MV_CC_OpenDevice(self, nAccessMode=MV_ACCESS_Exclusive, nSwitchoverKey=0):
+        if self._device is None:
+            return MV_E_HANDLE
+        if self._access_mode is not None:
+            return MV_E_CALLORDER
+        ret = self._device.open(nAccessMode)
+        if ret == MV_OK:
+            self._access_mode = nAccessMode
+            seed = crc32(self._device.serial_number.encode("utf-8")) & 0xFFFF
+            self._source = FrameSource(source=self._device.source, seed=seed,
+                                       width=self._device.get_value("WidthMax"), height=self._device.get_value("HeightMax"))
+        return ret
+
+    def MV_CC_CloseDevice(self):
+        if self._access_mode is None:
+            return MV_E_CALLORDER
+        self.MV_CC_StopGrabbing()
+        self._device.close(self._access_mode)
+        self._access_mode = None
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        return MV_OK
+
+    def MV_GIGE_SetTransmissionType(self, stTransmissionType):
+        if self._access_mode is None:
+            return MV_E_CALLORDER
+        self._transmission_type = (stTransmissionType.enTransmissionType, stTransmissionType.nDestIp, stTransmissionType.nDestPort)
+        return MV_OK
+
+    def MV_CC_IsDeviceConnected(self):
+        return self._access_mode is not None
+
+    def MV_CC_GetOptimalPacketSize(self):
+        return 8164 if self._access_mode is not None else MV_E_CALLORDER
+
+    # 参数节点
+    def _get_node(self, node_name: str, node_type: str):
+        if self._access_mode is None:
+            return MV_E_CALLORDER, None
+        node = self._device.nodes.get(node_name)
+        if node is None:
+            return MV_E_SUPPORT, None
+        if node[0] != node_type:
+            return MV_E_PARAMETER, None
+        return MV_OK, node
+
+    def _set_node(self, node_name: str, node_type: str, value) -> int:
+        ret, node = self._get_node(node_name, node_type)
+        if ret != MV_OK:
+            return ret
+        if self._access_mode == MV_ACCESS_Monitor or node_name in ("WidthMax", "HeightMax", "PayloadSize", "ResultingFrameRate"):
+            return MV_E_GC_ACCESS
+        if self._grabbing and node_name in LOCKED_WHEN_GRABBING:
+            return MV_E_GC_ACCESS
+
+        with self._device.lock:
+            if node_type in ("int", "float"):
+                if not node[2] <= value <= node[3]:
+                    return MV_E_PARAMETER
+                if node_type == "int" and value % INT_INCREMENTS.get(node_name, 1):
+                    return MV_E_PARAMETER
+                # ROI 不能超出最大分辨率
+                nodes = self._device.nodes
+                if node_name in ("Width", "OffsetX") and value + nodes["OffsetX" if node_name == "Width" else "Width"][1] > nodes["WidthMax"][1]:
+                    return MV_E_PARAMETER
+                if node_name in ("Height", "OffsetY") and value + nodes["OffsetY" if node_name == "Height" else "Height"][1] > nodes["HeightMax"][1]:
+                    return MV_E_PARAMETER
+            elif node_type == "enum" and value not in node[2]:
+                return MV_E_PARAMETER
+            elif node_type == "string" and len(value) >= node[3]:
+                return MV_E_PARAMETER
+            node[1] = value
+        return MV_OK
+
+    def MV_CC_GetIntValue(self, strKey, stIntValue):
+        if strKey == "PayloadSize" and self._access_mode is not None:
+            self._device.nodes["PayloadSize"][1] = self._device.get_payload_size()
+        ret, node = self._get_node(strKey, "int")
+        if ret == MV_OK:
+            stIntValue.nCurValue, stIntValue.nMin, stIntValue.nMax, stIntValue.nInc = node[1], node[2], node[3], INT_INCREMENTS.get(strKey, 1)
+        return ret
+
+    def MV_CC_GetIntValueEx(self, strKey, stIntValue):
+        return self.MV_CC_GetIntValue(strKey, stIntValue)
+
+    def MV_CC_SetIntValue(self, strKey, nValue):
+        return self._set_node(strKey, "int", int(nValue))
+
+    def MV_CC_SetIntValueEx(self, strKey, nValue):
+        return self.MV_CC_SetIntValue(strKey, nValue)
+
+    def MV_CC_GetFloatValue(self, strKey, stFloatValue):
+        if strKey == "ResultingFrameRate" and self._access_mode is not None:
+            self._device.nodes["ResultingFrameRate"][1] = 1.0 / self.get_frame_period()
+        ret, node = self._get_node(strKey, "float")
+        if ret == MV_OK:
+            stFloatValue.fCurValue, stFloatValue.fMin, stFloatValue.fMax = node[1], node[2], node[3]
+        return ret
+
+    def MV_CC_SetFloatValue(self, strKey, fValue):
+        return self._set_node(strKey, "float", float(fValue))
+
+    def MV_CC_GetEnumValue(self, strKey, stEnumValue):
+        ret, node = self._get_node(strKey, "enum")
+        if ret == MV_OK:
+            stEnumValue.nCurValue = node[1]
+            stEnumValue.nSupportedNum = len(node[2])
+            for index, value in enumerate(node[2]):
+                stEnumValue.nSupportValue[index] = value
+        return ret
+
+    def MV_CC_SetEnumValue(self, strKey, nValue):
+        return self._set_node(strKey, "enum", int(nValue))
+
+    def MV_CC_SetEnumValueByString(self, strKey, sValue):
+        if strKey == "PixelFormat" and sValue in PIXEL_FORMATS:
+            return self._set_node(strKey, "enum", PIXEL_FORMATS[sValue])
+        if strKey == "TriggerMode" and sValue in ("Off", "On"):
+            return self._set_node(strKey, "enum", TRIGGER_MODE_ON if sValue == "On" else TRIGGER_MODE_OFF)
+        if strKey == "TriggerSource" and sValue == "Software":
+            return self._set_node(strKey, "enum", TRIGGER_SOURCE_SOFTWARE)
+        if strKey == "TriggerSource" and sValue.startswith("Line") and sValue[4:].isdigit():
+            return self._set_node(strKey, "enum", int(sValue[4:]))
+        return MV_E_PARAMETER
+
+    def MV_CC_GetBoolValue(self, strKey, BoolValue):
+        ret, node = self._get_node(strKey, "bool")
+        if ret == MV_OK:
+            BoolValue.value = node[1]
+        return ret
+
+    def MV_CC_SetBoolValue(self, strKey, bValue):
+        return self._set_node(strKey, "bool", bool(bValue))
+
+    def MV_CC_GetStringValue(self, strKey, StringValue):
+        ret, node = self._get_node(strKey, "string")
+        if ret == MV_OK:
+            StringValue.chCurValue = node[1].encode("utf-8")
+            StringValue.nMaxLength = node[3]
+        return ret
+
+    def MV_CC_SetStringValue(self, strKey, sValue):
+        return self._set_node(strKey, "string", str(sValue))
+
+    def MV_CC_SetCommandValue(self, strKey):
+        if self._access_mode is None:
+            return MV_E_CALLORDER
+        if strKey == "TriggerSoftware":
+            # 只在软触发模式下取流时有效
+            if (not self._grabbing or self._access_mode == MV_ACCESS_Monitor or self._device.get_value("TriggerMode") != TRIGGER_MODE_ON or
+                    self._device.get_value("TriggerSource") != TRIGGER_SOURCE_SOFTWARE):
+                return MV_E_GC_ACCESS
+            self.triggers += 1
+            self._trigger_event.set()
+            return MV_OK
+        return MV_OK if strKey in ("AcquisitionStart", "AcquisitionStop", "UserSetLoad", "UserSetSave") else MV_E_SUPPORT
+
+    # 取流
+    def MV_CC_SetImageNodeNum(self, nNum):
+        if nNum < 1:
+            return MV_E_PARAMETER
+        with self._frames_condition:
+            self._frames = deque(self._frames, maxlen=int(nNum))
+        return MV_OK
+
+    def MV_CC_RegisterImageCallBackEx(self, CallBackFun, pUser):
+        if self._device is None:
+            return MV_E_HANDLE
+        # 与 SDK 相同，取流时不能注册
+        if self._grabbing:
+            return MV_E_CALLORDER
+        self._image_callback = CallBackFun
+        self._image_callback_user = pUser
+        return MV_OK
+
+    def _multicast_group(self) -> Optional[tuple]:
+        """
+        :return:    组播时为 (组地址, 端口)，否则为 None
+        """
+        if self._transmission_type is None or self._transmission_type[0] not in (MV_GIGE_TRANSTYPE_MULTICAST, MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV):
+            return None
+        return self._transmission_type[1:]
+
+    def _is_receiving(self) -> bool:
+        """
+        MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV 时本句柄只控制采集，不接收图像
+        """
+        return self._transmission_type is None or self._transmission_type[0] != MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV
+
+    def MV_CC_StartGrabbing(self):
+        if self._access_mode is None or self._grabbing:
+            return MV_E_CALLORDER
+        self._stop_event.clear()
+        self._trigger_event.clear()
+        with self._frames_condition:
+            self._frames.clear()
+        self._grabbing = True
+        # 监控权限只接收控制句柄组播的帧，不控制采集
+        if self._access_mode == MV_ACCESS_Monitor:
+            if self._multicast_group() is not None and self._is_receiving():
+                self._device.add_receiver(self)
+            return MV_OK
+        self._grab_thread = threading.Thread(target=self._grab, name="SimulatedCamera-%s" % (self._device.serial_number,), daemon=True)
+        self._grab_thread.start()
+        return MV_OK
+
+    def MV_CC_StopGrabbing(self):
+        if not self._grabbing:
+            return MV_E_CALLORDER
+        self._device.remove_receiver(self)
+        thread = self._grab_thread
+        self._stop_event.set()
+        self._trigger_event.set()
+        if thread is not None:
+            thread.join()
+        self._grab_thread = None
+        self._grabbing = False
+        with self._frames_condition:
+            self._frames.clear()
+            self._frames_condition.notify_all()
+        return MV_OK
+
+    def get_frame_period(self) -> float:
+        """
+        连续采集的帧间隔：帧率及曝光时间的限制
+        :return:    s
+        """
+        device = self._device
+        frame_rate = device.nodes["AcquisitionFrameRate"][3]
+        if device.get_value("AcquisitionFrameRateEnable"):
+            frame_rate = min(frame_rate, device.get_value("AcquisitionFrameRate"))
+        return max(1.0 / frame_rate, device.get_value("ExposureTime") / 1e6)
+
+    def _grab(self):
+        next_time = monotonic()
+        while not self._stop_event.is_set():
+            if self._device.get_value("TriggerMode") == TRIGGER_MODE_ON:
+                # 等待软触发
+                if not self._trigger_event.wait(0.05):
+                    continue
+                self._trigger_event.clear()
+                if self._stop_event.is_set():
+                    break
+                delay = self._device.get_value("TriggerDelay") / 1e6 + self._device.get_value("ExposureTime") / 1e6
+                if delay > 0 and self._stop_event.wait(delay):
+                    break
+                next_time = monotonic()
+            else:
+                next_time += self.get_frame_period()
+                wait = next_time - monotonic()
+                if wait > 0:
+                    if self._stop_event.wait(wait):
+                        break
+                else:
+                    # 处理跟不上时不补发
+                    next_time = monotonic()
+
+            buf, st_frame_out_info = self.create_frame()
+            if self._is_receiving():
+                self._deliver(buf, st_frame_out_info)
+            # 组播：同一组播地址的监控句柄收到同一帧
+            group = self._multicast_group()
+            if group is not None:
+                for receiver in self._device.get_receivers(group):
+                    receiver._deliver(buf, st_frame_out_info)
+
+    def create_frame(self) -> tuple:
+        """
+        从帧源取一帧，截取 ROI 并转换像素格式
+        :return:    (数据缓存, MV_FRAME_OUT_INFO_EX)
+        """
+        device = self._device
+        with device.lock:
+            nodes = device.nodes
+            width, height, offset_x, offset_y = nodes["Width"][1], nodes["Height"][1], nodes["OffsetX"][1], nodes["OffsetY"][1]
+            pixel_type = nodes["PixelFormat"][1]
+            gain, exposure_time = nodes["Gain"][1], nodes["ExposureTime"][1]
+
+        frame = self._source.next_frame()[offset_y:offset_y + height, offset_x:offset_x + width]
+        data = self.convert_pixel_type(frame, pixel_type)
+        data = np.ascontiguousarray(data)
+
+        buf = (c_ubyte * data.nbytes).from_buffer_copy(data)
+
+        self.frame_number += 1
+        self.receive_data_size += data.nbytes
+        host_time = int(time() * 1000)
+        device_time = int(monotonic() * SIMULATED_TICK_FREQUENCY)
+
+        st_frame_out_info = MV_FRAME_OUT_INFO_EX()
+        memset(byref(st_frame_out_info), 0, sizeof(st_frame_out_info))
+        st_frame_out_info.nWidth = width
+        st_frame_out_info.nHeight = height
+        st_frame_out_info.enPixelType = pixel_type
+        st_frame_out_info.nFrameNum = self.frame_number
+        st_frame_out_info.nFrameCounter = self.frame_number
+        st_frame_out_info.nTriggerIndex = self.triggers
+        st_frame_out_info.nDevTimeStampHigh = (device_time >> 32) & 0xFFFFFFFF
+        st_frame_out_info.nDevTimeStampLow = device_time & 0xFFFFFFFF
+        st_frame_out_info.nHostTimeStamp = host_time
+        st_frame_out_info.nFrameLen = data.nbytes
+        st_frame_out_info.nOffsetX = offset_x
+        st_frame_out_info.nOffsetY = offset_y
+        st_frame_out_info.fGain = gain
+        st_frame_out_info.fExposureTime = exposure_time
+        return buf, st_frame_out_info
+
+    @staticmethod
+    def convert_pixel_type(frame: np.ndarray, pixel_type: int) -> np.ndarray:
+        if pixel_type == PixelType_Gvsp_Mono8:
+            return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        bgr = frame if frame.ndim == 3 else cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if pixel_type == PixelType_Gvsp_RGB8_Packed:
+            return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+        # BayerRG8：与 MyCamera 的 cv2.COLOR_BAYER_RG2BGR 对应（opencv 按第二行命名），偶数行 B G，奇数行 G R
+        bayer = np.empty(bgr.shape[:2], np.uint8)
+        bayer[0::2, 0::2] = bgr[0::2, 0::2, 0]
+        bayer[0::2, 1::2] = bgr[0::2, 1::2, 1]
+        bayer[1::2, 0::2] = bgr[1::2, 0::2, 1]
+        bayer[1::2, 1::2] = bgr[1::2, 1::2, 2]
+        return bayer
+
+    def _deliver(self, buf, st_frame_out_info: MV_FRAME_OUT_INFO_EX):
+        # 回调取图
+        callback = self._image_callback
+        if callback is not None:
+            callback(cast(buf, POINTER(c_ubyte)), pointer(st_frame_out_info), self._image_callback_user)
+            return
+
+        # 主动取图，缓存满时丢弃最旧的帧
+        with self._frames_condition:
+            if len(self._frames) == self._frames.maxlen:
+                self.lost_frames += 1
+            self._frames.append((buf, st_frame_out_info))
+            self._frames_condition.notify()
+
+    def _pop_frame(self, nMsec: int):
+        if not self._grabbing:
+            return MV_E_CALLORDER, None
+        with self._frames_condition:
+            if not self._frames_condition.wait_for(lambda: self._frames or not self._grabbing, nMsec / 1000):
+                return MV_E_NODATA, None
+            if not self._frames:
+                return MV_E_NODATA, None
+            return MV_OK, self._frames.popleft()
+
+    def MV_CC_GetImageBuffer(self, stFrame, nMsec):
+        ret, frame = self._pop_frame(nMsec)
+        if ret != MV_OK:
+            return ret
+        buf, st_frame_out_info = frame
+        self._outstanding[addressof(buf)] = buf
+        stFrame.pBufAddr = cast(buf, POINTER(c_ubyte))
+        stFrame.stFrameInfo = st_frame_out_info
+        return MV_OK
+
+    def MV_CC_FreeImageBuffer(self, stFrame):
+        if not stFrame.pBufAddr:
+            return MV_E_PARAMETER
+        buf = self._outstanding.pop(addressof(stFrame.pBufAddr.contents), None)
+        stFrame.pBufAddr = None
+        return MV_OK if buf is not None else MV_E_PARAMETER
+
+    def MV_CC_GetOneFrameTimeout(self, pData, nDataSize, stFrameInfo, nMsec=1000):
+        ret, frame = self._pop_frame(nMsec)
+        if ret != MV_OK:
+            return ret
+        buf, st_frame_out_info = frame
+        if nDataSize < st_frame_out_info.nFrameLen:
+            return MV_E_PARAMETER
+        memmove(pData, buf, st_frame_out_info.nFrameLen)
+        memmove(byref(stFrameInfo), byref(st_frame_out_info), sizeof(MV_FRAME_OUT_INFO_EX))
+        return MV_OK
+
+    def MV_GIGE_GetNetTransInfo(self, pstInfo):
+        if self._access_mode is None:
+            return MV_E_CALLORDER
+        memset(byref(pstInfo), 0, sizeof(MV_NETTRANS_INFO))
+        pstInfo.nReceiveDataSize = self.receive_data_size
+        pstInfo.nThrowFrameCount = self.lost_frames
+        pstInfo.nNetRecvFrameCount = self.frame_number
+        return MV_OK
+
+    def get_statistics(self) -> dict:
+        return {"Frames": self.frame_number, "LostFrames": self.lost_frames, "Triggers": self.triggers}
+
+    @staticmethod
+    def get_synthetic_references(serial_number: str) -> list:
+        """
+        合成帧源的检测参数及基准 pins_map，用于写入数据库后运行完整的 取流->检测->记录 流程
+        :param serial_number:
+        :return:    [{"Parameters", "PinsMap"}]，不是合成帧源时为空
+        """
+        device = SimulatedDevices.find(serial_number)
+        if device is None or str(device.source).upper() != SYNTHETIC_SOURCE:
+            return list()
+        seed = crc32(device.serial_number.encode("utf-8")) & 0xFFFF
+        source = FrameSource(source=device.source, width=device.get_value("WidthMax"), height=device.get_value("HeightMax"), seed=seed)
+        source.load()
+        return source.references
@@ -28,6 +28,8 @@ class InterfaceGrab(QMainWindow, Ui_Grab):
     setParametersSignal = pyqtSignal()
     connectAlgorithmSignal = pyqtSignal(bool)
     savePictureSignal = pyqtSignal(dict)
+    # 帧质量不合格未检测，参数为原因（在取流线程中发出）
+    qualityRejectedSignal = pyqtSignal(str)
 
     def __init__(self, camera_identity: CameraIdentity, camera_location: dict, db_operator: DatabaseOperator):
         super().__init__()
@@ -66,6 +68,8 @@ class InterfaceGrab(QMainWindow, Ui_Grab):
         self.labelAfter.customContextMenuRequested.connect(self.show_left_click_menu_in_after)
         # 下拉框
         self.comboBoxPart.currentTextChanged.connect(self.current_part_changed)
+        # 帧质量不合格
+        self.qualityRejectedSignal.connect(self.show_quality_rejected)
         self.comboBoxPart.showPopupSignal.connect(lambda: self.comboBoxPart.set_items(get_items_callback=self.get_parts))
         # 按钮
         self.buttonGrab.toggled[bool].connect(self.grab_or_not)
@@ -288,6 +292,12 @@ class InterfaceGrab(QMainWindow, Ui_Grab):
             self.labelDetectionResult.setStyleSheet("font: 75 12pt '微软雅黑'; color: rgb(255, 85, 127);")
         self.labelDetectionResult.setGraphicsEffect(self.opacity)
 
+    def show_quality_rejected(self, reason: str):
+        self.opacity.setOpacity(1)
+        self.labelDetectionResult.setText("检测结果：未检测（图片%s）" % (reason,))
+        self.labelDetectionResult.setStyleSheet("font: 75 12pt '微软雅黑'; color: rgb(255, 170, 0);")
+        self.labelDetectionResult.setGraphicsEffect(self.opacity)
+
     def show_detection(self, result: bool, frame: np.ndarray):
         self.show_detect_result(result)
         self.show_detect_frame(frame)
@@ -298,6 +308,21 @@ class InterfaceGrab(QMainWindow, Ui_Grab):
         self.labelDetectionResult.setGraphicsEffect(self.opacity)
         self.show_detect_frame(self.null_image)
 
+    def show_telemetry(self, summary: dict):
+        """
+        在状态栏显示取流遥测 CameraTelemetry.get_summary()
+        :param summary:
+        :return:
+        """
+        def value(key: str, fmt: str = '%.1f') -> str:
+            return '-' if summary.get(key) is None else fmt % (summary[key],)
+
+        text = '帧率[%s]  丢帧[%s]  丢包[%s]  超时[%s]  SDK排队[%s ms]  传输抖动[%s ms]  处理[%s ms]  重发[%s/%s]' % (
+            value("Fps"), value("LostFrames", '%d'), value("LostPackets", '%d'), value("Timeouts", '%d'),
+            value("SdkMsP95"), value("TransferJitterMsP95"), value("ProcessMsP95"),
+            value("Resent", '%d'), value("ResendRequested", '%d'))
+        self.statusbar.showMessage(text)
+
     @staticmethod
     def verify_sequence() -> bool:
         """
@@ -9,7 +9,7 @@ from Interface.interface_part_detail import InterfacePartDetail
 from UI.ui_replace_data import Ui_Dialog as Ui_Replace
 
 from Utils.excel_reader import ExcelReader
-from Utils.serializer import MySerializer
+from Utils.pins_map_codec import PinsMapCodec
 from Utils.database_operator import DatabaseOperator
 from User.config_static import (CF_APP_ICON, CF_PINSMAP_CODES_LIST, CF_IMPORT_TABLE_HEADER, TB_PARTS_PINSMAP,
                                 CF_DATA_REPLACE_ONCE, CF_DATA_REPLACE_ALL, CF_DATA_REPLACE_NONE)
@@ -125,7 +125,7 @@ class InterfaceImportCards(QDialog, Ui_ImportCards):
             # 设置item
             item = self.tableParts.set_table_item(data=data[head_key], row=current_rows, column=column)
             if head_key == "ID":
-                str_pins_map = MySerializer.serialize(data["PinsMap"])      # 序列化
+                str_pins_map = PinsMapCodec.encode_pins_map(data["PinsMap"])      # 编码
                 item.setData(Qt.UserRole, str_pins_map)
 
     def duplicated(self, data: dict):
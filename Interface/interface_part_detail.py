@@ -8,7 +8,7 @@ from UI.ui_show_part_detail import Ui_Dialog as Ui_PartDetail
 
 from Interface.interface_teach_pins_map_page import InterfaceTeachPinsMapPage
 
-from Utils.serializer import MySerializer
+from Utils.pins_map_codec import PinsMapCodec
 from User.config_static import (CF_APP_ICON,
                                 CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL, CF_COLOR_PINSMAP_FREE, CF_COLOR_PINSMAP_DOWEL)
 
@@ -26,7 +26,7 @@ class InterfacePartDetail(QDialog, Ui_PartDetail):
         self.columns = details["Columns"]
 
         str_pins_map = details["PinsMap"]
-        self.pins_map = MySerializer.deserialize(str_pins_map)  # 反序列化
+        self.pins_map = PinsMapCodec.decode_pins_map(str_pins_map)  # 解码
 
         self.setupUi(self)  # 初始化窗口
 
@@ -111,7 +111,7 @@ class InterfacePartDetail(QDialog, Ui_PartDetail):
         InterfaceTeachPinsMapPage.refresh_pins_map(rows=self.rows, columns=self.columns, pins_map=self.pins_map, tabel=self.tablePins)
 
     def accept(self):
-        str_pins_map = MySerializer.serialize(self.pins_map)  # 序列化
+        str_pins_map = PinsMapCodec.encode_pins_map(self.pins_map)  # 编码
 
         message = {
             "ID": self.id,
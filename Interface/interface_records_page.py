@@ -1,17 +1,27 @@
-from os import remove as os_remove, path as os_path
+import threading
+from os import path as os_path
 from subprocess import run as subprocess_run
 from PyQt5.QtWidgets import QWidget, QMenu, QAction, QTableWidgetItem, QApplication, QStyle, QMessageBox
-from PyQt5.QtCore import QPoint
+from PyQt5.QtCore import QPoint, pyqtSignal
 from PyQt5.QtCore import Qt
 
 from UI.ui_records_page import Ui_Form as Ui_RecordsPage
 
+from Interface.interface_statistics import InterfaceStatistics
+
 from Utils.database_operator import DatabaseOperator, get_lines_with_all, get_parts_with_all
+from Utils.keyset_paginator import KeysetPaginator
 from Utils.messenger import Messenger
-from User.config_static import CF_RECORDS_TABLE_HEADER
+from Utils.picture_store import PictureStore
+from Utils.retention_engine import RetentionEngine, FileRemover
+from User.config_static import CF_RECORDS_TABLE_HEADER, TB_DETECTION_RECORDS
 
 
 class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
+    # 清理线程的结果，在界面线程中处理
+    purgePlannedSignal = pyqtSignal(dict)
+    purgeFinishedSignal = pyqtSignal(dict)
+
     def __init__(self, db_operator: DatabaseOperator):
         super().__init__()
 
@@ -29,6 +39,12 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
 
         self.filter_dict = dict()   # 筛选条件
 
+        self.purge_thread = None    # 统计及清理在线程中执行，不阻塞界面
+
+        # 分页，缓存行数及各页起始ID
+        self.paginator = KeysetPaginator(db_operator=self.db_operator, table_name=TB_DETECTION_RECORDS,
+                                         demand_list=CF_RECORDS_TABLE_HEADER.values(), page_rows=self.page_rows)
+
         # 设置comboBox
         self.comboBoxLine.set_items(get_items_callback=self.get_lines)
         self.comboBoxPart.set_items(get_items_callback=self.get_parts)
@@ -52,6 +68,9 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
         self.spinBoxPageRows.valueChanged.connect(self.page_rows_changed)
         self.buttonBack.clicked.connect(self.page_back)
         self.buttonNext.clicked.connect(self.page_next)
+        # 清理
+        self.purgePlannedSignal.connect(self.confirm_purge)
+        self.purgeFinishedSignal.connect(self.purge_finished)
 
         # 初始化每页行数
         self.set_page_rows(page_rows=self.page_rows)
@@ -81,6 +100,17 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
             delete_action.triggered.connect(lambda: self.delete_records(item=item))
             menu.addAction(delete_action)
 
+            statistics_action = QAction('统计', menu)
+            statistics_action.setIcon(style.standardIcon(QStyle.SP_FileDialogInfoView))
+            statistics_action.triggered.connect(self.show_statistics)
+            menu.addAction(statistics_action)
+
+            purge_action = QAction('按保留策略清理', menu)
+            purge_action.setIcon(style.standardIcon(QStyle.SP_DialogResetButton))
+            purge_action.triggered.connect(self.purge_records)
+            purge_action.setEnabled(not self.is_purging())
+            menu.addAction(purge_action)
+
             # 显示菜单
             global_pos = self.tableRecords.mapToGlobal(pos)
             menu.exec(global_pos)
@@ -91,8 +121,15 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
         :param page_rows:
         :return:
         """
-        # 获得总页数
-        self.total_pages, _, _ = self.db_operator.get_detection_records_pages(page_rows=page_rows, filter_dict=self.filter_dict)
+        self.paginator.set_page_rows(page_rows=page_rows)
+        self.update_pages()
+
+    def update_pages(self):
+        """
+        更新总页数，只统计新增的记录；按保留策略删除过记录时重新统计
+        :return:
+        """
+        self.total_pages = self.paginator.get_pages()
 
         # 显示总页数
         self.labelPages.setText(str(self.total_pages))
@@ -105,7 +142,10 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
             if self.current_page > self.total_pages - 1:
                 self.current_page = self.total_pages - 1
 
+        # 只更新页码，由调用者填表
+        self.spinBoxPage.blockSignals(True)
         self.spinBoxPage.setValue(self.current_page + 1)
+        self.spinBoxPage.blockSignals(False)
 
     def page_back(self):
         if self.current_page <= 0:
@@ -123,6 +163,8 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
 
     def page_changed(self, value: int):
         self.current_page = value - 1
+        # 其它进程新增或清理了记录时，缓存的行数及各页起始ID随之更新
+        self.update_pages()
         self.fill_in_table()
 
     def page_rows_changed(self, value: int):
@@ -135,12 +177,12 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
         self.filter_dict["Part"] = self.comboBoxPart.currentText().strip().upper()
         self.filter_dict["Location"] = self.comboBoxLocation.currentText().strip().upper()
         self.filter_dict["Result"] = "FALSE" if self.checkBoxResult.isChecked() else "ALL"
+        self.paginator.set_filter(filter_dict=self.filter_dict)
         self.set_page_rows(page_rows=self.page_rows)
         self.fill_in_table()
 
     def fill_in_table(self):
-        records = self.db_operator.get_all_detection_records(demand_list=CF_RECORDS_TABLE_HEADER.values(), filter_dict=self.filter_dict,
-                                                             page_rows=self.page_rows, page=self.current_page)
+        records = self.paginator.get_page(page=self.current_page)
 
         for record in records:
             record["When"] = str(record["When"])
@@ -158,24 +200,119 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
     def delete_records(self, item: QTableWidgetItem):
         # 获取所有选中的行
         selected_rows = self.tableRecords.selectionModel().selectedRows()
+        selected_ids = [self.tableRecords.get_item_data(row=row.row(), header_value="ID") for row in selected_rows]
+        if not selected_ids:
+            return
+
+        # 一次查询图片，一个事务删除记录
+        records = self.db_operator.select_by_ids(table_name=TB_DETECTION_RECORDS, demand_list=["DetectionPicture", "OriginPicture"], ids=selected_ids)
+        self.db_operator.delete_by_ids(table_name=TB_DETECTION_RECORDS, ids=selected_ids)
+
+        # 后台删除图片，含缩略图
+        files = list()
+        for record in records:
+            files.extend(PictureStore.get_picture_files(record))
+        FileRemover.get_instance().submit(files)
+
+        self.paginator.invalidate()
+        self.set_page_rows(page_rows=self.page_rows)    # 更新页码
+        self.fill_in_table()                            # 填表
+
+    def show_statistics(self):
+        """
+        按当前的 生产线/零件/位置 筛选显示统计
+        :return:
+        """
+        dialog = InterfaceStatistics(db_operator=self.db_operator, filter_dict=self.filter_dict)
+        dialog.show()
+        dialog.exec_()
+
+    def is_purging(self) -> bool:
+        return self.purge_thread is not None and self.purge_thread.is_alive()
+
+    def run_purge_thread(self, target, signal):
+        """
+        在线程中执行统计或清理，完成后发送信号，出错时结果含 "Error"
+        :param target:
+        :param signal:
+        :return:
+        """
+        def run():
+            try:
+                report = target()
+            except Exception as err:
+                report = {"Error": str(err)}
+            signal.emit(report)
+
+        self.purge_thread = threading.Thread(target=run, name="RecordsPurge", daemon=True)
+        self.purge_thread.start()
+
+    def purge_records(self):
+        """
+        按保留策略清理，先在线程中试运行，显示结果
+        :return:
+        """
+        if self.is_purging():
+            return
+        retention_engine = RetentionEngine(db_operator=self.db_operator)
+        if not retention_engine.is_enabled():
+            message = {"level": 'INFO', "title": '提示', "text": '未配置保留策略！',
+                       "informative_text": '', 'detailed_text': ''}
+            Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=200)
+            return
+
+        self.run_purge_thread(target=retention_engine.plan, signal=self.purgePlannedSignal)
+
+    def confirm_purge(self, report: dict):
+        """
+        显示试运行结果，确认后在线程中删除试运行确定的记录
+        :param report:  plan() 的报告
+        :return:
+        """
+        if "Error" in report:
+            message = {"level": 'ERROR', "title": '错误', "text": '统计需要清理的记录失败！',
+                       "informative_text": '错误信息[%s]' % (report["Error"],), 'detailed_text': ''}
+            Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=200)
+            return
 
-        for row in selected_rows:
-            r = row.row()
-            selected_id = self.tableRecords.get_item_data(row=r, header_value="ID")
+        if not report["Rows"]:
+            message = {"level": 'INFO', "title": '提示', "text": '没有需要清理的记录！',
+                       "informative_text": '记录总数[%d]' % (report["TotalRows"],), 'detailed_text': ''}
+            Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=200)
+            return
 
-            # 删除图片
-            res = self.db_operator.get_detection_records(demand_list=["DetectionPicture", "OriginPicture"], filter_dict={"ID": selected_id})
-            if os_path.exists(res["DetectionPicture"]):
-                os_remove(res["DetectionPicture"])
-            if os_path.exists(res["OriginPicture"]):
-                os_remove(res["OriginPicture"])
+        detailed_text = "按时间至ID[%s]\r\n按数量至ID[%s]\r\n按空间至ID[%s]" % (report["AgeBoundaryID"], report["CountBoundaryID"], report["QuotaBoundaryID"])
+        if report["DiskUsage"] is not None:
+            detailed_text += "\r\n图片占用[%.2f]GB" % (report["DiskUsage"] / 1024 ** 3,)
+        message = {"level": 'WARNING', "title": '警告', "text": '将删除[%d]条记录及其图片！' % (report["Rows"],),
+                   "informative_text": '记录总数[%d]，是否清理？' % (report["TotalRows"],), 'detailed_text': detailed_text}
+        res = Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=300, buttons={"YES": QMessageBox.YesRole, "NO": QMessageBox.NoRole})
+        if res != 0:
+            return
 
-            # 删除数据库
-            self.db_operator.delete_detection_records(filter_dict={"ID": selected_id})
+        # 只删除已确认的范围，不再重新统计
+        retention_engine = RetentionEngine(db_operator=self.db_operator)
+        boundary_id = report["BoundaryID"]
+        self.run_purge_thread(target=lambda: retention_engine.purge(boundary_id=boundary_id), signal=self.purgeFinishedSignal)
 
+    def purge_finished(self, report: dict):
+        """
+        清理完成，更新页码并填表
+        :param report:  purge() 的报告
+        :return:
+        """
+        self.paginator.invalidate()
         self.set_page_rows(page_rows=self.page_rows)    # 更新页码
         self.fill_in_table()                            # 填表
 
+        if "Error" in report:
+            message = {"level": 'ERROR', "title": '错误', "text": '清理检测记录失败！',
+                       "informative_text": '错误信息[%s]' % (report["Error"],), 'detailed_text': ''}
+        else:
+            message = {"level": 'INFO', "title": '提示', "text": '清理完成！',
+                       "informative_text": '删除记录[%d]条，图片在后台删除' % (report["DeletedRows"],), 'detailed_text': ''}
+        Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=200)
+
     def open_image(self, item: QTableWidgetItem, flag: int):
         row = item.row()
         selected_id = self.tableRecords.get_item_data(row=row, header_value="ID")
@@ -185,6 +322,13 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
             demand_list = ["OriginPicture"]
         image_path = self.db_operator.get_detection_records(demand_list=demand_list, filter_dict={"ID": selected_id})[demand_list[0]]
 
+        # 按保存策略未保存该图片
+        if not image_path:
+            message = {"level": 'INFO', "title": '提示', "text": '该记录未保存此图片！',
+                       "informative_text": '', 'detailed_text': ''}
+            Messenger.show_QMessageBox(widget=self, message=message, QLabelMinWidth=200)
+            return
+
         # 检查文件是否存在
         if os_path.exists(image_path):
             # 打开图片
@@ -196,5 +340,6 @@ class InterfaceRecordsPage(QWidget, Ui_RecordsPage):
             if res == 0:
                 # 删除数据库
                 self.db_operator.delete_detection_records(filter_dict={"ID": selected_id})
+                self.paginator.invalidate()
                 self.set_page_rows(page_rows=self.page_rows)  # 更新页码
                 self.fill_in_table()  # 填表
@@ -6,7 +6,9 @@ from UI.ui_socket_page import Ui_Form as Ui_SocketPage
 
 from Utils.database_operator import DatabaseOperator
 from Utils.socket_operator import SocketOperator
+from Utils.async_socket_server import AsyncSocketServer
 from Utils.messenger import Messenger
+from User.config_static import CF_SOCKET_SERVER
 
 
 class InterfaceSocketPage(QWidget, Ui_SocketPage):
@@ -26,7 +28,8 @@ class InterfaceSocketPage(QWidget, Ui_SocketPage):
         self.port = -1
         self.auto = False
 
-        self.socket_operator = SocketOperator()
+        # asyncio 服务器或每个客户端一个线程的服务器
+        self.socket_operator = AsyncSocketServer() if CF_SOCKET_SERVER == "ASYNC" else SocketOperator()
 
         # 链接信号
         self.comboBoxIp.currentTextChanged.connect(self.ip_changed)
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from PyQt5.QtWidgets import QDialog
+from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt
+
+from UI.ui_statistics import Ui_Dialog as Ui_Statistics
+
+from Utils.database_operator import DatabaseOperator
+from Utils.detection_statistics import DetectionStatistics, KIND_PIN
+from User.config_static import CF_APP_ICON, CF_STATISTICS_DAILY_HEADER, CF_STATISTICS_ERRORS_HEADER, CF_STATISTICS_DAYS
+
+
+class InterfaceStatistics(QDialog, Ui_Statistics):
+    def __init__(self, db_operator: DatabaseOperator, filter_dict: dict):
+        super().__init__()
+
+        self.db_operator = db_operator
+        self.filter_dict = {k: v for k, v in filter_dict.items() if k in ("Line", "Part", "Location")}     # 统计表只有这些列
+
+        self.setupUi(self)  # 初始化窗口
+
+        self.setWindowIcon(QIcon(CF_APP_ICON))  # 设置窗口图标
+
+        self.tableDaily.init_table(table_headers=CF_STATISTICS_DAILY_HEADER)
+        self.tableErrors.init_table(table_headers=CF_STATISTICS_ERRORS_HEADER)
+        self.tableDaily.sortItems(0, Qt.DescendingOrder)       # 最近的在前
+        self.tableErrors.sortItems(3, Qt.DescendingOrder)      # 次数多的在前
+
+        filter_text = ["%s[%s]" % (k, v) for k, v in self.filter_dict.items() if str(v).strip() and str(v).strip().upper() != "ALL"]
+        self.labelFilter.setText(" ".join(filter_text) if filter_text else "全部")
+
+        self.spinBoxDays.setValue(CF_STATISTICS_DAYS)
+
+        # 绑定信号
+        self.buttonRefresh.clicked.connect(self.fill_in_tables)
+
+        self.fill_in_tables()
+
+    def fill_in_tables(self):
+        end = DetectionStatistics.get_day(datetime.now()) + timedelta(days=1)
+        start = end - timedelta(days=self.spinBoxDays.value())
+
+        # 每日合格率
+        summary = DetectionStatistics.get_daily_summary(db_operator=self.db_operator, filter_dict=self.filter_dict, start=start, end=end)
+        total = sum(day["Total"] for day in summary)
+        right = sum(day["Right"] for day in summary)
+        for day in summary:
+            day["Day"] = day["Day"].strftime("%Y-%m-%d")
+            day["PassRate"] = "%.2f%%" % (day["PassRate"] * 100,)
+        self.tableDaily.fill_in(contents=summary)
+
+        if total:
+            self.labelSummary.setText("检测[%d]次  正确[%d]次  错误[%d]次  合格率[%.2f%%]" % (total, right, total - right, right / total * 100))
+        else:
+            self.labelSummary.setText("无检测记录")
+
+        # 错误位置，行列从1开始，与零件详情一致
+        frequency = DetectionStatistics.get_error_frequency(db_operator=self.db_operator, filter_dict=self.filter_dict, start=start, end=end)
+        for row in frequency:
+            row["Kind"] = "缺少顶棒" if row["Kind"] == KIND_PIN else "多余顶棒"
+            row["X"] += 1
+            row["Y"] += 1
+        self.tableErrors.fill_in(contents=frequency)
@@ -20,14 +20,16 @@ from Interface.interface_teach_pins_map_page import InterfaceTeachPinsMapPage
 
 from CameraCore.camera_identity import CameraIdentity
 from Utils.frame_operator import FrameOperator
+from Utils.frame_analyzer import FrameAnalyzer
+from Utils.frame_quality import FrameQuality
 from Utils.image_presenter import Presenter
 from Utils.database_operator import DatabaseOperator
 from Utils.messenger import Messenger
-from Utils.serializer import MySerializer
+from Utils.pins_map_codec import PinsMapCodec
 from User.config_static import (CF_TEACH_INFO_PAGE, CF_TEACH_KEYSTONE_PAGE, CF_TEACH_BINARIZATION_PAGE,
                                 CF_TEACH_DENOISE_PAGE, CF_TEACH_DIVISION_PAGE, CF_TEACH_CONTOURS_PAGE, CF_TEACH_PINS_MAP_PAGE,
                                 CF_TEACH_REFERENCE_SIDE, CF_RUNNING_SEQUENCE_FILE, CF_RUNNING_GRAB_FLAG, CF_RUNNING_TEACH_FLAG,
-                                CF_APP_TITLE, CF_APP_ICON)
+                                CF_APP_TITLE, CF_APP_ICON, CF_FRAME_QUALITY_TEACH)
 
 
 class InterfaceTeach(QMainWindow, Ui_Teach):
@@ -465,13 +467,13 @@ class InterfaceTeach(QMainWindow, Ui_Teach):
         )
 
         # 计算直方图
-        x, hist = FrameOperator.calculate_hist(gray)
+        x, hist = FrameAnalyzer.calculate_hist(gray)
         # 平滑曲线
-        smooth_x, smooth_hist = FrameOperator.smooth_hist(x=x, hist=hist)
+        smooth_x, smooth_hist = FrameAnalyzer.smooth_hist(x=x, hist=hist)
         # 找波谷
-        valleys_x, valleys_hist, _, _ = FrameOperator.find_valleys_and_peaks(x=smooth_x, hist=smooth_hist, whitelist=['valley'])
+        valleys_x, valleys_hist, _, _ = FrameAnalyzer.find_valleys_and_peaks(x=smooth_x, hist=smooth_hist, whitelist=['valley'])
         # 找参考值
-        ref_thresh = FrameOperator.calculate_reference_thresh(valleys_x, _, _, _)
+        ref_thresh = FrameAnalyzer.calculate_reference_thresh(valleys_x, _, _, _)
         # 显示参考值
         if ref_thresh is not None:
             self.binarization_page.labelRefThreshValue.setText(str(ref_thresh))
@@ -484,7 +486,7 @@ class InterfaceTeach(QMainWindow, Ui_Teach):
             self.binarization_page.labelThreshValue.setText(str(thresh))
 
         # 画直方图
-        FrameOperator.draw_hist(canvas=self.binarization_page.canvas, x=x, hist=hist,
+        FrameAnalyzer.draw_hist(canvas=self.binarization_page.canvas, x=x, hist=hist,
                                 smooth_x=smooth_x, smooth_hist=smooth_hist, valleys_x=valleys_x, valleys_hist=valleys_hist)
 
         if show_binarization:
@@ -568,6 +570,10 @@ class InterfaceTeach(QMainWindow, Ui_Teach):
     def contours_save_button(self, message: dict):
         message.pop("ShowOrigin")
         self.process_parameters.update(message)
+        # 帧质量检查的阈值按示教图片计算
+        if CF_FRAME_QUALITY_TEACH:
+            vertexes = [[self.process_parameters["P%dX" % i], self.process_parameters["P%dY" % i]] for i in range(1, 5)]
+            self.process_parameters.update(FrameQuality.teach(self.frame_data, vertexes))
         # 保存到数据库
         self.db_operator.set_process_parameters(filter_dict={"SerialNumber": self.camera_identity.serial_number}, demand_dict=self.process_parameters)
         Messenger.show_QMessageBox(widget=self, level='INFO', title="信息", text="算法参数保存成功",
@@ -667,7 +673,7 @@ class InterfaceTeach(QMainWindow, Ui_Teach):
         # 以右侧相机为基准
         # if side != CF_TEACH_REFERENCE_SIDE:
         #     pins_map = cv2.flip(pins_map, flipCode=0)       # 水平翻转
-        str_pins_map = MySerializer.serialize(pins_map)     # 序列化
+        str_pins_map = PinsMapCodec.encode_pins_map(pins_map)     # 编码
 
         # 保存至数据库
         self.db_operator.set_parts_pins_map(demand_dict={"Rows": rows, "Columns": columns, "PinsMap": str_pins_map},
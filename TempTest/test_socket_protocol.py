@@ -0,0 +1,76 @@
+import unittest
+
+from Utils.socket_protocol import MessageDecoder, MAX_FRAME_SIZE
+
+
+def feed_all(decoder: MessageDecoder, chunks: list) -> list:
+    messages = list()
+    for chunk in chunks:
+        messages.extend(decoder.feed(chunk))
+    return messages
+
+
+class TestMessageDecoder(unittest.TestCase):
+
+    # 含中文、转义、数字、字面量及嵌套对象，覆盖各种未接收完整的位置
+    STREAM = ('{"command":"detect","uid":"相机-1","v":-1.5e-3,"f":true,"n":null,"s":"a\\"b\\u4e2d\\ud83d\\ude00\\n"}\n'
+              '{"command":"enum"}{"x":[1,{"y":2}]}').encode("utf-8")
+
+    def test_single(self):
+        self.assertEqual(MessageDecoder().feed(b'{"command":"enum"}'), ['{"command":"enum"}'])
+
+    def test_concatenated(self):
+        messages = MessageDecoder().feed(self.STREAM)
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(messages[1], '{"command":"enum"}')
+        self.assertEqual(messages[2], '{"x":[1,{"y":2}]}')
+
+    def test_split_at_every_byte(self):
+        expected = MessageDecoder().feed(self.STREAM)
+        for i in range(1, len(self.STREAM)):
+            with self.subTest(split=i):
+                self.assertEqual(feed_all(MessageDecoder(), [self.STREAM[:i], self.STREAM[i:]]), expected)
+
+    def test_split_byte_by_byte(self):
+        chunks = [self.STREAM[i:i + 1] for i in range(len(self.STREAM))]
+        self.assertEqual(feed_all(MessageDecoder(), chunks), MessageDecoder().feed(self.STREAM))
+
+    def test_split_at_newline_inside_object(self):
+        decoder = MessageDecoder()
+        self.assertEqual(decoder.feed(b'{"command":\n'), [])
+        self.assertEqual(decoder.feed(b'"enum"}'), ['{"command":\n"enum"}'])
+
+    def test_multi_byte_utf8_split(self):
+        data = '{"uid":"相机"}'.encode("utf-8")
+        # 在“相”的 3 个字节中间分开
+        index = data.index('相'.encode("utf-8")) + 1
+        self.assertEqual(feed_all(MessageDecoder(), [data[:index], data[index:]]), ['{"uid":"相机"}'])
+
+    def test_malformed_without_newline(self):
+        decoder = MessageDecoder()
+        self.assertEqual(decoder.feed(b'{"command":"x" "y"}'), ['{"command":"x" "y"}'])
+        self.assertEqual(decoder.feed(b'{"command":"enum"}'), ['{"command":"enum"}'])
+
+    def test_malformed_followed_by_command(self):
+        self.assertEqual(MessageDecoder().feed(b'{"command":"x" "y"}{"command":"enum"}'),
+                         ['{"command":"x" "y"}', '{"command":"enum"}'])
+        self.assertEqual(MessageDecoder().feed(b'{"a":"\\uZZZZ"}\n{"command":"enum"}'),
+                         ['{"a":"\\uZZZZ"}', '{"command":"enum"}'])
+        self.assertEqual(MessageDecoder().feed(b'{"v":12.}{"command":"enum"}'),
+                         ['{"v":12.}', '{"command":"enum"}'])
+
+    def test_not_json(self):
+        self.assertEqual(MessageDecoder().feed(b'enum\n{"command":"enum"}'), ['enum', '{"command":"enum"}'])
+        self.assertEqual(MessageDecoder().feed(b'enum{"command":"enum"}'), ['enum', '{"command":"enum"}'])
+
+    def test_incomplete_over_max_size(self):
+        decoder = MessageDecoder(max_size=16)
+        self.assertEqual(decoder.feed(b'{"command":"'), [])
+        messages = decoder.feed(b'x' * 16)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(decoder.buffer, '')
+        self.assertEqual(MessageDecoder().max_size, MAX_FRAME_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'ui_statistics.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.4
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(900, 600)
+        Dialog.setMinimumSize(QtCore.QSize(700, 450))
+        Dialog.setStyleSheet("background-color: rgb(255, 255, 255);")
+        self.verticalLayout = QtWidgets.QVBoxLayout(Dialog)
+        self.verticalLayout.setContentsMargins(12, 12, 12, 12)
+        self.verticalLayout.setSpacing(6)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setSpacing(6)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.labelFilter = QtWidgets.QLabel(Dialog)
+        self.labelFilter.setStyleSheet("font: 75 10pt \"微软雅黑\";")
+        self.labelFilter.setObjectName("labelFilter")
+        self.horizontalLayout.addWidget(self.labelFilter)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout.addItem(spacerItem)
+        self.label = QtWidgets.QLabel(Dialog)
+        self.label.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.label.setObjectName("label")
+        self.horizontalLayout.addWidget(self.label)
+        self.spinBoxDays = QtWidgets.QSpinBox(Dialog)
+        self.spinBoxDays.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.spinBoxDays.setMinimum(1)
+        self.spinBoxDays.setMaximum(3650)
+        self.spinBoxDays.setProperty("value", 30)
+        self.spinBoxDays.setObjectName("spinBoxDays")
+        self.horizontalLayout.addWidget(self.spinBoxDays)
+        self.label_2 = QtWidgets.QLabel(Dialog)
+        self.label_2.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout.addWidget(self.label_2)
+        self.buttonRefresh = QtWidgets.QPushButton(Dialog)
+        self.buttonRefresh.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.buttonRefresh.setObjectName("buttonRefresh")
+        self.horizontalLayout.addWidget(self.buttonRefresh)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.labelSummary = QtWidgets.QLabel(Dialog)
+        self.labelSummary.setStyleSheet("font: 75 12pt \"微软雅黑\";")
+        self.labelSummary.setAlignment(QtCore.Qt.AlignCenter)
+        self.labelSummary.setObjectName("labelSummary")
+        self.verticalLayout.addWidget(self.labelSummary)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setSpacing(12)
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.label_3 = QtWidgets.QLabel(Dialog)
+        self.label_3.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.label_3.setObjectName("label_3")
+        self.verticalLayout_2.addWidget(self.label_3)
+        self.tableDaily = MyQTableWidget(Dialog)
+        self.tableDaily.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableDaily.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tableDaily.setColumnCount(0)
+        self.tableDaily.setObjectName("tableDaily")
+        self.tableDaily.setRowCount(0)
+        self.tableDaily.verticalHeader().setVisible(False)
+        self.verticalLayout_2.addWidget(self.tableDaily)
+        self.horizontalLayout_2.addLayout(self.verticalLayout_2)
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.label_4 = QtWidgets.QLabel(Dialog)
+        self.label_4.setStyleSheet("font: 10pt \"微软雅黑\";")
+        self.label_4.setObjectName("label_4")
+        self.verticalLayout_3.addWidget(self.label_4)
+        self.tableErrors = MyQTableWidget(Dialog)
+        self.tableErrors.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableErrors.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tableErrors.setColumnCount(0)
+        self.tableErrors.setObjectName("tableErrors")
+        self.tableErrors.setRowCount(0)
+        self.tableErrors.verticalHeader().setVisible(False)
+        self.verticalLayout_3.addWidget(self.tableErrors)
+        self.horizontalLayout_2.addLayout(self.verticalLayout_3)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "检测统计"))
+        self.labelFilter.setText(_translate("Dialog", "$"))
+        self.label.setText(_translate("Dialog", "最近"))
+        self.label_2.setText(_translate("Dialog", "天"))
+        self.buttonRefresh.setText(_translate("Dialog", "刷新"))
+        self.labelSummary.setText(_translate("Dialog", "@"))
+        self.label_3.setText(_translate("Dialog", "每日合格率"))
+        self.label_4.setText(_translate("Dialog", "错误位置"))
+from Interface.my_promote_widget import MyQTableWidget
+
+
+if __name__ == "__main__":
+    import sys
+    app = QtWidgets.QApplication(sys.argv)
+    Dialog = QtWidgets.QDialog()
+    ui = Ui_Dialog()
+    ui.setupUi(Dialog)
+    Dialog.show()
+    sys.exit(app.exec_())
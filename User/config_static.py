@@ -34,6 +34,24 @@ CF_IMPORT_TABLE_HEADER = {
     '列': "Columns"
     }
 
+CF_STATISTICS_DAILY_HEADER = {
+    '日期': "Day",
+    '总数': "Total",
+    '正确': "Right",
+    '错误': "Wrong",
+    '合格率': "PassRate",
+    }
+
+CF_STATISTICS_ERRORS_HEADER = {
+    '类型': "Kind",
+    '行': "Y",
+    '列': "X",
+    '次数': "Total",
+    }
+
+# 统计界面默认天数
+CF_STATISTICS_DAYS = 30
+
 CF_RECORDS_TABLE_HEADER = {
     '序号': "ID",
     '时间': "When",
@@ -58,10 +76,97 @@ CF_PART_PICTURE = r".\PinsCtrlData\Static\Pictures\part.jpg"
 CF_RECORD_PICTURE = r".\PinsCtrlData\Static\Pictures\record.png"
 CF_ID_PICTURE = r".\PinsCtrlData\Static\Pictures\id.png"
 CF_DATABASE_PATH = r".\PinsCtrlData\Database\pins_ctrl_database.accdb"
+# 数据库类型 AUTO/ACCESS/SQLITE，AUTO 根据扩展名判断（.accdb/.mdb 为 Access，.db/.sqlite/.sqlite3 为 SQLite）
+CF_DATABASE_BACKEND = "AUTO"
+# SQLite 等待写锁的超时 s
+CF_SQLITE_BUSY_TIMEOUT = 10.0
+# 数据库连接池 最大连接数/等待空闲连接超时 s/空闲超过该时间的连接租出前检查 s
+CF_DATABASE_POOL_SIZE = 4
+CF_DATABASE_POOL_TIMEOUT = 30.0
+CF_DATABASE_POOL_PING_INTERVAL = 60.0
 CF_TEMP_TEACH_DIR = r".\PinsCtrlData\Temp\Teach"
 CF_RECORDS_DETECTION_PICTURES_DIR = r".\PinsCtrlData\DetectionRecords\DetectionPictures"
 CF_RECORDS_ORIGIN_PICTURES_DIR = r".\PinsCtrlData\DetectionRecords\OriginPictures"
+# 检测图片保存策略 FULL：均保存 JPEG / ORIGIN_ON_FAILURE：原始图片只在检测错误时保存 / TIERED：检测错误保存无损 PNG，正确保存缩小的 JPEG
+# 图片按日期分目录保存（年/月/日），检测图片另存缩略图
+CF_PICTURE_STORE_POLICY = "FULL"
+CF_PICTURE_STORE_JPEG_QUALITY = 95
+CF_PICTURE_STORE_PNG_COMPRESSION = 3
+# TIERED 策略下检测正确时的缩放比例（原始图片缩小后不能再用于批量重新检测）
+CF_PICTURE_STORE_PASS_SCALE = 0.5
+# 缩略图宽度，0 时不生成
+CF_PICTURE_STORE_THUMBNAIL_WIDTH = 320
+CF_PICTURE_STORE_THUMBNAIL_QUALITY = 80
+# 检测记录保留策略 保留天数/最多记录数/检测图片最大占用 GB，0 为不限制；按 ID 从旧到新删除
+CF_RETENTION_MAX_AGE_DAYS = 0
+CF_RETENTION_MAX_RECORDS = 0
+CF_RETENTION_MAX_DISK_GB = 0
+# 每个事务删除的记录数 / 定时清理间隔 h，0 为不定时清理 / 启动后首次清理延迟 s
+CF_RETENTION_BATCH_ROWS = 500
+CF_RETENTION_INTERVAL_HOURS = 24
+CF_RETENTION_START_DELAY = 300
+# 检测记录后台写入 队列上限/每批最多行数/凑批最长等待 s/队列满时等待 s（超时则在检测线程内直接写入）
+CF_RECORD_WRITER_QUEUE_SIZE = 64
+CF_RECORD_WRITER_BATCH_ROWS = 16
+CF_RECORD_WRITER_BATCH_INTERVAL = 0.2
+CF_RECORD_WRITER_PUT_TIMEOUT = 5.0
+# 回复 socket 客户端前是否等待检测记录写入完成（durable），及等待超时 s
+CF_DETECTION_DURABLE_REPLY = False
+CF_DETECTION_DURABLE_TIMEOUT = 10.0
+# socket 检测 等待取流开始/等待检测完成 的超时 s，超时后关闭相机并回复 detection error
+CF_DETECTION_TIMEOUT = 30.0
+# socket 服务器 ASYNC：asyncio 单线程处理全部连接 / THREAD：每个客户端一个线程
+CF_SOCKET_SERVER = "ASYNC"
+# asyncio 服务器 等待连接队列/执行数据库命令的线程数/执行相机命令的线程数
+CF_SOCKET_BACKLOG = 256
+CF_SOCKET_COMMAND_WORKERS = 4
+CF_SOCKET_CAMERA_WORKERS = 4
+# 每个客户端 每秒命令数/突发上限，超出时回复 rate limited
+CF_SOCKET_RATE_LIMIT = 5.0
+CF_SOCKET_RATE_BURST = 10
+# 停止监听时等待进行中命令的时间 s
+CF_SOCKET_SHUTDOWN_TIMEOUT = 10.0
+# 相机发现服务 后台枚举间隔 s（0 为只在需要时枚举）/按需枚举的最小间隔 s
+CF_CAMERA_DISCOVERY_INTERVAL = 30.0
+CF_CAMERA_DISCOVERY_MIN_INTERVAL = 2.0
+# 相机取流遥测 每台相机保留的帧记录数/网络传输统计（重发包）查询间隔 s/取流界面状态栏刷新间隔 ms
+CF_CAMERA_TELEMETRY_SIZE = 512
+CF_CAMERA_TELEMETRY_NET_INTERVAL = 1.0
+CF_CAMERA_TELEMETRY_UI_INTERVAL = 1000
+# 取图方式 POLLING：取流线程循环 MV_CC_GetImageBuffer / CALLBACK：SDK 回调线程复制到环形缓冲；回调取流的环形缓冲帧数
+CF_CAMERA_ACQUISITION = "POLLING"
+CF_CAMERA_FRAME_RING_SIZE = 3
+# 组播：根进程以控制权限打开相机并组播（本进程不接收图像），显示及 socket 检测以监控权限接收同一路图像
+CF_CAMERA_MULTICAST_ENABLE = False
+# 各相机的组播地址 {序列号: (组地址, 端口)}，未配置的相机使用 239.192.1.<相机IP末位>
+CF_CAMERA_MULTICAST_GROUPS = {}
+CF_CAMERA_MULTICAST_PORT = 1042
+# 组播时相机连续采集的帧率，0 为不限制
+CF_CAMERA_MULTICAST_FRAME_RATE = 10.0
+# 控制端检查相机在线、重新打开掉线相机的间隔（秒）
+CF_CAMERA_MULTICAST_CHECK_INTERVAL = 10.0
+# socket 检测时按示教的检测区域设置相机 ROI，只采集四边形的外接矩形/外扩像素（传感器坐标）
+CF_SENSOR_ROI_ENABLE = False
+CF_SENSOR_ROI_MARGIN = 32
+# 检测前的帧质量检查（阈值保存在 ProcessParameters 中）：检查区域缩小后的最大边长/不合格时重取下一帧的次数
+CF_FRAME_QUALITY_SIZE = 256
+CF_FRAME_QUALITY_RETRIES = 3
+# 示教保存参数时按示教图片计算阈值并启用检查（默认关闭，未示教阈值的相机不检查）；对焦下限为示教图片的比例/亮度均值允许的偏差/99% 分位亮度上限（示教图片已过曝时不检查）/相邻帧平均灰度差上限（0 为不检查，只与同一次检测中的上一帧比较）
+CF_FRAME_QUALITY_TEACH = False
+CF_FRAME_QUALITY_FOCUS_RATIO = 0.5
+CF_FRAME_QUALITY_BRIGHTNESS_TOLERANCE = 40.0
+CF_FRAME_QUALITY_HIGHLIGHT = 254
+CF_FRAME_QUALITY_MAX_DIFFERENCE = 8.0
+# 相机后端 MVS（海康 MVS SDK）/SIMULATED（模拟相机，无需相机及 SDK）
+CF_CAMERA_BACKEND = "MVS"
+# 模拟相机，Source 为图片文件夹/视频文件/"SYNTHETIC"（合成顶棒网格），PixelFormat 为 Mono8/RGB8Packed/BayerRG8，FrameRate 为最大帧率
+CF_SIMULATED_CAMERAS = [
+    {"SerialNumber": "SIM00000001", "Uid": "SIM1", "Source": "SYNTHETIC", "Width": 1280, "Height": 1024, "PixelFormat": "Mono8", "FrameRate": 10.0},
+    {"SerialNumber": "SIM00000002", "Uid": "SIM2", "Source": "SYNTHETIC", "Width": 1280, "Height": 1024, "PixelFormat": "BayerRG8", "FrameRate": 10.0},
+]
 CF_RUNNING_SEQUENCE_FILE = r".\PinsCtrlData\Temp\sequence"
+CF_NUMBA_CACHE_DIR = r".\PinsCtrlData\Temp\NumbaCache"
+CF_DETECTION_CACHE_VERSION_DIR = r".\PinsCtrlData\Temp\CacheVersion"
 
 CF_TEACH_INFO_PAGE = 0
 CF_TEACH_KEYSTONE_PAGE = 1
@@ -86,6 +191,9 @@ TB_PROCESS_PARAMETERS = "ProcessParameters"
 TB_PARTS_PINSMAP = "PartsPinsMap"
 TB_DETECTION_RECORDS = "DetectionRecords"
 TB_SOCKET_CONFIG = "SocketConfig"
+# 检测统计，写入检测记录时累加：按 生产线/零件/位置/日期/结果 的次数，按 日期/错误类型/行列 的次数
+TB_DETECTION_STATISTICS = "DetectionStatistics"
+TB_ERROR_STATISTICS = "ErrorStatistics"
 
 # RGB
 CF_COLOR_PINSMAP_PIN = (105, 105, 105)
@@ -109,6 +217,9 @@ CF_PINSMAP_NULL_CODE = '×'
 CF_PINSMAP_FREE_CODE = '○'
 CF_PINSMAP_DOWEL_CODE = '◎'
 
+# pins_map 紧凑编码时使用 zlib 压缩
+CF_PINSMAP_CODEC_COMPRESS = True
+
 CF_PINSMAP_CODES_LIST = ["禁用", CF_PINSMAP_PIN_CODE, CF_PINSMAP_NULL_CODE, CF_PINSMAP_FREE_CODE, CF_PINSMAP_DOWEL_CODE]
 
 CF_DATA_REPLACE_ONCE = 0
@@ -0,0 +1,240 @@
+import asyncio
+import json
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from Utils.socket_operator import SocketOperator
+from Utils.frame_kernels import FrameKernels
+from Utils.messenger import Messenger
+from Utils.socket_protocol import (COMMAND_PREFIX, COMMAND_ENUM, COMMAND_OPEN_AND_DETECT, RESPONSE_PREFIX, RESPONSE_RATE_LIMITED,
+                                   MessageDecoder, create_message, get_request_id, frame_response)
+from User.config_static import (CF_SOCKET_BACKLOG, CF_SOCKET_COMMAND_WORKERS, CF_SOCKET_CAMERA_WORKERS,
+                                CF_SOCKET_RATE_LIMIT, CF_SOCKET_RATE_BURST, CF_SOCKET_SHUTDOWN_TIMEOUT)
+
+# Python 3.7 起为 asyncio.current_task
+current_task = getattr(asyncio, "current_task", None) or asyncio.Task.current_task
+
+# 使用相机的命令，在相机线程池中执行
+CAMERA_COMMANDS = (COMMAND_ENUM, COMMAND_OPEN_AND_DETECT)
+
+
+class TokenBucket:
+    """
+    令牌桶限流，每秒补充 rate 个令牌，最多 burst 个
+    """
+
+    def __init__(self, rate: float = CF_SOCKET_RATE_LIMIT, burst: int = CF_SOCKET_RATE_BURST):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.last_time = monotonic()
+
+    def consume(self) -> bool:
+        """
+        取一个令牌
+        :return:    False 为超出限制
+        """
+        if self.rate <= 0:
+            return True
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def create_command_executor():
+    # 延迟导入，相机 SDK 仅在执行命令时需要
+    from Utils.correspondent import CommandExecutor
+    return CommandExecutor()
+
+
+class AsyncSocketServer(SocketOperator):
+    """
+    asyncio 版 socket 服务器，命令集与 MyCorrespondent 相同
+    - 全部连接在一个事件循环线程中处理，空闲连接只占用一个协程，不占用线程及数据库连接
+    - 命令在线程池中执行：相机命令（枚举相机/打开并检测）与数据库命令分开，互不阻塞
+    - 同一连接可连续发送多条命令（流水线），命令同时执行，按完成顺序响应
+    - 每个客户端按令牌桶限流
+    - 停止监听时不再接受连接，等待进行中的命令（最多 CF_SOCKET_SHUTDOWN_TIMEOUT 秒）后关闭各连接
+    """
+
+    def __init__(self, executor_factory: Callable = create_command_executor, bucket_factory: Callable = TokenBucket):
+        """
+        :param executor_factory:    创建每个客户端的命令执行对象，需有 execute(data, reply) -> bool
+        :param bucket_factory:      创建每个客户端的限流对象，需有 consume() -> bool
+        """
+        super().__init__()
+        self.executor_factory = executor_factory
+        self.bucket_factory = bucket_factory
+
+        self._loop = None
+        self._shutdown_event = None
+        self._writers = set()       # 各客户端连接
+        self._clients = set()       # 各客户端协程
+        self._pending = set()       # 进行中的命令
+
+        self.command_pool = None
+        self.camera_pool = None
+
+    def start_listen(self, ip: str, port: int,
+                     server_created_successful_callback=None, server_created_failed_callback=None, server_closed_callback=None,
+                     client_online_callback=None, client_offline_callback=None):
+        """
+        在当前线程运行事件循环，直到停止监听
+        :return:
+        """
+        self.ip, self.port = ip, port
+        self.client_online_callback = client_online_callback
+        self.client_offline_callback = client_offline_callback
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self.command_pool = ThreadPoolExecutor(max_workers=CF_SOCKET_COMMAND_WORKERS)
+        self.camera_pool = ThreadPoolExecutor(max_workers=CF_SOCKET_CAMERA_WORKERS)
+
+        try:
+            loop.run_until_complete(self._serve(server_created_successful_callback=server_created_successful_callback))
+        except Exception as err:
+            # 监听失败的回调函数
+            if server_created_failed_callback is not None:
+                server_created_failed_callback(error=str(err))
+        else:
+            if server_closed_callback is not None:
+                server_closed_callback()
+        finally:
+            self.server = None
+            self._loop = None
+            self.command_pool.shutdown(wait=False)
+            self.camera_pool.shutdown(wait=False)
+            loop.close()
+
+    async def _serve(self, server_created_successful_callback=None):
+        self._shutdown_event = asyncio.Event()
+        self.server = await asyncio.start_server(self._handle_client, self.ip, self.port, backlog=CF_SOCKET_BACKLOG, reuse_address=True)
+
+        # 预热检测内核，第一个客户端的检测无需等待编译
+        FrameKernels.warm_up_in_thread(warm_up_callback=FrameKernels.print_warm_up_time)
+
+        # 监听成功的回调函数
+        if server_created_successful_callback is not None:
+            server_created_successful_callback()
+
+        await self._shutdown_event.wait()
+
+        # 不再接受新连接
+        self.server.close()
+        await self.server.wait_closed()
+
+        # 等待进行中的命令
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=CF_SOCKET_SHUTDOWN_TIMEOUT)
+
+        for writer in list(self._writers):
+            writer.close()
+        # 等待各客户端协程结束
+        if self._clients:
+            await asyncio.wait(list(self._clients), timeout=CF_SOCKET_SHUTDOWN_TIMEOUT)
+
+    def request_shutdown(self):
+        if self._shutdown_event is not None:
+            self._shutdown_event.set()
+
+    def stop_listen(self):
+        """
+        停止监听，可在任意线程调用
+        :return:
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.request_shutdown)
+
+    def send_threadsafe(self, writer, response: str):
+        """
+        线程池中执行的命令发送响应
+        :param writer:
+        :param response:
+        :return:
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._write, writer, response)
+
+    @staticmethod
+    def _write(writer, response: str):
+        if not writer.transport.is_closing():
+            writer.write(response.encode('utf-8'))
+
+    def choose_pool(self, data: str) -> ThreadPoolExecutor:
+        """
+        按命令选择线程池，无法解析的交给数据库命令线程池，由执行对象回复错误
+        :param data:
+        :return:
+        """
+        try:
+            command = json.loads(data).get(COMMAND_PREFIX)
+        except (ValueError, AttributeError):
+            return self.command_pool
+        return self.camera_pool if command in CAMERA_COMMANDS else self.command_pool
+
+    def command_done(self, future):
+        self._pending.discard(future)
+        if future.cancelled():
+            return
+        err = future.exception()
+        if err is not None:
+            m = {"level": 'ERROR', "title": '错误', "text": '命令执行失败',
+                 "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+            Messenger.print(message=m)
+        # 停止监听
+        elif not future.result():
+            self.request_shutdown()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        address = writer.get_extra_info('peername')[:2]
+        task = current_task()
+        self._clients.add(task)
+        self._writers.add(writer)
+        SocketOperator.conn_dict[address] = writer
+
+        if self.client_online_callback is not None:
+            self.client_online_callback(address=address)
+
+        command_executor = None     # 收到第一条命令时创建
+        message_decoder = MessageDecoder()
+        bucket = self.bucket_factory()
+        loop = asyncio.get_event_loop()
+        try:
+            while not self._shutdown_event.is_set():
+                data = await reader.read(1024)
+                # 客户端下线
+                if not data:
+                    break
+
+                for message in message_decoder.feed(data):
+                    request_id = get_request_id(message)
+                    if not bucket.consume():
+                        self._write(writer, frame_response(create_message(RESPONSE_PREFIX, RESPONSE_RATE_LIMITED), request_id=request_id))
+                        continue
+
+                    if command_executor is None:
+                        command_executor = await loop.run_in_executor(self.command_pool, self.executor_factory)
+
+                    # 不等待命令完成，同一连接的多条命令同时执行，按完成顺序响应
+                    future = loop.run_in_executor(self.choose_pool(message), command_executor.execute, message,
+                                                  lambda response: self.send_threadsafe(writer, response))
+                    self._pending.add(future)
+                    future.add_done_callback(self.command_done)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(task)
+            self._writers.discard(writer)
+            SocketOperator.conn_dict.pop(address, None)
+            writer.close()
+            if self.client_offline_callback is not None:
+                self.client_offline_callback(address=address)
@@ -0,0 +1,212 @@
+import csv
+import json
+from time import perf_counter
+from typing import Optional
+from datetime import datetime
+from multiprocessing import Pool
+from os import path as os_path
+import numpy as np
+import cv2
+
+from Utils.frame_operator import FrameOperator
+from Utils.frame_kernels import FrameKernels
+from Utils.database_operator import DatabaseOperator
+
+# 结果变化
+DELTA_NONE = ""
+DELTA_PASS_TO_FAIL = "PASS->FAIL"
+DELTA_FAIL_TO_PASS = "FAIL->PASS"
+
+# CSV 列
+BATCH_CSV_HEADER = ["ID", "When", "Line", "Part", "Location", "OriginPicture",
+                    "StoredResult", "NewResult", "Delta", "ErrorPins", "ErrorNull", "TimeMs", "Error"]
+
+
+def detect_job(job: dict) -> dict:
+    """
+    进程池任务：读取原始图片并重新检测
+    :param job:     {"Record": 检测记录, "Message": 检测参数}
+    :return:        结果行
+    """
+    record = job["Record"]
+    row = {"ID": record["ID"],
+           "When": record["When"].strftime('%Y-%m-%d %H:%M:%S') if isinstance(record["When"], datetime) else record["When"],
+           "Line": record["Line"], "Part": record["Part"], "Location": record["Location"],
+           "OriginPicture": record["OriginPicture"],
+           "StoredResult": bool(record["Result"]), "NewResult": None, "Delta": DELTA_NONE,
+           "ErrorPins": 0, "ErrorNull": 0, "TimeMs": None, "Error": job.get("Error", "")}
+
+    if row["Error"]:
+        return row
+
+    frame = cv2.imread(record["OriginPicture"], cv2.IMREAD_UNCHANGED)
+    if frame is None:
+        row["Error"] = "图片读取失败"
+        return row
+
+    start = perf_counter()
+    try:
+        detection_res, err_pins_location, err_null_location, _ = FrameOperator.detect_frame(frame, job["Message"])
+    except Exception as err:
+        row["Error"] = "检测异常[%s]" % (err,)
+        return row
+    row["TimeMs"] = round((perf_counter() - start) * 1000, 3)
+
+    row["NewResult"] = bool(detection_res)
+    row["ErrorPins"] = int(err_pins_location.shape[0])
+    row["ErrorNull"] = int(err_null_location.shape[0])
+    if row["StoredResult"] and not row["NewResult"]:
+        row["Delta"] = DELTA_PASS_TO_FAIL
+    elif not row["StoredResult"] and row["NewResult"]:
+        row["Delta"] = DELTA_FAIL_TO_PASS
+    return row
+
+
+def init_worker():
+    """
+    进程池初始化，预热检测内核
+    :return:
+    """
+    FrameKernels.warm_up()
+
+
+class BatchDetector:
+    """
+    基于已保存原始图片的批量重新检测
+    """
+
+    def __init__(self, db_operator: DatabaseOperator, parameters_overrides: Optional[dict] = None):
+        """
+        :param db_operator:
+        :param parameters_overrides:    替换的 ProcessParameters，覆盖数据库中的当前参数
+        """
+        self.db_operator = db_operator
+        self.parameters_overrides = parameters_overrides if parameters_overrides else dict()
+
+        # 缓存 (Line, Location) -> 参数，(Part, Line) -> 基准pins_map
+        self.parameters_cache = dict()
+        self.pins_map_cache = dict()
+
+    def get_process_parameters(self, line: str, location: str) -> Optional[dict]:
+        """
+        根据相机位置获取检测参数
+        :param line:
+        :param location:
+        :return:
+        """
+        key = (line, location)
+        if key not in self.parameters_cache:
+            parameters = None
+            camera = self.db_operator.get_camera_identity(demand_list=["SerialNumber"], filter_dict={"Line": line, "Location": location})
+            if camera:
+                parameters = self.db_operator.get_all_process_parameters(filter_dict={"SerialNumber": camera["SerialNumber"]})
+            if parameters:
+                parameters.update(self.parameters_overrides)
+            else:
+                parameters = None
+            self.parameters_cache[key] = parameters
+        return self.parameters_cache[key]
+
+    def get_pins_map(self, part: str, line: str) -> Optional[np.ndarray]:
+        """
+        获取基准pins_map
+        :param part:
+        :param line:
+        :return:
+        """
+        key = (part, line)
+        if key not in self.pins_map_cache:
+            self.pins_map_cache[key] = self.db_operator.get_decoded_pins_map(part=part, line=line)
+        return self.pins_map_cache[key]
+
+    def collect_jobs(self, filter_dict: Optional[dict] = None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        """
+        查询检测记录并生成任务
+        :param filter_dict:     Line/Part/Location/Result 筛选
+        :param start:
+        :param end:
+        :return:
+        """
+        records = self.db_operator.get_detection_records_in_period(
+            demand_list=["ID", "When", "Line", "Part", "Location", "Result", "OriginPicture"],
+            filter_dict=filter_dict, start=start, end=end)
+
+        jobs = list()
+        for record in records:
+            job = {"Record": record}
+            parameters = self.get_process_parameters(line=record["Line"], location=record["Location"])
+            pins_map = self.get_pins_map(part=record["Part"], line=record["Line"])
+            if parameters is None:
+                job["Error"] = "相机未示教或位置不存在"
+            elif pins_map is None:
+                job["Error"] = "零件基准不存在"
+            elif not record["OriginPicture"] or not os_path.exists(record["OriginPicture"]):
+                job["Error"] = "原始图片不存在"
+            else:
+                job["Message"] = dict(**parameters, PinsMap=pins_map)
+            jobs.append(job)
+        return jobs
+
+    @staticmethod
+    def run(jobs: list, workers: Optional[int] = None, chunk_size: int = 4, progress_callback=None) -> tuple:
+        """
+        进程池中执行任务
+        :param jobs:
+        :param workers:             进程数，None 为cpu核数
+        :param chunk_size:
+        :param progress_callback:   progress_callback(row=)
+        :return:    rows, summary
+        """
+        rows = list()
+        start = perf_counter()
+        with Pool(processes=workers, initializer=init_worker) as pool:
+            for row in pool.imap_unordered(detect_job, jobs, chunksize=chunk_size):
+                rows.append(row)
+                if progress_callback is not None:
+                    progress_callback(row=row)
+        wall_time = perf_counter() - start
+
+        rows.sort(key=lambda r: r["ID"])
+        return rows, BatchDetector.summarize(rows, wall_time)
+
+    @staticmethod
+    def summarize(rows: list, wall_time: float) -> dict:
+        """
+        汇总结果
+        :param rows:
+        :param wall_time:   总耗时 秒
+        :return:
+        """
+        done = [row for row in rows if row["NewResult"] is not None]
+        times = np.array([row["TimeMs"] for row in done], np.float64)
+
+        summary = {
+            "Total": len(rows),
+            "Processed": len(done),
+            "Skipped": len(rows) - len(done),
+            "StoredPass": sum(1 for row in done if row["StoredResult"]),
+            "NewPass": sum(1 for row in done if row["NewResult"]),
+            "Unchanged": sum(1 for row in done if row["Delta"] == DELTA_NONE),
+            "PassToFail": sum(1 for row in done if row["Delta"] == DELTA_PASS_TO_FAIL),
+            "FailToPass": sum(1 for row in done if row["Delta"] == DELTA_FAIL_TO_PASS),
+            "WallTimeS": round(wall_time, 3),
+            "ThroughputFps": round(len(done) / wall_time, 3) if wall_time > 0 else None,
+        }
+        if times.size:
+            summary.update({"TimeMsMean": round(float(times.mean()), 3),
+                            "TimeMsMedian": round(float(np.median(times)), 3),
+                            "TimeMsP95": round(float(np.percentile(times, 95)), 3),
+                            "TimeMsMax": round(float(times.max()), 3)})
+        return summary
+
+    @staticmethod
+    def write_csv(rows: list, file_path: str):
+        with open(file_path, "w", encoding="utf-8-sig", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=BATCH_CSV_HEADER)
+            writer.writeheader()
+            writer.writerows(rows)
+
+    @staticmethod
+    def write_json(rows: list, summary: dict, file_path: str):
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"Summary": summary, "Rows": rows}, file, ensure_ascii=False, indent=4)
@@ -0,0 +1,231 @@
+import atexit
+import threading
+from time import monotonic
+from datetime import datetime
+from typing import Optional
+
+from CameraCore.my_camera_t import MyCamera
+from CameraCore.camera_identity import CameraIdentity
+from MvImport.CameraParams_const import MV_GIGE_DEVICE
+
+from Utils.database_operator import DatabaseOperator
+from Utils.detection_cache import DetectionCache
+from Utils.messenger import Messenger
+from User.config_static import CF_PROJECT_ROLE, TB_CAMERAS_IDENTITY, CF_CAMERA_DISCOVERY_INTERVAL, CF_CAMERA_DISCOVERY_MIN_INTERVAL
+
+
+class CameraSnapshot:
+    """
+    一次枚举的结果，创建后不再修改，可在多个线程中同时读取
+    """
+
+    def __init__(self, result: int, devices: list, cameras: list, identity_version, enum_time: float):
+        """
+        :param result:              枚举结果 MV_OK/CAMERA_ENUM_NONE/错误码
+        :param devices:             枚举到的全部相机 [CameraIdentity, ...]
+        :param cameras:             角色匹配的相机 [{"Identity", "Line", "Location", "Side", "Role"}, ...]
+        :param identity_version:    关联时 CamerasIdentity 表的版本
+        :param enum_time:           枚举时间 monotonic()
+        """
+        self.result = result
+        self.devices = tuple(devices)
+        self.cameras = tuple(cameras)
+        self.identity_version = identity_version
+        self.enum_time = enum_time
+        self.created = datetime.now()
+
+    def get_uids(self) -> list:
+        return [camera["Identity"].uid for camera in self.cameras]
+
+    def find(self, uid: str) -> Optional[dict]:
+        for camera in self.cameras:
+            if camera["Identity"].uid == uid:
+                return dict(camera)
+        return None
+
+    def get_age(self) -> float:
+        return monotonic() - self.enum_time
+
+
+class CameraDiscovery:
+    """
+    相机发现服务，后台定时枚举 GigE 相机并关联 CamerasIdentity 表，socket 命令直接读取快照
+    - 快照整体替换，读取无需加锁
+    - 同时只有一次枚举，等待中的按需刷新复用刚完成的结果
+    - CamerasIdentity 表变化时（DetectionCache 版本文件）只重新关联，不重新枚举
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, interval: float = CF_CAMERA_DISCOVERY_INTERVAL, min_interval: float = CF_CAMERA_DISCOVERY_MIN_INTERVAL,
+                 role: str = CF_PROJECT_ROLE):
+        """
+        :param interval:        后台枚举间隔 s，0 为只在需要时枚举
+        :param min_interval:    按需枚举的最小间隔 s
+        :param role:            只保留该角色的相机
+        """
+        self.interval = interval
+        self.min_interval = min_interval
+        self.role = role
+
+        self.db_operator = DatabaseOperator()
+
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # 统计
+        self.enumerations = 0
+        self.rejoins = 0
+        self.last_enum_seconds = 0.0
+
+    @classmethod
+    def get_instance(cls) -> "CameraDiscovery":
+        """
+        进程内共享的服务，首次获取时在后台枚举
+        :return:
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    @classmethod
+    def close_instance(cls):
+        with cls._instance_lock:
+            instance = cls._instance
+            cls._instance = None
+        if instance is not None:
+            instance.stop()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="CameraDiscovery", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop_event.wait(delay):
+            try:
+                self.refresh(max_age=self.min_interval)
+            except Exception as err:
+                m = {"level": 'ERROR', "title": '错误', "text": '枚举相机错误！',
+                     "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+                Messenger.print(message=m)
+            # 只按需枚举
+            if self.interval <= 0:
+                return
+            delay = self.interval
+
+    @staticmethod
+    def enumerate() -> tuple:
+        """
+        枚举 GigE 相机，不修改 MyCamera.enum_cameras_identity
+        :return:    (枚举结果, [CameraIdentity, ...])
+        """
+        devices = list()
+
+        def enum_successful_callback(device_info_list, device_num):
+            for index in range(device_num):
+                st_device_info = MyCamera.get_st_device_info(device_info_list=device_info_list, device_index=index)
+                device_info = MyCamera.decode_device_info(st_device_info=st_device_info, device_index=index)
+                devices.append(CameraIdentity(st_device_info=st_device_info,
+                                              device_index=device_info.get("DeviceIndex"),
+                                              uid=device_info.get("Uid"),
+                                              serial_number=device_info.get("SerialNumber"),
+                                              current_ip=device_info.get("CurrentIp"),
+                                              model_name=device_info.get("ModelName")))
+
+        result = MyCamera.enum_devices(device_type=MV_GIGE_DEVICE, enum_successful_callback=enum_successful_callback)
+        return result, devices
+
+    def join(self, devices: list) -> tuple:
+        """
+        关联 CamerasIdentity 表
+        :param devices:
+        :return:    (角色匹配的相机, 表的版本)
+        """
+        identity_version = DetectionCache.get_instance().read_version(TB_CAMERAS_IDENTITY)
+        rows = self.db_operator.select_from_table(table_name=TB_CAMERAS_IDENTITY, demand_list=["SerialNumber", "Line", "Location", "Side", "Role"])
+        rows = {row["SerialNumber"]: row for row in rows}
+
+        cameras = list()
+        for identity in devices:
+            row = rows.get(identity.serial_number)
+            if row is None or row["Role"] != self.role:
+                continue
+            cameras.append({"Identity": identity, "Line": row["Line"], "Location": row["Location"], "Side": row["Side"], "Role": row["Role"]})
+        return cameras, identity_version
+
+    def _set_snapshot(self, snapshot: CameraSnapshot) -> CameraSnapshot:
+        with self._snapshot_lock:
+            # 不用较旧的枚举结果覆盖
+            if self._snapshot is None or snapshot.enum_time >= self._snapshot.enum_time:
+                self._snapshot = snapshot
+            return self._snapshot
+
+    def refresh(self, max_age: float = 0.0) -> CameraSnapshot:
+        """
+        重新枚举
+        :param max_age:     快照不超过 max_age s，或在等待期间已由其他线程刷新时，直接返回
+        :return:
+        """
+        requested = monotonic()
+        with self._refresh_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and (snapshot.enum_time >= requested or snapshot.get_age() <= max_age):
+                return snapshot
+
+            start = monotonic()
+            result, devices = self.enumerate()
+            self.last_enum_seconds = monotonic() - start
+            self.enumerations += 1
+
+            cameras, identity_version = self.join(devices)
+            return self._set_snapshot(CameraSnapshot(result=result, devices=devices, cameras=cameras,
+                                                     identity_version=identity_version, enum_time=start))
+
+    def get_snapshot(self) -> CameraSnapshot:
+        """
+        当前快照，还没有枚举过时等待枚举完成
+        :return:
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh(max_age=self.min_interval)
+
+        # CamerasIdentity 表变化，重新关联
+        if DetectionCache.get_instance().read_version(TB_CAMERAS_IDENTITY) != snapshot.identity_version:
+            cameras, identity_version = self.join(list(snapshot.devices))
+            self.rejoins += 1
+            snapshot = self._set_snapshot(CameraSnapshot(result=snapshot.result, devices=list(snapshot.devices), cameras=cameras,
+                                                         identity_version=identity_version, enum_time=snapshot.enum_time))
+        return snapshot
+
+    def find_camera(self, uid: str) -> Optional[dict]:
+        """
+        按 uid 查找相机，快照中没有时按需枚举一次（刚上线的相机）
+        :param uid:
+        :return:    {"Identity", "Line", "Location", "Side", "Role"}
+        """
+        camera = self.get_snapshot().find(uid)
+        if camera is None:
+            camera = self.refresh(max_age=self.min_interval).find(uid)
+        return camera
+
+    def get_statistics(self) -> dict:
+        snapshot = self._snapshot
+        return {"Enumerations": self.enumerations, "Rejoins": self.rejoins, "LastEnumSeconds": round(self.last_enum_seconds, 3),
+                "Result": None if snapshot is None else snapshot.result,
+                "Devices": 0 if snapshot is None else len(snapshot.devices),
+                "Cameras": 0 if snapshot is None else len(snapshot.cameras),
+                "Age": None if snapshot is None else round(snapshot.get_age(), 3)}
+
+
+atexit.register(CameraDiscovery.close_instance)
@@ -0,0 +1,179 @@
+import atexit
+import threading
+from os import getpid
+from time import monotonic
+from typing import Optional
+
+from User.config_static import CF_DATABASE_POOL_SIZE, CF_DATABASE_POOL_TIMEOUT, CF_DATABASE_POOL_PING_INTERVAL, TB_SOCKET_CONFIG
+
+
+class ConnectionPool:
+    """
+    数据库连接池，有上限，线程安全
+    同一进程内相同数据库共用一个池（get_pool），各 DatabaseOperator 按需租用连接，用完归还
+    空闲连接在进程内跨 DatabaseOperator（如各 socket 客户端）复用，进程退出时关闭
+    """
+    _pools = dict()
+    _pools_lock = threading.Lock()
+
+    # 健康检查语句，Access 与 SQLite 均可执行
+    PING_SQL = 'select count(*) from %s where 1=0' % (TB_SOCKET_CONFIG,)
+
+    def __init__(self, database_path: str, backend, max_size: int = CF_DATABASE_POOL_SIZE,
+                 timeout: float = CF_DATABASE_POOL_TIMEOUT, ping_interval: float = CF_DATABASE_POOL_PING_INTERVAL):
+        """
+        :param database_path:
+        :param backend:         AccessBackend/SqliteBackend
+        :param max_size:        最大连接数
+        :param timeout:         等待空闲连接的超时 s
+        :param ping_interval:   空闲超过该时间的连接，租出前做健康检查 s
+        """
+        self.database_path = database_path
+        self.backend = backend
+        self.max_size = max(int(max_size), 1)
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        # 连接不能跨进程使用，fork 出的子进程需要新建连接池
+        self.pid = getpid()
+
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = list()         # [(conn, 归还时间), ...]
+        self._size = 0              # 已创建的连接数，含租出的
+        self._closed = False
+
+        # 统计
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+
+    @classmethod
+    def get_pool(cls, database_path: str, backend) -> "ConnectionPool":
+        """
+        获取进程内共享的连接池
+        :param database_path:
+        :param backend:
+        :return:
+        """
+        key = (database_path, backend.name)
+        with cls._pools_lock:
+            pool = cls._pools.get(key)
+            if pool is None or pool._closed or pool.pid != getpid():
+                pool = cls(database_path=database_path, backend=backend)
+                cls._pools[key] = pool
+            return pool
+
+    @classmethod
+    def close_all(cls):
+        """
+        关闭进程内全部连接池
+        :return:
+        """
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def ping(self, conn) -> bool:
+        """
+        健康检查
+        :param conn:
+        :return:
+        """
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.PING_SQL)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.discarded += 1
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        租用一个连接，无空闲连接且已达上限时等待
+        :param timeout:     None 时使用池默认超时
+        :return:
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("连接池已关闭: %s" % (self.database_path,))
+
+                # 优先复用最近归还的连接
+                while self._idle:
+                    conn, released_time = self._idle.pop()
+                    if monotonic() - released_time < self.ping_interval or self.ping(conn):
+                        self.reused += 1
+                        return conn
+                    # 失效连接，丢弃后继续
+                    self._discard(conn)
+                    self._size -= 1
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("等待数据库连接超时，连接池上限 %d" % (self.max_size,))
+                self._condition.wait(remaining)
+
+        # 在锁外建立连接，Access 建立连接较慢
+        try:
+            conn = self.backend.connect(self.database_path)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        """
+        归还连接
+        :param conn:
+        :param broken:  连接已损坏，直接关闭
+        :return:
+        """
+        with self._condition:
+            if broken or self._closed:
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """
+        关闭空闲连接，租出的连接归还时关闭
+        :return:
+        """
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+                self._size -= 1
+            self._condition.notify_all()
+
+    def get_statistics(self) -> dict:
+        with self._condition:
+            return {"Size": self._size, "Idle": len(self._idle), "MaxSize": self.max_size,
+                    "Created": self.created, "Reused": self.reused, "Discarded": self.discarded}
+
+
+atexit.register(ConnectionPool.close_all)
@@ -1,125 +1,76 @@
-from threading import Thread
+from threading import Thread, Event, Lock
 import json
 import numpy as np
-from time import sleep
+from time import sleep, monotonic
+from typing import Optional
 
 from CameraCore.my_camera_t import MyCamera
+from CameraCore.sensor_roi import SensorRoi
+from CameraCore.camera_telemetry import CameraTelemetry
 from CameraCore.camera_err_header import CAMERA_ENUM_NONE
 from MvImport.MvErrorDefine_const import MV_OK
-from MvImport.CameraParams_const import MV_ACCESS_Exclusive
+from MvImport.CameraParams_const import MV_ACCESS_Monitor
 
 from main_grab import camera_save_process as grab_camera_save_process
 
 from Utils.database_operator import DatabaseOperator, get_lines_with_all, get_parts_with_all
-from Utils.serializer import MySerializer
+from Utils.detection_cache import DetectionCache
+from Utils.camera_discovery import CameraDiscovery
+from Utils.frame_quality import FrameQualityGate
+from Utils.messenger import Messenger
+from Utils.record_writer import RecordWriter
 
-from User.config_static import CF_PROJECT_ROLE, CF_TEACH_REFERENCE_SIDE
+from Utils.socket_protocol import (COMMAND_PREFIX, COMMAND_STOP_LISTEN, COMMAND_ENUM, COMMAND_OPEN_AND_DETECT, COMMAND_LINES,
+                                   COMMAND_PARTS, COMMAND_DOING, UID_PREFIX, LINE_PREFIX, PART_PREFIX, RESPONSE_PREFIX,
+                                   RESPONSE_ENUM_ERROR, RESPONSE_ENUM_NONE, RESPONSE_ENUM_SEPARATOR, RESPONSE_OPEN_CAMERA_FAILED,
+                                   RESPONSE_DETECTION_ERROR, RESPONSE_COMMAND_ILLEGAL, REQUEST_ID_PREFIX, MessageDecoder,
+                                   frame_response, COMMAND_TELEMETRY, RESPONSE_TELEMETRY, RESPONSE_TELEMETRY_CAMERAS,
+                                   RESPONSE_TELEMETRY_RECORD_WRITER)
 
+from User.config_static import (CF_TEACH_REFERENCE_SIDE, CF_DETECTION_DURABLE_REPLY, CF_DETECTION_DURABLE_TIMEOUT,
+                                CF_SENSOR_ROI_ENABLE, CF_SENSOR_ROI_MARGIN, CF_DETECTION_TIMEOUT)
 
-COMMAND_PREFIX = 'command'
-COMMAND_STOP_LISTEN = 'stop listen'
-COMMAND_ENUM = 'enum device'
-COMMAND_OPEN_AND_DETECT = 'open and check'
-COMMAND_LINES = 'enum line'
-COMMAND_PARTS = 'enum part'
 
-COMMAND_DOING = 'doing'
+class CommandExecutor:
+    """
+    客户端命令的执行，与连接方式无关，线程版 MyCorrespondent 与 asyncio 版 AsyncSocketServer 共用
+    execute 可在多个线程中同时执行（同一连接的多条命令），同一相机的检测依次进行
+    """
+    _camera_locks = dict()      # {uid: Lock}
+    _camera_locks_lock = Lock()
 
-UID_PREFIX = 'userDefined'
-LINE_PREFIX = 'line'
-PART_PREFIX = 'model'
+    def __init__(self):
+        self.is_durable = CF_DETECTION_DURABLE_REPLY     # 记录写入后才回复
 
-
-RESPONSE_PREFIX = 'result'
-RESPONSE_ENUM_ERROR = 'enum error'
-RESPONSE_ENUM_NONE = 'enum none'
-RESPONSE_ENUM_SEPARATOR = "^_^"
-RESPONSE_OPEN_CAMERA_SUCCESSFUL = 'open success'
-RESPONSE_OPEN_CAMERA_FAILED = 'open failed'
-RESPONSE_DETECTION_ERROR = 'check error'
-
-RESPONSE_DETECTION_RIGHT = 'check right","picture":"{}'
-RESPONSE_DETECTION_WRONG = 'check wrong","picture":"{}'
-
-# RESPONSE_COMMAND_ILLEGAL = 'command illegal'
-RESPONSE_COMMAND_ILLEGAL = 'check error'
-
-
-class MyCorrespondent(Thread):
-
-    def __init__(self, server, conn, address, pop_conn_callback, client_offline_callback=None):
-        super().__init__()
-
-        self.server = server    # 服务端
-        self.conn = conn        # 客户端
-        self.address = address  # 客户端地址 (ip, port)
-
-        self.pop_conn_callback = pop_conn_callback
-        self.client_offline_callback = client_offline_callback
-
-        self.flag = False       # detection 完成标志
+        CameraDiscovery.get_instance()      # 在后台枚举相机
 
         self.db_operator = DatabaseOperator()  # 数据库
 
-    def receive_message(self):
-        """
-        接受并处理消息
-        :return:
+    def execute(self, data: str, reply) -> bool:
         """
-        while True:
-            try:
-                # 最多接受1024个字节
-                # decode解码，将接受的二进制转为字符
-                data = self.conn.recv(1024).decode('utf-8')
-                # 如果接收的消息长度不为0，则将其解码输出
-                if data:
-                    # print('[server] receive message: %s' % data)
-                    res = self.decoder(data)
-                    if not res:
-                        # # 关闭客户端连接
-                        # self.conn.close()
-                        # 移除conn回调函数
-                        # if self.pop_conn_callback is not None:
-                        #     self.pop_conn_callback(address=self.address)
-                        # 关闭server
-                        self.server.close()
-                        break
-                # 当客户端断开连接时，会一直发送''空字符串，所以长度为0已下线
-                else:
-                    # print('[server] client off line')
-                    # 客户端下线的回调函数
-                    if self.client_offline_callback is not None:
-                        self.client_offline_callback(address=self.address)
-                    # 关闭客户端连接
-                    self.conn.close()
-                    # 移除conn回调函数
-                    if self.pop_conn_callback is not None:
-                        self.pop_conn_callback(address=self.address)
-                    break
-            except Exception as err:
-                if "10053" in str(err):
-                    break
-
-        self.db_operator.close()    # 关闭数据库
-
-    def decoder(self, data: str):
-        """
-
+        解析并执行一条命令
         :param data:    为JSON格式
-        :return:
+        :param reply:   reply(response)，发送响应
+        :return:    False 为停止监听
         """
         try:
             data = json.loads(data)      # 将JSON字符串转为字典
         # data 不是JSON格式
         except json.decoder.JSONDecodeError:
             response = self.create_message(RESPONSE_PREFIX, RESPONSE_COMMAND_ILLEGAL)
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
             return True
 
+        # 含 id 时为分帧模式，响应带 id 并以换行结尾
+        request_id = data.get(REQUEST_ID_PREFIX) if isinstance(data, dict) else None
+        if request_id is not None:
+            send = reply
+            reply = lambda response: send(frame_response(response, request_id=request_id))
+
         # json中没有'command'
-        if COMMAND_PREFIX not in data:
+        if not isinstance(data, dict) or COMMAND_PREFIX not in data:
             response = self.create_message(RESPONSE_PREFIX, RESPONSE_COMMAND_ILLEGAL)
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
             return True
         # 提取command的字典内容
         command = data[COMMAND_PREFIX]
@@ -139,7 +90,7 @@ class MyCorrespondent(Thread):
             # {"result":"enum none"}
             # {"result":"uid1^_^uid2^_^uid3"}
             response = self.enum_cameras()
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
             return True
         elif command == COMMAND_LINES:
             # 接收
@@ -152,7 +103,7 @@ class MyCorrespondent(Thread):
             for line in lines:
                 message += line + symbol
             response = self.create_message(RESPONSE_PREFIX, message[3:-3])
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
             return True
         elif command == COMMAND_PARTS:
             # 接收
@@ -166,7 +117,7 @@ class MyCorrespondent(Thread):
             for part in parts:
                 message += part + symbol
             response = self.create_message(RESPONSE_PREFIX, message[3:-3])
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
             return True
         # 打开相机，检查，关闭相机
         elif command == COMMAND_OPEN_AND_DETECT:
@@ -182,11 +133,11 @@ class MyCorrespondent(Thread):
             # 判断格式
             if UID_PREFIX not in data or PART_PREFIX not in data or LINE_PREFIX not in data:
                 response = self.create_message(RESPONSE_PREFIX, RESPONSE_COMMAND_ILLEGAL)
-                self.conn.send(response.encode('utf-8'))
+                reply(response)
                 return True
 
             response = COMMAND_DOING
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
 
             # 提取uid
             selected_uid = data[UID_PREFIX]
@@ -196,51 +147,62 @@ class MyCorrespondent(Thread):
             selected_line = data[LINE_PREFIX]
 
             response = self.open_and_detect_camera(uid=selected_uid, line=selected_line, part=selected_part, )
-            self.conn.send(response.encode('utf-8'))
+            reply(response)
+            return True
+        # 取流遥测
+        elif command == COMMAND_TELEMETRY:
+            # 接收
+            # {"command":"camera telemetry"}
+            # {"command":"camera telemetry","userDefined":"0"}
+            # 响应
+            # {"result":"telemetry","cameras":[{"SerialNumber":"xxx","Uid":"0","Fps":9.9,"LostFrames":0,"SdkMsP50":1.2,...}]}
+            response = self.get_telemetry(uid=data.get(UID_PREFIX))
+            reply(response)
             return True
         else:
             return True
 
-    def enum_cameras(self) -> str:
-        res = MyCamera.enum_cameras(filter_callback=lambda device_info: MyCorrespondent.filter_cameras(device_info=device_info, db_operator=self.db_operator))
-        if res == MV_OK:
-            return self.create_message(RESPONSE_PREFIX, self.creat_enum_message())
-        elif res == CAMERA_ENUM_NONE:
-            return self.create_message(RESPONSE_PREFIX, RESPONSE_ENUM_NONE)
+    @staticmethod
+    def enum_cameras() -> str:
+        # 使用相机发现服务的快照，不再每次枚举
+        snapshot = CameraDiscovery.get_instance().get_snapshot()
+        if snapshot.result == MV_OK:
+            return CommandExecutor.create_message(RESPONSE_PREFIX, RESPONSE_ENUM_SEPARATOR.join(snapshot.get_uids()))
+        elif snapshot.result == CAMERA_ENUM_NONE:
+            return CommandExecutor.create_message(RESPONSE_PREFIX, RESPONSE_ENUM_NONE)
         else:
-            return self.create_message(RESPONSE_PREFIX, RESPONSE_ENUM_ERROR)
+            return CommandExecutor.create_message(RESPONSE_PREFIX, RESPONSE_ENUM_ERROR)
 
     @staticmethod
-    def creat_enum_message() -> str:
-        symbol = RESPONSE_ENUM_SEPARATOR
-        message = symbol
-        cameras_identity = MyCamera.get_enum_cameras_identity()
-        for identity in cameras_identity:
-            uid = identity.uid
-            message += uid + symbol
-        return message[3:-3]
+    def get_telemetry(uid=None) -> str:
+        # 本进程中打开过的相机，uid 为 None 时返回全部；及检测记录后台写入的统计（未检测过时为 null）
+        msg = {
+            RESPONSE_PREFIX: RESPONSE_TELEMETRY,
+            RESPONSE_TELEMETRY_CAMERAS: CameraTelemetry.get_summaries(uid=uid),
+            RESPONSE_TELEMETRY_RECORD_WRITER: RecordWriter.get_instance_statistics(),
+        }
+        return json.dumps(msg, ensure_ascii=False)
 
     @staticmethod
-    def filter_cameras(device_info: dict, db_operator: DatabaseOperator) -> bool:
-        result = db_operator.get_camera_identity(demand_list=["Role"], filter_dict={"SerialNumber": device_info["SerialNumber"]})
-        role = result.get("Role")
-        if role == CF_PROJECT_ROLE:
-            return True
-        return False
+    def get_camera_lock(uid: str) -> Lock:
+        with CommandExecutor._camera_locks_lock:
+            return CommandExecutor._camera_locks.setdefault(uid, Lock())
 
     def open_and_detect_camera(self, uid: str, line: str, part: str):
+        # 同一相机独占打开，依次检测；不同相机可同时检测
+        with self.get_camera_lock(uid):
+            return self._open_and_detect_camera(uid=uid, line=line, part=part)
 
-        cameras_identity = MyCamera.get_enum_cameras_identity()
-        for identity in cameras_identity:
-            if uid == identity.uid:
-                break
-        else:
+    def _open_and_detect_camera(self, uid: str, line: str, part: str):
+
+        # 快照中的相机及其位置
+        camera = CameraDiscovery.get_instance().find_camera(uid)
+        if camera is None:
             return self.create_message(RESPONSE_PREFIX, RESPONSE_OPEN_CAMERA_FAILED)
+        identity = camera["Identity"]
 
-        # 获取相机位置
-        camera_location = self.db_operator.get_camera_identity(demand_list=["Line", "Location", "Side"], filter_dict={"SerialNumber": identity.serial_number})
         # 如果side为“LEFT”,相机视野旋转180度
-        side = camera_location["Side"]
+        side = camera["Side"]
         if side == CF_TEACH_REFERENCE_SIDE:
             rotate_flag = 0
         else:
@@ -251,7 +213,7 @@ class MyCorrespondent(Thread):
             name=None,
             resize_ratio=None,
             rotate_flag=rotate_flag,
-            access_mode=MV_ACCESS_Exclusive,
+            access_mode=MyCamera.get_receiver_access_mode(),
             msg_child_conn=None,
             imgbuf_child_conn=None,
             frame_process_callback=None,
@@ -263,98 +225,222 @@ class MyCorrespondent(Thread):
             running_cameras_lock=None,
         )
 
-        # 多线程，打开相机并取流
-        ret = my_camera.open_and_grab_in_thread()
+        # 打开相机
+        ret = my_camera.open_camera(access_mode=my_camera.access_mode)
         if ret != MV_OK:
             return self.create_message(RESPONSE_PREFIX, RESPONSE_OPEN_CAMERA_FAILED)
 
+        # 检测参数在取流前获取，用于设置 ROI
+        message = self.get_detect_message(camera=my_camera, line=line, part=part)
+        if message is None:
+            my_camera.close_camera()
+            return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
+
+        # 只采集检测区域，顶点换算为 ROI 帧中的坐标；设置失败时使用全画幅
+        # 组播时监控权限不能设置 ROI，且同一路图像还用于显示
+        if CF_SENSOR_ROI_ENABLE and my_camera.access_mode != MV_ACCESS_Monitor:
+            vertexes = my_camera.apply_sensor_roi(vertexes=SensorRoi.get_vertexes(message), margin=CF_SENSOR_ROI_MARGIN)
+            if vertexes is not None:
+                message = SensorRoi.set_vertexes(message, vertexes)
+
+        # 取流（默认在线程中取流）
+        my_camera.grab_in_runtime()
+
         # 方法1：延迟
+        # 取流启动失败时取流标志不会置位，超时后放弃，不一直占用相机线程及相机锁
+        deadline = monotonic() + CF_DETECTION_TIMEOUT
         while not my_camera.get_grab_flag():
+            if monotonic() > deadline:
+                self.detection_timeout_callback(uid=uid, stage='取流未开始')
+                my_camera.close_camera()
+                return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
             sleep(0.1)
-            pass
 
-        ret = self.do_detect(camera=my_camera, line=line, part=part)
-        if not ret:
-            my_camera.close_camera()
-            return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
+        # 本次检测的完成标志及结果
+        detection_done = Event()
+        detection_results = list()
+        self.do_detect(camera=my_camera, message=message, detection_done=detection_done, detection_results=detection_results)
 
         # 方法2：软触发
 
-        # 死循环判断 关闭相机
-        while not self.flag:
-            sleep(0.1)
-            pass
+        # 等待检测完成 关闭相机；超时（如触发模式下没有触发信号）时停止取流并关闭相机
+        if not detection_done.wait(timeout=CF_DETECTION_TIMEOUT):
+            self.detection_timeout_callback(uid=uid, stage='检测未完成')
+            my_camera.close_camera()
+            return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
         my_camera.close_camera()
 
-        # 获取最新记录
-        record = self.db_operator.get_latest_detection_records(demand_list=["Result", "DetectionPicture"], filter_dict={"Part": part, "Line": line})
-        if not record:
+        # 使用本次检测的内存结果，不再读取最新记录；记录在后台写入
+        detection_result = detection_results[-1] if detection_results else None
+        if detection_result is None or detection_result.record_key is None:
+            return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
+
+        # durable 模式，记录写入后才回复
+        if self.is_durable and not detection_result.wait_persisted(timeout=CF_DETECTION_DURABLE_TIMEOUT):
             return self.create_message(RESPONSE_PREFIX, RESPONSE_DETECTION_ERROR)
 
         # 判断结果
-        if record["Result"]:
+        if detection_result.result:
             msg = {
                 RESPONSE_PREFIX: "check right",
-                "picture": record["DetectionPicture"],
+                "picture": detection_result.detection_picture,
             }
         else:
             msg = {
                 RESPONSE_PREFIX: "check wrong",
-                "picture": record["DetectionPicture"],
+                "picture": detection_result.detection_picture,
             }
 
         response = json.dumps(msg)
         return response
 
-    def do_detect(self, camera: MyCamera, line: str, part: str):
-        self.flag = False
+    @staticmethod
+    def detection_timeout_callback(uid: str, stage: str):
+        """
+        检测超时回调函数
+        :param uid:
+        :param stage:   超时时的阶段
+        :return:
+        """
+        m = {"level": 'WARNING', "title": '警告', "text": '相机检测超时，已关闭相机',
+             "informative_text": '相机[%s]，%s，超时[%s]s' % (uid, stage, CF_DETECTION_TIMEOUT), "detailed_text": ''}
+        Messenger.print(message=m)
 
+    def get_detect_message(self, camera: MyCamera, line: str, part: str):
+        """
+        检测所需的相机位置、图片处理参数及基准
+        :param camera:
+        :param line:
+        :param part:
+        :return:    检测消息，缺少数据时为 None
+        """
         serial_number = camera.camera_identity.serial_number
         detect_message = {
             "Part": part,
             "SerialNumber": serial_number
         }
 
+        detection_cache = DetectionCache.get_instance()
+
         # 获取相机位置
-        camera_location = self.db_operator.get_camera_identity(demand_list=["Line", "Location", "Side"], filter_dict={"SerialNumber": serial_number})
+        camera_location = detection_cache.get_camera_location(db_operator=self.db_operator, serial_number=serial_number)
         if (not camera_location or
                 camera_location.get("Line", '') != line or
                 camera_location.get("Location", '') == '' or
                 camera_location.get("Side", '') == ''):
-            return False
+            return None
         detect_message["CameraLocation"] = camera_location
 
         # 数据库获取图片处理参数
-        process_parameters = self.db_operator.get_all_process_parameters(filter_dict={"SerialNumber": serial_number})
+        process_parameters = detection_cache.get_process_parameters(db_operator=self.db_operator, serial_number=serial_number)
         if not process_parameters:
-            return False
+            return None
 
-        # 数据库获取pins_map
-        pins_map = self.db_operator.get_parts_pins_map(demand_list=["PinsMap", ], filter_dict={"Part": part, "Line": line})
+        # 数据库获取pins_map，已反序列化
+        pins_map = detection_cache.get_pins_map(db_operator=self.db_operator, part=part, line=line)
         if not pins_map:
-            return False
+            return None
 
-        pins_map["PinsMap"] = MySerializer.deserialize(pins_map["PinsMap"])     # 反序列化
-        message = dict(**detect_message, **process_parameters, **pins_map)      # 合并字典
+        return dict(**detect_message, **process_parameters, **pins_map)      # 合并字典
 
+    def do_detect(self, camera: MyCamera, message: dict, detection_done: Event, detection_results: list):
+        """
+        保存下一帧并检测
+        :param camera:
+        :param message:             检测消息
+        :param detection_done:      检测完成时置位
+        :param detection_results:   加入本次检测结果 DetectionResult
+        :return:
+        """
+        # 帧质量不合格时重取下一帧，重取后仍不合格则不检测（没有检测结果，回复 detection error）
+        quality_gate = FrameQualityGate(parameters=message, retry_callback=lambda: camera.set_to_save(True),
+                                        failed_callback=lambda reason, metrics: detection_done.set())
         # 设置 save_process_callback 回调函数
         camera.save_process_callback = lambda frame_data, parameters: self.camera_save_process(frame_data=frame_data, parameters=parameters, message=message,
-                                                                                               db_operator=self.db_operator)
-        camera.set_to_save(True)    # 置位保存图片
+                                                                                               db_operator=self.db_operator,
+                                                                                               detection_done=detection_done,
+                                                                                               detection_results=detection_results,
+                                                                                               quality_gate=quality_gate)
+        quality_gate.start(camera)  # 置位保存图片，连续采集时先观察一帧用于运动检查
 
-        return True
-
-    def camera_save_process(self, frame_data: np.ndarray, parameters: dict, message: dict, db_operator: DatabaseOperator):
+    @staticmethod
+    def camera_save_process(frame_data: np.ndarray, parameters: dict, message: dict, db_operator: DatabaseOperator,
+                            detection_done: Event, detection_results: list, quality_gate: Optional[FrameQualityGate] = None):
         grab_camera_save_process(flag=1, frame_data=frame_data, parameters=parameters, message=message,
-                                 db_operator=db_operator, show_detection_callback=self.show_detection)
-
-    def show_detection(self, result: bool, frame: np.ndarray):
-        self.flag = True
+                                 db_operator=db_operator, show_detection_callback=lambda result, frame: detection_done.set(),
+                                 detection_result_callback=detection_results.append, quality_gate=quality_gate)
 
     @staticmethod
     def create_message(prefix: str, message: str) -> str:
         data = '{"%s":"%s"}' % (prefix, message)
         return data
 
+
+class MyCorrespondent(Thread, CommandExecutor):
+
+    def __init__(self, server, conn, address, pop_conn_callback, client_offline_callback=None):
+        Thread.__init__(self)
+        CommandExecutor.__init__(self)
+
+        self.server = server    # 服务端
+        self.conn = conn        # 客户端
+        self.address = address  # 客户端地址 (ip, port)
+
+        self.pop_conn_callback = pop_conn_callback
+        self.client_offline_callback = client_offline_callback
+
+        self.message_decoder = MessageDecoder()
+
+    def receive_message(self):
+        """
+        接受并处理消息，一次接收的多条命令依次执行
+        :return:
+        """
+        while True:
+            try:
+                # 最多接受1024个字节
+                data = self.conn.recv(1024)
+                # 如果接收的消息长度不为0，则将其解码输出
+                if data:
+                    # print('[server] receive message: %s' % data)
+                    res = all(self.decoder(message) for message in self.message_decoder.feed(data))
+                    if not res:
+                        # # 关闭客户端连接
+                        # self.conn.close()
+                        # 移除conn回调函数
+                        # if self.pop_conn_callback is not None:
+                        #     self.pop_conn_callback(address=self.address)
+                        # 关闭server
+                        self.server.close()
+                        break
+                # 当客户端断开连接时，会一直发送''空字符串，所以长度为0已下线
+                else:
+                    # print('[server] client off line')
+                    # 客户端下线的回调函数
+                    if self.client_offline_callback is not None:
+                        self.client_offline_callback(address=self.address)
+                    # 关闭客户端连接
+                    self.conn.close()
+                    # 移除conn回调函数
+                    if self.pop_conn_callback is not None:
+                        self.pop_conn_callback(address=self.address)
+                    break
+            except Exception as err:
+                if "10053" in str(err):
+                    break
+
+        self.db_operator.close()    # 关闭数据库
+
+    def decoder(self, data: str):
+        """
+
+        :param data:    为JSON格式
+        :return:
+        """
+        return self.execute(data=data, reply=self.send_message)
+
+    def send_message(self, response: str):
+        self.conn.send(response.encode('utf-8'))
+
     def run(self):
         self.receive_message()
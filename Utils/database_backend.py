@@ -0,0 +1,340 @@
+from os import path as os_path, makedirs
+from typing import Optional
+
+from User.config_static import CF_DATABASE_BACKEND, CF_SQLITE_BUSY_TIMEOUT, \
+    TB_CAMERAS_IDENTITY, TB_PROCESS_PARAMETERS, TB_PARTS_PINSMAP, TB_DETECTION_RECORDS, TB_SOCKET_CONFIG, \
+    TB_DETECTION_STATISTICS, TB_ERROR_STATISTICS
+
+BACKEND_ACCESS = "ACCESS"
+BACKEND_SQLITE = "SQLITE"
+
+ACCESS_EXTENSIONS = (".accdb", ".mdb")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+# 表结构，与 Access 数据库中的表名、列名一致
+# 列类型为 SQLite 的声明类型，BOOLEAN/TIMESTAMP 在读取时分别转换为 bool/datetime
+TABLES_SCHEMA = {
+    TB_CAMERAS_IDENTITY: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("SerialNumber", "TEXT"),
+        ("Line", "TEXT"),
+        ("Location", "TEXT"),
+        ("Side", "TEXT"),
+        ("Role", "TEXT"),
+    ],
+    TB_PROCESS_PARAMETERS: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("SerialNumber", "TEXT"),
+        ("P1X", "INTEGER"), ("P1Y", "INTEGER"), ("P2X", "INTEGER"), ("P2Y", "INTEGER"),
+        ("P3X", "INTEGER"), ("P3Y", "INTEGER"), ("P4X", "INTEGER"), ("P4Y", "INTEGER"),
+        ("XNumber", "INTEGER"), ("XMini", "INTEGER"), ("XMaxi", "INTEGER"),
+        ("YNumber", "INTEGER"), ("YMini", "INTEGER"), ("YMaxi", "INTEGER"),
+        ("ScaleAlpha", "REAL"), ("ScaleBeta", "REAL"), ("ScaleEnable", "BOOLEAN"),
+        ("GammaConstant", "REAL"), ("GammaPower", "REAL"), ("GammaEnable", "BOOLEAN"),
+        ("LogConstant", "REAL"), ("LogEnable", "BOOLEAN"),
+        ("Thresh", "INTEGER"), ("AutoThresh", "BOOLEAN"),
+        ("EliminatedSpan", "INTEGER"), ("ReservedInterval", "INTEGER"),
+        ("ErodeShape", "INTEGER"), ("ErodeKsize", "INTEGER"), ("ErodeIterations", "INTEGER"),
+        ("DilateShape", "INTEGER"), ("DilateKsize", "INTEGER"), ("DilateIterations", "INTEGER"),
+        ("StripeEnable", "BOOLEAN"), ("ErodeEnable", "BOOLEAN"), ("DilateEnable", "BOOLEAN"),
+        ("MinArea", "REAL"), ("MaxArea", "REAL"), ("MaxRoundness", "REAL"), ("MaxDistance", "REAL"),
+        ("SauvolaThreshWindowSize", "INTEGER"), ("SauvolaThreshK", "REAL"), ("ThreadMethod", "INTEGER"),
+        ("QualityEnable", "BOOLEAN"), ("MinFocus", "REAL"), ("MinBrightness", "REAL"), ("MaxBrightness", "REAL"),
+        ("MaxHighlight", "INTEGER"), ("MaxDifference", "REAL"),
+    ],
+    TB_PARTS_PINSMAP: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("Line", "TEXT"),
+        ("Part", "TEXT"),
+        ("Rows", "INTEGER"),
+        ("Columns", "INTEGER"),
+        ("PinsMap", "TEXT"),
+    ],
+    TB_DETECTION_RECORDS: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("[When]", "TIMESTAMP"),
+        ("Line", "TEXT"),
+        ("Part", "TEXT"),
+        ("Location", "TEXT"),
+        ("Result", "BOOLEAN"),
+        ("Error", "TEXT"),
+        ("User", "TEXT"),
+        ("DetectionPicture", "TEXT"),
+        ("OriginPicture", "TEXT"),
+    ],
+    TB_SOCKET_CONFIG: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("IP", "TEXT"),
+        ("Port", "INTEGER"),
+        ("Auto", "BOOLEAN"),
+    ],
+    TB_DETECTION_STATISTICS: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("Line", "TEXT"),
+        ("Part", "TEXT"),
+        ("Location", "TEXT"),
+        ("[Day]", "TIMESTAMP"),
+        ("Result", "BOOLEAN"),
+        ("Total", "INTEGER"),
+    ],
+    TB_ERROR_STATISTICS: [
+        ("ID", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        ("Line", "TEXT"),
+        ("Part", "TEXT"),
+        ("Location", "TEXT"),
+        ("[Day]", "TIMESTAMP"),
+        ("Kind", "TEXT"),
+        ("X", "INTEGER"),
+        ("Y", "INTEGER"),
+        ("Total", "INTEGER"),
+    ],
+}
+
+# 索引 (名称, 表, 列, 是否唯一)
+TABLES_INDEXES = [
+    ("IdxCamerasIdentitySerialNumber", TB_CAMERAS_IDENTITY, "SerialNumber", True),
+    ("IdxCamerasIdentityLineLocation", TB_CAMERAS_IDENTITY, "Line, Location", False),
+    ("IdxProcessParametersSerialNumber", TB_PROCESS_PARAMETERS, "SerialNumber", True),
+    ("IdxPartsPinsMapLinePart", TB_PARTS_PINSMAP, "Line, Part", True),
+    ("IdxDetectionRecordsWhen", TB_DETECTION_RECORDS, "[When]", False),
+    ("IdxDetectionRecordsLinePartLocation", TB_DETECTION_RECORDS, "Line, Part, Location, [When]", False),
+    ("IdxSocketConfigIP", TB_SOCKET_CONFIG, "IP", True),
+    ("IdxDetectionStatisticsKey", TB_DETECTION_STATISTICS, "Line, Part, Location, [Day], Result", True),
+    ("IdxErrorStatisticsKey", TB_ERROR_STATISTICS, "Line, Part, Location, [Day], Kind, X, Y", True),
+]
+
+# 原 Access 数据库中没有的表，连接时创建
+ACCESS_CREATED_TABLES = (TB_DETECTION_STATISTICS, TB_ERROR_STATISTICS)
+
+# 后来增加的列，连接时补充到已有的表中
+ADDED_COLUMNS = {
+    TB_PROCESS_PARAMETERS: ("QualityEnable", "MinFocus", "MinBrightness", "MaxBrightness", "MaxHighlight", "MaxDifference"),
+}
+
+# SQLite 声明类型 -> Access 类型
+ACCESS_COLUMN_TYPES = {
+    "INTEGER PRIMARY KEY AUTOINCREMENT": "COUNTER PRIMARY KEY",
+    "TEXT": "TEXT(255)",
+    "INTEGER": "LONG",
+    "REAL": "DOUBLE",
+    "BOOLEAN": "YESNO",
+    "TIMESTAMP": "DATETIME",
+}
+
+
+def quote_identifier(name: str) -> str:
+    """
+    列名加方括号，Access 与 SQLite 均支持，避免 When/User 等关键字冲突
+    :param name:
+    :return:
+    """
+    name = name.strip()
+    if name.startswith("[") or "(" in name:
+        return name
+    return "[%s]" % (name,)
+
+
+def get_table_columns(table_name: str) -> list:
+    """
+    表的列名，不含方括号
+    :param table_name:
+    :return:
+    """
+    return [column.strip("[]") for column, _ in TABLES_SCHEMA[table_name]]
+
+
+class AccessBackend:
+    """
+    Microsoft Access，通过 ODBC 连接，仅 Windows 可用
+    """
+    name = BACKEND_ACCESS
+    # 已检查过表结构的数据库
+    _ensured_paths = set()
+
+    @staticmethod
+    def connect(database_path: str):
+        # 延迟导入，非 Windows 环境不需要 pyodbc
+        from pyodbc import connect
+        conn = connect('Driver={Microsoft Access Driver (*.mdb, *.accdb)};DBQ=%s' % database_path)
+        if database_path not in AccessBackend._ensured_paths:
+            AccessBackend.ensure_tables(conn, ACCESS_CREATED_TABLES)
+            AccessBackend.ensure_columns(conn, ADDED_COLUMNS)
+            AccessBackend._ensured_paths.add(database_path)
+        return conn
+
+    @staticmethod
+    def ensure_tables(conn, table_names: tuple):
+        """
+        创建不存在的表及其索引
+        :param conn:
+        :param table_names:
+        :return:
+        """
+        cursor = conn.cursor()
+        try:
+            existing_tables = {row.table_name.lower() for row in cursor.tables(tableType='TABLE')}
+            for table_name in table_names:
+                if table_name.lower() in existing_tables:
+                    continue
+                definition = ", ".join("%s %s" % (quote_identifier(column), ACCESS_COLUMN_TYPES[column_type])
+                                       for column, column_type in TABLES_SCHEMA[table_name])
+                cursor.execute('create table %s (%s)' % (table_name, definition))
+                for index_name, index_table_name, columns, is_unique in TABLES_INDEXES:
+                    if index_table_name == table_name:
+                        cursor.execute('create %sindex %s on %s (%s)' % ("unique " if is_unique else "", index_name, table_name, columns))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def ensure_columns(conn, added_columns: dict):
+        """
+        已有的表中补充缺少的列
+        :param conn:
+        :param added_columns:   {表名: (列名, ...)}
+        :return:
+        """
+        cursor = conn.cursor()
+        try:
+            for table_name, columns in added_columns.items():
+                existing_columns = {row.column_name.lower() for row in cursor.columns(table=table_name)}
+                column_types = dict(TABLES_SCHEMA[table_name])
+                for column in columns:
+                    if column.lower() not in existing_columns:
+                        cursor.execute('alter table %s add column %s %s' % (table_name, quote_identifier(column), ACCESS_COLUMN_TYPES[column_types[column]]))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def select_page_sql(demand: str, table_name: str, where: str, order: str, order_temp: str,
+                        required_rows: int, page: int, page_rows: int) -> tuple:
+        """
+        Access 不支持 offset，使用嵌套 top 分页
+        :return:    sql, 额外参数
+        """
+        temp_rows = (page + 1) * page_rows
+        where = ' where %s' % (where,) if where else ''
+        sql = 'select top %d %s from (select top %d %s from %s%s%s)%s' % (required_rows, demand, temp_rows, demand, table_name, where, order_temp, order)
+        return sql, list()
+
+    @staticmethod
+    def select_limit_sql(demand: str, table_name: str, where: str, order: str, rows: int) -> tuple:
+        """
+        取排序后的前 rows 行
+        :return:    sql, 额外参数
+        """
+        where = ' where %s' % (where,) if where else ''
+        return 'select top %d %s from %s%s%s' % (rows, demand, table_name, where, order), list()
+
+    @staticmethod
+    def select_nth_id_sql(table_name: str, where: str, is_desc: bool, rows: int) -> tuple:
+        """
+        按 ID 排序后第 rows 行的 ID，嵌套 top 只在数据库内扫描 ID 索引
+        :return:    sql, 额外参数
+        """
+        where = ' where %s' % (where,) if where else ''
+        order, order_temp = (' order by ID desc', ' order by ID') if is_desc else (' order by ID', ' order by ID desc')
+        return 'select top 1 ID from (select top %d ID from %s%s%s)%s' % (rows, table_name, where, order, order_temp), list()
+
+
+class SqliteBackend:
+    """
+    SQLite，WAL 模式，读写可并发，跨平台
+    """
+    name = BACKEND_SQLITE
+
+    @staticmethod
+    def connect(database_path: str):
+        import sqlite3
+        # 读取时 BOOLEAN 转为 bool，TIMESTAMP 由 sqlite3 默认转换为 datetime
+        sqlite3.register_converter("BOOLEAN", lambda value: value not in (b"0", b""))
+
+        directory = os_path.dirname(os_path.abspath(database_path))
+        if not os_path.exists(directory):
+            makedirs(directory)
+
+        # 多线程共用同一链接（与 pyodbc 一致），语句缓存相当于预编译
+        conn = sqlite3.connect(database_path, timeout=CF_SQLITE_BUSY_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute('pragma journal_mode=WAL')
+        conn.execute('pragma synchronous=NORMAL')
+        conn.execute('pragma busy_timeout=%d' % (int(CF_SQLITE_BUSY_TIMEOUT * 1000),))
+        SqliteBackend.ensure_schema(conn)
+        return conn
+
+    @staticmethod
+    def ensure_schema(conn):
+        """
+        建表、补充列及索引，已存在则跳过
+        :param conn:
+        :return:
+        """
+        for table_name, columns in TABLES_SCHEMA.items():
+            definition = ", ".join("%s %s" % (column, column_type) for column, column_type in columns)
+            conn.execute('create table if not exists %s (%s)' % (table_name, definition))
+        # 旧数据库中缺少后来增加的列
+        for table_name, columns in ADDED_COLUMNS.items():
+            existing_columns = {row[1].lower() for row in conn.execute('pragma table_info(%s)' % (table_name,))}
+            column_types = dict(TABLES_SCHEMA[table_name])
+            for column in columns:
+                if column.lower() not in existing_columns:
+                    conn.execute('alter table %s add column %s %s' % (table_name, quote_identifier(column), column_types[column]))
+        for index_name, table_name, columns, is_unique in TABLES_INDEXES:
+            conn.execute('create %sindex if not exists %s on %s (%s)' % ("unique " if is_unique else "", index_name, table_name, columns))
+        conn.commit()
+
+    @staticmethod
+    def select_page_sql(demand: str, table_name: str, where: str, order: str, order_temp: str,
+                        required_rows: int, page: int, page_rows: int) -> tuple:
+        """
+        与 Access 嵌套 top 的分页结果一致：按 order_temp 取第 page 页，再按 order 排序
+        :return:    sql, 额外参数
+        """
+        where = ' where %s' % (where,) if where else ''
+        sql = 'select %s from (select %s from %s%s%s limit ? offset ?)%s' % (demand, demand, table_name, where, order_temp, order)
+        return sql, [required_rows, page * page_rows]
+
+    @staticmethod
+    def select_limit_sql(demand: str, table_name: str, where: str, order: str, rows: int) -> tuple:
+        """
+        取排序后的前 rows 行
+        :return:    sql, 额外参数
+        """
+        where = ' where %s' % (where,) if where else ''
+        return 'select %s from %s%s%s limit ?' % (demand, table_name, where, order), [rows]
+
+    @staticmethod
+    def select_nth_id_sql(table_name: str, where: str, is_desc: bool, rows: int) -> tuple:
+        """
+        按 ID 排序后第 rows 行的 ID，offset 只在数据库内扫描 ID 索引
+        :return:    sql, 额外参数
+        """
+        where = ' where %s' % (where,) if where else ''
+        order = ' order by ID desc' if is_desc else ' order by ID'
+        return 'select ID from %s%s%s limit 1 offset ?' % (table_name, where, order), [rows - 1]
+
+
+def get_backend(database_path: str, backend: Optional[str] = None):
+    """
+    选择数据库后端
+    :param database_path:
+    :param backend:     ACCESS/SQLITE/AUTO，None 时使用配置 CF_DATABASE_BACKEND；AUTO 根据文件扩展名判断
+    :return:
+    """
+    backend = (backend or CF_DATABASE_BACKEND).upper()
+    if backend == "AUTO":
+        extension = os_path.splitext(database_path)[1].lower()
+        if extension in SQLITE_EXTENSIONS:
+            backend = BACKEND_SQLITE
+        elif extension in ACCESS_EXTENSIONS:
+            backend = BACKEND_ACCESS
+        else:
+            raise ValueError("无法根据扩展名确定数据库类型: %s" % database_path)
+
+    if backend == BACKEND_SQLITE:
+        return SqliteBackend
+    elif backend == BACKEND_ACCESS:
+        return AccessBackend
+    else:
+        raise ValueError("不支持的数据库类型: %s" % backend)
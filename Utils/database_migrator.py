@@ -0,0 +1,78 @@
+from typing import Optional, Callable
+
+from Utils.database_operator import DatabaseOperator
+from Utils.database_backend import TABLES_SCHEMA, get_table_columns, quote_identifier
+
+
+class DatabaseMigrator:
+    """
+    将数据库（一般为 Access .accdb）中的各表原样复制到另一个数据库（一般为 SQLite），保留 ID
+    """
+
+    def __init__(self, source: DatabaseOperator, target: DatabaseOperator, batch_rows: int = 500):
+        self.source = source
+        self.target = target
+        self.batch_rows = batch_rows
+
+    def get_common_columns(self, table_name: str) -> list:
+        """
+        源表与目标表结构共有的列，源表中多余的列忽略
+        :param table_name:
+        :return:
+        """
+        self.source.cursor.execute('select * from %s where 1=0' % (table_name,))
+        source_columns = {d[0].lower(): d[0] for d in self.source.cursor.description}
+        return [column for column in get_table_columns(table_name) if column.lower() in source_columns]
+
+    def migrate_table(self, table_name: str, clear: bool = False, progress_callback: Optional[Callable] = None) -> int:
+        """
+        复制一个表
+        :param table_name:
+        :param clear:               目标表非空时先清空，否则报错
+        :param progress_callback:   progress_callback(table_name, rows)
+        :return:    复制的行数
+        """
+        with self.source.lease(), self.target.lease():
+            return self._migrate_table(table_name=table_name, clear=clear, progress_callback=progress_callback)
+
+    def _migrate_table(self, table_name: str, clear: bool, progress_callback: Optional[Callable]) -> int:
+        target_rows = self.target.get_table_rows(table_name=table_name)
+        if target_rows:
+            if not clear:
+                raise RuntimeError("目标表 %s 已有 %d 行数据" % (table_name, target_rows))
+            self.target.cursor.execute('delete from %s' % (table_name,))
+
+        columns = self.get_common_columns(table_name)
+        demand = ", ".join(quote_identifier(column) for column in columns)
+        interrogation = ", ".join("?" for _ in columns)
+        insert_sql = 'insert into %s (%s) values (%s)' % (table_name, demand, interrogation)
+
+        self.source.cursor.execute('select %s from %s order by ID' % (demand, table_name))
+        rows = 0
+        while True:
+            data = self.source.cursor.fetchmany(self.batch_rows)
+            if not data:
+                break
+            self.target.cursor.executemany(insert_sql, [tuple(row) for row in data])
+            rows += len(data)
+            if progress_callback is not None:
+                progress_callback(table_name, len(data))
+
+        self.target.conn.commit()
+        return rows
+
+    def migrate(self, clear: bool = False, progress_callback: Optional[Callable] = None) -> dict:
+        """
+        复制全部表，并核对行数
+        :param clear:
+        :param progress_callback:
+        :return:    {表名: 行数}
+        """
+        summary = dict()
+        for table_name in TABLES_SCHEMA.keys():
+            rows = self.migrate_table(table_name=table_name, clear=clear, progress_callback=progress_callback)
+            target_rows = self.target.get_table_rows(table_name=table_name)
+            if target_rows != rows:
+                raise RuntimeError("表 %s 复制 %d 行，目标表实际 %d 行" % (table_name, rows, target_rows))
+            summary[table_name] = rows
+        return summary
@@ -1,31 +1,103 @@
-from pyodbc import connect
+import threading
 from typing import Optional
-from User.config_static import CF_DATABASE_PATH, TB_CAMERAS_IDENTITY, TB_PROCESS_PARAMETERS, TB_PARTS_PINSMAP, TB_DETECTION_RECORDS, TB_SOCKET_CONFIG
+from datetime import datetime
+from functools import wraps
+from contextlib import contextmanager
+from Utils.database_backend import get_backend, quote_identifier
+from Utils.connection_pool import ConnectionPool
+from Utils.detection_cache import DetectionCache
+from Utils.pins_map_codec import PinsMapCodec
+from Utils.detection_statistics import DetectionStatistics
+from User.config_static import CF_DATABASE_PATH, TB_CAMERAS_IDENTITY, TB_PROCESS_PARAMETERS, TB_PARTS_PINSMAP, TB_DETECTION_RECORDS, TB_SOCKET_CONFIG, \
+    TB_DETECTION_STATISTICS, TB_ERROR_STATISTICS
 
 
-class DatabaseOperator:
-    def __init__(self, database_path: str = CF_DATABASE_PATH):
-        # 链接数据库
-        self.conn = connect('Driver={Microsoft Access Driver (*.mdb, *.accdb)};DBQ=%s' % database_path)
-        # 创建游标
-        self.cursor = self.conn.cursor()
+# 按 ID 列表查询/删除时，每条语句最多的 ID 数
+ID_CHUNK_ROWS = 100
+
 
-    def create_cursor(self):
-        # 创建游标
-        self.cursor = self.conn.cursor()
+def leased(method):
+    """
+    方法执行期间为当前线程租用一个连接，嵌套调用复用同一连接
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lease():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class DatabaseOperator:
+    def __init__(self, database_path: str = CF_DATABASE_PATH, backend: Optional[str] = None):
+        """
+        :param database_path:
+        :param backend:     ACCESS/SQLITE/AUTO，None 时使用配置 CF_DATABASE_BACKEND
+        """
+        self.database_path = database_path
+        self.backend = get_backend(database_path=database_path, backend=backend)
+        # 进程内共享的连接池，各线程使用时租用，不再共用一个游标
+        self.pool = ConnectionPool.get_pool(database_path=database_path, backend=self.backend)
+        # 当前线程租用的 连接/游标
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            raise RuntimeError("数据库连接只能在 lease() 内使用")
+        return conn
+
+    @property
+    def cursor(self):
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            raise RuntimeError("数据库游标只能在 lease() 内使用")
+        return cursor
+
+    @contextmanager
+    def lease(self):
+        """
+        为当前线程租用连接，结束时归还；出错时回滚，回滚失败的连接不再复用
+        :return:    游标
+        """
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            local.depth += 1
+            try:
+                yield local.cursor
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self.pool.acquire()
+        broken = False
+        local.conn = conn
+        local.cursor = conn.cursor()
+        local.depth = 1
+        try:
+            yield local.cursor
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            try:
+                local.cursor.close()
+            except Exception:
+                broken = True
+            local.conn = None
+            local.cursor = None
+            local.depth = 0
+            self.pool.release(conn, broken=broken)
 
     def close(self, obj: Optional[str] = None):
-        if obj is None or obj.lower() == "all":
-            # 关闭游标
-            self.cursor.close()
-            # 关闭链接
-            self.conn.close()
-        elif obj.lower() == "cursor":
-            # 关闭游标
-            self.cursor.close()
-        elif obj.lower() == "conn":
-            # 关闭链接
-            self.conn.close()
+        """
+        连接均已归还连接池，留给进程内其他 DatabaseOperator 复用，进程退出时关闭
+        :param obj:     兼容旧接口，忽略
+        :return:
+        """
 
     @staticmethod
     def assign_where(filter_dict: Optional[dict] = None):
@@ -42,10 +114,11 @@ class DatabaseOperator:
                         elif val.strip().upper() == "TRUE":
                             val = True
 
-                assignment += '%s=? and ' % key
+                assignment += '%s=? and ' % quote_identifier(key)
                 params.append(val)
         return assignment[:-5], params
 
+    @leased
     def get_table_rows(self, table_name: str, filter_dict: Optional[dict] = None) -> int:
         assignment, params = self.assign_where(filter_dict=filter_dict)
         if params:
@@ -65,6 +138,155 @@ class DatabaseOperator:
         pages = full_pages + bool(residue_rows)
         return pages, full_pages, residue_rows
 
+    @leased
+    def get_table_rows_and_max_id(self, table_name: str, filter_dict: Optional[dict] = None, after_id: Optional[int] = None) -> tuple:
+        """
+        行数及最大 ID，用于增量更新缓存的行数
+        :param table_name:
+        :param filter_dict:
+        :param after_id:    只统计 ID 大于该值的行
+        :return:    行数, 最大ID（无数据为 None）
+        """
+        where, params = self.assign_where(filter_dict=filter_dict)
+        conditions = [where] if where else list()
+        if after_id is not None:
+            conditions.append('ID>?')
+            params.append(after_id)
+
+        sql = 'select count(ID), max(ID) from %s' % (table_name,)
+        if conditions:
+            sql += ' where %s' % (' and '.join(conditions),)
+        self.cursor.execute(sql, params)
+        data = self.cursor.fetchall()
+        return data[0][0], data[0][1]
+
+    @leased
+    def get_table_min_id(self, table_name: str) -> Optional[int]:
+        """
+        不筛选的最小 ID，只读取 ID 索引；按保留策略删除最早的记录后变大
+        :param table_name:
+        :return:    无数据为 None
+        """
+        sql = 'select min(ID) from %s' % (table_name,)
+        self.cursor.execute(sql)
+        data = self.cursor.fetchall()
+        return data[0][0]
+
+    @leased
+    def select_by_keyset(self, table_name: str, demand_list: list, filter_dict: Optional[dict] = None, rows: int = 1,
+                         boundary_id: Optional[int] = None, is_inclusive: bool = False, is_desc: bool = True) -> list:
+        """
+        按 ID 定位分页（keyset），只读取 rows 行，耗时与页的深度无关
+        :param table_name:
+        :param demand_list:
+        :param filter_dict:
+        :param rows:            行数
+        :param boundary_id:     从该 ID 之后开始，None 时从头开始
+        :param is_inclusive:    包含 boundary_id 本身
+        :param is_desc:         ID 降序
+        :return:
+        """
+        demand_list = list(demand_list)
+        if "ID" not in demand_list:
+            demand_list.append("ID")
+        demand = ", ".join(quote_identifier(k) for k in demand_list)
+
+        where, params = self.assign_keyset_where(filter_dict=filter_dict, boundary_id=boundary_id, is_inclusive=is_inclusive, is_desc=is_desc)
+        order = ' order by ID desc' if is_desc else ' order by ID'
+
+        sql, limit_params = self.backend.select_limit_sql(demand=demand, table_name=table_name, where=where,
+                                                          order=order, rows=int(rows))
+        self.cursor.execute(sql, params + limit_params)
+        data = self.cursor.fetchall()
+        return [dict(zip(demand_list, row)) for row in data]
+
+    @leased
+    def get_keyset_id(self, table_name: str, filter_dict: Optional[dict] = None, rows: int = 1,
+                      boundary_id: Optional[int] = None, is_inclusive: bool = False, is_desc: bool = True) -> Optional[int]:
+        """
+        从 boundary_id 开始第 rows 行的 ID，一条语句在数据库内定位，不读取中间的行
+        :param table_name:
+        :param filter_dict:
+        :param rows:            从 1 开始
+        :param boundary_id:     从该 ID 之后开始，None 时从头开始
+        :param is_inclusive:    包含 boundary_id 本身
+        :param is_desc:         ID 降序
+        :return:    行数不足时为 None（Access 为最后一行的 ID）
+        """
+        where, params = self.assign_keyset_where(filter_dict=filter_dict, boundary_id=boundary_id, is_inclusive=is_inclusive, is_desc=is_desc)
+        sql, nth_params = self.backend.select_nth_id_sql(table_name=table_name, where=where, is_desc=is_desc, rows=int(rows))
+        self.cursor.execute(sql, params + nth_params)
+        data = self.cursor.fetchall()
+        return data[0][0] if data else None
+
+    def assign_keyset_where(self, filter_dict: Optional[dict], boundary_id: Optional[int], is_inclusive: bool, is_desc: bool) -> tuple:
+        """
+        筛选条件及 ID 边界
+        :return:    where, params
+        """
+        where, params = self.assign_where(filter_dict=filter_dict)
+        conditions = [where] if where else list()
+        if boundary_id is not None:
+            conditions.append('ID%s?' % ({(True, False): "<", (True, True): "<=", (False, False): ">", (False, True): ">="}[(is_desc, is_inclusive)],))
+            params.append(boundary_id)
+        return ' and '.join(conditions), params
+
+    @leased
+    def select_by_ids(self, table_name: str, demand_list: list, ids: list) -> list:
+        """
+        按 ID 列表查询，分段使用 in，避免语句过长
+        :param table_name:
+        :param demand_list:
+        :param ids:
+        :return:    ID升序
+        """
+        demand_list = list(demand_list)
+        if "ID" not in demand_list:
+            demand_list.append("ID")
+        demand = ", ".join(quote_identifier(k) for k in demand_list)
+
+        records = list()
+        for i in range(0, len(ids), ID_CHUNK_ROWS):
+            chunk = list(ids[i: i + ID_CHUNK_ROWS])
+            sql = 'select %s from %s where ID in (%s)' % (demand, table_name, ", ".join("?" for _ in chunk))
+            self.cursor.execute(sql, chunk)
+            records.extend(dict(zip(demand_list, row)) for row in self.cursor.fetchall())
+        records.sort(key=lambda record: record["ID"])
+        return records
+
+    @leased
+    def delete_by_ids(self, table_name: str, ids: list):
+        """
+        按 ID 列表删除，同一事务内提交
+        :param table_name:
+        :param ids:
+        :return:
+        """
+        for i in range(0, len(ids), ID_CHUNK_ROWS):
+            chunk = list(ids[i: i + ID_CHUNK_ROWS])
+            where = 'ID in (%s)' % (", ".join("?" for _ in chunk),)
+            self._subtract_statistics(table_name=table_name, where=where, params=chunk)
+            sql = 'delete from %s where %s' % (table_name, where)
+            self.cursor.execute(sql, chunk)
+        self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
+
+    @leased
+    def delete_by_id_range(self, table_name: str, first_id: int, last_id: int):
+        """
+        删除 ID 在 [first_id, last_id] 内的行
+        :param table_name:
+        :param first_id:
+        :param last_id:
+        :return:
+        """
+        self._subtract_statistics(table_name=table_name, where='ID>=? and ID<=?', params=[first_id, last_id])
+        sql = 'delete from %s where ID>=? and ID<=?' % (table_name,)
+        self.cursor.execute(sql, (first_id, last_id))
+        self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
+
+    @leased
     def select_from_table(self, table_name: str, demand_list: list, filter_dict: Optional[dict] = None, is_fetchall: bool = True,
                           page: int = 0, page_rows: int = -1,
                           order_by: Optional[str] = None, is_desc: bool = True):
@@ -92,16 +314,16 @@ class DatabaseOperator:
             if order_by not in demand_list:
                 demand_list.append(order_by)
             if is_desc:
-                order = ' order by %s desc' % (order_by,)
-                order_temp = ' order by %s' % (order_by,)
+                order = ' order by %s desc' % (quote_identifier(order_by),)
+                order_temp = ' order by %s' % (quote_identifier(order_by),)
             else:
-                order = ' order by %s' % (order_by,)
-                order_temp = ' order by %s desc' % (order_by,)
+                order = ' order by %s' % (quote_identifier(order_by),)
+                order_temp = ' order by %s desc' % (quote_identifier(order_by),)
 
         # 需求
         demand = ""
         for k in demand_list:
-            demand += "%s, " % k
+            demand += "%s, " % quote_identifier(k)
         demand = demand[-len(demand): -2]
 
         # where
@@ -130,16 +352,10 @@ class DatabaseOperator:
             else:
                 return list()
 
-            temp_rows = (page + 1) * page_rows
-
-            # 无筛选
-            if not where_params:
-                sql = ('select top %d %s from (select top %d %s from %s%s)%s' % (required_rows, demand, temp_rows, demand, table_name, order_temp, order))
-                self.cursor.execute(sql)
-            # 有筛选
-            else:
-                sql = ('select top %d %s from (select top %d %s from %s where %s%s)%s' % (required_rows, demand, temp_rows, demand, table_name, where, order_temp, order))
-                self.cursor.execute(sql, where_params)
+            # 各数据库分页语法不同
+            sql, page_params = self.backend.select_page_sql(demand=demand, table_name=table_name, where=where, order=order, order_temp=order_temp,
+                                                            required_rows=required_rows, page=page, page_rows=page_rows)
+            self.cursor.execute(sql, where_params + page_params)
 
         if is_fetchall:
             data = self.cursor.fetchall()
@@ -155,11 +371,12 @@ class DatabaseOperator:
                 res = dict()
             return res
 
+    @leased
     def update_table(self, table_name: str, demand_dict: dict, filter_dict: Optional[dict] = None):
         # 需求
         demand = ""
         for k in demand_dict.keys():
-            demand += "%s=?, " % k
+            demand += "%s=?, " % quote_identifier(k)
         demand = demand[-len(demand): -2]
         demand_params = list(demand_dict.values())
 
@@ -171,13 +388,15 @@ class DatabaseOperator:
 
         self.cursor.execute(sql, params)
         self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
 
+    @leased
     def insert_to_table(self, table_name: str, demand_dict: dict):
         # 需求
         demand = ""
         demand_interrogation = ""
         for k in demand_dict.keys():
-            demand += "%s, " % k
+            demand += "%s, " % quote_identifier(k)
             demand_interrogation += "?, "
         demand = demand[-len(demand): -2]
         demand_interrogation = demand_interrogation[-len(demand_interrogation): -2]
@@ -186,28 +405,106 @@ class DatabaseOperator:
         sql = 'insert into %s (%s) values (%s)' % (table_name, demand, demand_interrogation)
         self.cursor.execute(sql, params)
         self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
 
+    @leased
+    def insert_many_to_table(self, table_name: str, demand_dicts: list):
+        """
+        批量插入，同一事务内提交；各行的列可以不同，按列分组后 executemany
+        :param table_name:
+        :param demand_dicts:
+        :return:
+        """
+        self._insert_many(table_name=table_name, demand_dicts=demand_dicts)
+        self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
+
+    def _insert_many(self, table_name: str, demand_dicts: list):
+        groups = dict()
+        for demand_dict in demand_dicts:
+            groups.setdefault(tuple(demand_dict.keys()), list()).append(tuple(demand_dict.values()))
+
+        for columns, params in groups.items():
+            demand = ", ".join(quote_identifier(k) for k in columns)
+            demand_interrogation = ", ".join("?" for _ in columns)
+            sql = 'insert into %s (%s) values (%s)' % (table_name, demand, demand_interrogation)
+            self.cursor.executemany(sql, params)
+
+    def _accumulate_counts(self, table_name: str, key_columns: list, counts: dict):
+        """
+        计数表累加，不存在则插入，不提交
+        :param table_name:
+        :param key_columns:
+        :param counts:      {键值元组: 次数}
+        :return:
+        """
+        assignment = " and ".join("%s=?" % quote_identifier(k) for k in key_columns)
+        update_sql = 'update %s set [Total]=[Total]+? where %s' % (table_name, assignment)
+        demand = ", ".join(quote_identifier(k) for k in key_columns + ["Total"])
+        insert_sql = 'insert into %s (%s) values (%s)' % (table_name, demand, ", ".join("?" for _ in range(len(key_columns) + 1)))
+
+        for key, count in counts.items():
+            self.cursor.execute(update_sql, (count,) + key)
+            # 减去时（count 为负）不插入
+            if self.cursor.rowcount == 0 and count > 0:
+                self.cursor.execute(insert_sql, key + (count,))
+
+    def _accumulate_statistics(self, records: list):
+        result_counts, error_counts = DetectionStatistics.aggregate(records)
+        self._accumulate_counts(table_name=TB_DETECTION_STATISTICS, key_columns=["Line", "Part", "Location", "Day", "Result"], counts=result_counts)
+        self._accumulate_counts(table_name=TB_ERROR_STATISTICS, key_columns=["Line", "Part", "Location", "Day", "Kind", "X", "Y"], counts=error_counts)
+
+    def _subtract_statistics(self, table_name: str, where: str, params: list):
+        """
+        删除检测记录前，从统计中减去将删除的记录，与删除在同一事务内，不提交
+        :param table_name:  不是检测记录表时不处理
+        :param where:       删除的条件
+        :param params:
+        :return:
+        """
+        if table_name != TB_DETECTION_RECORDS:
+            return
+        demand_list = ["When", "Line", "Part", "Location", "Result", "Error"]
+        sql = 'select %s from %s where %s' % (", ".join(quote_identifier(k) for k in demand_list), table_name, where)
+        self.cursor.execute(sql, params)
+        records = [dict(zip(demand_list, row)) for row in self.cursor.fetchall()]
+        if not records:
+            return
+
+        result_counts, error_counts = DetectionStatistics.aggregate(records)
+        self._accumulate_counts(table_name=TB_DETECTION_STATISTICS, key_columns=["Line", "Part", "Location", "Day", "Result"],
+                                counts={key: -count for key, count in result_counts.items()})
+        self._accumulate_counts(table_name=TB_ERROR_STATISTICS, key_columns=["Line", "Part", "Location", "Day", "Kind", "X", "Y"],
+                                counts={key: -count for key, count in error_counts.items()})
+        for statistics_table in (TB_DETECTION_STATISTICS, TB_ERROR_STATISTICS):
+            self.cursor.execute('delete from %s where [Total]<=0' % (statistics_table,))
+
+    @leased
     def delete_from_table(self, table_name: str, filter_dict: dict):
         # where
         where, where_params = self.assign_where(filter_dict=filter_dict)
+        self._subtract_statistics(table_name=table_name, where=where, params=list(where_params))
 
         sql = 'delete from %s where %s' % (table_name, where)
 
         self.cursor.execute(sql, where_params)
         self.conn.commit()
+        DetectionCache.notify_table_changed(table_name)
 
+    @leased
     def verify_camera_existence(self, table_name: str, serial_number: str) -> bool:
         sql = 'select SerialNumber from %s where SerialNumber=?' % (table_name,)
-        self.cursor.execute(sql, serial_number)
+        self.cursor.execute(sql, (serial_number,))
         data = self.cursor.fetchone()
         if data:
             return True
         else:
             return False
 
+    @leased
     def verify_part_existence(self, table_name: str, part: str, line: str) -> bool:
         sql = 'select Part from %s where Part=? and Line=?' % (table_name,)
-        self.cursor.execute(sql, part, line)
+        self.cursor.execute(sql, (part, line))
         data = self.cursor.fetchone()
         if data:
             return True
@@ -217,6 +514,7 @@ class DatabaseOperator:
     def get_camera_identity(self, demand_list: list, filter_dict: dict):
         return self.select_from_table(table_name=TB_CAMERAS_IDENTITY, demand_list=demand_list, filter_dict=filter_dict, is_fetchall=False)
 
+    @leased
     def set_camera_identity(self, demand_dict: dict, filter_dict: dict):
         res = self.verify_camera_existence(table_name=TB_CAMERAS_IDENTITY, serial_number=filter_dict['SerialNumber'])
         # 改
@@ -232,6 +530,7 @@ class DatabaseOperator:
         # if res:
         self.delete_from_table(table_name=TB_CAMERAS_IDENTITY, filter_dict=filter_dict)
 
+    @leased
     def set_process_parameters(self, demand_dict: dict, filter_dict: dict):
         res = self.verify_camera_existence(table_name=TB_PROCESS_PARAMETERS, serial_number=filter_dict['SerialNumber'])
         # update
@@ -259,12 +558,31 @@ class DatabaseOperator:
             "StripeEnable", "ErodeEnable", "DilateEnable",
             "MinArea", "MaxArea", "MaxRoundness", "MaxDistance",
             "SauvolaThreshWindowSize", "SauvolaThreshK", "ThreadMethod",
+            "QualityEnable", "MinFocus", "MinBrightness", "MaxBrightness", "MaxHighlight", "MaxDifference",
         ]
         return self.get_process_parameters(demand_list=demand_list, filter_dict=filter_dict)
 
     def get_parts_pins_map(self, demand_list: list, filter_dict: dict) -> dict:
         return self.select_from_table(table_name=TB_PARTS_PINSMAP, demand_list=demand_list, filter_dict=filter_dict, is_fetchall=False)
 
+    def get_decoded_pins_map(self, part: str, line: str):
+        """
+        读取并解码基准 pins_map，旧格式（pickle）的记录同时改写为紧凑编码
+        :param part:
+        :param line:
+        :return:    (行, 列, 3) 颜色数组，无记录时为 None
+        """
+        pins_map = self.get_parts_pins_map(demand_list=["ID", "PinsMap"], filter_dict={"Part": part, "Line": line})
+        if not pins_map:
+            return None
+        text = pins_map["PinsMap"]
+        ref_pins_map = PinsMapCodec.decode_pins_map(text)
+        if PinsMapCodec.is_legacy(text):
+            self.update_table(table_name=TB_PARTS_PINSMAP, demand_dict={"PinsMap": PinsMapCodec.encode_pins_map(ref_pins_map)},
+                              filter_dict={"ID": pins_map["ID"]})
+        return ref_pins_map
+
+    @leased
     def set_parts_pins_map(self, demand_dict: dict, filter_dict: dict):
         res = self.verify_part_existence(table_name=TB_PARTS_PINSMAP, part=filter_dict['Part'], line=filter_dict['Line'])
         # update
@@ -280,6 +598,7 @@ class DatabaseOperator:
         # if res:
         self.delete_from_table(table_name=TB_PARTS_PINSMAP, filter_dict=filter_dict)
 
+    @leased
     def get_lines(self) -> dict:
         sql = 'select Line, count(*) from %s group by Line order by Line' % (TB_PARTS_PINSMAP,)
         self.cursor.execute(sql)
@@ -289,13 +608,14 @@ class DatabaseOperator:
             lines[d[0]] = d[1]
         return lines
 
+    @leased
     def get_parts(self, line: str) -> list:
         if line == "ALL" or line == "" or line == " ":
             sql = 'select distinct Part from %s order by Part' % (TB_PARTS_PINSMAP,)
             self.cursor.execute(sql)
         else:
             sql = 'select distinct Part from %s where Line=? order by Part' % (TB_PARTS_PINSMAP,)
-            self.cursor.execute(sql, line)
+            self.cursor.execute(sql, (line,))
         data = self.cursor.fetchall()
         parts = list()
         for d in data:
@@ -303,7 +623,99 @@ class DatabaseOperator:
         return parts
 
     def set_detection_records(self, demand_dict: dict):
-        self.insert_to_table(table_name=TB_DETECTION_RECORDS, demand_dict=demand_dict)
+        self.set_many_detection_records(demand_dicts=[demand_dict])
+
+    @leased
+    def set_many_detection_records(self, demand_dicts: list):
+        """
+        批量插入检测记录，同一事务内累加统计
+        :param demand_dicts:
+        :return:
+        """
+        self._insert_many(table_name=TB_DETECTION_RECORDS, demand_dicts=demand_dicts)
+        self._accumulate_statistics(records=demand_dicts)
+        self.conn.commit()
+
+    @leased
+    def rebuild_statistics(self, batch_rows: int = 1000) -> int:
+        """
+        由全部检测记录重新计算统计，用于统计表建立之前的记录
+        :param batch_rows:
+        :return:    统计的记录数
+        """
+        self.cursor.execute('delete from %s' % (TB_DETECTION_STATISTICS,))
+        self.cursor.execute('delete from %s' % (TB_ERROR_STATISTICS,))
+
+        rows = 0
+        boundary_id = None
+        while True:
+            records = self.select_by_keyset(table_name=TB_DETECTION_RECORDS, demand_list=["When", "Line", "Part", "Location", "Result", "Error"],
+                                            rows=batch_rows, boundary_id=boundary_id, is_desc=False)
+            if not records:
+                break
+            self._accumulate_statistics(records=records)
+            boundary_id = records[-1]["ID"]
+            rows += len(records)
+
+        self.conn.commit()
+        return rows
+
+    @leased
+    def ensure_statistics(self) -> Optional[int]:
+        """
+        统计表为空而已有检测记录时（统计表刚建立的旧数据库），由全部检测记录计算一次
+        :return:    统计的记录数，不需要计算时为 None
+        """
+        self.cursor.execute('select count(*) from %s' % (TB_DETECTION_STATISTICS,))
+        if self.cursor.fetchall()[0][0]:
+            return None
+        self.cursor.execute('select count(ID) from %s' % (TB_DETECTION_RECORDS,))
+        if not self.cursor.fetchall()[0][0]:
+            return None
+        return self.rebuild_statistics()
+
+    def _select_statistics(self, table_name: str, group_list: list, filter_dict: Optional[dict],
+                           start: Optional[datetime], end: Optional[datetime]) -> list:
+        where, params = self.assign_where(filter_dict=filter_dict)
+        conditions = [where] if where else list()
+        if start is not None:
+            conditions.append('[Day]>=?')
+            params.append(start)
+        if end is not None:
+            conditions.append('[Day]<?')
+            params.append(end)
+
+        group = ", ".join(quote_identifier(k) for k in group_list)
+        sql = 'select %s, sum([Total]) from %s' % (group, table_name)
+        if conditions:
+            sql += ' where %s' % (' and '.join(conditions),)
+        sql += ' group by %s' % (group,)
+
+        self.cursor.execute(sql, params)
+        data = self.cursor.fetchall()
+        return [dict(zip(group_list + ["Total"], row)) for row in data]
+
+    @leased
+    def get_detection_statistics(self, filter_dict: Optional[dict] = None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        """
+        按 日期/结果 汇总的次数
+        :param filter_dict:     Line/Part/Location
+        :param start:           起始日期（含）
+        :param end:             结束日期（不含）
+        :return:    [{"Day", "Result", "Total"}, ...]
+        """
+        return self._select_statistics(table_name=TB_DETECTION_STATISTICS, group_list=["Day", "Result"], filter_dict=filter_dict, start=start, end=end)
+
+    @leased
+    def get_error_statistics(self, filter_dict: Optional[dict] = None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        """
+        按 错误类型/列/行 汇总的次数
+        :param filter_dict:     Line/Part/Location
+        :param start:
+        :param end:
+        :return:    [{"Kind", "X", "Y", "Total"}, ...]
+        """
+        return self._select_statistics(table_name=TB_ERROR_STATISTICS, group_list=["Kind", "X", "Y"], filter_dict=filter_dict, start=start, end=end)
 
     def get_detection_records(self, demand_list: list, filter_dict: dict) -> dict:
         return self.select_from_table(table_name=TB_DETECTION_RECORDS, demand_list=demand_list, filter_dict=filter_dict, is_fetchall=False)
@@ -324,6 +736,48 @@ class DatabaseOperator:
     def get_detection_records_pages(self, page_rows: int, filter_dict: Optional[dict] = None):
         return self.get_table_pages(table_name=TB_DETECTION_RECORDS, page_rows=page_rows, filter_dict=filter_dict)
 
+    @leased
+    def get_detection_records_in_period(self, demand_list: list, filter_dict: Optional[dict] = None,
+                                        start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        """
+        按时间段查询检测记录，ID升序
+        :param demand_list:
+        :param filter_dict:
+        :param start:   起始时间（含）
+        :param end:     结束时间（不含）
+        :return:
+        """
+        where, params = self.assign_where(filter_dict=filter_dict)
+        conditions = [where] if where else list()
+        if start is not None:
+            conditions.append('[When]>=?')
+            params.append(start)
+        if end is not None:
+            conditions.append('[When]<?')
+            params.append(end)
+
+        demand = ", ".join(quote_identifier(k) for k in demand_list)
+        sql = 'select %s from %s' % (demand, TB_DETECTION_RECORDS)
+        if conditions:
+            sql += ' where %s' % (' and '.join(conditions),)
+        sql += ' order by ID'
+
+        self.cursor.execute(sql, params)
+        data = self.cursor.fetchall()
+        return [dict(zip(demand_list, row)) for row in data]
+
+    @leased
+    def get_detection_records_max_id_before(self, when: datetime) -> Optional[int]:
+        """
+        时间早于 when 的记录中最大的 ID
+        :param when:
+        :return:    无记录时为 None
+        """
+        sql = 'select max(ID) from %s where [When]<?' % (TB_DETECTION_RECORDS,)
+        self.cursor.execute(sql, (when,))
+        data = self.cursor.fetchall()
+        return data[0][0]
+
     def get_latest_detection_records(self, demand_list: list, filter_dict: Optional[dict] = None):
         # 降序
         return self.select_from_table(table_name=TB_DETECTION_RECORDS, demand_list=demand_list, filter_dict=filter_dict, is_fetchall=False, order_by="ID", is_desc=True)
@@ -331,6 +785,7 @@ class DatabaseOperator:
     def get_socket_config(self, ip: str):
         return self.select_from_table(table_name=TB_SOCKET_CONFIG, demand_list=["Port", "Auto"], filter_dict={"IP": ip}, is_fetchall=False)
 
+    @leased
     def set_socket_config(self, ip: str, port: Optional[int], auto: Optional[bool]):
         table_name = TB_SOCKET_CONFIG
 
@@ -342,7 +797,7 @@ class DatabaseOperator:
 
         # 查询ip存在
         sql = 'select IP from %s where IP=?' % (table_name,)
-        self.cursor.execute(sql, ip)
+        self.cursor.execute(sql, (ip,))
         data = self.cursor.fetchone()
         # 改
         if data:
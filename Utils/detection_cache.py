@@ -0,0 +1,166 @@
+import threading
+from os import path as os_path, makedirs, getpid
+from uuid import uuid4
+from typing import Optional
+
+from User.config_static import CF_DETECTION_CACHE_VERSION_DIR, TB_CAMERAS_IDENTITY, TB_PROCESS_PARAMETERS, TB_PARTS_PINSMAP
+
+# 缓存内容来自的表
+CACHED_TABLES = (TB_CAMERAS_IDENTITY, TB_PROCESS_PARAMETERS, TB_PARTS_PINSMAP)
+
+
+class DetectionCache:
+    """
+    检测所需数据的读穿缓存，同一零件/生产线重复检测时不再访问数据库
+    - 相机位置、检测参数：按 SerialNumber
+    - 基准 pins_map（已反序列化）及其掩码：按 (Part, Line)
+    写入上述表时（DatabaseOperator.update_table/insert_to_table/delete_from_table）更新该表的版本文件，
+    各进程读取缓存前比较版本文件的内容（每次写入新的 uuid），变化则清空该表对应的缓存
+    不比较修改时间：FAT/SMB 上修改时间的精度为秒级，同一秒内的两次写入无法区分
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, version_dir: str = CF_DETECTION_CACHE_VERSION_DIR):
+        self.version_dir = version_dir
+        self._lock = threading.Lock()
+        self._entries = {table_name: dict() for table_name in CACHED_TABLES}
+        self._versions = {table_name: self.read_version(table_name) for table_name in CACHED_TABLES}
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls) -> "DetectionCache":
+        """
+        进程内共享的缓存
+        :return:
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def get_version_file(table_name: str, version_dir: str = CF_DETECTION_CACHE_VERSION_DIR) -> str:
+        return os_path.join(version_dir, "%s.version" % (table_name,))
+
+    def read_version(self, table_name: str) -> Optional[str]:
+        """
+        版本文件的内容，写入过程中读到的不完整内容同样视为版本变化
+        :param table_name:
+        :return:    无版本文件时为 None
+        """
+        try:
+            with open(self.get_version_file(table_name, self.version_dir), "r", encoding="utf-8") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def notify_table_changed(table_name: str, version_dir: str = CF_DETECTION_CACHE_VERSION_DIR):
+        """
+        表内容变化，更新版本文件，并清空本进程的缓存
+        :param table_name:
+        :param version_dir:
+        :return:
+        """
+        if table_name not in CACHED_TABLES:
+            return
+        try:
+            if not os_path.exists(version_dir):
+                makedirs(version_dir)
+            with open(DetectionCache.get_version_file(table_name, version_dir), "w", encoding="utf-8") as file:
+                file.write("%s %d" % (uuid4().hex, getpid()))
+        except OSError:
+            pass
+
+        instance = DetectionCache._instance
+        if instance is not None:
+            instance.clear(table_name)
+
+    def clear(self, table_name: Optional[str] = None):
+        with self._lock:
+            for name in CACHED_TABLES if table_name is None else (table_name,):
+                self._entries[name].clear()
+                self._versions[name] = self.read_version(name)
+
+    def _get(self, table_name: str, key, load):
+        """
+        读穿：版本未变且有缓存时直接返回，否则调用 load() 读取并缓存
+        :param table_name:
+        :param key:
+        :param load:    返回 None 时不缓存
+        :return:
+        """
+        version = self.read_version(table_name)
+        with self._lock:
+            if version != self._versions[table_name]:
+                self._entries[table_name].clear()
+                self._versions[table_name] = version
+            entries = self._entries[table_name]
+            if key in entries:
+                self.hits += 1
+                return entries[key]
+            self.misses += 1
+
+        value = load()
+        if value is not None:
+            with self._lock:
+                # 读取期间版本未变才缓存
+                if self._versions[table_name] == version:
+                    self._entries[table_name][key] = value
+        return value
+
+    def get_camera_location(self, db_operator, serial_number: str) -> dict:
+        """
+        相机位置 Line/Location/Side
+        :param db_operator:
+        :param serial_number:
+        :return:    无记录时为空字典
+        """
+        def load():
+            camera_location = db_operator.get_camera_identity(demand_list=["Line", "Location", "Side"], filter_dict={"SerialNumber": serial_number})
+            return camera_location or None
+
+        camera_location = self._get(TB_CAMERAS_IDENTITY, serial_number, load)
+        return dict(camera_location) if camera_location else dict()
+
+    def get_process_parameters(self, db_operator, serial_number: str) -> dict:
+        """
+        检测参数
+        :param db_operator:
+        :param serial_number:
+        :return:    无记录时为空字典
+        """
+        def load():
+            process_parameters = db_operator.get_all_process_parameters(filter_dict={"SerialNumber": serial_number})
+            return process_parameters or None
+
+        process_parameters = self._get(TB_PROCESS_PARAMETERS, serial_number, load)
+        return dict(process_parameters) if process_parameters else dict()
+
+    def get_pins_map(self, db_operator, part: str, line: str) -> dict:
+        """
+        已反序列化的基准 pins_map 及其掩码，数组只读
+        :param db_operator:
+        :param part:
+        :param line:
+        :return:    {"PinsMap", "RefMasks"}，无记录时为空字典
+        """
+        def load():
+            ref_pins_map = db_operator.get_decoded_pins_map(part=part, line=line)
+            if ref_pins_map is None:
+                return None
+            from Utils.frame_operator import FrameOperator
+            ref_pins_map.flags.writeable = False
+            return {"PinsMap": ref_pins_map, "RefMasks": FrameOperator.prepare_ref_pins_map(ref_pins_map)}
+
+        pins_map = self._get(TB_PARTS_PINSMAP, (part, line), load)
+        return dict(pins_map) if pins_map else dict()
+
+    def get_statistics(self) -> dict:
+        with self._lock:
+            return {"Hits": self.hits, "Misses": self.misses,
+                    "Entries": {table_name: len(entries) for table_name, entries in self._entries.items()}}
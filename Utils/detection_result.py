@@ -0,0 +1,63 @@
+import threading
+from typing import Optional
+import numpy as np
+
+
+class DetectionResult:
+    """
+    一次检测的内存结果，检测完成即可使用，记录在后台写入
+    - RecordKey 为预先确定的检测图片路径，每次检测唯一，即回复中的 picture，可按它对应到检测记录
+    - wait_persisted() 等待记录写入完成
+    """
+
+    def __init__(self, result: bool, err_pins_location: Optional[np.ndarray] = None, err_null_location: Optional[np.ndarray] = None):
+        self.result = result
+        self.err_pins_location = err_pins_location
+        self.err_null_location = err_null_location
+
+        self.record_message = None
+        self.persist_error = None
+        self._persisted = threading.Event()
+
+    def set_record(self, record_message: dict):
+        """
+        关联待写入的记录
+        :param record_message:  含 DetectionPicture/OriginPicture
+        :return:
+        """
+        self.record_message = record_message
+
+    @property
+    def record_key(self) -> Optional[str]:
+        return self.detection_picture
+
+    @property
+    def detection_picture(self) -> Optional[str]:
+        if self.record_message is None:
+            return None
+        return self.record_message.get("DetectionPicture")
+
+    @property
+    def origin_picture(self) -> Optional[str]:
+        if self.record_message is None:
+            return None
+        return self.record_message.get("OriginPicture")
+
+    def mark_persisted(self, error: Optional[Exception] = None):
+        """
+        记录写入完成（RecordWriter 回调）
+        :param error:   写入失败时的异常
+        :return:
+        """
+        self.persist_error = error
+        self._persisted.set()
+
+    def wait_persisted(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待记录写入
+        :param timeout:
+        :return:    在超时前写入成功
+        """
+        if self.record_message is None:
+            return False
+        return self._persisted.wait(timeout) and self.persist_error is None
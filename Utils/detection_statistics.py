@@ -0,0 +1,99 @@
+from json import loads
+from datetime import datetime
+
+from Utils.pins_map_codec import PinsMapCodec
+
+# 错误类型
+KIND_PIN = "PIN"        # 应有顶棒处无顶棒
+KIND_NULL = "NULL"      # 应为孔处有顶棒
+
+
+class DetectionStatistics:
+    """
+    检测统计，写入检测记录时在同一事务内累加（DatabaseOperator.set_many_detection_records）
+    - DetectionStatistics：按 生产线/零件/位置/日期/结果 计数
+    - ErrorStatistics：按 生产线/零件/位置/日期/错误类型/列(X)/行(Y) 计数，由记录的 Error 解码
+    """
+
+    @staticmethod
+    def get_day(when: datetime) -> datetime:
+        return datetime(when.year, when.month, when.day)
+
+    @staticmethod
+    def decode_error(error: str) -> list:
+        """
+        解码 DetectionRecords.Error
+        :param error:   FrameOperator.serialize_error_location 的结果
+        :return:    [(类型, 列, 行), ...]
+        """
+        if not error:
+            return list()
+        err = loads(error)
+        locations = list()
+        for kind, key in ((KIND_PIN, "ErrorPinsLocation"), (KIND_NULL, "ErrorNullLocation")):
+            if err.get(key):
+                locations.extend((kind, int(x), int(y)) for x, y in PinsMapCodec.decode_locations(err[key]).reshape(-1, 2))
+        return locations
+
+    @staticmethod
+    def aggregate(records: list) -> tuple:
+        """
+        累计一批记录
+        :param records:     含 Line/Part/Location/When/Result/Error
+        :return:    ({(Line, Part, Location, Day, Result): 次数}, {(Line, Part, Location, Day, Kind, X, Y): 次数})
+        """
+        result_counts = dict()
+        error_counts = dict()
+        for record in records:
+            when = record.get("When")
+            if when is None:
+                continue
+            key = (record["Line"], record["Part"], record["Location"], DetectionStatistics.get_day(when))
+            result_key = key + (bool(record["Result"]),)
+            result_counts[result_key] = result_counts.get(result_key, 0) + 1
+
+            try:
+                locations = DetectionStatistics.decode_error(record.get("Error"))
+            except Exception:
+                # 无法解码的错误位置不计入
+                continue
+            for location in locations:
+                error_key = key + location
+                error_counts[error_key] = error_counts.get(error_key, 0) + 1
+        return result_counts, error_counts
+
+    @staticmethod
+    def get_daily_summary(db_operator, filter_dict: dict, start: datetime, end: datetime) -> list:
+        """
+        每日 总数/正确/错误/合格率
+        :param db_operator:
+        :param filter_dict:     Line/Part/Location
+        :param start:
+        :param end:
+        :return:    日期升序
+        """
+        days = dict()
+        for row in db_operator.get_detection_statistics(filter_dict=filter_dict, start=start, end=end):
+            day = days.setdefault(row["Day"], {"Day": row["Day"], "Total": 0, "Right": 0, "Wrong": 0})
+            day["Total"] += row["Total"]
+            day["Right" if row["Result"] else "Wrong"] += row["Total"]
+
+        summary = [days[day] for day in sorted(days.keys())]
+        for day in summary:
+            day["PassRate"] = day["Right"] / day["Total"] if day["Total"] else 0.0
+        return summary
+
+    @staticmethod
+    def get_error_frequency(db_operator, filter_dict: dict, start: datetime, end: datetime, top: int = 0) -> list:
+        """
+        各位置的错误次数
+        :param db_operator:
+        :param filter_dict:
+        :param start:
+        :param end:
+        :param top:     只取次数最多的前 top 个，0 为全部
+        :return:    次数降序
+        """
+        frequency = db_operator.get_error_statistics(filter_dict=filter_dict, start=start, end=end)
+        frequency.sort(key=lambda row: row["Total"], reverse=True)
+        return frequency[:top] if top > 0 else frequency
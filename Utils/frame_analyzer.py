@@ -0,0 +1,213 @@
+from typing import Optional
+import numpy as np
+import cv2
+
+
+class FrameAnalyzer:
+    """
+    示教/可视化使用的灰度直方图分析工具
+    scipy、matplotlib 等较重的依赖仅在调用时导入，检测进程不会为其付出导入时间
+    """
+
+    @staticmethod
+    def calculate_hist(frame: np.ndarray, bins: int = 64):
+        """
+        计算直方图
+        :param frame:
+        :param bins:
+        :return:
+        """
+        # 计算直方图  shape (bins, 1)
+        hist = cv2.calcHist([frame], [0], None, [bins], [0, 256])
+        # reshape    shape (bins,)
+        hist = hist.reshape(-1)
+        # 转换为百分比
+        hist = hist / np.sum(hist)
+        # x轴坐标
+        x = np.linspace(0, 256, bins, endpoint=True, dtype=np.int32)
+        return x, hist
+
+    @staticmethod
+    def smooth_hist(x: np.ndarray, hist: np.ndarray, method: str = "convolve", **kwargs):
+        """
+        平滑直方图曲线
+        :param x:
+        :param hist:
+        :param method:
+        :return:
+        """
+        # Savitzky-Golay 滤波器
+        if method.lower() == "savgol":
+            from scipy.signal import savgol_filter
+            window_length = kwargs.get("window_length", 9)  # window_length即窗口长度 取值为奇数且不能超过len(x) 它越大，则平滑效果越明显 越小，则更贴近原始曲线
+            polyorder = kwargs.get("polyorder", 3)  # polyorder为多项式拟合的阶数 它越小，则平滑效果越明显 越大，则更贴近原始曲线
+            hist_savgol = savgol_filter(hist, window_length, polyorder, mode='nearest')
+            return x, hist_savgol
+        # 滑动平均滤波
+        elif method.lower() == "convolve":
+            window_size = kwargs.get("window_size", 4)
+            window = np.ones(int(window_size)) / float(window_size)
+            hist_convolve = np.convolve(hist, window, 'same')
+            return x, hist_convolve
+        # 插值
+        elif method.lower() == "interp":
+            from scipy.interpolate import make_interp_spline
+            number = kwargs.get("number", 4)
+            x_interp = np.linspace(0, 256, number)
+            hist_interp = make_interp_spline(x, hist)(x_interp)
+            return x_interp, hist_interp
+        else:
+            return x, hist
+
+    @staticmethod
+    def find_valleys_and_peaks(x: np.ndarray, hist: np.ndarray, method: str = "argrelextrema", whitelist: list = ('peak', 'valley'), **kwargs):
+        """
+        寻找波谷
+        :param x:
+        :param hist:
+        :param method:
+        :param whitelist:
+        :param kwargs:
+        :return:
+        """
+        # TODO 需要更多匹配条件,自动寻找图片直方图的波峰和波谷，以适应更多条件
+        # findpeaks 方法比 argrelextrema 方法多首尾两个点
+        if method.lower() == "findpeaks" and "findpeaks" in kwargs:
+            '''
+            fp = findpeaks(
+                method='peakdetect',    # 检测方式：一维数组【】二维数据【】
+                whitelist=['peak', 'valley'],   # 检测目标【峰peak,谷valley,峰谷['peak','valley']】
+                lookahead=1,            # 前瞻性优化算法【数据量越少，此数字越小，比如50个数据，最好选择1或者2】
+                )
+            '''
+            fp = kwargs["findpeaks"]
+            fit = fp.fit(hist)
+            df = fit['df']      # pandas.DataFrame
+
+            if 'valley' in whitelist:
+                # 波谷
+                valleys = df[df['valley']]
+                # 波谷索引
+                valleys_index = np.asarray(valleys["x"])
+                # x
+                valleys_x = x[valleys_index]
+                # hist
+                valleys_hist = hist[valleys_index]
+            else:
+                valleys_x = np.empty(0)
+                valleys_hist = np.empty(0)
+
+            if 'peak' in whitelist:
+                # 波峰
+                peaks = df[df['peak']]
+                # 波谷索引
+                peaks_index = np.asarray(peaks["x"])
+                # x
+                peaks_x = x[peaks_index]
+                # hist
+                peaks_hist = hist[peaks_index]
+            else:
+                peaks_x = np.empty(0)
+                peaks_hist = np.empty(0)
+
+            return valleys_x, valleys_hist, peaks_x, peaks_hist
+        elif method.lower() == "argrelextrema":
+            from scipy.signal import argrelextrema
+            if 'valley' in whitelist:
+                # 波谷索引
+                valleys_index = argrelextrema(hist, np.less)
+                # x
+                valleys_x = x[valleys_index]
+                # hist
+                valleys_hist = hist[valleys_index]
+            else:
+                valleys_x = np.empty(0)
+                valleys_hist = np.empty(0)
+
+            if 'peak' in whitelist:
+                # 波峰索引
+                peaks_index = argrelextrema(hist, np.greater)
+                # x
+                peaks_x = x[peaks_index]
+                # hist
+                peaks_hist = hist[peaks_index]
+            else:
+                peaks_x = np.empty(0)
+                peaks_hist = np.empty(0)
+
+            return valleys_x, valleys_hist, peaks_x, peaks_hist
+        else:
+            null = np.empty(0)
+            return null, null, null, null
+
+    @staticmethod
+    def calculate_reference_thresh(valleys_x: np.ndarray, valleys_hist: np.ndarray, peaks_x: np.ndarray, peaks_hist: np.ndarray, **kwargs):
+        """
+        计算二值化阈值参考点
+        :param valleys_x:
+        :param valleys_hist:
+        :param peaks_x:
+        :param peaks_hist:
+        :param kwargs:
+        :return:
+        """
+        # 最简单的规律，选择第一个波谷
+        if valleys_x.shape[0] > 0:
+            thresh = valleys_x[0]
+            return int(thresh)
+        else:
+            return None
+
+    @staticmethod
+    def calculate_auto_thresh(gray: np.ndarray) -> Optional[int]:
+        """
+        根据灰度图直方图的第一个波谷自动计算二值化阈值
+        :param gray:
+        :return:    失败返回 None
+        """
+        # 计算直方图
+        x, hist = FrameAnalyzer.calculate_hist(gray)
+        # 平滑曲线
+        smooth_x, smooth_hist = FrameAnalyzer.smooth_hist(x=x, hist=hist)
+        # 找波谷
+        valleys_x, _, _, _ = FrameAnalyzer.find_valleys_and_peaks(x=smooth_x, hist=smooth_hist, whitelist=['valley'])
+        # 找参考值
+        return FrameAnalyzer.calculate_reference_thresh(valleys_x, _, _, _)
+
+    @staticmethod
+    def draw_hist(canvas, x: np.ndarray, hist: np.ndarray, **kwargs):
+        """
+        在 matplotlib 画布上绘制直方图
+        :param canvas:  FigureCanvasQTAgg
+        :param x:
+        :param hist:
+        :param kwargs:
+        :return:
+        """
+        from matplotlib import pyplot as plt
+
+        # 清除画布
+        plt.clf()
+
+        # 画图
+        plt.plot(x, hist, "g-")
+        if "smooth_x" in kwargs and "smooth_hist" in kwargs:
+            plt.plot(kwargs["smooth_x"], kwargs["smooth_hist"], "b--")
+
+            plt.legend(['原始', '拟合'])
+
+        if "valleys_x" in kwargs and "valleys_hist" in kwargs:
+            plt.scatter(kwargs["valleys_x"], kwargs["valleys_hist"], c='r', alpha=0.8)
+
+        # x轴范围
+        plt.xlim(-10, 266)
+        # x轴刻度
+        ticks = np.arange(0, 270, 20)
+        plt.xticks(ticks)
+        # 标题
+        plt.title('灰度直方图')
+        # 网格线
+        plt.grid(True)
+
+        # 刷新
+        canvas.draw()
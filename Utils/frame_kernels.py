@@ -0,0 +1,148 @@
+from threading import Lock, Thread
+from time import perf_counter
+from os import environ as os_environ, makedirs as os_makedirs, path as os_path
+import numpy as np
+
+from Utils.messenger import Messenger
+from User.config_static import CF_NUMBA_CACHE_DIR
+
+
+def stripe_denoise_kernel(copy: np.ndarray,
+                          eliminated_span: int, reserved_interval: int,
+                          eliminated_pixel: int, replaced_pixel: int):
+    """
+    条纹去噪内核，按行扫描，直接修改传入的二维图片
+    :param copy:                 二维 uint8 图片
+    :param eliminated_span:      要消除像素的跨度
+    :param reserved_interval:    两段要消除像素之间的最大间隔像素数量
+    :param eliminated_pixel:     要消除像素值,黑色为0,白色为255
+    :param replaced_pixel:       想替换像素值,黑色为0,白色为255
+    :return:
+    """
+    eliminated_count = 0
+    reserved_count = 0
+    total_reserved_count = 0
+
+    # 获取图片尺寸
+    height, width = copy.shape
+
+    # 遍历图片
+    for h in range(height):
+        for w in range(width):
+            if copy[h, w] <= eliminated_pixel:
+                eliminated_count += 1
+                if reserved_count != 0:
+                    total_reserved_count += reserved_count
+                    reserved_count = 0
+            else:
+                if eliminated_count != 0:
+                    reserved_count += 1
+                    if reserved_count >= reserved_interval:
+                        if eliminated_count >= eliminated_span:
+                            total_reserved_count += reserved_count
+                            for p in range(w - eliminated_count - total_reserved_count + 1,
+                                           w - reserved_count + 1):
+                                copy[h, p] = replaced_pixel
+                        eliminated_count = 0
+                        reserved_count = 0
+                        total_reserved_count = 0
+        # 每行最后
+        if eliminated_count >= eliminated_span:
+            total_reserved_count += reserved_count
+            for p in range(width - eliminated_count - total_reserved_count,
+                           width - reserved_count):
+                copy[h, p] = replaced_pixel
+        eliminated_count = 0
+        reserved_count = 0
+        total_reserved_count = 0
+    return copy
+
+
+class FrameKernels:
+    """
+    numba 编译的检测内核
+    numba 导入和编译都推迟到第一次使用，不做检测的进程（示教、主界面）不承担这部分开销
+    内核使用显式签名并缓存到磁盘，新进程直接加载已编译的机器码；进程启动时调用 warm_up 完成加载
+    """
+
+    # 内核显式签名
+    STRIPE_DENOISE_SIGNATURE = "uint8[:, :](uint8[:, :], int64, int64, int64, int64)"
+
+    _lock = Lock()
+    _compiled = dict()
+    # 预热耗时 秒，未预热时为 None
+    warm_up_time = None
+
+    @staticmethod
+    def _jit(function, signature: str):
+        """
+        编译内核，优先使用磁盘缓存
+        :param function:
+        :param signature:
+        :return:
+        """
+        # numba 缓存目录需在导入 numba 前设置
+        if "NUMBA_CACHE_DIR" not in os_environ:
+            os_makedirs(CF_NUMBA_CACHE_DIR, exist_ok=True)
+            os_environ["NUMBA_CACHE_DIR"] = os_path.abspath(CF_NUMBA_CACHE_DIR)
+
+        from numba import jit
+        try:
+            return jit(signature, nopython=True, cache=True)(function)
+        except RuntimeError:
+            # 打包后源文件不存在时无法定位缓存，退化为不缓存
+            return jit(signature, nopython=True)(function)
+
+    @staticmethod
+    def get_stripe_denoise():
+        """
+        获取编译后的条纹去噪内核
+        :return:
+        """
+        kernel = FrameKernels._compiled.get("stripe_denoise")
+        if kernel is None:
+            with FrameKernels._lock:
+                kernel = FrameKernels._compiled.get("stripe_denoise")
+                if kernel is None:
+                    kernel = FrameKernels._jit(stripe_denoise_kernel, FrameKernels.STRIPE_DENOISE_SIGNATURE)
+                    FrameKernels._compiled["stripe_denoise"] = kernel
+        return kernel
+
+    @staticmethod
+    def warm_up(height: int = 64, width: int = 64) -> float:
+        """
+        预热：编译/加载全部内核，并在假图片上各执行一次
+        :param height:
+        :param width:
+        :return:    耗时 秒
+        """
+        start = perf_counter()
+
+        dummy = np.zeros((height, width), np.uint8)
+        dummy[:, width // 4: width // 2] = 255
+        FrameKernels.get_stripe_denoise()(dummy, 5, 3, 0, 255)
+
+        FrameKernels.warm_up_time = perf_counter() - start
+        return FrameKernels.warm_up_time
+
+    @staticmethod
+    def warm_up_in_thread(warm_up_callback=None) -> Thread:
+        """
+        在后台线程中预热，不阻塞进程启动；检测先于预热完成时会在内核锁上等待
+        :param warm_up_callback:     预热完成回调 warm_up_callback(warm_up_time=)
+        :return:
+        """
+        def target():
+            warm_up_time = FrameKernels.warm_up()
+            if warm_up_callback is not None:
+                warm_up_callback(warm_up_time=warm_up_time)
+
+        t = Thread(target=target, daemon=True)
+        t.start()
+        return t
+
+    @staticmethod
+    def print_warm_up_time(warm_up_time: float):
+        m = {"level": 'INFO', "title": '提示', "text": '检测内核预热完成',
+             "informative_text": '耗时[%.3f]秒' % warm_up_time, "detailed_text": ''}
+        Messenger.print(message=m)
@@ -2,25 +2,32 @@ from typing import Optional, Union
 import numpy as np
 import cv2
 import math
-from skimage.filters import threshold_sauvola
-from numba import jit
 from json import dumps
-from matplotlib import pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from scipy.signal import savgol_filter, argrelextrema
-from scipy.interpolate import make_interp_spline
-from findpeaks import findpeaks
-from pandas import DataFrame
 
 from User.config_static import (CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL, CF_TEACH_REFERENCE_SIDE,
                                 CF_COLOR_KEYSTONE_POINT, CF_COLOR_KEYSTONE_LINE, CF_COLOR_DIVISION_VERTICAL_LINE, CF_COLOR_DIVISION_HORIZONTAL_LINE,
                                 CF_COLOR_CONTOURS_CIRCLE, CF_COLOR_ERROR_PINS, CF_COLOR_ERROR_NULL, CF_COLOR_PINSMAP_FREE, CF_COLOR_PINSMAP_DOWEL)
-from Utils.serializer import MySerializer
+from Utils.pins_map_codec import PinsMapCodec
+from Utils.frame_analyzer import FrameAnalyzer
+from Utils.frame_kernels import FrameKernels
+from Utils.detection_result import DetectionResult
 
 MORPH_RECT = 0
 MORPH_CROSS = 1
 MORPH_ELLIPSE = 2
 
+# 检测流程各阶段依赖的参数，上游阶段参数相同时其结果相同（参数搜索按此缓存各阶段结果）
+STAGE_PERSPECTIVE_KEYS = ("P1X", "P1Y", "P2X", "P2Y", "P3X", "P3Y", "P4X", "P4Y")
+STAGE_BINARIZATION_KEYS = ("ScaleAlpha", "ScaleBeta", "ScaleEnable", "GammaConstant", "GammaPower", "GammaEnable",
+                           "LogConstant", "LogEnable", "Thresh", "AutoThresh",
+                           "SauvolaThreshWindowSize", "SauvolaThreshK", "ThreadMethod")
+STAGE_DENOISE_KEYS = ("EliminatedSpan", "ReservedInterval",
+                      "ErodeShape", "ErodeKsize", "ErodeIterations",
+                      "DilateShape", "DilateKsize", "DilateIterations",
+                      "StripeEnable", "ErodeEnable", "DilateEnable")
+STAGE_CONTOURS_KEYS = ("MinArea", "MaxArea", "MaxRoundness", "MaxDistance",
+                       "XNumber", "XMini", "XMaxi", "YNumber", "YMini", "YMaxi")
+
 
 class FrameOperator:
 
@@ -244,14 +251,7 @@ class FrameOperator:
         elif thread_method == 0:
             # 根据灰度图自动获取thresh
             if auto_thresh:
-                # 计算直方图
-                x, hist = FrameOperator.calculate_hist(gray)
-                # 平滑曲线
-                smooth_x, smooth_hist = FrameOperator.smooth_hist(x=x, hist=hist)
-                # 找波谷
-                valleys_x, _, _, _ = FrameOperator.find_valleys_and_peaks(x=smooth_x, hist=smooth_hist, whitelist=['valley'])
-                # 找参考值
-                ref_thresh = FrameOperator.calculate_reference_thresh(valleys_x, _, _, _)
+                ref_thresh = FrameAnalyzer.calculate_auto_thresh(gray)
 
                 if ref_thresh is not None:
                     thresh = ref_thresh
@@ -334,7 +334,6 @@ class FrameOperator:
         return frame
 
     @staticmethod
-    @jit(nopython=True)
     def stripe_denoise(frame: np.ndarray,
                        eliminated_span: int, reserved_interval: int,
                        eliminated_pixel: int = 0, replaced_pixel: int = 255):
@@ -347,49 +346,14 @@ class FrameOperator:
         :param replaced_pixel:       想替换像素值,黑色为0,白色为255
         :return:
         """
-        eliminated_count: int = 0
-        reserved_count: int = 0
-        total_reserved_count: int = 0
-
         # 转2维图片
         if frame.ndim != 2:
             copy = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         else:
             copy = frame.copy()
 
-        # 获取图片尺寸
-        height, width = copy.shape
-
-        # 遍历图片
-        for h in range(height):
-            for w in range(width):
-                if copy[h, w] <= eliminated_pixel:
-                    eliminated_count += 1
-                    if reserved_count != 0:
-                        total_reserved_count += reserved_count
-                        reserved_count = 0
-                else:
-                    if eliminated_count != 0:
-                        reserved_count += 1
-                        if reserved_count >= reserved_interval:
-                            if eliminated_count >= eliminated_span:
-                                total_reserved_count += reserved_count
-                                for p in range(w - eliminated_count - total_reserved_count + 1,
-                                               w - reserved_count + 1):
-                                    copy[h, p] = replaced_pixel
-                            eliminated_count = 0
-                            reserved_count = 0
-                            total_reserved_count = 0
-            # 每行最后
-            if eliminated_count >= eliminated_span:
-                total_reserved_count += reserved_count
-                for p in range(width - eliminated_count - total_reserved_count,
-                               width - reserved_count):
-                    copy[h, p] = replaced_pixel
-            eliminated_count = 0
-            reserved_count = 0
-            total_reserved_count = 0
-        return copy
+        kernel = FrameKernels.get_stripe_denoise()
+        return kernel(copy, int(eliminated_span), int(reserved_interval), int(eliminated_pixel), int(replaced_pixel))
 
     @staticmethod
     def set_kernel(shape_flag: Union[int, str], ksize: int):
@@ -518,7 +482,8 @@ class FrameOperator:
             CHAIN_APPROX_TC89_L1：用Teh-Chin chain approximation algorithm的一种算法压缩轮廓
             CHAIN_APPROX_TC89_KCOS：用Teh-Chin chain approximation algorithm的另一种算法压缩轮廓；
         '''
-        _, contours, _ = cv2.findContours(image=frame, mode=cv2.RETR_LIST, method=cv2.CHAIN_APPROX_NONE)
+        # opencv 3.x 返回 (image, contours, hierarchy)，4.x 返回 (contours, hierarchy)
+        contours = cv2.findContours(image=frame, mode=cv2.RETR_LIST, method=cv2.CHAIN_APPROX_NONE)[-2]
 
         contours_collection = dict()
 
@@ -639,180 +604,6 @@ class FrameOperator:
 
         return pins_map
 
-    @staticmethod
-    def calculate_hist(frame: np.ndarray, bins: int = 64):
-        """
-        计算直方图
-        :param frame:
-        :param bins:
-        :return:
-        """
-        # 计算直方图  shape (bins, 1)
-        hist = cv2.calcHist([frame], [0], None, [bins], [0, 256])
-        # reshape    shape (bins,)
-        hist = hist.reshape(-1)
-        # 转换为百分比
-        hist = hist / np.sum(hist)
-        # x轴坐标
-        x = np.linspace(0, 256, bins, endpoint=True, dtype=np.int32)
-        return x, hist
-
-    @staticmethod
-    def smooth_hist(x: np.ndarray, hist: np.ndarray, method: str = "convolve", **kwargs):
-        """
-        平滑直方图曲线
-        :param x:
-        :param hist:
-        :param method:
-        :return:
-        """
-        # Savitzky-Golay 滤波器
-        if method.lower() == "savgol":
-            window_length = kwargs.get("window_length", 9)  # window_length即窗口长度 取值为奇数且不能超过len(x) 它越大，则平滑效果越明显 越小，则更贴近原始曲线
-            polyorder = kwargs.get("polyorder", 3)  # polyorder为多项式拟合的阶数 它越小，则平滑效果越明显 越大，则更贴近原始曲线
-            hist_savgol = savgol_filter(hist, window_length, polyorder, mode='nearest')
-            return x, hist_savgol
-        # 滑动平均滤波
-        elif method.lower() == "convolve":
-            window_size = kwargs.get("window_size", 4)
-            window = np.ones(int(window_size)) / float(window_size)
-            hist_convolve = np.convolve(hist, window, 'same')
-            return x, hist_convolve
-        # 插值
-        elif method.lower() == "interp":
-            number = kwargs.get("number", 4)
-            x_interp = np.linspace(0, 256, number)
-            hist_interp = make_interp_spline(x, hist)(x_interp)
-            return x_interp, hist_interp
-        else:
-            return x, hist
-
-    @staticmethod
-    def find_valleys_and_peaks(x: np.ndarray, hist: np.ndarray, method: str = "argrelextrema", whitelist: list = ('peak', 'valley'), **kwargs):
-        """
-        寻找波谷
-        :param x:
-        :param hist:
-        :param method:
-        :param whitelist:
-        :param kwargs:
-        :return:
-        """
-        # TODO 需要更多匹配条件,自动寻找图片直方图的波峰和波谷，以适应更多条件
-        # findpeaks 方法比 argrelextrema 方法多首尾两个点
-        if method.lower() == "findpeaks" and "findpeaks" in kwargs:
-            '''
-            fp = findpeaks(
-                method='peakdetect',    # 检测方式：一维数组【】二维数据【】
-                whitelist=['peak', 'valley'],   # 检测目标【峰peak,谷valley,峰谷['peak','valley']】
-                lookahead=1,            # 前瞻性优化算法【数据量越少，此数字越小，比如50个数据，最好选择1或者2】
-                )
-            '''
-            fp: findpeaks = kwargs["findpeaks"]
-            fit = fp.fit(hist)
-            df: DataFrame = fit['df']
-
-            if 'valley' in whitelist:
-                # 波谷
-                valleys: DataFrame = df[df['valley']]
-                # 波谷索引
-                valleys_index = np.asarray(valleys["x"])
-                # x
-                valleys_x = x[valleys_index]
-                # hist
-                valleys_hist = hist[valleys_index]
-            else:
-                valleys_x = np.empty(0)
-                valleys_hist = np.empty(0)
-
-            if 'peak' in whitelist:
-                # 波峰
-                peaks: DataFrame = df[df['peak']]
-                # 波谷索引
-                peaks_index = np.asarray(peaks["x"])
-                # x
-                peaks_x = x[peaks_index]
-                # hist
-                peaks_hist = hist[peaks_index]
-            else:
-                peaks_x = np.empty(0)
-                peaks_hist = np.empty(0)
-
-            return valleys_x, valleys_hist, peaks_x, peaks_hist
-        elif method.lower() == "argrelextrema":
-            if 'valley' in whitelist:
-                # 波谷索引
-                valleys_index = argrelextrema(hist, np.less)
-                # x
-                valleys_x = x[valleys_index]
-                # hist
-                valleys_hist = hist[valleys_index]
-            else:
-                valleys_x = np.empty(0)
-                valleys_hist = np.empty(0)
-
-            if 'peak' in whitelist:
-                # 波峰索引
-                peaks_index = argrelextrema(hist, np.greater)
-                # x
-                peaks_x = x[peaks_index]
-                # hist
-                peaks_hist = hist[peaks_index]
-            else:
-                peaks_x = np.empty(0)
-                peaks_hist = np.empty(0)
-
-            return valleys_x, valleys_hist, peaks_x, peaks_hist
-        else:
-            null = np.empty(0)
-            return null, null, null, null
-
-    @staticmethod
-    def calculate_reference_thresh(valleys_x: np.ndarray, valleys_hist: np.ndarray, peaks_x: np.ndarray, peaks_hist: np.ndarray, **kwargs):
-        """
-        计算二值化阈值参考点
-        :param valleys_x:
-        :param valleys_hist:
-        :param peaks_x:
-        :param peaks_hist:
-        :param kwargs:
-        :return:
-        """
-        # 最简单的规律，选择第一个波谷
-        if valleys_x.shape[0] > 0:
-            thresh = valleys_x[0]
-            return int(thresh)
-        else:
-            return None
-
-    @staticmethod
-    def draw_hist(canvas: FigureCanvas, x: np.ndarray, hist: np.ndarray, **kwargs):
-        # 清除画布
-        plt.clf()
-
-        # 画图
-        plt.plot(x, hist, "g-")
-        if "smooth_x" in kwargs and "smooth_hist" in kwargs:
-            plt.plot(kwargs["smooth_x"], kwargs["smooth_hist"], "b--")
-
-            plt.legend(['原始', '拟合'])
-
-        if "valleys_x" in kwargs and "valleys_hist" in kwargs:
-            plt.scatter(kwargs["valleys_x"], kwargs["valleys_hist"], c='r', alpha=0.8)
-
-        # x轴范围
-        plt.xlim(-10, 266)
-        # x轴刻度
-        ticks = np.arange(0, 270, 20)
-        plt.xticks(ticks)
-        # 标题
-        plt.title('灰度直方图')
-        # 网格线
-        plt.grid(True)
-
-        # 刷新
-        canvas.draw()
-
     @staticmethod
     def online_process_algorithm(frame: np.ndarray, algorithm_parameters: dict):
         vertexes = [[algorithm_parameters["P1X"], algorithm_parameters["P1Y"]],
@@ -879,102 +670,106 @@ class FrameOperator:
         return draw
 
     @staticmethod
-    def offline_process_algorithm(frame: np.ndarray, message: dict,
-                                  show_detection_callback=None, record_detection_callback=None,
-                                  err_pins_color: tuple = CF_COLOR_ERROR_PINS, err_null_color: tuple = CF_COLOR_ERROR_NULL):
-        """
-
-        :param frame:
-        :param message:
-        :param show_detection_callback:
-        :param record_detection_callback:
-        :param err_pins_color:
-        :param err_null_color:
-        :return:
-        """
-        vertexes = [[message["P1X"], message["P1Y"]],
-                    [message["P2X"], message["P2Y"]],
-                    [message["P3X"], message["P3Y"]],
-                    [message["P4X"], message["P4Y"]]]
-        scale_alpha = message["ScaleAlpha"]
-        scale_beta = message["ScaleBeta"]
-        scale_enable = message["ScaleEnable"]
-        gamma_c = message["GammaConstant"]
-        gamma_power = message["GammaPower"]
-        gamma_enable = message["GammaEnable"]
-        log_c = message["LogConstant"]
-        log_enable = message["LogEnable"]
-        thresh = message["Thresh"]
-        auto_thresh = message["AutoThresh"]
-
-        sauvola_thresh_window_size = message["SauvolaThreshWindowSize"]
-        sauvola_thresh_k = message["SauvolaThreshK"]
-        thread_method = message["ThreadMethod"]
-
-        eliminated_span = message["EliminatedSpan"]
-        reserved_interval = message["ReservedInterval"]
-        erode_shape = message["ErodeShape"]
-        erode_ksize = message["ErodeKsize"]
-        erode_iterations = message["ErodeIterations"]
-        dilate_shape = message["DilateShape"]
-        dilate_ksize = message["DilateKsize"]
-        dilate_iterations = message["DilateIterations"]
-        stripe_enable = message["StripeEnable"]
-        erode_enable = message["ErodeEnable"]
-        dilate_enable = message["DilateEnable"]
-        x_number = message["XNumber"]
-        x_mini = message["XMini"]
-        x_maxi = message["XMaxi"]
-        y_number = message["YNumber"]
-        y_mini = message["YMini"]
-        y_maxi = message["YMaxi"]
-        min_area = message["MinArea"]
-        max_area = message["MaxArea"]
-        max_roundness = message["MaxRoundness"]
-        max_distance = message["MaxDistance"]
-
-        ref_pins_map = message["PinsMap"]
-
-        camera_location = message["CameraLocation"]
-        location = camera_location["Location"]
-        side = camera_location["Side"]
+    def get_vertexes(message: dict) -> list:
+        return [[message["P1X"], message["P1Y"]],
+                [message["P2X"], message["P2Y"]],
+                [message["P3X"], message["P3Y"]],
+                [message["P4X"], message["P4Y"]]]
 
+    @staticmethod
+    def perspective_stage(frame: np.ndarray, message: dict) -> np.ndarray:
         # 梯形变换
-        perspective = FrameOperator.perspective_transform(frame, vertexes)
+        return FrameOperator.perspective_transform(frame, FrameOperator.get_vertexes(message))
+
+    @staticmethod
+    def binarization_stage(perspective: np.ndarray, message: dict) -> np.ndarray:
         # 二值化
         binarization, _ = FrameOperator.binarization_transform(
-            perspective, scale_alpha, scale_beta, gamma_c, gamma_power, log_c,
-            thresh, sauvola_thresh_window_size, sauvola_thresh_k,
-            scale_enable, gamma_enable, log_enable,
-            auto_thresh, thread_method)
+            perspective, message["ScaleAlpha"], message["ScaleBeta"],
+            message["GammaConstant"], message["GammaPower"], message["LogConstant"],
+            message["Thresh"], message["SauvolaThreshWindowSize"], message["SauvolaThreshK"],
+            message["ScaleEnable"], message["GammaEnable"], message["LogEnable"],
+            message["AutoThresh"], message["ThreadMethod"])
+        return binarization
+
+    @staticmethod
+    def denoise_stage(binarization: np.ndarray, message: dict) -> np.ndarray:
         # 去噪
-        denoise = FrameOperator.denoise_transform(binarization, eliminated_span, reserved_interval,
-                                                  erode_shape, erode_ksize, erode_iterations,
-                                                  dilate_shape, dilate_ksize, dilate_iterations,
-                                                  stripe_enable, erode_enable, dilate_enable)
+        return FrameOperator.denoise_transform(binarization, message["EliminatedSpan"], message["ReservedInterval"],
+                                               message["ErodeShape"], message["ErodeKsize"], message["ErodeIterations"],
+                                               message["DilateShape"], message["DilateKsize"], message["DilateIterations"],
+                                               message["StripeEnable"], message["ErodeEnable"], message["DilateEnable"])
+
+    @staticmethod
+    def contours_stage(denoise: np.ndarray, message: dict) -> list:
         # 轮廓集
-        contours_collection = FrameOperator.find_matched_contours(denoise, min_area, max_area, max_roundness, max_distance,
-                                                                  x_number, x_mini, x_maxi, y_number, y_mini, y_maxi)
-        # 获取区域划分
-        x_division, _, _ = FrameOperator.get_sorted_division(x_number, x_mini, x_maxi)
-        y_division, _, _ = FrameOperator.get_sorted_division(y_number, y_mini, y_maxi)
+        return FrameOperator.find_matched_contours(denoise, message["MinArea"], message["MaxArea"], message["MaxRoundness"], message["MaxDistance"],
+                                                   message["XNumber"], message["XMini"], message["XMaxi"],
+                                                   message["YNumber"], message["YMini"], message["YMaxi"])
 
+    @staticmethod
+    def get_detection_stages() -> tuple:
+        """
+        检测流程的各阶段，detect_frame 与参数搜索共用
+        :return:    ((名称, 依赖的参数, stage(上一阶段的结果, message)), ...)，第一阶段的输入为原始图片，最后一阶段的结果为轮廓集
+        """
+        return (("perspective", STAGE_PERSPECTIVE_KEYS, FrameOperator.perspective_stage),
+                ("binarization", STAGE_BINARIZATION_KEYS, FrameOperator.binarization_stage),
+                ("denoise", STAGE_DENOISE_KEYS, FrameOperator.denoise_stage),
+                ("contours", STAGE_CONTOURS_KEYS, FrameOperator.contours_stage))
+
+    @staticmethod
+    def match_stage(contours_collection: list, message: dict) -> tuple:
+        """
+        轮廓集转为 pins_map 并与基准对比
+        :param contours_collection:
+        :param message:     含基准 PinsMap，有缓存的掩码 RefMasks 时直接使用
+        :return:    detection_res, err_pins_location, err_null_location
+        """
         # 计算pins_map
-        pins_map = FrameOperator.convert_contours_collection_to_array(contours_collection, x_number, y_number)
+        pins_map = FrameOperator.convert_contours_collection_to_array(contours_collection, message["XNumber"], message["YNumber"])
 
         # 计算实际 ref_pins_map
         # if side != CF_TEACH_REFERENCE_SIDE:
         #     ref_pins_map = cv2.flip(ref_pins_map, flipCode=0)  # 水平翻转
 
-        # pins_map 与 ref_pins_map 对比
-        err_pins_location, err_null_location = FrameOperator.match_pins_map(pins_map, ref_pins_map)
+        # pins_map 与 ref_pins_map 对比，有缓存的掩码时直接使用
+        ref_masks = message.get("RefMasks")
+        if ref_masks is not None and ref_masks["Pins"].shape == pins_map.shape[:2]:
+            err_pins_location, err_null_location = FrameOperator.match_pins_map_with_masks(pins_map, ref_masks)
+        else:
+            err_pins_location, err_null_location = FrameOperator.match_pins_map(pins_map, message["PinsMap"])
 
         # 检测结果
         # detection_res = not bool(err_pins_location.any() or err_null_location.any())
-        if err_pins_location.shape == (0, 2) and err_null_location.shape == (0, 2):
-            detection_res = True
-        else:
-            detection_res = False
+        detection_res = err_pins_location.shape == (0, 2) and err_null_location.shape == (0, 2)
+        return detection_res, err_pins_location, err_null_location
+
+    @staticmethod
+    def detect_frame(frame: np.ndarray, message: dict,
+                     err_pins_color: tuple = CF_COLOR_ERROR_PINS, err_null_color: tuple = CF_COLOR_ERROR_NULL) -> tuple:
+        """
+        对单帧图片执行完整检测流程，不涉及记录和显示
+        :param frame:
+        :param message:     检测参数 ProcessParameters 及基准 PinsMap
+        :param err_pins_color:
+        :param err_null_color:
+        :return:    detection_res, err_pins_location, err_null_location, draw
+        """
+        # 梯形变换 -> 二值化 -> 去噪 -> 轮廓集
+        results = dict()
+        result = frame
+        for name, _, stage in FrameOperator.get_detection_stages():
+            result = stage(result, message)
+            results[name] = result
+        perspective = results["perspective"]
+        contours_collection = results["contours"]
+
+        detection_res, err_pins_location, err_null_location = FrameOperator.match_stage(contours_collection, message)
+
+        # 获取区域划分
+        x_division, _, _ = FrameOperator.get_sorted_division(message["XNumber"], message["XMini"], message["XMaxi"])
+        y_division, _, _ = FrameOperator.get_sorted_division(message["YNumber"], message["YMini"], message["YMaxi"])
 
         # 画轮廓集
         draw = FrameOperator.draw_matched_contours(perspective, contours_collection)
@@ -983,33 +778,101 @@ class FrameOperator:
             draw = FrameOperator.draw_err_location(draw, x_division, y_division, err_pins_location, color=err_pins_color)
             draw = FrameOperator.draw_err_location(draw, x_division, y_division, err_null_location, color=err_null_color)
 
+        return detection_res, err_pins_location, err_null_location, draw
+
+    @staticmethod
+    def serialize_error_location(err_pins_location: np.ndarray, err_null_location: np.ndarray) -> str:
+        """
+        序列化错误位置，写入 DetectionRecords.Error
+        :param err_pins_location:
+        :param err_null_location:
+        :return:
+        """
+        # 紧凑编码
+        str_err_pins_location = PinsMapCodec.encode_locations(err_pins_location)
+        str_err_null_location = PinsMapCodec.encode_locations(err_null_location)
+        err = {"ErrorPinsLocation": str_err_pins_location,
+               "ErrorNullLocation": str_err_null_location}
+        # json序列化
+        return dumps(err)
+
+    @staticmethod
+    def offline_process_algorithm(frame: np.ndarray, message: dict,
+                                  show_detection_callback=None, record_detection_callback=None, detection_result_callback=None,
+                                  err_pins_color: tuple = CF_COLOR_ERROR_PINS, err_null_color: tuple = CF_COLOR_ERROR_NULL):
+        """
+
+        :param frame:
+        :param message:
+        :param show_detection_callback:
+        :param record_detection_callback:
+        :param detection_result_callback:   detection_result_callback(detection_result)，记录入队后、显示结果前调用
+        :param err_pins_color:
+        :param err_null_color:
+        :return:
+        """
+        detection_res, err_pins_location, err_null_location, draw = FrameOperator.detect_frame(frame, message, err_pins_color, err_null_color)
+        detection_result = DetectionResult(result=detection_res, err_pins_location=err_pins_location, err_null_location=err_null_location)
+
         # 保存记录回调函数
         if record_detection_callback is not None:
+            camera_location = message["CameraLocation"]
+
             record_message = dict()
 
             record_message["Part"] = message["Part"]
             record_message["Line"] = camera_location["Line"]
-            record_message["Location"] = location
+            record_message["Location"] = camera_location["Location"]
             record_message["Result"] = detection_res
 
             if not detection_res:
-                # 序列化
-                str_err_pins_location = MySerializer.serialize(err_pins_location)
-                str_err_null_location = MySerializer.serialize(err_null_location)
-                err = {"ErrorPinsLocation": str_err_pins_location,
-                       "ErrorNullLocation": str_err_null_location}
-                # json序列化
-                record_message["Error"] = dumps(err)
+                record_message["Error"] = FrameOperator.serialize_error_location(err_pins_location, err_null_location)
 
             if "User" in message:
                 record_message["User"] = message.get("User", "")
 
-            record_detection_callback(record_message=record_message, origin_frame=frame, detection_frame=draw)
+            record_detection_callback(record_message=record_message, origin_frame=frame, detection_frame=draw, detection_result=detection_result)
+
+        # 检测结果，记录可能尚未写入
+        if detection_result_callback is not None:
+            detection_result_callback(detection_result)
 
         # 显示检测结果回调函数
         if show_detection_callback is not None:
             show_detection_callback(result=detection_res, frame=draw)
 
+    @staticmethod
+    def prepare_ref_pins_map(ref_pins_map: np.ndarray) -> dict:
+        """
+        预先计算基准 pins_map 的掩码，供 match_pins_map_with_masks 使用
+        :param ref_pins_map:
+        :return:    {"Pins": 顶棒, "Null": 孔, "Ignored": 自由/定位销}
+        """
+        masks = {
+            "Pins": np.all(ref_pins_map == CF_COLOR_PINSMAP_PIN, axis=2),
+            "Null": np.all(ref_pins_map == CF_COLOR_PINSMAP_NULL, axis=2),
+            "Ignored": np.all(ref_pins_map == CF_COLOR_PINSMAP_FREE, axis=2) | np.all(ref_pins_map == CF_COLOR_PINSMAP_DOWEL, axis=2),
+        }
+        for mask in masks.values():
+            mask.flags.writeable = False
+        return masks
+
+    @staticmethod
+    def match_pins_map_with_masks(pins_map: np.ndarray, ref_masks: dict):
+        """
+        与 match_pins_map 结果相同，使用预先计算的基准掩码
+        :param pins_map:
+        :param ref_masks:   prepare_ref_pins_map 的结果
+        :return:    err_pins_location, err_null_location
+        """
+        pins_mask = np.all(pins_map == CF_COLOR_PINSMAP_PIN, axis=2)
+        null_mask = np.all(pins_map == CF_COLOR_PINSMAP_NULL, axis=2)
+
+        # 基准是顶棒，检测不是顶棒；基准是孔，检测不是孔（行 列 交换）
+        err_pins_location = np.argwhere(ref_masks["Pins"] & ~pins_mask)[:, [1, 0]]
+        err_null_location = np.argwhere(ref_masks["Null"] & ~null_mask)[:, [1, 0]]
+        return err_pins_location, err_null_location
+
     @staticmethod
     def match_pins_map(pins_map: np.ndarray, ref_pins_map: np.ndarray):
         # 方法1，颜色含有相同数字，失效
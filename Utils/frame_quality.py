@@ -0,0 +1,216 @@
+from typing import Optional, Callable
+import numpy as np
+import cv2
+
+from Utils.messenger import Messenger
+from User.config_static import (CF_FRAME_QUALITY_SIZE, CF_FRAME_QUALITY_RETRIES, CF_FRAME_QUALITY_FOCUS_RATIO,
+                                CF_FRAME_QUALITY_BRIGHTNESS_TOLERANCE, CF_FRAME_QUALITY_HIGHLIGHT, CF_FRAME_QUALITY_MAX_DIFFERENCE)
+
+"""
+检测前的帧质量检查，在检测区域外接矩形的缩小灰度图上计算，耗时远小于 二值化及轮廓
+    对焦    Focus       拉普拉斯方差，运动模糊或失焦时变小
+    曝光    Mean        平均亮度，欠曝/过曝
+            P99         99% 分位亮度，大面积过曝时达到 255
+    运动    Difference  与取流中前一帧的平均灰度差，压机动作中或零件移动时变大；只在连续采集时检查，触发模式下没有前一帧
+阈值保存在 ProcessParameters 中（QualityEnable/MinFocus/MinBrightness/MaxBrightness/MaxHighlight/MaxDifference），为空或 0 的项不检查
+"""
+
+# 不合格原因
+QUALITY_FOCUS = "对焦不清或运动模糊"
+QUALITY_DARK = "欠曝"
+QUALITY_BRIGHT = "过曝"
+QUALITY_MOTION = "画面运动中"
+
+
+class FrameQuality:
+
+    @staticmethod
+    def get_roi(frame: np.ndarray, vertexes: list, size: int = CF_FRAME_QUALITY_SIZE) -> np.ndarray:
+        """
+        检测区域外接矩形的灰度图，最大边长缩小到 size
+        :param frame:
+        :param vertexes:    检测区域顶点 [[x, y], ...]
+        :param size:
+        :return:
+        """
+        height, width = frame.shape[:2]
+        x_min = max(int(min(v[0] for v in vertexes)), 0)
+        y_min = max(int(min(v[1] for v in vertexes)), 0)
+        x_max = min(int(max(v[0] for v in vertexes)) + 1, width)
+        y_max = min(int(max(v[1] for v in vertexes)) + 1, height)
+        roi = frame[y_min:y_max, x_min:x_max] if x_max > x_min and y_max > y_min else frame
+
+        # 先缩小再转灰度
+        scale = size / max(roi.shape[:2])
+        if scale < 1:
+            roi = cv2.resize(roi, (max(int(roi.shape[1] * scale), 1), max(int(roi.shape[0] * scale), 1)), interpolation=cv2.INTER_AREA)
+        if roi.ndim == 3:
+            roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        return roi
+
+    @staticmethod
+    def measure(frame: np.ndarray, vertexes: list, previous: Optional[np.ndarray] = None, size: int = CF_FRAME_QUALITY_SIZE) -> dict:
+        """
+        计算质量指标
+        :param frame:
+        :param vertexes:
+        :param previous:    上一帧的 Roi，None 时不计算 Difference
+        :param size:
+        :return:    {"Focus", "Mean", "P99", "Difference", "Roi"}
+        """
+        roi = FrameQuality.get_roi(frame, vertexes, size)
+
+        focus = float(cv2.Laplacian(roi, cv2.CV_64F).var())
+        # 8 位灰度按直方图求分位，不排序
+        hist = np.bincount(roi.ravel(), minlength=256)
+        mean = float(np.dot(hist, np.arange(hist.size)) / roi.size)
+        p99 = int(np.searchsorted(np.cumsum(hist), roi.size * 0.99))
+
+        difference = None
+        if previous is not None and previous.shape == roi.shape:
+            difference = float(cv2.absdiff(roi, previous).mean())
+
+        return {"Focus": focus, "Mean": mean, "P99": p99, "Difference": difference, "Roi": roi}
+
+    @staticmethod
+    def check(metrics: dict, parameters: dict) -> Optional[str]:
+        """
+        :param metrics:     measure() 的结果
+        :param parameters:  ProcessParameters
+        :return:    不合格原因，合格为 None
+        """
+        # 拉普拉斯方差随对比度变化，先判断曝光
+        min_brightness = parameters.get("MinBrightness")
+        if min_brightness and metrics["Mean"] < min_brightness:
+            return QUALITY_DARK
+        max_brightness = parameters.get("MaxBrightness")
+        if max_brightness and metrics["Mean"] > max_brightness:
+            return QUALITY_BRIGHT
+        max_highlight = parameters.get("MaxHighlight")
+        if max_highlight and metrics["P99"] > max_highlight:
+            return QUALITY_BRIGHT
+
+        min_focus = parameters.get("MinFocus")
+        if min_focus and metrics["Focus"] < min_focus:
+            return QUALITY_FOCUS
+
+        # 没有前一帧（触发模式）时不检查，不为比较而多取一帧（触发模式下可能没有下一帧）
+        max_difference = parameters.get("MaxDifference")
+        if max_difference and metrics["Difference"] is not None and metrics["Difference"] > max_difference:
+            return QUALITY_MOTION
+        return None
+
+    @staticmethod
+    def teach(frame: np.ndarray, vertexes: list) -> dict:
+        """
+        按示教图片计算阈值
+        :param frame:       示教图片（合格的帧）
+        :param vertexes:
+        :return:    ProcessParameters 中的质量检查列
+        """
+        metrics = FrameQuality.measure(frame, vertexes)
+        mean = metrics["Mean"]
+        return {
+            "QualityEnable": True,
+            "MinFocus": round(metrics["Focus"] * CF_FRAME_QUALITY_FOCUS_RATIO, 3),
+            "MinBrightness": round(max(mean - CF_FRAME_QUALITY_BRIGHTNESS_TOLERANCE, 0.0), 3),
+            "MaxBrightness": round(min(mean + CF_FRAME_QUALITY_BRIGHTNESS_TOLERANCE, 255.0), 3),
+            # 示教图片本身已过曝时不检查
+            "MaxHighlight": CF_FRAME_QUALITY_HIGHLIGHT if metrics["P99"] <= CF_FRAME_QUALITY_HIGHLIGHT else None,
+            "MaxDifference": CF_FRAME_QUALITY_MAX_DIFFERENCE or None,
+        }
+
+
+class FrameQualityGate:
+    """
+    一次检测的帧质量检查：不合格的帧不检测，重新保存下一帧；超过重试次数后放弃本次检测
+    在取流线程中调用，失败回调中不能操作界面
+    - start() 开始检测：连续采集且检查运动时，先观察一帧作为前一帧再保存下一帧，之后每帧更新前一帧
+    """
+
+    def __init__(self, parameters: dict, retry_callback: Callable, failed_callback: Optional[Callable] = None,
+                 retries: int = CF_FRAME_QUALITY_RETRIES):
+        """
+        :param parameters:          检测消息，含 ProcessParameters
+        :param retry_callback:      retry_callback()，保存下一帧
+        :param failed_callback:     failed_callback(reason, metrics)
+        :param retries:
+        """
+        self.parameters = parameters
+        self.vertexes = [[parameters["P1X"], parameters["P1Y"]], [parameters["P2X"], parameters["P2Y"]],
+                         [parameters["P3X"], parameters["P3Y"]], [parameters["P4X"], parameters["P4Y"]]]
+        self.retry_callback = retry_callback
+        self.failed_callback = failed_callback
+        self.retries = retries
+
+        self.camera = None      # 观察取流的相机
+        self.previous = None    # 取流中前一帧的 Roi
+        self.rejected = 0
+        self.metrics = None
+        self.reason = None
+
+    def is_enabled(self) -> bool:
+        return bool(self.parameters.get("QualityEnable"))
+
+    def start(self, camera):
+        """
+        开始检测，保存下一帧
+        :param camera:  MyCamera
+        :return:
+        """
+        if self.is_enabled() and self.parameters.get("MaxDifference") and camera.is_continuous():
+            self.camera = camera
+            camera.frame_observer = self.observe
+        else:
+            self.retry_callback()
+
+    def observe(self, frame: np.ndarray):
+        """
+        记录取流中的每一帧（相机的 frame_observer），第一帧之后开始保存
+        :param frame:
+        :return:
+        """
+        is_first = self.previous is None
+        self.previous = FrameQuality.get_roi(frame, self.vertexes)
+        if is_first:
+            self.retry_callback()
+
+    def stop(self):
+        """
+        检测完成，不再观察取流
+        :return:
+        """
+        if self.camera is not None and self.camera.frame_observer == self.observe:
+            self.camera.frame_observer = None
+        self.camera = None
+
+    def accept(self, frame: np.ndarray) -> bool:
+        """
+        :param frame:
+        :return:    True 为合格，可以检测
+        """
+        if not self.is_enabled():
+            return True
+
+        # 前一帧由 observe() 在本帧之前记录，未观察取流（触发模式）时为 None，不检查运动
+        metrics = FrameQuality.measure(frame, self.vertexes, previous=self.previous)
+        metrics.pop("Roi")
+        self.metrics = metrics
+        self.reason = FrameQuality.check(metrics, self.parameters)
+        if self.reason is None:
+            self.stop()
+            return True
+
+        self.rejected += 1
+        if self.rejected <= self.retries:
+            self.retry_callback()
+            return False
+
+        self.stop()
+        m = {"level": 'WARNING', "title": '警告', "text": '图片质量不合格，未检测',
+             "informative_text": '原因[%s]，重取[%d]次' % (self.reason, self.retries),
+             "detailed_text": ', '.join('%s[%s]' % (k, v if v is None else round(v, 2)) for k, v in metrics.items())}
+        Messenger.print(message=m)
+        if self.failed_callback is not None:
+            self.failed_callback(reason=self.reason, metrics=metrics)
+        return False
@@ -0,0 +1,141 @@
+from typing import Optional
+import numpy as np
+import cv2
+
+from Utils.frame_operator import FrameOperator
+from User.config_static import CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL
+
+
+class FrameSynthesizer:
+    """
+    合成带透视畸变的顶棒网格图片，并给出对应的检测参数和基准 pins_map
+    亮色为底板和顶棒顶面，暗色圆为未插顶棒的孔（检测中识别为 NULL）
+    """
+
+    @staticmethod
+    def target_size(vertexes: np.ndarray) -> tuple:
+        """
+        与 FrameOperator.perspective_transform 相同的校正后画布尺寸
+        :param vertexes:
+        :return:    宽, 高
+        """
+        sorted_vertexes = FrameOperator.sort_vertexes(vertexes)
+        sub = np.diff(sorted_vertexes, axis=0, prepend=sorted_vertexes[-1:, :])
+        dis = np.hypot(sub[:, 0], sub[:, 1])
+        return int((dis[1] + dis[3]) / 2), int((dis[0] + dis[2]) / 2)
+
+    @staticmethod
+    def random_vertexes(width: int, height: int, perspective: float, rng: np.random.RandomState, margin: float = 0.08) -> np.ndarray:
+        """
+        在图片中随机生成四边形顶点，左上->右上->右下->左下
+        :param width:
+        :param height:
+        :param perspective:     顶点随机偏移量，占图片尺寸的比例
+        :param rng:
+        :param margin:          四边形到图片边缘的距离比例
+        :return:
+        """
+        base = np.array([[margin, margin], [1 - margin, margin], [1 - margin, 1 - margin], [margin, 1 - margin]], np.float64)
+        jitter = rng.uniform(-perspective, perspective, size=(4, 2)) if perspective > 0 else np.zeros((4, 2))
+        # 偏移只向四边形内部，保证顶点在图片内
+        jitter = np.abs(jitter) * np.array([[1, 1], [-1, 1], [-1, -1], [1, -1]])
+        vertexes = (base + jitter) * np.array([width - 1, height - 1])
+        return vertexes.astype(np.int32)
+
+    @staticmethod
+    def synthesize(width: int = 1280, height: int = 1024,
+                   x_number: int = 12, y_number: int = 8,
+                   pin_ratio: float = 0.5,
+                   noise: float = 4.0,
+                   stripes: int = 0,
+                   perspective: float = 0.05,
+                   thread_method: int = 0,
+                   seed: Optional[int] = 0,
+                   pins_map: Optional[np.ndarray] = None) -> dict:
+        """
+        合成图片
+        :param width:           图片宽
+        :param height:          图片高
+        :param x_number:        列数
+        :param y_number:        行数
+        :param pin_ratio:       插顶棒的比例
+        :param noise:           高斯噪声标准差
+        :param stripes:         黑色条纹数量
+        :param perspective:     透视畸变程度
+        :param thread_method:   二值化方法，决定生成的检测参数
+        :param seed:
+        :param pins_map:        指定基准 (y_number, x_number, 3)，None 时随机生成
+        :return:    {"Frame", "Parameters", "PinsMap", "Vertexes"}
+        """
+        rng = np.random.RandomState(seed)
+
+        # 基准
+        if pins_map is None:
+            is_pin = rng.uniform(size=(y_number, x_number)) < pin_ratio
+            pins_map = np.empty((y_number, x_number, 3), np.uint8)
+            pins_map[is_pin] = CF_COLOR_PINSMAP_PIN
+            pins_map[~is_pin] = CF_COLOR_PINSMAP_NULL
+        else:
+            y_number, x_number = pins_map.shape[:2]
+        is_null = np.all(pins_map == CF_COLOR_PINSMAP_NULL, axis=2)
+
+        # 校正后的底板
+        vertexes = FrameSynthesizer.random_vertexes(width, height, perspective, rng)
+        plate_width, plate_height = FrameSynthesizer.target_size(vertexes)
+        plate = np.full((plate_height, plate_width), 200, np.uint8)
+
+        x_division, _, _ = FrameOperator.get_sorted_division(x_number, 0, plate_width - 1)
+        y_division, _, _ = FrameOperator.get_sorted_division(y_number, 0, plate_height - 1)
+        cell = min(plate_width / x_number, plate_height / y_number)
+        radius = max(int(cell * 0.28), 2)
+        for y_index in range(y_number):
+            for x_index in range(x_number):
+                center = (int((x_division[x_index] + x_division[x_index + 1]) / 2),
+                          int((y_division[y_index] + y_division[y_index + 1]) / 2))
+                if is_null[y_index, x_index]:
+                    # 空孔
+                    cv2.circle(plate, center, radius, 40, -1, lineType=cv2.LINE_AA)
+                else:
+                    # 顶棒顶面
+                    cv2.circle(plate, center, radius, 230, -1, lineType=cv2.LINE_AA)
+
+        # 黑色条纹：在行间的空隙中横穿底板，长度远大于 EliminatedSpan、宽度不超过 ReservedInterval，条纹去噪能完整消除且不破坏孔
+        eliminated_span = max(int(cell), 8)
+        reserved_interval = 2
+        for _ in range(stripes):
+            y = int(y_division[rng.randint(1, y_number)]) if y_number > 1 else int(rng.randint(0, plate_height))
+            x1 = int(rng.randint(0, max(plate_width - eliminated_span * 2, 1)))
+            x2 = int(rng.randint(min(x1 + eliminated_span * 2, plate_width - 1), plate_width))
+            cv2.line(plate, (x1, y), (x2, y), 10, int(rng.randint(1, reserved_interval + 1)))
+
+        # 透视投影到相机画面
+        frame = np.full((height, width), 90, np.uint8)
+        source = np.array([[0, 0], [plate_width - 1, 0], [plate_width - 1, plate_height - 1], [0, plate_height - 1]], np.float32)
+        matrix = cv2.getPerspectiveTransform(source, vertexes.astype(np.float32))
+        cv2.warpPerspective(plate, matrix, (width, height), dst=frame, borderMode=cv2.BORDER_TRANSPARENT)
+
+        # 噪声
+        if noise > 0:
+            frame = np.clip(frame + rng.normal(0, noise, frame.shape), 0, 255).astype(np.uint8)
+
+        # 检测参数
+        min_area_ref, max_area_ref, _, distance_ref, distance_max = FrameOperator.calculate_ref_value(
+            x_number, 0, plate_width - 1, y_number, 0, plate_height - 1)
+        parameters = {
+            "P1X": int(vertexes[0][0]), "P1Y": int(vertexes[0][1]), "P2X": int(vertexes[1][0]), "P2Y": int(vertexes[1][1]),
+            "P3X": int(vertexes[2][0]), "P3Y": int(vertexes[2][1]), "P4X": int(vertexes[3][0]), "P4Y": int(vertexes[3][1]),
+            "XNumber": x_number, "XMini": 0, "XMaxi": plate_width - 1,
+            "YNumber": y_number, "YMini": 0, "YMaxi": plate_height - 1,
+            "ScaleAlpha": 1.0, "ScaleBeta": 0.0, "ScaleEnable": True,
+            "GammaConstant": 1.0, "GammaPower": 1.0, "GammaEnable": False,
+            "LogConstant": 1.0, "LogEnable": False,
+            "Thresh": 120, "AutoThresh": False,
+            "EliminatedSpan": eliminated_span, "ReservedInterval": reserved_interval,
+            "ErodeShape": 2, "ErodeKsize": 3, "ErodeIterations": 1,
+            "DilateShape": 2, "DilateKsize": 3, "DilateIterations": 1,
+            "StripeEnable": stripes > 0, "ErodeEnable": True, "DilateEnable": True,
+            "MinArea": min_area_ref, "MaxArea": max_area_ref, "MaxRoundness": max(radius * 0.2, 2.0), "MaxDistance": distance_max,
+            "SauvolaThreshWindowSize": (int(cell) * 2) | 1, "SauvolaThreshK": 0.2, "ThreadMethod": thread_method,
+        }
+
+        return {"Frame": frame, "Parameters": parameters, "PinsMap": pins_map, "Vertexes": vertexes}
@@ -0,0 +1,139 @@
+from typing import Optional
+
+from Utils.database_operator import DatabaseOperator
+
+
+class KeysetPaginator:
+    """
+    按 ID 分页，第 0 页为最新的记录，页内 ID 升序（与原嵌套 top 分页一致）；用 ID 定位代替 top/offset
+    - 缓存总行数及最大 ID，刷新时只统计新增的行；最小 ID 变化（按保留策略删除了最早的记录）时重新统计
+    - 缓存每页的起始 ID，翻页只读取一页
+    - 跳到未读取过的页时，从最近的已知页或末尾开始，用一条语句在数据库内按 ID 索引定位该页的起始 ID，不读取中间的行
+    """
+
+    def __init__(self, db_operator: DatabaseOperator, table_name: str, demand_list: list, page_rows: int = 20,
+                 filter_dict: Optional[dict] = None):
+        self.db_operator = db_operator
+        self.table_name = table_name
+        self.demand_list = list(demand_list)
+        self.page_rows = max(int(page_rows), 1)
+        self.filter_dict = dict(filter_dict) if filter_dict else dict()
+
+        self.total_rows = None      # 缓存的总行数
+        self.max_id = None          # 统计总行数时的最大 ID
+        self.min_id = None          # 统计总行数时表的最小 ID（不筛选）
+        # 页的起始位置 {页: (ID, 是否包含该ID)}，第 page 页为 ID 小于（或等于）该值的前 page_rows 行
+        self.anchors = {0: (None, False)}
+
+    def invalidate(self):
+        """
+        清除缓存，删除记录或筛选条件变化后调用
+        :return:
+        """
+        self.total_rows = None
+        self.max_id = None
+        self.min_id = None
+        self.anchors = {0: (None, False)}
+
+    def set_filter(self, filter_dict: Optional[dict]):
+        self.filter_dict = dict(filter_dict) if filter_dict else dict()
+        self.invalidate()
+
+    def set_page_rows(self, page_rows: int):
+        self.page_rows = max(int(page_rows), 1)
+        self.anchors = {0: (None, False)}
+
+    def refresh(self) -> int:
+        """
+        更新总行数：最小 ID 变化时重新统计，否则只统计 ID 大于缓存最大 ID 的新行
+        :return:    总行数
+        """
+        min_id = self.db_operator.get_table_min_id(table_name=self.table_name)
+        if self.total_rows is None or min_id != self.min_id:
+            self.invalidate()
+            self.total_rows, self.max_id = self.db_operator.get_table_rows_and_max_id(table_name=self.table_name, filter_dict=self.filter_dict)
+            self.min_id = min_id
+            return self.total_rows
+
+        new_rows, new_max_id = self.db_operator.get_table_rows_and_max_id(table_name=self.table_name, filter_dict=self.filter_dict,
+                                                                          after_id=self.max_id)
+        if new_rows:
+            self.total_rows += new_rows
+            self.max_id = new_max_id
+            # 有新记录时各页内容后移
+            self.anchors = {0: (None, False)}
+        return self.total_rows
+
+    def get_pages(self, is_refresh: bool = True) -> int:
+        """
+        总页数
+        :param is_refresh:
+        :return:
+        """
+        if is_refresh or self.total_rows is None:
+            self.refresh()
+        return -(-self.total_rows // self.page_rows)
+
+    def skip_rows(self, boundary: tuple, rows: int, is_desc: bool) -> Optional[int]:
+        """
+        从 boundary 开始第 rows 行的 ID，在数据库内定位，不读取中间的行
+        :param boundary:
+        :param rows:
+        :param is_desc:
+        :return:    无数据为 None
+        """
+        return self.db_operator.get_keyset_id(table_name=self.table_name, filter_dict=self.filter_dict, rows=rows,
+                                              boundary_id=boundary[0], is_inclusive=boundary[1], is_desc=is_desc)
+
+    def locate(self, page: int):
+        """
+        计算第 page 页的起始位置，从下方最近的已知页降序、或从上方最近的已知页（或最早的记录）升序定位
+        :param page:
+        :return:
+        """
+        lower_page = max(p for p in self.anchors.keys() if p < page)
+        upper_pages = [p for p in self.anchors.keys() if p > page]
+        lower_distance = (page - lower_page) * self.page_rows
+        if upper_pages:
+            upper_page = min(upper_pages)
+            # 升序时不含已知页的第一行，即与降序的包含关系相反
+            upper_boundary = (self.anchors[upper_page][0], not self.anchors[upper_page][1])
+            upper_distance = (upper_page - page) * self.page_rows
+        else:
+            # 最早的记录
+            upper_boundary = (None, False)
+            upper_distance = self.total_rows - page * self.page_rows
+
+        if lower_distance <= upper_distance:
+            last_id = self.skip_rows(boundary=self.anchors[lower_page], rows=lower_distance, is_desc=True)
+            if last_id is not None:
+                self.anchors[page] = (last_id, False)
+        else:
+            # 升序读取的最后一行即该页的第一行
+            last_id = self.skip_rows(boundary=upper_boundary, rows=upper_distance, is_desc=False)
+            if last_id is not None:
+                self.anchors[page] = (last_id, True)
+
+    def get_page(self, page: int) -> list:
+        """
+        读取一页，页内 ID 升序
+        :param page:    从 0 开始
+        :return:
+        """
+        if self.total_rows is None:
+            self.refresh()
+        if page < 0 or page * self.page_rows >= self.total_rows:
+            return list()
+
+        if page not in self.anchors:
+            self.locate(page)
+            if page not in self.anchors:
+                return list()
+
+        boundary_id, is_inclusive = self.anchors[page]
+        records = self.db_operator.select_by_keyset(table_name=self.table_name, demand_list=self.demand_list, filter_dict=self.filter_dict,
+                                                    rows=self.page_rows, boundary_id=boundary_id, is_inclusive=is_inclusive, is_desc=True)
+        if records:
+            self.anchors[page + 1] = (records[-1]["ID"], False)
+        records.reverse()
+        return records
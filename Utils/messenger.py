@@ -1,7 +1,5 @@
-from typing import Optional
 from datetime import datetime
 from sys import argv
-from PyQt5.QtWidgets import QMessageBox, QWidget, QApplication
 
 
 class Messenger:
@@ -25,14 +23,16 @@ class Messenger:
         print("[Level]{}, [title]{}, [text]{}, [informative]{}, [detailed]{}".format(level, title, text, informative_text, detailed_text))
 
     @staticmethod
-    def show_QMessageBox(widget: Optional[QWidget], *args, **kwargs):
+    def show_QMessageBox(widget, *args, **kwargs):
         """
         输出消息
-        :param widget:
+        :param widget:  Optional[QWidget]
         :param args:
         :param kwargs:
         :return:
         """
+        # Messenger.print 在无界面的检测/相机进程中也会使用，PyQt5 仅在弹窗时导入
+        from PyQt5.QtWidgets import QMessageBox, QApplication
 
         if "message" in kwargs:
             message = kwargs.get("message")
@@ -0,0 +1,157 @@
+import threading
+from typing import Optional
+
+from CameraCore.my_camera_t import MyCamera
+from CameraCore.camera_identity import CameraIdentity
+from MvImport.CameraParams_const import MV_ACCESS_Control
+from MvImport.MvErrorDefine_const import MV_OK
+
+from Utils.camera_discovery import CameraDiscovery
+from Utils.messenger import Messenger
+from User.config_static import CF_CAMERA_MULTICAST_ENABLE, CF_CAMERA_MULTICAST_FRAME_RATE, CF_CAMERA_MULTICAST_CHECK_INTERVAL
+
+
+class MulticastController(threading.Thread):
+    """
+    组播控制端：以控制权限打开发现的相机并连续采集，图像组播给以监控权限打开的 显示界面 及 socket 检测
+    - 本进程不接收图像（MV_GIGE_TRANSTYPE_MULTICAST_WITHOUT_RECV），只开启取流，不运行取流循环
+    - 参数（触发模式、帧率、包大小）由控制端设置，监控端不能写节点
+    - 定时检查相机在线，掉线或打开失败的相机重新打开
+    """
+
+    def __init__(self, interval: float = CF_CAMERA_MULTICAST_CHECK_INTERVAL, frame_rate: float = CF_CAMERA_MULTICAST_FRAME_RATE):
+        """
+        :param interval:    检查间隔（秒）
+        :param frame_rate:  连续采集帧率，0 为不限制
+        """
+        super().__init__(name="MulticastController", daemon=True)
+        self.interval = interval
+        self.frame_rate = frame_rate
+        self.cameras = dict()   # {serial_number: MyCamera}
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        # 统计
+        self.opens = 0
+        self.failures = 0
+        self.reconnects = 0
+
+    def run(self):
+        delay = 0.0
+        while not self._stop_event.wait(delay):
+            delay = self.interval
+            try:
+                self.check()
+            except Exception as err:
+                m = {"level": 'ERROR', "title": '错误', "text": '组播相机检查失败',
+                     "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+                Messenger.print(message=m)
+        self.close_all()
+
+    def check(self):
+        """
+        打开快照中未打开的相机，掉线的相机关闭后重新打开
+        :return:
+        """
+        snapshot = CameraDiscovery.get_instance().get_snapshot()
+        serial_numbers = set()
+        for camera in snapshot.cameras:
+            identity = camera["Identity"]
+            serial_numbers.add(identity.serial_number)
+            with self.lock:
+                my_camera = self.cameras.get(identity.serial_number)
+            if my_camera is not None:
+                if my_camera.is_device_connected():
+                    continue
+                self.reconnects += 1
+                self.close(identity.serial_number)
+            if self._stop_event.is_set():
+                return
+            self.open(identity)
+
+        # 已不在快照中且掉线的相机
+        with self.lock:
+            absent = [sn for sn, my_camera in self.cameras.items() if sn not in serial_numbers and not my_camera.is_device_connected()]
+        for serial_number in absent:
+            self.close(serial_number)
+
+    def open(self, identity: CameraIdentity) -> bool:
+        """
+        以控制权限打开相机，连续采集并开启取流
+        :param identity:
+        :return:
+        """
+        my_camera = MyCamera(camera_identity=identity, name=identity.uid, access_mode=MV_ACCESS_Control)
+        ret = my_camera.open_camera(multicast_receive=False)
+        if ret != MV_OK:
+            self.failures += 1
+            return False
+
+        my_camera.set_TriggerMode(TriggerMode=0)
+        if self.frame_rate > 0:
+            my_camera.set_AcquisitionFrameRateEnable(AcquisitionFrameRateEnable=True)
+            my_camera.set_AcquisitionFrameRate(AcquisitionFrameRate=float(self.frame_rate))
+
+        ret = my_camera.start_grabbing(start_grabbing_failed_callback=my_camera.start_grabbing_failed_callback)
+        if ret != MV_OK:
+            my_camera.close_camera()
+            self.failures += 1
+            return False
+
+        with self.lock:
+            self.cameras[identity.serial_number] = my_camera
+        self.opens += 1
+
+        group_ip, group_port = MyCamera.get_multicast_group(identity)
+        m = {"level": 'INFO', "title": '信息', "text": '相机组播开始',
+             "informative_text": '相机[%s]，组播地址[%s:%d]' % (identity.uid, group_ip, group_port), "detailed_text": ''}
+        Messenger.print(message=m)
+        return True
+
+    def close(self, serial_number: str):
+        """
+        停止取流并关闭相机
+        :param serial_number:
+        :return:
+        """
+        with self.lock:
+            my_camera = self.cameras.pop(serial_number, None)
+        if my_camera is None:
+            return
+        my_camera.stop_grabbing()
+        my_camera.close_camera()
+
+    def close_all(self):
+        with self.lock:
+            serial_numbers = list(self.cameras)
+        for serial_number in serial_numbers:
+            self.close(serial_number)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止检查并关闭全部相机
+        :param timeout:     等待线程结束的时间，None 为一直等待
+        :return:
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            self.close_all()
+
+    def get_statistics(self) -> dict:
+        with self.lock:
+            cameras = sorted(self.cameras)
+        return {"Cameras": cameras, "Opens": self.opens, "Failures": self.failures, "Reconnects": self.reconnects}
+
+    @staticmethod
+    def start_if_enabled() -> Optional["MulticastController"]:
+        """
+        配置了组播时启动
+        :return:
+        """
+        if not CF_CAMERA_MULTICAST_ENABLE:
+            return None
+        controller = MulticastController()
+        controller.start()
+        return controller
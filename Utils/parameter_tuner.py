@@ -0,0 +1,256 @@
+import json
+import random
+from time import perf_counter
+from typing import Optional
+from itertools import product
+from collections import OrderedDict
+from multiprocessing import Pool
+import numpy as np
+
+from Utils.frame_operator import FrameOperator, STAGE_PERSPECTIVE_KEYS, STAGE_BINARIZATION_KEYS, STAGE_DENOISE_KEYS
+from Utils.frame_kernels import FrameKernels
+
+SEARCH_GRID = "grid"
+SEARCH_RANDOM = "random"
+
+# 每张样本图片的缓存条目：梯形变换/二值化/去噪 各一条，另留一条给相邻候选参数
+CACHE_ENTRIES_PER_SAMPLE = 4
+
+
+class StageCache:
+    """
+    检测流程各阶段的结果缓存，LRU
+    键为 (图片序号, 阶段, 上游参数)，值为 (结果, 耗时)；命中时仍计入首次计算的耗时，候选参数的耗时与单独运行一致
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(int(max_entries), 1)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, compute):
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return value
+        self.misses += 1
+        start = perf_counter()
+        result = compute()
+        value = (result, perf_counter() - start)
+        # 超过容量时丢弃最久未使用的条目；同组候选参数的梯形变换及二值化结果每次都被使用，不会被丢弃
+        while len(self.entries) >= self.max_entries:
+            self.entries.popitem(last=False)
+        self.entries[key] = value
+        return value
+
+
+def stage_key(parameters: dict, keys: tuple) -> tuple:
+    return tuple(parameters[k] for k in keys)
+
+
+def evaluate_candidate(parameters: dict, samples: list, cache: StageCache) -> dict:
+    """
+    在全部样本上评估一组参数，检测流程与 FrameOperator.detect_frame 相同
+    :param parameters:  完整的 ProcessParameters
+    :param samples:     [{"Frame", "PinsMap", "Expected"}, ...]
+    :param cache:
+    :return:    {"Parameters", "Agreement", "Matched", "TimeMs"}
+    """
+    stages = FrameOperator.get_detection_stages()
+
+    matched = 0
+    total_time = 0.0
+    for index, sample in enumerate(samples):
+        message = dict(parameters, PinsMap=sample["PinsMap"])
+
+        # 梯形变换 -> 二值化 -> 去噪，键含全部上游参数，按键复用
+        result = sample["Frame"]
+        upstream_key = tuple()
+        for name, keys, stage in stages[:-1]:
+            upstream_key += stage_key(parameters, keys)
+            result, t_stage = cache.get_or_compute((index, name, upstream_key),
+                                                   lambda stage=stage, result=result: stage(result, message))
+            total_time += t_stage
+
+        # 轮廓 及 比较，每个候选参数都需要重新计算
+        start = perf_counter()
+        contours_collection = stages[-1][2](result, message)
+        detection_res, _, _ = FrameOperator.match_stage(contours_collection, message)
+        total_time += perf_counter() - start
+
+        matched += int(detection_res == sample["Expected"])
+
+    return {"Parameters": parameters,
+            "Matched": matched,
+            "Agreement": matched / len(samples) if samples else 0.0,
+            "TimeMs": round(total_time * 1000 / max(len(samples), 1), 3)}
+
+
+# 进程池内的全局数据，由 init_worker 设置，避免每个任务重复传输图片
+_worker_samples = list()
+_worker_cache: Optional[StageCache] = None
+
+
+def init_worker(samples: list, cache_entries: int):
+    global _worker_samples, _worker_cache
+    _worker_samples = samples
+    _worker_cache = StageCache(max_entries=cache_entries)
+    FrameKernels.warm_up()
+
+
+def evaluate_group(candidates: list) -> list:
+    """
+    进程池任务：评估一组上游参数相同的候选参数
+    :param candidates:
+    :return:
+    """
+    return [evaluate_candidate(parameters, _worker_samples, _worker_cache) for parameters in candidates]
+
+
+class ParameterTuner:
+    """
+    ProcessParameters 参数搜索
+    在已知基准的样本图片上评估候选参数，选出与期望结果 100% 一致且耗时最短的参数
+    """
+
+    def __init__(self, base_parameters: dict, samples: list):
+        """
+        :param base_parameters:     基础参数，搜索空间之外的参数保持不变
+        :param samples:             [{"Frame": 原始图片, "PinsMap": 基准pins_map, "Expected": 期望检测结果 默认True}, ...]
+        """
+        self.base_parameters = dict(base_parameters)
+        self.samples = [dict({"Expected": True}, **sample) for sample in samples]
+
+    @staticmethod
+    def default_search_space(base: dict) -> dict:
+        """
+        以基础参数为中心的默认搜索空间，优先覆盖更小的核与更少的迭代次数
+        :param base:
+        :return:
+        """
+        def around(value, steps, mini=None, maxi=None):
+            values = sorted(set(v for v in (value + s for s in steps) if (mini is None or v >= mini) and (maxi is None or v <= maxi)))
+            return values if values else [value]
+
+        space = dict()
+        if base["ThreadMethod"] == 0:
+            if not base["AutoThresh"]:
+                space["Thresh"] = around(base["Thresh"], (-20, -10, 0, 10, 20), 0, 255)
+        else:
+            space["SauvolaThreshWindowSize"] = around(base["SauvolaThreshWindowSize"], (-20, -10, 0, 10, 20), 3)
+            # 窗口尺寸需为奇数
+            space["SauvolaThreshWindowSize"] = sorted(set(v | 1 for v in space["SauvolaThreshWindowSize"]))
+            space["SauvolaThreshK"] = sorted(set(round(base["SauvolaThreshK"] + s, 3) for s in (-0.05, 0, 0.05) if base["SauvolaThreshK"] + s > 0))
+        if base["ErodeEnable"]:
+            space["ErodeKsize"] = around(base["ErodeKsize"], (-2, 0), 1)
+            space["ErodeIterations"] = around(base["ErodeIterations"], (-1, 0), 1)
+        if base["DilateEnable"]:
+            space["DilateKsize"] = around(base["DilateKsize"], (-2, 0), 1)
+            space["DilateIterations"] = around(base["DilateIterations"], (-1, 0), 1)
+        space["StripeEnable"] = sorted({bool(base["StripeEnable"]), False})
+        space["MaxRoundness"] = sorted(set(round(base["MaxRoundness"] * r, 3) for r in (0.8, 1.0, 1.2)))
+        return space
+
+    def generate_candidates(self, space: dict, search: str = SEARCH_GRID, samples: int = 200, seed: int = 0) -> list:
+        """
+        生成候选参数
+        :param space:       {参数名: [取值, ...]}
+        :param search:      grid 全组合，random 随机抽取 samples 组
+        :param samples:
+        :param seed:
+        :return:
+        """
+        keys = list(space.keys())
+        if search == SEARCH_GRID:
+            combinations = list(product(*(space[k] for k in keys)))
+        elif search == SEARCH_RANDOM:
+            rng = random.Random(seed)
+            combinations = list({tuple(rng.choice(space[k]) for k in keys) for _ in range(samples)})
+        else:
+            raise ValueError('unknown search %s' % (search,))
+
+        candidates = list()
+        for values in combinations:
+            parameters = dict(self.base_parameters)
+            parameters.update(zip(keys, values))
+            candidates.append(parameters)
+        return candidates
+
+    @staticmethod
+    def group_candidates(candidates: list) -> list:
+        """
+        按上游阶段参数分组并排序，同组在同一进程中评估以复用阶段缓存
+        :param candidates:
+        :return:
+        """
+        groups = dict()
+        for parameters in candidates:
+            key = stage_key(parameters, STAGE_PERSPECTIVE_KEYS + STAGE_BINARIZATION_KEYS)
+            groups.setdefault(key, list()).append(parameters)
+        for group in groups.values():
+            group.sort(key=lambda p: repr(stage_key(p, STAGE_DENOISE_KEYS)))
+        return list(groups.values())
+
+    def run(self, candidates: list, workers: Optional[int] = None, cache_entries: Optional[int] = None, progress_callback=None) -> dict:
+        """
+        并行评估候选参数
+        :param candidates:
+        :param workers:
+        :param cache_entries:       每个进程的阶段缓存容量，None 时按样本数计算
+        :param progress_callback:   progress_callback(evaluated=)
+        :return:    {"Best", "Baseline", "Results", "WallTimeS"}
+        """
+        if cache_entries is None:
+            cache_entries = CACHE_ENTRIES_PER_SAMPLE * max(len(self.samples), 1)
+        groups = self.group_candidates(candidates)
+        # 基础参数作为对照
+        groups.append([dict(self.base_parameters)])
+
+        results = list()
+        start = perf_counter()
+        with Pool(processes=workers, initializer=init_worker, initargs=(self.samples, cache_entries)) as pool:
+            for group_results in pool.imap_unordered(evaluate_group, groups):
+                results.extend(group_results)
+                if progress_callback is not None:
+                    progress_callback(evaluated=len(group_results))
+        wall_time = perf_counter() - start
+
+        baseline = results.pop(next(i for i, r in enumerate(results) if r["Parameters"] == self.base_parameters))
+        return {"Best": self.select_best(results + [baseline]),
+                "Baseline": baseline,
+                "Results": sorted(results, key=lambda r: (-r["Agreement"], r["TimeMs"])),
+                "WallTimeS": round(wall_time, 3)}
+
+    @staticmethod
+    def select_best(results: list) -> Optional[dict]:
+        """
+        选出 100% 一致且耗时最短的参数
+        :param results:
+        :return:    没有满足条件的参数返回 None
+        """
+        agreed = [r for r in results if r["Agreement"] >= 1.0]
+        if not agreed:
+            return None
+        return min(agreed, key=lambda r: r["TimeMs"])
+
+    @staticmethod
+    def write_json(report: dict, file_path: str, top: int = 20):
+        """
+        保存搜索结果
+        :param report:
+        :param file_path:
+        :param top:     保存前 top 个结果
+        :return:
+        """
+        def convert(value):
+            if isinstance(value, np.generic):
+                return value.item()
+            raise TypeError(type(value))
+
+        data = {"Best": report["Best"], "Baseline": report["Baseline"],
+                "Evaluated": len(report["Results"]), "WallTimeS": report["WallTimeS"],
+                "Top": report["Results"][:top]}
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=4, default=convert)
@@ -0,0 +1,151 @@
+from os import path as os_path, makedirs, remove as os_remove
+from datetime import datetime
+from typing import Optional
+import numpy as np
+import cv2
+
+from User.config_static import (CF_RECORDS_DETECTION_PICTURES_DIR, CF_RECORDS_ORIGIN_PICTURES_DIR,
+                                CF_PICTURE_STORE_POLICY, CF_PICTURE_STORE_JPEG_QUALITY, CF_PICTURE_STORE_PNG_COMPRESSION,
+                                CF_PICTURE_STORE_PASS_SCALE, CF_PICTURE_STORE_THUMBNAIL_WIDTH, CF_PICTURE_STORE_THUMBNAIL_QUALITY)
+
+# 保存策略
+POLICY_FULL = "FULL"                            # 检测图片、原始图片均保存原尺寸 JPEG
+POLICY_ORIGIN_ON_FAILURE = "ORIGIN_ON_FAILURE"  # 原始图片只在检测错误时保存
+POLICY_TIERED = "TIERED"                        # 检测错误保存无损 PNG，检测正确保存缩小的 JPEG
+
+# 缩略图所在的子目录
+THUMBNAIL_DIR = "Thumbnails"
+
+
+class PictureStore:
+    """
+    检测图片的保存：按策略选择格式/尺寸，按日期分目录（年/月/日），写入检测图片时生成缩略图
+    plan_pictures() 在检测线程内只确定路径，write_picture() 在 RecordWriter 的写入线程内编码写盘
+    """
+    _made_dirs = set()
+
+    @staticmethod
+    def get_shard_dir(base_dir: str, when: datetime) -> str:
+        return os_path.join(base_dir, when.strftime("%Y"), when.strftime("%m"), when.strftime("%d"))
+
+    @staticmethod
+    def get_thumbnail_path(picture_path: str) -> str:
+        """
+        缩略图路径：同目录下 Thumbnails 子目录，JPEG
+        :param picture_path:
+        :return:
+        """
+        dir_path, file_name = os_path.split(picture_path)
+        return os_path.join(dir_path, THUMBNAIL_DIR, os_path.splitext(file_name)[0] + ".jpg")
+
+    @staticmethod
+    def plan_pictures(record_message: dict, origin_frame: np.ndarray, detection_frame: np.ndarray, policy: str = CF_PICTURE_STORE_POLICY,
+                      detection_dir: str = CF_RECORDS_DETECTION_PICTURES_DIR, origin_dir: str = CF_RECORDS_ORIGIN_PICTURES_DIR) -> list:
+        """
+        确定图片路径及写入方式，写入 record_message 的 DetectionPicture/OriginPicture（不保存时为空字符串）
+        :param record_message:  含 Line/Part/Location/Result/When
+        :param origin_frame:
+        :param detection_frame:
+        :param policy:
+        :param detection_dir:
+        :param origin_dir:
+        :return:    [(文件路径, 图像, 写入方式), ...]
+        """
+        when = record_message["When"]
+        is_right = bool(record_message["Result"])
+        name = "%s_%s_%s_%s" % (record_message["Line"], record_message["Part"], record_message["Location"], when.strftime('%G%m%d%H%M%S%f'))
+
+        if policy == POLICY_TIERED and not is_right:
+            spec = {"Format": ".png"}
+        elif policy == POLICY_TIERED:
+            spec = {"Format": ".jpg", "Scale": CF_PICTURE_STORE_PASS_SCALE}
+        else:
+            spec = {"Format": ".jpg"}
+        is_save_origin = policy != POLICY_ORIGIN_ON_FAILURE or not is_right
+
+        pictures = list()
+
+        detection_picture = os_path.join(PictureStore.get_shard_dir(detection_dir, when), "Detection_%s%s" % (name, spec["Format"]))
+        pictures.append((detection_picture, detection_frame, dict(spec, Thumbnail=True)))
+        record_message["DetectionPicture"] = detection_picture
+
+        if is_save_origin:
+            origin_picture = os_path.join(PictureStore.get_shard_dir(origin_dir, when), "Origin_%s%s" % (name, spec["Format"]))
+            pictures.append((origin_picture, origin_frame, spec))
+            record_message["OriginPicture"] = origin_picture
+        else:
+            record_message["OriginPicture"] = ""
+
+        return pictures
+
+    @staticmethod
+    def make_dirs(file_path: str):
+        dir_path = os_path.dirname(file_path)
+        if dir_path and dir_path not in PictureStore._made_dirs:
+            makedirs(dir_path, exist_ok=True)
+            PictureStore._made_dirs.add(dir_path)
+
+    @staticmethod
+    def resize(frame: np.ndarray, scale: float) -> np.ndarray:
+        if scale >= 1:
+            return frame
+        height, width = frame.shape[:2]
+        size = (max(int(width * scale), 1), max(int(height * scale), 1))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def write_picture(file_path: str, frame: np.ndarray, spec: Optional[dict] = None):
+        """
+        编码并写盘
+        :param file_path:
+        :param frame:
+        :param spec:    {"Scale": 缩放比例, "Thumbnail": 是否生成缩略图}，None 时按扩展名原尺寸写入
+        :return:
+        """
+        spec = spec or dict()
+        PictureStore.make_dirs(file_path)
+
+        if file_path.lower().endswith(".png"):
+            params = [cv2.IMWRITE_PNG_COMPRESSION, CF_PICTURE_STORE_PNG_COMPRESSION]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, CF_PICTURE_STORE_JPEG_QUALITY]
+        if not cv2.imwrite(file_path, PictureStore.resize(frame, spec.get("Scale", 1.0)), params):
+            raise IOError("图片写入失败: %s" % (file_path,))
+
+        if spec.get("Thumbnail") and CF_PICTURE_STORE_THUMBNAIL_WIDTH > 0:
+            thumbnail_path = PictureStore.get_thumbnail_path(file_path)
+            PictureStore.make_dirs(thumbnail_path)
+            thumbnail = PictureStore.resize(frame, CF_PICTURE_STORE_THUMBNAIL_WIDTH / frame.shape[1])
+            if not cv2.imwrite(thumbnail_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, CF_PICTURE_STORE_THUMBNAIL_QUALITY]):
+                raise IOError("缩略图写入失败: %s" % (thumbnail_path,))
+
+    @staticmethod
+    def get_picture_files(record: dict) -> list:
+        """
+        记录对应的全部图片文件，含缩略图
+        :param record:  含 DetectionPicture/OriginPicture
+        :return:
+        """
+        files = list()
+        detection_picture = record.get("DetectionPicture")
+        if detection_picture:
+            files.append(detection_picture)
+            files.append(PictureStore.get_thumbnail_path(detection_picture))
+        origin_picture = record.get("OriginPicture")
+        if origin_picture:
+            files.append(origin_picture)
+        return files
+
+    @staticmethod
+    def remove_pictures(record: dict) -> int:
+        """
+        删除记录对应的图片
+        :param record:
+        :return:    删除的文件数
+        """
+        removed = 0
+        for file_path in PictureStore.get_picture_files(record):
+            if os_path.exists(file_path):
+                os_remove(file_path)
+                removed += 1
+        return removed
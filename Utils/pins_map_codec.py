@@ -0,0 +1,141 @@
+import zlib
+import pickle
+from io import BytesIO
+from struct import Struct
+from base64 import b64encode, b64decode
+import numpy as np
+
+from User.config_static import (CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL, CF_COLOR_PINSMAP_FREE, CF_COLOR_PINSMAP_DOWEL,
+                                CF_PINSMAP_CODEC_COMPRESS)
+
+# 文本前缀，带版本号；无此前缀的为旧格式 pickle+base64
+CODEC_PREFIX = "PMC1:"
+
+# 头部: 类型, 标志, 行数, 列数
+HEADER = Struct("<BBHH")
+KIND_PINS_MAP = 0
+KIND_LOCATIONS = 1
+FLAG_ZLIB = 0x01
+
+# 2bit 编码 -> 颜色
+PALETTE = np.array([CF_COLOR_PINSMAP_PIN, CF_COLOR_PINSMAP_NULL, CF_COLOR_PINSMAP_FREE, CF_COLOR_PINSMAP_DOWEL], np.uint8)
+# 颜色 -> 24bit 整数，升序及对应编码，用于编码时查表
+PALETTE_KEYS = (PALETTE[:, 0].astype(np.uint32) << 16) | (PALETTE[:, 1].astype(np.uint32) << 8) | PALETTE[:, 2]
+PALETTE_ORDER = np.argsort(PALETTE_KEYS)
+PALETTE_SORTED_KEYS = PALETTE_KEYS[PALETTE_ORDER]
+# 字节 -> 4 个编码，低位在前
+UNPACK_TABLE = ((np.arange(256, dtype=np.uint16)[:, None] >> np.array([0, 2, 4, 6])) & 0x03).astype(np.uint8)
+
+
+class LegacyUnpickler(pickle.Unpickler):
+    """
+    只允许还原 numpy 数组的 Unpickler，读取旧格式数据时使用
+    """
+    ALLOWED = {
+        ("numpy.core.multiarray", "_reconstruct"), ("numpy._core.multiarray", "_reconstruct"),
+        ("numpy.core.multiarray", "scalar"), ("numpy._core.multiarray", "scalar"),
+        ("numpy", "ndarray"), ("numpy", "dtype"),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) in self.ALLOWED:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError("不允许还原 %s.%s" % (module, name))
+
+
+class PinsMapCodec:
+    """
+    pins_map 紧凑编码：每个位置 2bit（顶棒/孔/自由/定位销），头部记录形状，可选 zlib 压缩，base64 后加前缀存入文本列
+    错误位置列表使用相同的头部，数据为 uint16
+    """
+
+    @staticmethod
+    def is_legacy(text: str) -> bool:
+        return not text.startswith(CODEC_PREFIX)
+
+    @staticmethod
+    def legacy_loads(text: str):
+        return LegacyUnpickler(BytesIO(b64decode(text))).load()
+
+    @staticmethod
+    def pack(kind: int, rows: int, columns: int, payload: bytes, compress: bool) -> str:
+        flags = 0
+        if compress:
+            compressed = zlib.compress(payload, 9)
+            # 只在变小时压缩
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= FLAG_ZLIB
+        return CODEC_PREFIX + b64encode(HEADER.pack(kind, flags, rows, columns) + payload).decode()
+
+    @staticmethod
+    def unpack(text: str, kind: int) -> tuple:
+        data = b64decode(text[len(CODEC_PREFIX):])
+        data_kind, flags, rows, columns = HEADER.unpack_from(data)
+        if data_kind != kind:
+            raise ValueError("编码类型错误: %d" % (data_kind,))
+        payload = data[HEADER.size:]
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        return rows, columns, payload
+
+    @staticmethod
+    def encode_pins_map(pins_map: np.ndarray, compress: bool = CF_PINSMAP_CODEC_COMPRESS) -> str:
+        """
+        编码
+        :param pins_map:    (行, 列, 3) 颜色数组
+        :param compress:
+        :return:
+        """
+        rows, columns = pins_map.shape[:2]
+        # 颜色 -> 编码
+        keys = (pins_map[:, :, 0].astype(np.uint32) << 16) | (pins_map[:, :, 1].astype(np.uint32) << 8) | pins_map[:, :, 2]
+        index = np.minimum(np.searchsorted(PALETTE_SORTED_KEYS, keys), len(PALETTE_SORTED_KEYS) - 1)
+        if not np.array_equal(PALETTE_SORTED_KEYS[index], keys):
+            raise ValueError("pins_map 含有未知颜色")
+        codes = PALETTE_ORDER[index].astype(np.uint8)
+
+        # 每字节 4 个位置，低位在前
+        flat = codes.ravel()
+        flat = np.concatenate((flat, np.zeros(-flat.size % 4, np.uint8)))
+        packed = flat[0::4] | (flat[1::4] << 2) | (flat[2::4] << 4) | (flat[3::4] << 6)
+        return PinsMapCodec.pack(KIND_PINS_MAP, rows, columns, packed.tobytes(), compress)
+
+    @staticmethod
+    def decode_pins_map(text: str) -> np.ndarray:
+        """
+        解码，兼容旧格式
+        :param text:
+        :return:    (行, 列, 3) 颜色数组
+        """
+        if PinsMapCodec.is_legacy(text):
+            return PinsMapCodec.legacy_loads(text)
+
+        rows, columns, payload = PinsMapCodec.unpack(text, KIND_PINS_MAP)
+        packed = np.frombuffer(payload, np.uint8)
+        codes = UNPACK_TABLE[packed].ravel()[:rows * columns].reshape(rows, columns)
+        return PALETTE[codes]
+
+    @staticmethod
+    def encode_locations(locations: np.ndarray, compress: bool = CF_PINSMAP_CODEC_COMPRESS) -> str:
+        """
+        编码位置列表
+        :param locations:   (n, 2) 列 行
+        :param compress:
+        :return:
+        """
+        locations = np.asarray(locations).reshape(-1, 2)
+        return PinsMapCodec.pack(KIND_LOCATIONS, locations.shape[0], 2, locations.astype("<u2").tobytes(), compress)
+
+    @staticmethod
+    def decode_locations(text: str) -> np.ndarray:
+        """
+        解码位置列表，兼容旧格式
+        :param text:
+        :return:    (n, 2)
+        """
+        if PinsMapCodec.is_legacy(text):
+            return PinsMapCodec.legacy_loads(text)
+
+        rows, columns, payload = PinsMapCodec.unpack(text, KIND_LOCATIONS)
+        return np.frombuffer(payload, "<u2").reshape(rows, columns).astype(int)
@@ -0,0 +1,258 @@
+import atexit
+import threading
+from queue import Queue, Empty, Full
+from time import monotonic
+from typing import Optional, Callable
+
+from Utils.database_operator import DatabaseOperator
+from Utils.messenger import Messenger
+from Utils.picture_store import PictureStore
+from User.config_static import (CF_RECORD_WRITER_QUEUE_SIZE, CF_RECORD_WRITER_BATCH_ROWS, CF_RECORD_WRITER_BATCH_INTERVAL,
+                                CF_RECORD_WRITER_PUT_TIMEOUT)
+
+# 停止写入线程的标记
+_STOP = object()
+
+
+class RecordWriter:
+    """
+    检测记录后台写入：检测线程只入队，写入线程负责图片编码/写盘，并把多条记录合并到一个事务中插入
+    - 队列有上限，满时检测线程等待 put_timeout，仍满则在检测线程内直接写入，不丢记录
+    - flush() 等待已入队的记录全部写入；进程退出时自动 close()
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db_operator: DatabaseOperator, queue_size: int = CF_RECORD_WRITER_QUEUE_SIZE,
+                 batch_rows: int = CF_RECORD_WRITER_BATCH_ROWS, batch_interval: float = CF_RECORD_WRITER_BATCH_INTERVAL,
+                 put_timeout: float = CF_RECORD_WRITER_PUT_TIMEOUT):
+        """
+        :param db_operator:
+        :param queue_size:      队列上限
+        :param batch_rows:      每批最多记录数
+        :param batch_interval:  收到第一条记录后，凑批的最长等待 s
+        :param put_timeout:     队列满时等待 s
+        """
+        self.db_operator = db_operator
+        self.batch_rows = max(int(batch_rows), 1)
+        self.batch_interval = batch_interval
+        self.put_timeout = put_timeout
+
+        self._queue = Queue(maxsize=max(int(queue_size), 1))
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = None
+        self._closed = False
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0          # 已处理（含失败）
+        self.failed = 0
+        self.overflow = 0           # 队列满，在检测线程内直接写入
+        self.batches = 0
+        self.max_batch = 0
+        self.max_queue_depth = 0
+        self.blocked_time = 0.0     # 检测线程等待入队的总时间 s
+        self.latency_total = 0.0    # 入队到写入完成 s
+        self.latency_max = 0.0
+
+    @classmethod
+    def get_instance(cls, db_operator: Optional[DatabaseOperator] = None) -> "RecordWriter":
+        """
+        进程内共享的写入器，首次调用时创建
+        :param db_operator:     None 时新建 DatabaseOperator
+        :return:
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(db_operator=db_operator if db_operator is not None else DatabaseOperator())
+            return cls._instance
+
+    @classmethod
+    def close_instance(cls, timeout: Optional[float] = None):
+        """
+        写完剩余记录并关闭进程内共享的写入器
+        :param timeout:
+        :return:
+        """
+        with cls._instance_lock:
+            instance = cls._instance
+            cls._instance = None
+        if instance is not None:
+            instance.close(timeout=timeout)
+            # 进程结束时记录写入统计
+            statistics = instance.get_statistics()
+            m = {"level": 'INFO', "title": '信息', "text": '检测记录写入统计',
+                 "informative_text": '处理[%d]条（失败[%d]条），未写入[%d]条' % (statistics["Completed"], statistics["Failed"], statistics["Pending"]),
+                 "detailed_text": ', '.join('%s[%s]' % (k, round(v, 3)) for k, v in statistics.items())}
+            Messenger.print(message=m)
+
+    @classmethod
+    def get_instance_statistics(cls) -> Optional[dict]:
+        """
+        进程内共享的写入器的统计，不创建写入器
+        :return:    未创建时为 None
+        """
+        with cls._instance_lock:
+            instance = cls._instance
+        return instance.get_statistics() if instance is not None else None
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="RecordWriter", daemon=True)
+            self._thread.start()
+
+    def submit(self, record_message: dict, pictures: list, persisted_callback: Optional[Callable] = None):
+        """
+        入队，立即返回
+        :param record_message:      插入 DetectionRecords 的字段
+        :param pictures:            [(文件路径, 图像[, 写入方式]), ...]，见 PictureStore.plan_pictures，写入前不得再修改图像
+        :param persisted_callback:  写入完成后在写入线程调用 persisted_callback(error)，成功时 error 为 None
+        :return:
+        """
+        item = (record_message, pictures, monotonic(), persisted_callback)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("检测记录写入器已关闭")
+            self.submitted += 1
+            self._start()
+
+        start = monotonic()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except Full:
+            with self._condition:
+                self.overflow += 1
+                self.blocked_time += monotonic() - start
+            self._write_batch([item])
+            return
+
+        with self._condition:
+            self.blocked_time += monotonic() - start
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            # 凑批：达到 batch_rows 或等待超过 batch_interval
+            batch = [item]
+            is_stop = False
+            deadline = monotonic() + self.batch_interval
+            while len(batch) < self.batch_rows:
+                remaining = deadline - monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is _STOP:
+                    is_stop = True
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            if is_stop:
+                return
+
+    @staticmethod
+    def _write_pictures(pictures: list):
+        for picture in pictures:
+            PictureStore.write_picture(*picture)
+
+    def _write_batch(self, batch: list):
+        records = list()
+        errors = [None] * len(batch)
+        for i, (record_message, pictures, _, _) in enumerate(batch):
+            try:
+                self._write_pictures(pictures)
+            except Exception as err:
+                errors[i] = err
+                self.report_error(text='检测图片写入失败', err=err)
+            # 图片失败也保留记录，检测结果不丢
+            records.append(record_message)
+
+        try:
+            self.db_operator.set_many_detection_records(demand_dicts=records)
+        except Exception as err:
+            # 整批失败时逐条重试，避免一条记录影响整批
+            self.report_error(text='检测记录批量写入失败，逐条重试', err=err)
+            for i, record_message in enumerate(records):
+                try:
+                    self.db_operator.set_detection_records(demand_dict=record_message)
+                except Exception as err:
+                    errors[i] = err
+                    self.report_error(text='检测记录写入失败', err=err)
+
+        for (_, _, _, persisted_callback), error in zip(batch, errors):
+            if persisted_callback is not None:
+                try:
+                    persisted_callback(error)
+                except Exception as err:
+                    self.report_error(text='检测记录写入回调异常', err=err)
+        failed = sum(1 for error in errors if error is not None)
+
+        now = monotonic()
+        with self._condition:
+            self.completed += len(batch)
+            self.failed += failed
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            for _, _, submit_time, _ in batch:
+                latency = now - submit_time
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+            self._condition.notify_all()
+
+    @staticmethod
+    def report_error(text: str, err: Exception):
+        m = {"level": 'ERROR', "title": '错误', "text": text,
+             "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+        Messenger.print(message=m)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待调用前已入队的记录全部写入
+        :param timeout:     None 时一直等待
+        :return:    是否全部写入
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            target = self.submitted
+            while self.completed < target:
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        写完剩余记录后停止写入线程
+        :param timeout:
+        :return:
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def get_statistics(self) -> dict:
+        with self._condition:
+            written = self.completed
+            return {"Submitted": self.submitted, "Completed": self.completed, "Failed": self.failed,
+                    "Pending": self.submitted - self.completed, "QueueDepth": self._queue.qsize(), "MaxQueueDepth": self.max_queue_depth,
+                    "Overflow": self.overflow, "BlockedTime": self.blocked_time,
+                    "Batches": self.batches, "MaxBatch": self.max_batch,
+                    "AverageBatch": written / self.batches if self.batches else 0.0,
+                    "AverageLatency": self.latency_total / written if written else 0.0, "MaxLatency": self.latency_max}
+
+
+atexit.register(RecordWriter.close_instance)
@@ -0,0 +1,315 @@
+import atexit
+import threading
+from os import path as os_path, walk as os_walk, stat as os_stat, remove as os_remove
+from queue import Queue
+from datetime import datetime, timedelta
+from typing import Optional
+
+from Utils.database_operator import DatabaseOperator
+from Utils.messenger import Messenger
+from Utils.picture_store import PictureStore
+from User.config_static import (CF_RECORDS_DETECTION_PICTURES_DIR, CF_RECORDS_ORIGIN_PICTURES_DIR, TB_DETECTION_RECORDS,
+                                CF_RETENTION_MAX_AGE_DAYS, CF_RETENTION_MAX_RECORDS, CF_RETENTION_MAX_DISK_GB,
+                                CF_RETENTION_BATCH_ROWS, CF_RETENTION_INTERVAL_HOURS, CF_RETENTION_START_DELAY)
+
+# 停止删除线程的标记
+_STOP = object()
+
+
+class FileRemover:
+    """
+    后台批量删除图片文件，数据库记录删除后提交，不阻塞界面及检测
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._queue = Queue()
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = None
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0
+        self.removed = 0
+        self.removed_bytes = 0
+        self.failed = 0
+
+    @classmethod
+    def get_instance(cls) -> "FileRemover":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def close_instance(cls, timeout: Optional[float] = None):
+        with cls._instance_lock:
+            instance = cls._instance
+            cls._instance = None
+        if instance is not None:
+            instance.close(timeout=timeout)
+
+    def submit(self, files: list):
+        """
+        提交待删除的文件
+        :param files:
+        :return:
+        """
+        if not files:
+            return
+        with self._condition:
+            self.submitted += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="FileRemover", daemon=True)
+                self._thread.start()
+        self._queue.put(list(files))
+
+    def _run(self):
+        while True:
+            files = self._queue.get()
+            if files is _STOP:
+                return
+
+            removed = 0
+            removed_bytes = 0
+            failed = 0
+            for file_path in files:
+                try:
+                    size = os_stat(file_path).st_size
+                    os_remove(file_path)
+                except FileNotFoundError:
+                    continue
+                except OSError:
+                    failed += 1
+                    continue
+                removed += 1
+                removed_bytes += size
+
+            with self._condition:
+                self.completed += 1
+                self.removed += removed
+                self.removed_bytes += removed_bytes
+                self.failed += failed
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已提交的文件删除完成
+        :param timeout:
+        :return:
+        """
+        with self._condition:
+            target = self.submitted
+            return self._condition.wait_for(lambda: self.completed >= target, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        with self._condition:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def get_statistics(self) -> dict:
+        with self._condition:
+            return {"Pending": self.submitted - self.completed, "Removed": self.removed,
+                    "RemovedBytes": self.removed_bytes, "Failed": self.failed}
+
+
+class RetentionEngine:
+    """
+    检测记录保留策略：按时间/记录数/图片占用空间，从最旧的记录（ID 最小）开始删除
+    - plan() 只统计，作为试运行报告
+    - purge() 按批在事务内删除记录，图片交给 FileRemover 在后台删除
+    """
+
+    def __init__(self, db_operator: DatabaseOperator, max_age_days: float = CF_RETENTION_MAX_AGE_DAYS,
+                 max_records: int = CF_RETENTION_MAX_RECORDS, max_disk_gb: float = CF_RETENTION_MAX_DISK_GB,
+                 batch_rows: int = CF_RETENTION_BATCH_ROWS,
+                 picture_dirs: tuple = (CF_RECORDS_DETECTION_PICTURES_DIR, CF_RECORDS_ORIGIN_PICTURES_DIR)):
+        """
+        :param db_operator:
+        :param max_age_days:    保留天数，0 为不限制
+        :param max_records:     最多记录数，0 为不限制
+        :param max_disk_gb:     图片最大占用 GB，0 为不限制
+        :param batch_rows:      每个事务删除的记录数
+        :param picture_dirs:    统计占用空间的图片目录
+        """
+        self.db_operator = db_operator
+        self.max_age_days = max_age_days
+        self.max_records = int(max_records)
+        self.max_disk_bytes = int(max_disk_gb * 1024 ** 3)
+        self.batch_rows = max(int(batch_rows), 1)
+        self.picture_dirs = picture_dirs
+
+    def is_enabled(self) -> bool:
+        return self.max_age_days > 0 or self.max_records > 0 or self.max_disk_bytes > 0
+
+    @staticmethod
+    def get_dir_size(dir_path: str) -> int:
+        size = 0
+        for root, _, files in os_walk(dir_path):
+            for file_name in files:
+                try:
+                    size += os_stat(os_path.join(root, file_name)).st_size
+                except OSError:
+                    pass
+        return size
+
+    @staticmethod
+    def get_record_size(record: dict) -> int:
+        size = 0
+        for file_path in PictureStore.get_picture_files(record):
+            try:
+                size += os_stat(file_path).st_size
+            except OSError:
+                pass
+        return size
+
+    def get_age_boundary(self, now: datetime) -> Optional[int]:
+        if self.max_age_days <= 0:
+            return None
+        return self.db_operator.get_detection_records_max_id_before(when=now - timedelta(days=self.max_age_days))
+
+    def get_count_boundary(self, total_rows: int) -> Optional[int]:
+        excess = total_rows - self.max_records
+        if self.max_records <= 0 or excess <= 0:
+            return None
+        return self.db_operator.get_keyset_id(table_name=TB_DETECTION_RECORDS, rows=excess, is_desc=False)
+
+    def get_quota_boundary(self, disk_usage: int) -> Optional[int]:
+        excess = disk_usage - self.max_disk_bytes
+        if self.max_disk_bytes <= 0 or excess <= 0:
+            return None
+
+        # 从最旧的记录开始累计图片大小，直到超出部分
+        freed = 0
+        boundary_id = None
+        while freed < excess:
+            records = self.db_operator.select_by_keyset(table_name=TB_DETECTION_RECORDS, demand_list=["DetectionPicture", "OriginPicture"],
+                                                        rows=self.batch_rows, boundary_id=boundary_id, is_desc=False)
+            if not records:
+                break
+            for record in records:
+                freed += self.get_record_size(record)
+                boundary_id = record["ID"]
+                if freed >= excess:
+                    break
+        return boundary_id
+
+    def plan(self, now: Optional[datetime] = None) -> dict:
+        """
+        试运行，统计需要删除的记录
+        :param now:
+        :return:    {"TotalRows", "DiskUsage", "AgeBoundaryID", "CountBoundaryID", "QuotaBoundaryID", "BoundaryID", "Rows"}
+                    删除 ID <= BoundaryID 的 Rows 条记录
+        """
+        now = datetime.now() if now is None else now
+        total_rows, _ = self.db_operator.get_table_rows_and_max_id(table_name=TB_DETECTION_RECORDS)
+        disk_usage = sum(self.get_dir_size(dir_path) for dir_path in self.picture_dirs) if self.max_disk_bytes > 0 else None
+
+        report = {
+            "TotalRows": total_rows,
+            "DiskUsage": disk_usage,
+            "AgeBoundaryID": self.get_age_boundary(now),
+            "CountBoundaryID": self.get_count_boundary(total_rows),
+            "QuotaBoundaryID": self.get_quota_boundary(disk_usage) if disk_usage is not None else None,
+        }
+
+        boundaries = [report[k] for k in ("AgeBoundaryID", "CountBoundaryID", "QuotaBoundaryID") if report[k] is not None]
+        report["BoundaryID"] = max(boundaries) if boundaries else None
+        if report["BoundaryID"] is None:
+            report["Rows"] = 0
+        else:
+            remaining_rows, _ = self.db_operator.get_table_rows_and_max_id(table_name=TB_DETECTION_RECORDS, after_id=report["BoundaryID"])
+            report["Rows"] = total_rows - remaining_rows
+        return report
+
+    def purge(self, dry_run: bool = False, now: Optional[datetime] = None, boundary_id: Optional[int] = None) -> dict:
+        """
+        按保留策略删除记录
+        :param dry_run:     只统计不删除
+        :param now:
+        :param boundary_id: 删除 ID <= boundary_id 的记录（已确认的 plan() 报告中的 BoundaryID）；None 时重新 plan()
+        :return:    plan() 的报告，另含 "DeletedRows"；指定 boundary_id 时只含 "BoundaryID" 及 "DeletedRows"
+        """
+        if boundary_id is None:
+            report = self.plan(now=now)
+            boundary_id = report["BoundaryID"]
+        else:
+            report = {"BoundaryID": boundary_id}
+        report["DeletedRows"] = 0
+        if dry_run or boundary_id is None:
+            return report
+
+        file_remover = FileRemover.get_instance()
+        while True:
+            records = self.db_operator.select_by_keyset(table_name=TB_DETECTION_RECORDS, demand_list=["DetectionPicture", "OriginPicture"],
+                                                        rows=self.batch_rows, is_desc=False)
+            records = [record for record in records if record["ID"] <= boundary_id]
+            if not records:
+                break
+
+            # 升序读取的连续记录，按 ID 范围删除
+            self.db_operator.delete_by_id_range(table_name=TB_DETECTION_RECORDS, first_id=records[0]["ID"], last_id=records[-1]["ID"])
+            report["DeletedRows"] += len(records)
+
+            files = list()
+            for record in records:
+                files.extend(PictureStore.get_picture_files(record))
+            file_remover.submit(files)
+
+        return report
+
+
+class RetentionScheduler(threading.Thread):
+    """
+    定时执行保留策略
+    """
+
+    def __init__(self, retention_engine: RetentionEngine, interval_hours: float = CF_RETENTION_INTERVAL_HOURS,
+                 start_delay: float = CF_RETENTION_START_DELAY):
+        super().__init__(name="RetentionScheduler", daemon=True)
+        self.retention_engine = retention_engine
+        self.interval = interval_hours * 3600
+        self.start_delay = start_delay
+        self._stop_event = threading.Event()
+
+        self.last_report = None
+
+    def run(self):
+        delay = self.start_delay
+        while not self._stop_event.wait(delay):
+            delay = self.interval
+            try:
+                self.last_report = self.retention_engine.purge()
+            except Exception as err:
+                m = {"level": 'ERROR', "title": '错误', "text": '检测记录清理失败',
+                     "informative_text": '错误信息[%s]' % (err,), "detailed_text": ''}
+                Messenger.print(message=m)
+                continue
+
+            if self.last_report["DeletedRows"]:
+                m = {"level": 'INFO', "title": '提示', "text": '检测记录清理完成',
+                     "informative_text": '删除记录[%d]条' % (self.last_report["DeletedRows"],), "detailed_text": ''}
+                Messenger.print(message=m)
+
+    def stop(self):
+        self._stop_event.set()
+
+    @staticmethod
+    def start_if_enabled(db_operator: DatabaseOperator) -> Optional["RetentionScheduler"]:
+        """
+        配置了保留策略及清理间隔时启动
+        :param db_operator:
+        :return:
+        """
+        retention_engine = RetentionEngine(db_operator=db_operator)
+        if CF_RETENTION_INTERVAL_HOURS <= 0 or not retention_engine.is_enabled():
+            return None
+        scheduler = RetentionScheduler(retention_engine=retention_engine)
+        scheduler.start()
+        return scheduler
+
+
+atexit.register(FileRemover.close_instance)
@@ -1,5 +1,6 @@
 import socket
-from Utils.correspondent import COMMAND_STOP_LISTEN, COMMAND_PREFIX, MyCorrespondent
+from Utils.socket_protocol import COMMAND_STOP_LISTEN, COMMAND_PREFIX, create_message
+from Utils.frame_kernels import FrameKernels
 
 '''
 {"command":"stop listen"}
@@ -15,6 +16,10 @@ from Utils.correspondent import COMMAND_STOP_LISTEN, COMMAND_PREFIX, MyCorrespon
     {"result":"open failed"}
     {"result":"check error"}
 
+带 id 的命令（分帧模式，响应以换行结尾，可连续发送多条）：
+{"command":"open and check","userDefined":"05100","line":"5-100","model":"5100PART1","id":1}
+    {"result":"doing","id":1}
+    {"result":"check right","picture":"xxx","id":1}
 
 '''
 
@@ -82,7 +87,7 @@ class SocketOperator:
             client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # 创建 TCP socket
             client.connect((self.ip, self.port))                        # 连接服务器
 
-            command = MyCorrespondent.create_message(COMMAND_PREFIX, COMMAND_STOP_LISTEN)
+            command = create_message(COMMAND_PREFIX, COMMAND_STOP_LISTEN)
             client.send(command.encode("gbk"))                          # 发送停止监听命令
 
             client.close()                                              # 关闭TCP socket客户端
@@ -94,6 +99,9 @@ class SocketOperator:
         开始监听后执行的函数
         :return:
         """
+        # 延迟导入，相机 SDK 仅在执行命令时需要
+        from Utils.correspondent import MyCorrespondent
+
         try:
             self.ip, self.port = ip, port
 
@@ -106,6 +114,9 @@ class SocketOperator:
 
             SocketOperator.conn_dict = dict()     # 重置conn_dict
 
+            # 预热检测内核，第一个客户端的检测无需等待编译
+            FrameKernels.warm_up_in_thread(warm_up_callback=FrameKernels.print_warm_up_time)
+
             # 监听成功的回调函数
             if server_created_successful_callback is not None:
                 server_created_successful_callback()
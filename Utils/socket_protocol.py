@@ -0,0 +1,157 @@
+# socket 通信协议：命令及响应，JSON 格式
+# - 接收：按 JSON 文档流解析，一次接收可含多条命令，一条命令也可分多次到达；命令之间可用换行分隔
+# - 命令含 "id" 时为分帧模式：该命令的每条响应（包括 doing）均为带相同 "id" 的 JSON，以换行结尾，
+#   同一连接可连续发送多条命令，响应按完成顺序返回
+# - 命令不含 "id" 时响应与旧版相同
+import json
+import re
+import codecs
+
+COMMAND_PREFIX = 'command'
+COMMAND_STOP_LISTEN = 'stop listen'
+COMMAND_ENUM = 'enum device'
+COMMAND_OPEN_AND_DETECT = 'open and check'
+COMMAND_LINES = 'enum line'
+COMMAND_PARTS = 'enum part'
+COMMAND_TELEMETRY = 'camera telemetry'
+
+COMMAND_DOING = 'doing'
+
+UID_PREFIX = 'userDefined'
+LINE_PREFIX = 'line'
+PART_PREFIX = 'model'
+
+
+RESPONSE_PREFIX = 'result'
+RESPONSE_ENUM_ERROR = 'enum error'
+RESPONSE_ENUM_NONE = 'enum none'
+RESPONSE_ENUM_SEPARATOR = "^_^"
+RESPONSE_OPEN_CAMERA_SUCCESSFUL = 'open success'
+RESPONSE_OPEN_CAMERA_FAILED = 'open failed'
+RESPONSE_DETECTION_ERROR = 'check error'
+
+RESPONSE_DETECTION_RIGHT = 'check right","picture":"{}'
+RESPONSE_DETECTION_WRONG = 'check wrong","picture":"{}'
+
+# RESPONSE_COMMAND_ILLEGAL = 'command illegal'
+RESPONSE_COMMAND_ILLEGAL = 'check error'
+RESPONSE_RATE_LIMITED = 'rate limited'
+RESPONSE_TELEMETRY = 'telemetry'
+RESPONSE_TELEMETRY_CAMERAS = 'cameras'
+RESPONSE_TELEMETRY_RECORD_WRITER = 'record writer'
+
+REQUEST_ID_PREFIX = 'id'
+FRAME_DELIMITER = '\n'
+MAX_FRAME_SIZE = 64 * 1024      # 未完成的命令最大长度，超出按非法命令处理
+NUMBER_TAIL = re.compile(r'(\.\d*)?([eE][-+]?\d*)?$')    # 数字未接收完的部分
+
+
+def create_message(prefix: str, message: str) -> str:
+    data = '{"%s":"%s"}' % (prefix, message)
+    return data
+
+
+def get_request_id(message: str):
+    """
+    命令的 id，不是JSON或没有 id 时为 None
+    :param message:
+    :return:
+    """
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    return data.get(REQUEST_ID_PREFIX) if isinstance(data, dict) else None
+
+
+def frame_response(response: str, request_id=None) -> str:
+    """
+    分帧模式的响应：加入 id，以换行结尾
+    :param response:    create_message 的结果，或 COMMAND_DOING
+    :param request_id:  None 时原样返回
+    :return:
+    """
+    if request_id is None:
+        return response
+    try:
+        data = json.loads(response)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        data = {RESPONSE_PREFIX: response}
+    data[REQUEST_ID_PREFIX] = request_id
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + FRAME_DELIMITER
+
+
+class MessageDecoder:
+    """
+    流式解析接收的字节，返回完整的命令
+    """
+
+    def __init__(self, max_size: int = MAX_FRAME_SIZE):
+        self.max_size = max_size
+        self.buffer = ''
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._json_decoder = json.JSONDecoder()
+
+    @staticmethod
+    def is_incomplete(text: str, err: json.JSONDecodeError) -> bool:
+        """
+        解析错误是否只因为未接收完整：出错位置之后没有内容，或只是未完的字符串/\\u 转义/数字/字面量
+        :param text:
+        :param err:
+        :return:
+        """
+        if err.msg.startswith("Unterminated string"):
+            return True
+        rest = text[err.pos:].rstrip()
+        # 字符串中未完的 \u 转义，之后还没有收到字符串的结束引号
+        if err.msg.startswith("Invalid \\uXXXX escape"):
+            return '"' not in rest
+        # 未完的小数/指数，如 1. 1e 1e-
+        if err.pos > 0 and text[err.pos - 1].isdigit() and NUMBER_TAIL.match(rest):
+            return True
+        return not rest or rest == '-' or any(literal.startswith(rest) for literal in ("true", "false", "null"))
+
+    def feed(self, data: bytes) -> list:
+        """
+        :param data:    接收的字节
+        :return:    [命令字符串, ...]，无法解析的部分也作为一条命令返回，由执行方回复非法命令
+        """
+        self.buffer += self._text_decoder.decode(data)
+
+        messages = list()
+        while True:
+            text = self.buffer.lstrip()
+            if not text:
+                self.buffer = ''
+                break
+
+            end = None
+            error_pos = None
+            if text[0] == '{':
+                try:
+                    _, end = self._json_decoder.raw_decode(text)
+                except json.JSONDecodeError as err:
+                    if not self.is_incomplete(text, err):
+                        error_pos = err.pos
+                    # JSON 对象未接收完整（可能含换行），继续等待，超出最大长度时丢弃
+                    elif len(text) > self.max_size:
+                        messages.append(text)
+                        self.buffer = ''
+                        break
+                    else:
+                        self.buffer = text
+                        break
+            if end is not None:
+                messages.append(text[:end])
+                self.buffer = text[end:]
+                continue
+
+            # 不是JSON对象，或JSON对象有语法错误：到出错位置之后的换行、下一个JSON对象或末尾为止，立即回复非法命令
+            start = max(error_pos, 1) if error_pos is not None else 0
+            indexes = [i for i in (text.find(FRAME_DELIMITER, start), text.find('{', max(start, 1))) if i >= 0]
+            index = min(indexes) if indexes else len(text)
+            messages.append(text[:index].rstrip())
+            self.buffer = text[index:]
+        return messages
@@ -0,0 +1,97 @@
+"""
+批量重新检测（无界面）
+根据 生产线/零件/位置/结果/日期 筛选检测记录，读取保存的原始图片，使用当前或替换的检测参数在进程池中重新检测，
+输出结果变化及每张图片的耗时
+
+示例:
+    python main_batch.py --line 5-100 --part 5100PART1 --start 2024-03-01 --end 2024-03-08 --csv batch.csv --json batch.json
+    python main_batch.py --line 5-100 --parameters new_parameters.json --workers 4
+"""
+import json
+import argparse
+from sys import exit as sys_exit
+from datetime import datetime, timedelta
+from multiprocessing import freeze_support
+
+from Utils.batch_detector import BatchDetector
+from Utils.database_operator import DatabaseOperator
+from User.config_static import CF_DATABASE_PATH
+
+
+def parse_time(text: str, is_end: bool = False):
+    """
+    解析时间，只给日期时结束时间取到当天结束
+    :param text:
+    :param is_end:
+    :return:
+    """
+    if not text:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            value = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if is_end and fmt == '%Y-%m-%d':
+            value += timedelta(days=1)
+        return value
+    raise argparse.ArgumentTypeError("时间格式错误: %s" % text)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Pins-Ctrl 批量重新检测")
+    parser.add_argument("--database", default=CF_DATABASE_PATH, help="数据库路径")
+    parser.add_argument("--line", default="ALL", help="生产线")
+    parser.add_argument("--part", default="ALL", help="零件")
+    parser.add_argument("--location", default="ALL", help="相机位置")
+    parser.add_argument("--result", default="ALL", choices=["ALL", "TRUE", "FALSE"], help="原检测结果")
+    parser.add_argument("--start", default="", help="起始时间 YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--end", default="", help="结束时间 YYYY-MM-DD[ HH:MM:SS]")
+    parser.add_argument("--parameters", default="", help="替换的检测参数json文件，覆盖数据库中的当前参数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认cpu核数")
+    parser.add_argument("--csv", default="", help="逐张结果csv文件")
+    parser.add_argument("--json", default="", help="汇总及逐张结果json文件")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_arguments()
+
+    overrides = None
+    if args.parameters:
+        with open(args.parameters, "r", encoding="utf-8") as file:
+            overrides = json.load(file)
+
+    filter_dict = {"Line": args.line, "Part": args.part, "Location": args.location, "Result": args.result}
+
+    db_operator = DatabaseOperator(database_path=args.database)
+    try:
+        detector = BatchDetector(db_operator=db_operator, parameters_overrides=overrides)
+        jobs = detector.collect_jobs(filter_dict=filter_dict, start=parse_time(args.start), end=parse_time(args.end, is_end=True))
+    finally:
+        db_operator.close()
+
+    if not jobs:
+        print("没有符合条件的检测记录")
+        return 0
+
+    from tqdm import tqdm
+    with tqdm(total=len(jobs)) as bar:
+        rows, summary = BatchDetector.run(jobs, workers=args.workers, progress_callback=lambda row: bar.update(1))
+
+    for key, value in summary.items():
+        print("%-14s %s" % (key, value))
+
+    if args.csv:
+        BatchDetector.write_csv(rows, args.csv)
+    if args.json:
+        BatchDetector.write_json(rows, summary, args.json)
+
+    return 0
+
+
+if __name__ == '__main__':
+    # 需要，否则无法打包
+    freeze_support()
+
+    sys_exit(main())
@@ -1,36 +1,38 @@
 from sys import argv, exit
 import numpy as np
-import cv2
 from typing import Union, Optional
-from os import path as os_path, makedirs as os_makedirs
+from os import path as os_path
 from multiprocessing import Pipe, Process
 from threading import Thread
 from datetime import datetime
 
 from PyQt5.QtWidgets import QApplication, QDialog, QStyle, QMessageBox
 from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtCore import QTimer
 
 from Interface.interface_grab import InterfaceGrab
-from UI.ui_authority import Ui_Dialog as Ui_Authority
-from main_teach import show_teach
 
-from MvImport.CameraParams_const import MV_ACCESS_Exclusive
 from MvImport.MvErrorDefine_const import MV_OK
 from CameraCore.camera_identity import CameraIdentity
 from CameraCore.my_camera_t import MyCamera
 from CameraCore.camera_operator import CameraOperator
 
 from Utils.frame_operator import FrameOperator
+from Utils.frame_quality import FrameQualityGate
+from Utils.frame_kernels import FrameKernels
 from Utils.background_listener import ImageBufferListener
 from Utils.messenger import Messenger
 from Utils.database_operator import DatabaseOperator
+from Utils.detection_cache import DetectionCache
+from Utils.record_writer import RecordWriter
+from Utils.picture_store import PictureStore
+from Utils.detection_result import DetectionResult
 from Utils.serializer import MySerializer
 from Utils.image_presenter import Presenter
 
-from User.config_static import (CF_TEMP_TEACH_DIR, CF_RECORDS_ORIGIN_PICTURES_DIR, CF_RECORDS_DETECTION_PICTURES_DIR,
-                                CF_TEACH_PINS_MAP_PAGE,
+from User.config_static import (CF_TEMP_TEACH_DIR, CF_TEACH_PINS_MAP_PAGE,
                                 CF_RUNNING_SEQUENCE_FILE, CF_RUNNING_GRAB_FLAG, CF_RUNNING_ROOT_FLAG, CF_APP_ICON, CF_TEACH_REFERENCE_SIDE,
-                                CF_TEACH_AUTHORITY_PASSWORD)
+                                CF_TEACH_AUTHORITY_PASSWORD, CF_CAMERA_TELEMETRY_UI_INTERVAL)
 
 from MvImport.CameraParams_const import MV_GIGE_DEVICE
 from MvImport.CameraParams_header import MV_CC_DEVICE_INFO_LIST, MV_CC_DEVICE_INFO
@@ -65,6 +67,10 @@ def active_interface(arguments: dict):
     camera_location = arguments["CameraLocation"]
 
     global camera_identity
+
+    # 预热检测内核，与枚举相机同时进行
+    FrameKernels.warm_up_in_thread(warm_up_callback=FrameKernels.print_warm_up_time)
+
     # 枚举相机
     ret = MyCamera.enum_devices(device_type=MV_GIGE_DEVICE,
                           enum_err_callback=None,
@@ -105,7 +111,7 @@ def active_interface(arguments: dict):
         name=None,
         resize_ratio=None,
         rotate_flag=rotate_flag,
-        access_mode=MV_ACCESS_Exclusive,
+        access_mode=MyCamera.get_receiver_access_mode(),
         msg_child_conn=None,
         imgbuf_child_conn=imgbuf_child_conn,
         frame_process_callback=None,
@@ -144,8 +150,13 @@ def active_interface(arguments: dict):
     # 开启多线程
     imgbuf_listener.start()
 
-    # 多线程，打开相机并取流
-    ret = my_camera.open_and_grab_in_thread()
+    # 状态栏定时显示取流遥测
+    telemetry_timer = QTimer(interface_camera_grab)
+    telemetry_timer.timeout.connect(lambda: interface_camera_grab.show_telemetry(summary=my_camera.telemetry.get_summary()))
+    telemetry_timer.start(CF_CAMERA_TELEMETRY_UI_INTERVAL)
+
+    # 打开相机并取流（默认在线程中取流）
+    ret = my_camera.open_and_grab_in_runtime()
     if ret == MV_OK:
 
         # 打开顺序文件
@@ -169,6 +180,8 @@ def active_interface(arguments: dict):
              "detailed_text": '打开相机进程异常退出'}
         Messenger.show_QMessageBox(widget=None, message=m, QLabelMinWidth=200)
 
+    # 写完未写入的检测记录
+    RecordWriter.close_instance()
     db_operator.close()
     exit(ret)
 
@@ -177,25 +190,31 @@ def do_detect(detect_message: dict, cam: MyCamera, db_operator: DatabaseOperator
     part = detect_message["Part"]
     serial_number = detect_message["SerialNumber"]
     camera_location = detect_message["CameraLocation"]
+    detection_cache = DetectionCache.get_instance()
     # 获取数据
-    process_parameters = db_operator.get_all_process_parameters(filter_dict={"SerialNumber": serial_number})
+    process_parameters = detection_cache.get_process_parameters(db_operator=db_operator, serial_number=serial_number)
     if not process_parameters:
         message = {"level": 'WARNING', "title": '警告', "text": '相机还未进行检测算法的参数示教！', "informative_text": '', 'detailed_text': '请先对相机进行示教'}
         Messenger.show_QMessageBox(widget=interface, message=message, QLabelMinWidth=200)
         return
 
-    # 获取基准pins_map
-    pins_map = db_operator.get_parts_pins_map(filter_dict={"Part": part, "Line": camera_location["Line"]}, demand_list=["PinsMap",])
+    # 获取基准pins_map，已反序列化
+    pins_map = detection_cache.get_pins_map(db_operator=db_operator, part=part, line=camera_location["Line"])
     if pins_map:
-        pins_map["PinsMap"] = MySerializer.deserialize(pins_map["PinsMap"])     # 反序列化
         message = dict(**detect_message, **process_parameters, **pins_map)      # 合并字典
+        # 帧质量不合格时重取下一帧
+        quality_gate = FrameQualityGate(parameters=message, retry_callback=lambda: cam.set_to_save(True),
+                                        failed_callback=lambda reason, metrics: interface.qualityRejectedSignal.emit(reason))
         # 设置 save_process_callback 回调函数
         cam.save_process_callback = lambda frame_data, parameters: camera_save_process(flag=1, frame_data=frame_data, parameters=parameters, message=message,
-                                                                                       db_operator=db_operator, show_detection_callback=show_detection_callback)
-        cam.set_to_save(True)   # 置位保存图片
+                                                                                       db_operator=db_operator, show_detection_callback=show_detection_callback,
+                                                                                       quality_gate=quality_gate)
+        quality_gate.start(cam)     # 置位保存图片，连续采集时先观察一帧用于运动检查
 
 
 def do_authority(password: str = "123"):
+    from UI.ui_authority import Ui_Dialog as Ui_Authority
+
     dialog = QDialog()
     dialog.setWindowIcon(QIcon(CF_APP_ICON))  # 设置窗口图标
 
@@ -261,7 +280,8 @@ def do_part_teach(teach_message: dict, cam: MyCamera, db_operator: DatabaseOpera
 
 
 def camera_save_process(flag: int, frame_data: np.ndarray, parameters: dict, message: dict,
-                        db_operator: Optional[DatabaseOperator] = None, show_detection_callback=None):
+                        db_operator: Optional[DatabaseOperator] = None, show_detection_callback=None, detection_result_callback=None,
+                        quality_gate: Optional[FrameQualityGate] = None):
     """
     相机保存过程的回调函数
     :param flag:
@@ -270,16 +290,20 @@ def camera_save_process(flag: int, frame_data: np.ndarray, parameters: dict, mes
     :param message:
     :param db_operator:
     :param show_detection_callback:
+    :param detection_result_callback:
+    :param quality_gate:    检测前的帧质量检查，不合格时不检测
     :return:
     """
     if flag == 1 and db_operator is not None:
+        if quality_gate is not None and not quality_gate.accept(frame_data):
+            return
         p = {"frame": frame_data,
              "message": message,
              "show_detection_callback": show_detection_callback,
-             "record_detection_callback": lambda record_message, origin_frame, detection_frame: record_detection(record_message=record_message,
-                                                                                                                 origin_frame=origin_frame,
-                                                                                                                 detection_frame=detection_frame,
-                                                                                                                 db_operator=db_operator)}
+             "detection_result_callback": detection_result_callback,
+             "record_detection_callback": lambda record_message, origin_frame, detection_frame, detection_result: record_detection(
+                 record_message=record_message, origin_frame=origin_frame, detection_frame=detection_frame, db_operator=db_operator,
+                 detection_result=detection_result)}
         target = FrameOperator.offline_process_algorithm
     else:
         p = {"message": message, "frame_data": frame_data}
@@ -312,6 +336,9 @@ def show_teach_interface(message: dict, frame_data: np.ndarray):
     str_camera_identity = MySerializer.serialize(camera_identity)
     str_camera_location = MySerializer.serialize(camera_location)
 
+    # 示教界面依赖较重，仅在打开示教时导入
+    from main_teach import show_teach
+
     # 多进程
     serialize_arguments = {"CameraIdentity": str_camera_identity, 'CameraLocation': str_camera_location,
                            'Part': part, 'FrameFile': file_path, "Page": page}
@@ -320,36 +347,35 @@ def show_teach_interface(message: dict, frame_data: np.ndarray):
     p.start()
 
 
-def record_detection(record_message: dict, origin_frame: np.ndarray, detection_frame: np.ndarray, db_operator: DatabaseOperator):
-    part = record_message["Part"]
-    line = record_message["Line"]
-    location = record_message["Location"]
-
+def record_detection(record_message: dict, origin_frame: np.ndarray, detection_frame: np.ndarray, db_operator: DatabaseOperator,
+                     detection_result: Optional[DetectionResult] = None):
     record_message["When"] = datetime.now()
-    time = record_message["When"].strftime('%G%m%d%H%M%S%f')
-
-    record_message["DetectionPicture"] = os_path.join(CF_RECORDS_DETECTION_PICTURES_DIR, "Detection_%s_%s_%s_%s.jpg" % (line, part, location, time))
-    record_message["OriginPicture"] = os_path.join(CF_RECORDS_ORIGIN_PICTURES_DIR, "Origin_%s_%s_%s_%s.jpg" % (line, part, location, time))
 
-    os_makedirs(CF_RECORDS_DETECTION_PICTURES_DIR, exist_ok=True)
-    os_makedirs(CF_RECORDS_ORIGIN_PICTURES_DIR, exist_ok=True)
+    # 按保存策略确定图片路径
+    pictures = PictureStore.plan_pictures(record_message=record_message, origin_frame=origin_frame, detection_frame=detection_frame)
 
-    cv2.imwrite(record_message["DetectionPicture"], detection_frame)
-    cv2.imwrite(record_message["OriginPicture"], origin_frame)
+    # 图片编码/写盘及插入数据库在后台线程完成，检测结果不等待
+    persisted_callback = None
+    if detection_result is not None:
+        detection_result.set_record(record_message)
+        persisted_callback = detection_result.mark_persisted
 
-    # db_operator = DatabaseOperator()
-    db_operator.set_detection_records(demand_dict=record_message)
-    # db_operator.close()
+    record_writer = RecordWriter.get_instance(db_operator=db_operator)
+    record_writer.submit(record_message=record_message,
+                         pictures=pictures,
+                         persisted_callback=persisted_callback)
 
 
 def connect_process_algorithm(value: bool, db_operator: DatabaseOperator, cam: MyCamera):
-    # TODO 当重新对相机进行示教后，当前的链接算法参数功能不会更新当前相机示教参数
     if value:
         serial_number = cam.camera_identity.serial_number
+        detection_cache = DetectionCache.get_instance()
         # 获取数据
-        process_parameters = db_operator.get_all_process_parameters(filter_dict={"SerialNumber": serial_number})
+        process_parameters = detection_cache.get_process_parameters(db_operator=db_operator, serial_number=serial_number)
         if process_parameters:
-            cam.frame_process_callback = lambda frame_data, parameters: FrameOperator.online_process_algorithm(frame=frame_data, algorithm_parameters=process_parameters)
+            # 每帧从缓存读取参数，重新示教后自动使用新参数
+            cam.frame_process_callback = lambda frame_data, parameters: FrameOperator.online_process_algorithm(
+                frame=frame_data, algorithm_parameters=detection_cache.get_process_parameters(db_operator=db_operator, serial_number=serial_number) or process_parameters)
     else:
         cam.frame_process_callback = None
 
@@ -0,0 +1,49 @@
+"""
+数据库迁移（一次性）
+将 Access 数据库中的 CamerasIdentity/ProcessParameters/PartsPinsMap/DetectionRecords/SocketConfig 复制到 SQLite 数据库，
+完成后将 config_static.CF_DATABASE_PATH 改为新的 .db 文件即可
+
+示例:
+    python main_migrate.py --source .\\PinsCtrlData\\Database\\pins_ctrl_database.accdb --target .\\PinsCtrlData\\Database\\pins_ctrl_database.db
+"""
+import argparse
+from sys import exit as sys_exit
+
+from Utils.database_operator import DatabaseOperator
+from Utils.database_migrator import DatabaseMigrator
+from User.config_static import CF_DATABASE_PATH
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Pins-Ctrl 数据库迁移")
+    parser.add_argument("--source", default=CF_DATABASE_PATH, help="源数据库路径")
+    parser.add_argument("--target", required=True, help="目标数据库路径")
+    parser.add_argument("--source-backend", default="AUTO", choices=["AUTO", "ACCESS", "SQLITE"], help="源数据库类型")
+    parser.add_argument("--target-backend", default="AUTO", choices=["AUTO", "ACCESS", "SQLITE"], help="目标数据库类型")
+    parser.add_argument("--clear", action="store_true", help="目标表已有数据时先清空")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_arguments()
+
+    source = DatabaseOperator(database_path=args.source, backend=args.source_backend)
+    target = DatabaseOperator(database_path=args.target, backend=args.target_backend)
+    try:
+        migrator = DatabaseMigrator(source=source, target=target)
+        summary = migrator.migrate(clear=args.clear,
+                                   progress_callback=lambda table_name, rows: print("%-18s +%d" % (table_name, rows)))
+    except RuntimeError as err:
+        print("迁移失败: %s" % (err,))
+        return 1
+    finally:
+        source.close()
+        target.close()
+
+    for table_name, rows in summary.items():
+        print("%-18s %d" % (table_name, rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys_exit(main())
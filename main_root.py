@@ -12,23 +12,21 @@ from PyQt5.QtGui import QIcon
 
 from CameraCore.my_camera_t import MyCamera
 
-from main_grab import show_grab
-
-from UI.ui_about import Ui_Dialog as Ui_About
-from Interface.interface_root import InterfaceRoot
-from Interface.interface_cameras_page import InterfaceCamerasPage
-
 from Utils.messenger import Messenger
 from Utils.database_operator import DatabaseOperator
+from Utils.retention_engine import RetentionScheduler
+from Utils.multicast_controller import MulticastController
 from Utils.serializer import MySerializer
 from Utils.image_presenter import Presenter
 
 from User.config_static import (CF_PROJECT_ROLE, CF_RUNNING_SEQUENCE_FILE, CF_RUNNING_ROOT_FLAG,
                                 CF_APP_TITLE, CF_APP_ICON, CF_CAMERA_YY_PICTURE, CF_ID_PICTURE,
-                                CF_CONTACTS, CF_VERSION, CF_CREATE_TIME, CF_README_PATH)
+                                CF_CONTACTS, CF_VERSION, CF_CREATE_TIME, CF_README_PATH, CF_CAMERA_MULTICAST_CHECK_INTERVAL)
 
 
 def show_about():
+    from UI.ui_about import Ui_Dialog as Ui_About
+
     my_version = CF_VERSION
     my_create_time = CF_CREATE_TIME
 
@@ -80,7 +78,7 @@ def show_readme():
     subprocess_run(['start', CF_README_PATH], shell=True)
 
 
-def enum_cameras(interface: InterfaceCamerasPage):
+def enum_cameras(interface):
     MyCamera.enum_cameras(filter_callback=lambda device_info: interface.filter_cameras(device_info=device_info),
                           fill_in_table_callback=lambda cameras_identity: interface.fill_in_table(cameras_identity=cameras_identity),
                           message_callback=lambda message: Messenger.show_QMessageBox(widget=interface, message=message))
@@ -124,6 +122,9 @@ def open_camera(message: dict, interface=None):
     str_camera_identity = MySerializer.serialize(camera_identity)
     str_camera_location = MySerializer.serialize(camera_location)
 
+    # Windows 下子进程会重新导入 __main__ 模块，界面相关模块放在函数内导入，避免相机进程加载整个界面树
+    from main_grab import show_grab
+
     # 多进程
     serialize_arguments = {"CameraIdentity": str_camera_identity, "CameraLocation": str_camera_location}
     p = Process(target=show_grab, kwargs={"serialize_arguments": serialize_arguments})
@@ -180,7 +181,11 @@ if __name__ == '__main__':
     with open(CF_RUNNING_SEQUENCE_FILE, 'w', encoding='utf-8') as sequence_file:
         sequence_file.write(str(CF_RUNNING_ROOT_FLAG))
 
+    from Interface.interface_root import InterfaceRoot
+
     db_opt = DatabaseOperator()
+    # 统计表建立之前的检测记录，在检测开始前统计一次
+    db_opt.ensure_statistics()
 
     app = QApplication(sys_argv)
     interface_root = InterfaceRoot(db_operator=db_opt)
@@ -190,10 +195,19 @@ if __name__ == '__main__':
     interface_root.readMeSignal.connect(show_readme)
     interface_root.aboutSignal.connect(show_about)
 
+    # 定时清理检测记录
+    retention_scheduler = RetentionScheduler.start_if_enabled(db_operator=db_opt)
+    # 组播时以控制权限打开相机，显示及检测以监控权限接收
+    multicast_controller = MulticastController.start_if_enabled()
+
     interface_root.show()
 
     res = app.exec_()
 
+    if retention_scheduler is not None:
+        retention_scheduler.stop()
+    if multicast_controller is not None:
+        multicast_controller.stop(timeout=CF_CAMERA_MULTICAST_CHECK_INTERVAL)
     db_opt.close()
 
     sys_exit(res)
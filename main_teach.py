@@ -9,6 +9,7 @@ from PyQt5.QtGui import QPixmap
 from Interface.interface_teach import InterfaceTeach
 
 from Utils.database_operator import DatabaseOperator
+from Utils.frame_kernels import FrameKernels
 from Utils.image_presenter import Presenter
 from Utils.serializer import MySerializer
 from User.config_static import CF_RUNNING_SEQUENCE_FILE, CF_RUNNING_TEACH_FLAG
@@ -32,6 +33,9 @@ def active_interface(arguments: dict):
     with open(CF_RUNNING_SEQUENCE_FILE, 'a', encoding='utf-8') as sequence_file:
         sequence_file.write(str(CF_RUNNING_TEACH_FLAG))
 
+    # 预热检测内核
+    FrameKernels.warm_up_in_thread(warm_up_callback=FrameKernels.print_warm_up_time)
+
     db_operator = DatabaseOperator()
 
     app = QApplication(argv)
@@ -0,0 +1,121 @@
+"""
+检测参数自动搜索（无界面）
+使用某相机的历史检测记录（原始图片 + 零件基准）作为样本，搜索与期望结果 100% 一致且耗时最短的 ProcessParameters
+
+示例:
+    python main_tune.py --line 5-100 --location A1 --max-samples 50 --json tune.json
+    python main_tune.py --serial-number 00D12345678 --line 5-100 --location A1 --space space.json --search random --candidates 300
+"""
+import json
+import argparse
+from sys import exit as sys_exit
+from multiprocessing import freeze_support
+import cv2
+
+from Utils.parameter_tuner import ParameterTuner, SEARCH_GRID, SEARCH_RANDOM
+from Utils.database_operator import DatabaseOperator
+from User.config_static import CF_DATABASE_PATH
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Pins-Ctrl 检测参数自动搜索")
+    parser.add_argument("--database", default=CF_DATABASE_PATH, help="数据库路径")
+    parser.add_argument("--line", required=True, help="生产线")
+    parser.add_argument("--location", required=True, help="相机位置")
+    parser.add_argument("--serial-number", default="", help="相机序列号，默认根据生产线和位置查询")
+    parser.add_argument("--part", default="ALL", help="零件")
+    parser.add_argument("--max-samples", type=int, default=50, help="最多使用的样本数量（取最新的记录）")
+    parser.add_argument("--include-failed", action="store_true", help="原检测结果为失败的记录也作为样本，期望结果为失败")
+    parser.add_argument("--space", default="", help="搜索空间json文件 {参数名: [取值, ...]}，默认以当前参数为中心")
+    parser.add_argument("--search", default=SEARCH_GRID, choices=[SEARCH_GRID, SEARCH_RANDOM], help="搜索方式")
+    parser.add_argument("--candidates", type=int, default=200, help="随机搜索的候选数量")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认cpu核数")
+    parser.add_argument("--json", default="", help="结果json文件")
+    parser.add_argument("--apply", action="store_true", help="将最优参数写入数据库")
+    return parser.parse_args()
+
+
+def load_samples(db_operator: DatabaseOperator, args) -> list:
+    filter_dict = {"Line": args.line, "Location": args.location, "Part": args.part}
+    if not args.include_failed:
+        filter_dict["Result"] = "TRUE"
+    records = db_operator.get_detection_records_in_period(demand_list=["ID", "Part", "Line", "Result", "OriginPicture"], filter_dict=filter_dict)
+    # 最新的记录优先
+    records = records[::-1][:args.max_samples]
+
+    pins_maps = dict()
+    samples = list()
+    for record in records:
+        key = (record["Part"], record["Line"])
+        if key not in pins_maps:
+            pins_maps[key] = db_operator.get_decoded_pins_map(part=record["Part"], line=record["Line"])
+        if pins_maps[key] is None:
+            continue
+        frame = cv2.imread(record["OriginPicture"], cv2.IMREAD_UNCHANGED) if record["OriginPicture"] else None
+        if frame is None:
+            continue
+        samples.append({"Frame": frame, "PinsMap": pins_maps[key], "Expected": bool(record["Result"])})
+    return samples
+
+
+def main() -> int:
+    args = parse_arguments()
+
+    db_operator = DatabaseOperator(database_path=args.database)
+    try:
+        serial_number = args.serial_number
+        if not serial_number:
+            camera = db_operator.get_camera_identity(demand_list=["SerialNumber"], filter_dict={"Line": args.line, "Location": args.location})
+            serial_number = camera.get("SerialNumber")
+        base_parameters = db_operator.get_all_process_parameters(filter_dict={"SerialNumber": serial_number}) if serial_number else None
+        if not base_parameters:
+            print("相机还未进行检测算法的参数示教")
+            return -1
+
+        samples = load_samples(db_operator, args)
+        if not samples:
+            print("没有可用的样本图片")
+            return -1
+
+        tuner = ParameterTuner(base_parameters=base_parameters, samples=samples)
+        if args.space:
+            with open(args.space, "r", encoding="utf-8") as file:
+                space = json.load(file)
+        else:
+            space = ParameterTuner.default_search_space(base_parameters)
+        candidates = tuner.generate_candidates(space, search=args.search, samples=args.candidates)
+
+        print("样本[%d] 候选参数[%d]" % (len(samples), len(candidates)))
+
+        from tqdm import tqdm
+        with tqdm(total=len(candidates) + 1) as bar:
+            report = tuner.run(candidates, workers=args.workers, progress_callback=lambda evaluated: bar.update(evaluated))
+
+        baseline = report["Baseline"]
+        best = report["Best"]
+        print("当前参数: 一致率[%.1f%%] 耗时[%.3f]ms" % (baseline["Agreement"] * 100, baseline["TimeMs"]))
+        if best is None:
+            print("没有 100% 一致的候选参数")
+        else:
+            print("最优参数: 一致率[%.1f%%] 耗时[%.3f]ms" % (best["Agreement"] * 100, best["TimeMs"]))
+            for key in space:
+                if best["Parameters"][key] != base_parameters[key]:
+                    print("    %-24s %s -> %s" % (key, base_parameters[key], best["Parameters"][key]))
+
+        if args.json:
+            ParameterTuner.write_json(report, args.json)
+
+        if args.apply and best is not None:
+            db_operator.set_process_parameters(demand_dict=dict(best["Parameters"]), filter_dict={"SerialNumber": serial_number})
+            print("最优参数已写入数据库")
+    finally:
+        db_operator.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    # 需要，否则无法打包
+    freeze_support()
+
+    sys_exit(main())